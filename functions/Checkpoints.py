@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 23:02:47 2026
+
+@author: Jérémy Bernard, chercheur associé au Lab-STICC
+"""
+import os
+import json
+import shutil
+import hashlib
+import time
+
+from .globalVariables import CHECKPOINT_FILE
+from .DataUtil import fileHash
+
+
+class Checkpoints(object):
+    """ Stages and wind directions of a preparation already done, recorded
+    in the CHECKPOINT_FILE of a checkpoint directory together with their
+    outputs (files of the checkpoint directory) and values (e.g. table names).
+    The checkpoints are only valid for the inputs used to record them."""
+
+    def __init__(self, directory, inputs, resume = False, key = None,
+                 feedback = None):
+        """
+		Parameters
+		_ _ _ _ _ _ _ _ _ _
+
+            directory: String
+                Directory where are saved the checkpoints
+            inputs: dictionary
+                Settings of the preparation (the files of the settings
+                being paths are hashed)
+            resume: boolean, default False
+                Whether or not the existing checkpoints are used (they are
+                removed otherwise)
+            key: String, default None
+                Identifier of the inputs if already known (see 'inputKey')
+            feedback: QgsProcessingFeedback, default None
+                Object used to warn the user when the existing checkpoints
+                can not be used (printed if None)"""
+        self.directory = directory
+        self.inputs = inputs
+        self.resume = resume
+        self.feedback = feedback
+        self.key = key or inputKey(inputs)
+        self.stages = {}
+        if resume and os.path.exists(self.path()):
+            with open(self.path()) as f:
+                content = json.load(f)
+            # Checkpoints recorded with other inputs can not be used
+            if content.get("key") == self.key:
+                self.stages = content.get("stages", {})
+            else:
+                message = f"The checkpoints of '{directory}' were recorded with other inputs, they are not used (the preparation restarts from the beginning)"
+                if feedback:
+                    feedback.pushWarning(message)
+                else:
+                    print(message)
+        if not self.stages and os.path.exists(directory):
+            shutil.rmtree(directory)
+        os.makedirs(directory, exist_ok = True)
+
+    def path(self, fileName = CHECKPOINT_FILE):
+        """ Path of a file of the checkpoint directory"""
+        return self.directory + os.sep + fileName
+
+    def done(self, stage):
+        """ Whether or not a stage has been recorded (and its outputs still exist)"""
+        return stage in self.stages\
+            and all(os.path.exists(self.path(f)) for f in self.stages[stage]["outputs"].values())
+
+    def get(self, stage):
+        """ Values recorded for a stage"""
+        return self.stages[stage]["values"]
+
+    def output(self, stage, name):
+        """ Path of an output recorded for a stage"""
+        return self.path(self.stages[stage]["outputs"][name])
+
+    def record(self, stage, outputs = {}, values = {}):
+        """ Record a stage as done
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _
+
+            stage: String
+                Name of the stage
+            outputs: dictionary, default {}
+                Name of the outputs as keys and file names (in the
+                checkpoint directory) as values
+            values: dictionary, default {}
+                Values needed to continue the preparation after this stage
+                (JSON serializable)"""
+        self.stages[stage] = {"outputs": outputs,
+                              "values": values,
+                              "time": time.time()}
+        # The file is replaced at once so that it is never partly written
+        tempPath = self.path(CHECKPOINT_FILE + ".tmp")
+        with open(tempPath, "w") as f:
+            json.dump({"key": self.key,
+                       "inputs": self.inputs,
+                       "stages": self.stages},
+                      f, indent = 2, default = str)
+        os.replace(tempPath, self.path())
+
+    def child(self, directory):
+        """ Checkpoints of a sub-preparation (e.g. a park of a batch)
+        having the same inputs"""
+        return Checkpoints(directory, self.inputs, resume = self.resume,
+                           key = self.key, feedback = self.feedback)
+
+    def clear(self):
+        """ Remove the checkpoints (once the preparation is done)"""
+        self.stages = {}
+        if os.path.exists(self.directory):
+            shutil.rmtree(self.directory)
+
+
+def inputKey(inputs):
+    """ Identifier of the inputs of a preparation: settings and content of
+    the input files"""
+    hashes = {n: fileHash(v) for n, v in inputs.items()
+              if isinstance(v, str) and os.path.isfile(v)}
+
+    return hashlib.sha256(json.dumps({"inputs": inputs, "hashes": hashes},
+                                     sort_keys = True, default = str)\
+                          .encode("utf-8")).hexdigest()
+
+def directionStage(windDirection):
+    """ Name of the stage of a wind direction"""
+    return f"direction {float(windDirection)}"
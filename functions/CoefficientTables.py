@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 22:41:05 2026
+
+Empirical coefficient tables, read only when first used. Each table is
+kept in memory once read and a binary copy is saved in a cache directory so
+that the next sessions do not parse the CSV file again.
+
+@author: Jérémy Bernard, chercheur associé au Lab-STICC
+"""
+import os
+import hashlib
+from collections.abc import Mapping
+from functools import lru_cache
+
+
+@lru_cache(maxsize = None)
+def readTable(filePath, cacheDirectory = None):
+    """ Read a coefficient table (CSV file whose first column is the index).
+    The table is read once per session: do not modify it (copy it first).
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _
+
+            filePath: String
+                Path of the CSV file
+            cacheDirectory: String, default None
+                Directory of the binary copies of the tables (no copy if None)
+
+		Returns
+		_ _ _ _ _ _ _ _ _ _
+
+            df_table: pd.DataFrame
+                Coefficient table"""
+    import pandas as pd
+
+    cachePath = None
+    if cacheDirectory:
+        # The copy is identified by the file path, size and modification date
+        stat = os.stat(filePath)
+        fileId = hashlib.sha1(f"{os.path.abspath(filePath)}_{stat.st_size}_{stat.st_mtime_ns}"\
+                              .encode("utf-8")).hexdigest()[:16]
+        cachePath = os.path.join(cacheDirectory,
+                                 f"{os.path.splitext(os.path.basename(filePath))[0]}_{fileId}.pkl")
+        if os.path.exists(cachePath):
+            try:
+                return pd.read_pickle(cachePath)
+            except Exception:
+                pass
+
+    df_table = pd.read_csv(filePath, header = 0, index_col = 0)
+    if cachePath:
+        try:
+            os.makedirs(cacheDirectory, exist_ok = True)
+            df_table.to_pickle(cachePath)
+        except OSError:
+            pass
+
+    return df_table
+
+@lru_cache(maxsize = None)
+def extremumValues(filePath, cacheDirectory = None):
+    """ Maximum ("MAX" column) and minimum ("MIN" column) of each column of
+    a training data table
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _
+
+            filePath: String
+                Path of the training data CSV file
+            cacheDirectory: String, default None
+                Directory of the binary copies of the tables
+
+		Returns
+		_ _ _ _ _ _ _ _ _ _
+
+            df_extremum: pd.DataFrame
+                Max and min of each variable (variables as index)"""
+    import pandas as pd
+
+    df_training = readTable(filePath, cacheDirectory)
+
+    return pd.concat([df_training.max().rename("MAX"),
+                      df_training.min().rename("MIN")],
+                     axis = 1)
+
+
+class LazyTables(Mapping):
+    """ Dictionary of coefficient tables (e.g. one per time period), each
+    table being read on first access (see 'readTable')"""
+
+    def __init__(self, filePaths, cacheDirectory = None):
+        """
+		Parameters
+		_ _ _ _ _ _ _ _ _ _
+
+            filePaths: dictionary
+                Path of the CSV file of each table
+            cacheDirectory: String, default None
+                Directory of the binary copies of the tables"""
+        self.filePaths = filePaths
+        self.cacheDirectory = cacheDirectory
+
+    def __getitem__(self, key):
+        return readTable(self.filePaths[key], self.cacheDirectory)
+
+    def __iter__(self):
+        return iter(self.filePaths)
+
+    def __len__(self):
+        return len(self.filePaths)
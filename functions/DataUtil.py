@@ -1,11 +1,22 @@
 # -*- coding: utf-8 -*-
 import zipfile
 import os
+import re
 import shutil
 import errno
+import hashlib
 import numpy as np
 from datetime import datetime
 import pandas as pd
+from .globalVariables import BULK_FETCH_BATCH_SIZE, WIND_DIR_FIELD
+
+# The calculations can be run without QGIS: the errors are then raised with
+# an exception having the same name as the QGIS processing one
+try:
+    from qgis.core import QgsProcessingException
+except ImportError:
+    class QgsProcessingException(Exception):
+        """ Error raised by the calculations when QGIS is not available"""
 
 
 def decompressZip(dirPath, inputFileName, outputFileBaseName=None, 
@@ -100,6 +111,64 @@ def postfix(tableName, suffix = None, separator = "_"):
     
     return tableName+separator+suffix
 
+def directionSuffix(wind_dir):
+    """ Suffix identifying the tables calculated for a wind direction
+    
+    Parameters
+	_ _ _ _ _ _ _ _ _ _ 
+		wind_dir : float
+			Wind direction (None if the table gathers all wind directions)
+    
+    Returns
+	_ _ _ _ _ _ _ _ _ _ 	
+		The suffix of the wind direction"""
+    if wind_dir is None:
+        return "ALL"
+    else:
+        return str(wind_dir).replace(".", "_")
+
+def directionKey(wind_dir, alias = None):
+    """ Wind direction column to add to the SELECT and GROUP BY clauses
+    when a table gathers all wind directions (nothing otherwise)
+    
+    Parameters
+	_ _ _ _ _ _ _ _ _ _ 
+		wind_dir : float
+			Wind direction (None if the tables gather all wind directions)
+        alias : String, default None
+            Alias of the table containing the wind direction column
+    
+    Returns
+	_ _ _ _ _ _ _ _ _ _ 	
+		SQL column followed by a comma (or empty string)"""
+    if wind_dir is None:
+        if alias:
+            return f"{alias}.{WIND_DIR_FIELD}, "
+        return f"{WIND_DIR_FIELD}, "
+    else:
+        return ""
+
+def directionJoin(wind_dir, alias1 = "a", alias2 = "b"):
+    """ Wind direction condition to add to a join when the tables gather 
+    all wind directions (nothing otherwise)
+    
+    Parameters
+	_ _ _ _ _ _ _ _ _ _ 
+		wind_dir : float
+			Wind direction (None if the tables gather all wind directions)
+        alias1 : String, default "a"
+            Alias of the first table
+        alias2 : String, default "b"
+            Alias of the second table
+    
+    Returns
+	_ _ _ _ _ _ _ _ _ _ 	
+		SQL condition starting with 'AND' (or empty string)"""
+    if wind_dir is None:
+        return f" AND {alias1}.{WIND_DIR_FIELD} = {alias2}.{WIND_DIR_FIELD}"
+    else:
+        return ""
+
 def prefix(tableName, prefix = "", separator = "_"):
     """ Add a suffix to an input table name
     
@@ -121,7 +190,9 @@ def prefix(tableName, prefix = "", separator = "_"):
         return prefix+separator+tableName
 
 def getColumns(cursor, tableName):
-    """ Get the column name of a table into a list
+    """ Get the column name of a table into a list. If the cursor keeps
+    a registry of the table metadata (see 'MetadataCursor'), the column
+    names are read only once per table (until the table is modified)
     
     Parameters
 	_ _ _ _ _ _ _ _ _ _ 
@@ -134,11 +205,282 @@ def getColumns(cursor, tableName):
 	_ _ _ _ _ _ _ _ _ _ 	
 		columnNames: list
             A list of the table column names"""
-    cursor.execute("""SELECT * FROM {0}""".format(tableName))
+    registry = getattr(cursor, "tableColumns", None)
+    key = normalizeTableName(tableName)
+    if registry is not None and key in registry:
+        return list(registry[key])
+    
+    # No row is fetched, only the result metadata
+    cursor.execute("""SELECT * FROM {0} LIMIT 0""".format(tableName))
     columnNames = [info[0] for info in cursor.description]
+    if registry is not None:
+        registry[key] = list(columnNames)
     
     return columnNames
 
+def normalizeTableName(tableName):
+    """ Return the name of a table as stored by the database (unquoted names
+    are upper case)
+    
+    Parameters
+	_ _ _ _ _ _ _ _ _ _ 
+		tableName : String
+			Name of the table
+    
+    Returns
+	_ _ _ _ _ _ _ _ _ _ 	
+		tableName: String
+            Normalized name of the table"""
+    tableName = tableName.strip()
+    if tableName.startswith('"') and tableName.endswith('"'):
+        return tableName[1:-1]
+    else:
+        return tableName.upper()
+
+def splitStatements(sql):
+    """ Split a string containing several SQL statements (separated by ';')
+    without splitting the statements containing ';' within quotes. The
+    comments ('--' until the end of the line and '/* */') are removed.
+    
+    Parameters
+	_ _ _ _ _ _ _ _ _ _ 
+        sql: String
+            SQL queries
+    
+    Returns
+	_ _ _ _ _ _ _ _ _ _ 	
+		statements: list of String
+            Non empty SQL statements"""
+    statements = []
+    current = []
+    quote = None
+    i = 0
+    while i < len(sql):
+        char = sql[i]
+        if quote:
+            # Escaped quotes ('') close and reopen the quote
+            if char == quote:
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif sql.startswith("--", i):
+            end = sql.find("\n", i)
+            i = len(sql) if end < 0 else end
+            continue
+        elif sql.startswith("/*", i):
+            end = sql.find("*/", i + 2)
+            i = len(sql) if end < 0 else end + 2
+            current.append(" ")
+            continue
+        elif char == ";":
+            statements.append("".join(current))
+            current = []
+            i += 1
+            continue
+        current.append(char)
+        i += 1
+    statements.append("".join(current))
+    
+    return [s.strip() for s in statements if s.strip()]
+
+# Statements modifying the table metadata
+_DROP_TABLE = re.compile(r"^DROP\s+TABLE\s+(?:IF\s+EXISTS\s+)?(.+?)(?:\s+CASCADE|\s+RESTRICT)?$",
+                         re.IGNORECASE | re.DOTALL)
+_CREATE_TABLE = re.compile(r"^CREATE\s+(?:CACHED\s+|MEMORY\s+|(?:LOCAL\s+|GLOBAL\s+)?TEMPORARY\s+)?"
+                           r"TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?([\w.\"]+)",
+                           re.IGNORECASE)
+_ALTER_TABLE = re.compile(r"^ALTER\s+TABLE\s+(?:IF\s+EXISTS\s+)?([\w.\"]+)"
+                          r"(?:\s+RENAME\s+TO\s+([\w.\"]+))?",
+                          re.IGNORECASE)
+_CREATE_INDEX = re.compile(r"^CREATE\s+(SPATIAL\s+)?INDEX\s+(?:IF\s+NOT\s+EXISTS\s+)?([\w\"]+)"
+                           r"\s+ON\s+([\w.\"]+)\s*\(\s*([\w\"]+)\s*\)$",
+                           re.IGNORECASE | re.DOTALL)
+_UNKNOWN_CHANGES = re.compile(r"^(?:CALL\s+\w+READ\s*\(|RUNSCRIPT\b|DROP\s+(?:ALL|INDEX|SCHEMA)\b)",
+                              re.IGNORECASE)
+
+class MetadataCursor(object):
+    """ Wraps a database cursor in order to keep a registry of the table
+    columns (filled by 'getColumns') and of the existing indexes. The registry
+    is updated according to the DROP / CREATE / ALTER statements executed, and
+    the 'CREATE INDEX' statements of indexes known to exist are not sent to 
+    the database. All other cursor attributes and methods are forwarded to
+    the wrapped cursor."""
+    
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.tableColumns = {}
+        self.tableIndexes = set()
+    
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+    
+    def execute(self, operation, parameters = None):
+        if parameters is None:
+            operation = self._updateRegistry(operation)
+            # Nothing left to execute
+            if operation == "":
+                return None
+        try:
+            if parameters is None:
+                return self._cursor.execute(operation)
+            else:
+                return self._cursor.execute(operation, parameters)
+        except Exception:
+            # The state of the database is not known anymore
+            self.clearRegistry()
+            raise
+    
+    def executemany(self, operation, seq_of_parameters):
+        return self._cursor.executemany(operation, seq_of_parameters)
+    
+    def clearRegistry(self):
+        self.tableColumns.clear()
+        self.tableIndexes.clear()
+    
+    def _invalidate(self, tableName):
+        key = normalizeTableName(tableName)
+        self.tableColumns.pop(key, None)
+        for index in [i for i in self.tableIndexes if i[0] == key]:
+            self.tableIndexes.remove(index)
+    
+    def _updateRegistry(self, operation):
+        """ Update the registry according to the statements of a query and
+        return the query without the creation of already existing indexes"""
+        statements = splitStatements(operation)
+        keptStatements = []
+        for statement in statements:
+            createIndex = _CREATE_INDEX.match(statement)
+            if createIndex:
+                # An index is identified by its table, column, type (spatial
+                # or not) and name: a spatial index is still created on a
+                # column having a B-tree index (and conversely)
+                index = (normalizeTableName(createIndex.group(3)),
+                         normalizeTableName(createIndex.group(4)),
+                         createIndex.group(1) is not None,
+                         normalizeTableName(createIndex.group(2)))
+                if index in self.tableIndexes:
+                    continue
+                self.tableIndexes.add(index)
+            elif _UNKNOWN_CHANGES.match(statement):
+                self.clearRegistry()
+            else:
+                dropTable = _DROP_TABLE.match(statement)
+                createTable = _CREATE_TABLE.match(statement)
+                alterTable = _ALTER_TABLE.match(statement)
+                if dropTable:
+                    for t in dropTable.group(1).split(","):
+                        self._invalidate(t)
+                elif createTable:
+                    self._invalidate(createTable.group(1))
+                elif alterTable:
+                    for t in alterTable.groups():
+                        if t:
+                            self._invalidate(t)
+            keptStatements.append(statement)
+        
+        # Keep the initial query if nothing has been removed
+        if len(keptStatements) == len(statements):
+            return operation
+        else:
+            return ";\n".join(keptStatements)
+
+def fetchDataFrame(cursor, query, geometryField = None, 
+                   batchSize = BULK_FETCH_BATCH_SIZE):
+    """ Fetch the result of a query directly into a DataFrame (no temporary
+    file is written on disk). If a geometry field is given, it is converted
+    to shapely geometries and a GeoDataFrame is returned
+    
+    Parameters
+	_ _ _ _ _ _ _ _ _ _ 
+        cursor: conn.cursor
+            A cursor object, used to perform spatial SQL queries
+		query : String
+			SELECT query (or simply the name of a table to fetch entirely)
+        geometryField: String, default None
+            Name of the geometry field (must be selected by the query)
+        batchSize: int, default BULK_FETCH_BATCH_SIZE
+            Number of rows fetched at once
+    
+    Returns
+	_ _ _ _ _ _ _ _ _ _ 	
+		df: pd.DataFrame or gpd.GeoDataFrame
+            Result of the query (one column per selected field)"""
+    if not query.strip().upper().startswith("SELECT"):
+        query = "SELECT * FROM {0}".format(query)
+    if geometryField:
+        # Geometries are transferred as hexadecimal WKB strings
+        query = """SELECT *, RAWTOHEX(ST_ASBINARY({1})) AS WKB_{1}
+                   FROM ({0})""".format(query, geometryField)
+    cursor.execute(query)
+    columnNames = [info[0] for info in cursor.description]
+    if geometryField:
+        import geopandas as gpd
+        from shapely import wkb
+    
+    # A DataFrame is built for each batch so that the rows fetched (and the
+    # WKB strings) are released batch after batch
+    frames = []
+    batch = cursor.fetchmany(batchSize)
+    while batch:
+        df = pd.DataFrame.from_records(batch, columns = columnNames)
+        if geometryField:
+            df[geometryField] = [wkb.loads(g, hex = True) if pd.notna(g) else None
+                                     for g in df.pop("WKB_" + geometryField)]
+        frames.append(df)
+        batch = cursor.fetchmany(batchSize)
+    if frames:
+        df = pd.concat(frames, ignore_index = True)
+    else:
+        df = pd.DataFrame(columns = columnNames)
+        if geometryField:
+            df = df.drop(columns = ["WKB_" + geometryField])
+    
+    if geometryField:
+        # The geometry is the last column
+        geom = df.pop(geometryField)
+        df = gpd.GeoDataFrame(df, geometry = list(geom))
+        df = df.rename_geometry(geometryField)
+    
+    return df
+
+def connectedComponents(pairs):
+    """ Identify the connected components of a graph given by its edges
+    (union-find with path compression). Each node is labelled by the 
+    smallest node of its component, thus the labelling is deterministic
+    
+    Parameters
+	_ _ _ _ _ _ _ _ _ _ 
+		pairs : iterable of tuples
+			Edges of the graph (pair of node IDs)
+    
+    Returns
+	_ _ _ _ _ _ _ _ _ _ 	
+		components: dict
+            Component label (value) of each node contained in 'pairs' (key)"""
+    parent = {}
+    
+    def find(node):
+        root = node
+        while parent[root] != root:
+            root = parent[root]
+        # Path compression
+        while parent[node] != root:
+            parent[node], node = root, parent[node]
+        return root
+    
+    for a, b in pairs:
+        parent.setdefault(a, a)
+        parent.setdefault(b, b)
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            # Keep the smallest ID as root
+            if root_a < root_b:
+                parent[root_b] = root_a
+            else:
+                parent[root_a] = root_b
+    
+    return {node: find(node) for node in parent}
+
 def readFunction(extension):
     """ Return the name of the right H2GIS function to use depending of the file extension
     
@@ -278,4 +620,35 @@ def trunc_to(x, sign_nb, upper = True):
 			add_up = 1. / 10 ** shift_nb
 		else:
 			add_up = 0
-		return round_to(np.trunc(x * 10 ** shift_nb) / 10 ** shift_nb + add_up, sign_nb)
\ No newline at end of file
+		return round_to(np.trunc(x * 10 ** shift_nb) / 10 ** shift_nb + add_up, sign_nb)
+
+def fileHash(filePath, blockSize = 2**20):
+	"""Calculates the SHA-256 hash of a file (read block by block). For a
+	shapefile, the .dbf and .shx files are also included in the hash.
+	
+		Parameters
+	_ _ _ _ _ _ _ _ _ _ 
+	
+			filePath : String
+				Path of the file to hash
+			blockSize : int, default 2**20
+				Number of bytes read at once
+				
+		Returns
+	_ _ _ _ _ _ _ _ _ _ 
+	
+			Hexadecimal hash of the file (None if the file does not exist)"""
+	if not filePath or not os.path.exists(filePath):
+		return None
+	filePaths = [filePath]
+	if os.path.splitext(filePath)[1].lower() == ".shp":
+		filePaths += [os.path.splitext(filePath)[0] + ext for ext in [".dbf", ".shx"]
+					  if os.path.exists(os.path.splitext(filePath)[0] + ext)]
+	
+	sha = hashlib.sha256()
+	for f in filePaths:
+		with open(f, "rb") as fileToHash:
+			for block in iter(lambda: fileToHash.read(blockSize), b""):
+				sha.update(block)
+	
+	return sha.hexdigest()
@@ -9,6 +9,9 @@ Created on Thu Jan 21 11:49:12 2021
 #!/usr/bin/python
 from __future__ import print_function
 import os
+import shutil
+import struct
+import zipfile
 import urllib3
 from . import DataUtil
 from .globalVariables import INSTANCE_NAME, INSTANCE_ID, INSTANCE_PASS, NEW_DB,\
@@ -95,7 +98,7 @@ def downloadH2gis(dbDirectory):
 def startH2gisInstance(dbDirectory, dbInstanceDir = TEMPO_DIRECTORY, 
                        instanceName = INSTANCE_NAME, suffix = "", 
                        instanceId=INSTANCE_ID, 
-                       instancePass = INSTANCE_PASS):
+                       instancePass = INSTANCE_PASS, newDB = NEW_DB):
     """ Start an H2GIS spatial database instance (used for Röckle zone calculation)
     For more information about use with Python: https://github.com/orbisgis/h2gis/wiki/4.4-Use-H2GIS-with-Python
 
@@ -114,6 +117,9 @@ def startH2gisInstance(dbDirectory, dbInstanceDir = TEMPO_DIRECTORY,
                 ID used to connect to the database
             instancePass: String, default INSTANCE_PASS
                 password used to connect to the database
+            newDB: boolean, default NEW_DB
+                Whether or not an existing database file should be deleted
+                (if False, the existing database is opened)
         
 		Returns
 		_ _ _ _ _ _ _ _ _ _ 
@@ -135,7 +141,7 @@ def startH2gisInstance(dbDirectory, dbInstanceDir = TEMPO_DIRECTORY,
     print (localH2JarDir)
 
     # If the DB already exists and if 'newDB' is set to True, delete all the DB files
-    if isDbExist:
+    if isDbExist and newDB:
         os.remove(localH2InstanceDir+DB_EXTENSION)
         if os.path.exists(localH2InstanceDir+DB_TRACE_EXTENSION):
             os.remove(localH2InstanceDir+DB_TRACE_EXTENSION)
@@ -147,7 +153,8 @@ def startH2gisInstance(dbDirectory, dbInstanceDir = TEMPO_DIRECTORY,
                                 localH2JarDir,)
 
     # conn.cursor will return a cursor object, you can use this cursor to perform queries
-    cur = conn.cursor()
+    # (the cursor keeps track of table columns and of existing indexes)
+    cur = DataUtil.MetadataCursor(conn.cursor())
     print("Connected!\n")
     
 
@@ -184,6 +191,81 @@ def closeAndRemoveH2gisInstance(localH2InstanceDir, conn, cur):
     if os.path.exists(localH2InstanceDir + DB_TRACE_EXTENSION):
         os.remove(localH2InstanceDir + DB_TRACE_EXTENSION)
 
+def backupH2gisInstance(cur, localH2InstanceDir):
+    """ Save a copy of an opened H2GIS instance in a zip file (online backup)
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _ 
+
+            cur: conn.cursor
+                A cursor object, used to perform queries
+            localH2InstanceDir: String
+                File directory of the database to save (without extension)
+        
+		Returns
+		_ _ _ _ _ _ _ _ _ _ 
+
+            backupFile: String
+                Path of the zip file containing the database copy"""
+    backupFile = localH2InstanceDir + ".zip"
+    if os.path.exists(backupFile):
+        os.remove(backupFile)
+    cur.execute(f"BACKUP TO '{backupFile}'")
+    
+    return backupFile
+
+def restoreH2gisInstance(backupFile, localH2InstanceDir):
+    """ Create a new database file from the backup of an H2GIS instance
+    (the new instance can then be opened using 'startH2gisInstance' with
+    'newDB' set to False)
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _ 
+
+            backupFile: String
+                Path of the zip file containing the database copy
+            localH2InstanceDir: String
+                File directory of the database to create (without extension)
+        
+		Returns
+		_ _ _ _ _ _ _ _ _ _ 
+
+            None"""
+    with zipfile.ZipFile(backupFile) as z:
+        dbFile = [f for f in z.namelist() if f.endswith(DB_EXTENSION)][0]
+        with z.open(dbFile) as src, open(localH2InstanceDir + DB_EXTENSION, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+
+def configureJava(pluginDirectory):
+    """ Set the JAVA variable environment needed by H2GIS (and save it in 
+    the plugin repository)
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _ 
+
+            pluginDirectory: String
+                Path of the plugin directory where is saved the java path
+        
+		Returns
+		_ _ _ _ _ _ _ _ _ _ 
+
+            javaPath: String
+                JAVA variable path"""
+    javaPath = getJavaDir(pluginDirectory)
+    if not javaPath:  # Raise an error if could not find a Java installation
+        raise DataUtil.QgsProcessingException("No Java installation found")
+    elif ("Program Files (x86)" in javaPath) and (struct.calcsize("P") * 8 != 32):
+        # Raise an error if Java is 32 bits but Python 64 bits
+        raise DataUtil.QgsProcessingException('Only a 32 bits version of Java has been'+
+                                              'found while your Python installation is 64 bits.'+
+                                              'Consider installing a 64 bits Java version.')
+    else:   # Set a Java dir if not exist and save it into a file in the plugin repository
+        setJavaDir(javaPath)
+        saveJavaDir(javaPath = javaPath,
+                    pluginDirectory = pluginDirectory)
+    
+    return javaPath
+
 def setJavaDir(javaPath):
     """ If there is no JAVA variable environment set or neither already one 
     saved in the URock repository, ask the user to enter one for
@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 22:03:18 2026
+
+Local job service running the CoolParks calculations submitted by several
+QGIS sessions (or command-line runners): the jobs are queued and run with a
+limited number of workers, their progress is sent back to the clients and
+identical jobs share the same outputs.
+
+@author: Jérémy Bernard, chercheur associé au Lab-STICC
+"""
+import os
+import json
+import threading
+import time
+import uuid
+import urllib.request
+import urllib.error
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ThreadPoolExecutor
+
+from .globalVariables import JOB_SERVICE_HOST, JOB_SERVICE_PORT, JOB_SERVICE_WORKERS,\
+    JOB_SERVICE_POLLING, JOB_SERVICE_URL, OUTPUT_PROCESSOR_FOLDER
+from .DataUtil import QgsProcessingException, fileHash
+from . import mainCalculations
+from .H2gisConnection import configureJava
+
+# Kind of jobs
+PREPARE = "prepare"
+CALC = "calc"
+COMPARE = "compare"
+JOB_KINDS = [PREPARE, CALC, COMPARE]
+
+# Status of a job
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = [DONE, FAILED, CANCELLED]
+
+
+class JobFeedback(object):
+    """ Keep the progress of a job so that it can be sent to its client
+    (replace the QGIS processing feedback)"""
+
+    def __init__(self):
+        self.messages = []
+        self.progress = 0
+        self.canceled = False
+
+    def setProgressText(self, text):
+        self.messages.append(text)
+
+    def pushWarning(self, text):
+        self.messages.append(f"Warning: {text}")
+
+    def setProgress(self, progress):
+        self.progress = progress
+
+    def isCanceled(self):
+        return self.canceled
+
+
+class Job(object):
+    """ Calculation submitted to the job service"""
+
+    def __init__(self, kind, parameters, key):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.parameters = parameters
+        self.key = key
+        self.status = QUEUED
+        self.feedback = JobFeedback()
+        self.result = None
+        self.error = None
+        self.future = None
+
+    def state(self, since = 0):
+        """ State of the job sent to the clients (only the progress messages
+        from the 'since' one)"""
+        return {"id": self.id,
+                "kind": self.kind,
+                "status": self.status,
+                "progress": self.feedback.progress,
+                "messages": self.feedback.messages[since:],
+                "nMessages": len(self.feedback.messages),
+                "result": self.result,
+                "error": self.error}
+
+
+class JobQueue(object):
+    """ Queue of the jobs of the service, run by a limited number of workers.
+    A job identical to a job queued, running or whose outputs still exist
+    (same kind, parameters and input files) is not run again."""
+
+    def __init__(self, nWorkers = JOB_SERVICE_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers = nWorkers)
+        self.jobs = {}
+        self.cache = {}
+        self.lock = threading.Lock()
+
+    def submit(self, kind, parameters):
+        """ Queue a job (or return the identical job already submitted)
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _
+
+            kind: String
+                Kind of job (one of JOB_KINDS)
+            parameters: dictionary
+                Arguments of the calculation (see 'runJob')
+
+		Returns
+		_ _ _ _ _ _ _ _ _ _
+
+            job: Job
+                Job running the calculation"""
+        if kind not in JOB_KINDS:
+            raise ValueError(f"The kind of job should be one of {JOB_KINDS}")
+        key = jobKey(kind, parameters)
+        with self.lock:
+            cached = self.jobs.get(self.cache.get(key))
+            if cached and (cached.status in [QUEUED, RUNNING]
+                           or cached.status == DONE and _outputsExist(cached)):
+                return cached
+            job = Job(kind, parameters, key)
+            self.jobs[job.id] = job
+            self.cache[key] = job.id
+            job.future = self.executor.submit(self.run, job)
+
+        return job
+
+    def run(self, job):
+        """ Run a job in a worker"""
+        job.status = RUNNING
+        try:
+            job.result = runJob(job.kind, job.parameters, feedback = job.feedback)
+            if job.feedback.isCanceled():
+                job.status = CANCELLED
+            else:
+                job.status = DONE
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            job.status = FAILED
+
+    def cancel(self, jobId):
+        """ Cancel a job (not started yet or running)"""
+        job = self.jobs[jobId]
+        job.feedback.canceled = True
+        if job.future.cancel():
+            job.status = CANCELLED
+
+        return job
+
+
+def jobKey(kind, parameters):
+    """ Identifier of a job: its kind, its parameters and the content of its
+    input files"""
+    hashes = {n: fileHash(v) for n, v in parameters.items()
+              if isinstance(v, str) and os.path.isfile(v)}
+
+    return json.dumps({"kind": kind, "parameters": parameters, "hashes": hashes},
+                      sort_keys = True, default = str)
+
+def runJob(kind, parameters, feedback = None):
+    """ Run a calculation in the current process and convert its result into
+    JSON serializable values
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _
+
+            kind: String
+                Kind of job: PREPARE (arguments of mainCalculations.prepareScenario),
+                CALC (arguments of mainCalculations.processScenario) or COMPARE
+                (arguments of mainCalculations.compareScenarios)
+            parameters: dictionary
+                Arguments of the calculation
+            feedback: QgsProcessingFeedback, default None
+                Object used to report progress and to check cancellation
+
+		Returns
+		_ _ _ _ _ _ _ _ _ _
+
+            result: list
+                Values returned by the calculation (None if cancelled), the
+                H2GIS cursor and the building GeoDataFrame being replaced by None"""
+    if kind == PREPARE:
+        # The database is not used by the client, thus it is removed (the
+        # service runs many jobs)
+        result = mainCalculations.prepareScenario(feedback = feedback,
+                                                  **dict(parameters, closeInstance = True))
+        if result is not None:
+            result = [None, result[1]]
+    elif kind == CALC:
+        result = mainCalculations.processScenario(feedback = feedback, **parameters)
+        if result is not None:
+            result = list(result)
+            result[4] = None
+    elif kind == COMPARE:
+        result = list(mainCalculations.compareScenarios(**parameters))
+    else:
+        raise ValueError(f"The kind of job should be one of {JOB_KINDS}")
+
+    return json.loads(json.dumps(result, default = _toJson))
+
+def _outputsExist(job):
+    """ Whether or not the outputs of a finished job still exist"""
+    if job.kind == PREPARE:
+        directory = job.parameters["output_directory"] + os.sep + job.parameters["prefix"]
+    elif job.kind == CALC:
+        directory = job.parameters["scenarioDirectory"] + os.sep + OUTPUT_PROCESSOR_FOLDER\
+            + os.sep + job.parameters.get("prefix", "")
+    else:
+        directory = job.result[0]
+
+    return os.path.exists(directory)
+
+def _toJson(value):
+    """ Convert numpy values (and other objects) into JSON serializable values"""
+    if hasattr(value, "item"):
+        return value.item()
+    else:
+        return str(value)
+
+def _fromJson(value):
+    """ Convert back the dictionary keys which were integers (time periods)"""
+    if isinstance(value, dict):
+        return {int(k) if k.isdigit() else k: _fromJson(v) for k, v in value.items()}
+    elif isinstance(value, list):
+        return [_fromJson(v) for v in value]
+    else:
+        return value
+
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    """ HTTP interface of the job service:
+        - POST /jobs {"kind": ..., "parameters": {...}}: submit a job
+        - GET /jobs: state of all jobs
+        - GET /jobs/<id>?since=<n>: state of a job (progress messages from the n-th)
+        - DELETE /jobs/<id>: cancel a job"""
+    queue = None
+
+    def _send(self, code, content):
+        body = json.dumps(content, default = _toJson).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _job(self):
+        """ Job identified by the request path (None if not found)"""
+        parts = urlparse(self.path).path.strip("/").split("/")
+        if len(parts) == 2 and parts[0] == "jobs":
+            return self.queue.jobs.get(parts[1])
+        return None
+
+    def do_POST(self):
+        if urlparse(self.path).path.strip("/") != "jobs":
+            return self._send(404, {"error": f"Unknown path {self.path}"})
+        try:
+            content = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            if not isinstance(content, dict) or not isinstance(content.get("parameters", {}), dict):
+                raise ValueError('The request should be {"kind": ..., "parameters": {...}}')
+            job = self.queue.submit(content["kind"], content.get("parameters", {}))
+        except (ValueError, KeyError) as e:
+            return self._send(400, {"error": str(e)})
+        self._send(200, job.state())
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.strip("/") == "jobs":
+            return self._send(200, [{"id": j.id, "kind": j.kind, "status": j.status}
+                                    for j in list(self.queue.jobs.values())])
+        job = self._job()
+        if job is None:
+            return self._send(404, {"error": f"Unknown job {self.path}"})
+        since = int(parse_qs(url.query).get("since", [0])[0])
+        self._send(200, job.state(since))
+
+    def do_DELETE(self):
+        job = self._job()
+        if job is None:
+            return self._send(404, {"error": f"Unknown job {self.path}"})
+        self._send(200, self.queue.cancel(job.id).state())
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(pluginDirectory, host = JOB_SERVICE_HOST, port = JOB_SERVICE_PORT,
+          nWorkers = JOB_SERVICE_WORKERS):
+    """ Run the job service until interrupted
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _
+
+            pluginDirectory: String
+                Directory of the plugin (used to set the Java environment)
+            host: String, default JOB_SERVICE_HOST
+                Address of the service (keep a local address, the service
+                has no authentication)
+            port: int, default JOB_SERVICE_PORT
+                Port of the service
+            nWorkers: int, default JOB_SERVICE_WORKERS
+                Number of jobs run at the same time"""
+    configureJava(pluginDirectory)
+    handler = type("Handler", (JobRequestHandler, ), {"queue": JobQueue(nWorkers)})
+    server = ThreadingHTTPServer((host, port), handler)
+    print(f"CoolParks job service listening on http://{host}:{port} ({nWorkers} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        handler.queue.executor.shutdown(wait = False, cancel_futures = True)
+
+
+def _request(serviceUrl, path, method = "GET", content = None):
+    """ Send a request to the job service and return its JSON answer"""
+    data = json.dumps(content, default = _toJson).encode("utf-8") if content is not None else None
+    request = urllib.request.Request(serviceUrl.rstrip("/") + path, data = data,
+                                     method = method,
+                                     headers = {"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        raise QgsProcessingException(f"The job service refused the request: {e.read().decode()}")
+    except urllib.error.URLError as e:
+        raise QgsProcessingException(f"The job service '{serviceUrl}' can not be reached: {e.reason}")
+
+def submitJob(kind, parameters, serviceUrl = JOB_SERVICE_URL, feedback = None):
+    """ Submit a job to the service and wait for its result, the progress of
+    the job being sent to the feedback (the job is cancelled if the feedback
+    is cancelled)
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _
+
+            kind: String
+                Kind of job (one of JOB_KINDS)
+            parameters: dictionary
+                Arguments of the calculation (see 'runJob')
+            serviceUrl: String, default JOB_SERVICE_URL
+                URL of the job service
+            feedback: QgsProcessingFeedback, default None
+                Object used to report progress and to check cancellation
+
+		Returns
+		_ _ _ _ _ _ _ _ _ _
+
+            result: list
+                Values returned by the calculation (see 'runJob', None if
+                cancelled)"""
+    state = _request(serviceUrl, "/jobs", method = "POST",
+                     content = {"kind": kind, "parameters": parameters})
+    jobId = state["id"]
+    nMessages = 0
+    while True:
+        state = _request(serviceUrl, f"/jobs/{jobId}?since={nMessages}")
+        nMessages = state["nMessages"]
+        if feedback:
+            for message in state["messages"]:
+                feedback.setProgressText(message)
+            feedback.setProgress(state["progress"])
+            if feedback.isCanceled() and state["status"] not in FINISHED:
+                _request(serviceUrl, f"/jobs/{jobId}", method = "DELETE")
+        if state["status"] in FINISHED:
+            break
+        time.sleep(JOB_SERVICE_POLLING)
+    if state["status"] == FAILED:
+        raise QgsProcessingException(f"The job failed on the service: {state['error']}")
+
+    return _fromJson(state["result"])
+
+def execute(kind, feedback = None, serviceUrl = JOB_SERVICE_URL, **parameters):
+    """ Run a calculation on the job service if its URL is set, else in the
+    current process. The result has the same form in both cases.
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _
+
+            kind: String
+                Kind of job: PREPARE (mainCalculations.prepareScenario), CALC
+                (mainCalculations.processScenario) or COMPARE
+                (mainCalculations.compareScenarios)
+            feedback: QgsProcessingFeedback, default None
+                Object used to report progress and to check cancellation
+            serviceUrl: String, default JOB_SERVICE_URL
+                URL of the job service (None to run in the current process)
+            parameters:
+                Arguments of the calculation
+
+		Returns
+		_ _ _ _ _ _ _ _ _ _
+
+            result: tuple
+                Values returned by the calculation (None if cancelled)"""
+    if not serviceUrl:
+        if kind == PREPARE:
+            return mainCalculations.prepareScenario(feedback = feedback, **parameters)
+        elif kind == CALC:
+            return mainCalculations.processScenario(feedback = feedback, **parameters)
+        else:
+            return mainCalculations.compareScenarios(**parameters)
+
+    result = submitJob(kind, parameters, serviceUrl = serviceUrl, feedback = feedback)
+    if result is None:
+        return None
+    if kind == CALC:
+        # The building results are read from their file
+        import geopandas as gpd
+        result[4] = gpd.read_file(result[5])
+
+    return tuple(result)
@@ -46,16 +46,8 @@ def windRotation(cursor, dicOfInputTables, rotateAngle, rotationCenterCoordinate
     # If not specified, get the most North-East point of the envelope of all
     # geometries of all tables as the center of rotation
     if rotationCenterCoordinates is None:
-        queryUnionTables = " UNION ALL ".join(["""
-                                                SELECT {0} FROM ST_EXPLODE('(SELECT {0} FROM {1})')
-                                                """.format( GEOM_FIELD,
-                                                            t)
-                                                for t in dicOfInputTables.values()])
-        cursor.execute("""
-           SELECT  ST_XMAX(ST_EXTENT({0})),
-                   ST_YMAX(ST_EXTENT({0}))
-           FROM    ({1})""".format(GEOM_FIELD, queryUnionTables))
-        rotationCenterCoordinates = cursor.fetchall()[0]
+        rotationCenterCoordinates = rotationCenter(cursor = cursor,
+                                                   tables = dicOfInputTables.values())
     
     columnNames = {}
     # Store the column names (except geometry field) of each table into a dictionary
@@ -81,3 +73,82 @@ def windRotation(cursor, dicOfInputTables, rotateAngle, rotationCenterCoordinate
     cursor.execute(";".join(sqlRotateQueries))
     
     return dicOfRotateTables, rotationCenterCoordinates
+
+def rotationCenter(cursor, tables):
+    """ Get the most North-East point of the envelope of all geometries
+    contained in all tables (default center of rotation).
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _ 
+
+            cursor: conn.cursor
+                A cursor object, used to perform spatial SQL queries
+            tables: list of String
+                Name of the tables containing the geometries
+            
+		Returns
+		_ _ _ _ _ _ _ _ _ _ 
+
+            rotationCenterCoordinates: tuple of float
+                x and y values of the point used as center of rotation"""
+    queryUnionTables = " UNION ALL ".join(["""
+                                            SELECT {0} FROM ST_EXPLODE('(SELECT {0} FROM {1})')
+                                            """.format( GEOM_FIELD,
+                                                        t)
+                                            for t in tables])
+    cursor.execute("""
+       SELECT  ST_XMAX(ST_EXTENT({0})),
+               ST_YMAX(ST_EXTENT({0}))
+       FROM    ({1})""".format(GEOM_FIELD, queryUnionTables))
+    
+    return cursor.fetchall()[0]
+
+def windRotationAllDirections(cursor, dicOfInputTables, rotateAngles, 
+                              rotationCenterCoordinates):
+    """ Rotates the geometries of all tables for several wind directions at
+    once. For each table, the geometries rotated for all directions are 
+    stored in a single table (the wind direction is stored in a WIND_DIR
+    column).
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _ 
+
+            cursor: conn.cursor
+                A cursor object, used to perform spatial SQL queries
+            dicOfInputTables: dictionary of String
+                Dictionary of String with type of obstacle as key and input 
+                table name as value (tables containing the geometries to rotate)
+            rotateAngles: list of float
+                Counter clock-wise rotation angles (in degree)
+            rotationCenterCoordinates: tuple of float
+                x and y values of the point used as center of rotation
+            
+		Returns
+		_ _ _ _ _ _ _ _ _ _ 
+
+            dicOfRotateTables: dictionary
+                Map of initial table names as keys and rotated table names as values"""
+    print("Rotates geometries for {0} directions".format(len(rotateAngles)))
+    
+    dicOfRotateTables = {t: dicOfInputTables[t]+"_ROTATED_ALL" for t in dicOfInputTables.keys()}
+    sqlRotateQueries = []
+    for t in dicOfRotateTables.keys():
+        columnNames = DataUtil.getColumns(cursor = cursor,
+                                          tableName = dicOfInputTables[t])
+        columnNames.remove(GEOM_FIELD)
+        sqlUnion = " UNION ALL ".join(["""
+            SELECT  CAST({0} AS DOUBLE) AS {1},
+                    ST_MAKEVALID(ST_ROTATE({2}, {3}, {4}, {5})) AS {2},
+                    {6}
+            FROM    {7}""".format(  d                           , WIND_DIR_FIELD,
+                                    GEOM_FIELD                  , DataUtil.degToRad(d),
+                                    rotationCenterCoordinates[0], rotationCenterCoordinates[1],
+                                    ",".join(columnNames)       , dicOfInputTables[t])
+                                        for d in rotateAngles])
+        sqlRotateQueries.append("""
+            DROP TABLE IF EXISTS {0};
+            CREATE TABLE {0}
+                AS {1}""".format(dicOfRotateTables[t], sqlUnion))
+    cursor.execute(";".join(sqlRotateQueries))
+    
+    return dicOfRotateTables
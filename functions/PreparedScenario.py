@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 14:05:12 2026
+
+@author: Jérémy Bernard, chercheur associé au Lab-STICC
+"""
+import os
+import json
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from .DataUtil import fetchDataFrame, degToRad
+from .Obstacles import windRotation
+from .globalVariables import GEOM_FIELD, WIND_DIR_FIELD, GRID_INDIC_TAB,\
+    GRID_LATTICE_TAB, DEFAULT_D_PARK_INPUT, DEFAULT_D_PARK_OUTPUT, DEFAULT_D_PARK,\
+    PREPARED_SCENARIO_FILE, PARK_BOUNDARIES_TAB, PREPARATION_SETTINGS_FILE
+
+# Size of the SQLite memory map used when reading the container (bytes)
+MMAP_SIZE = 2**30
+
+# SQLite column type of each numpy data kind
+_SQLITE_TYPES = {"b": "INTEGER", "i": "INTEGER", "u": "INTEGER", "f": "REAL"}
+
+
+def fetchLayer(cursor, tableName, srid, windDirection = None,
+               rotationCenterCoordinates = None, rotateAngle = None):
+    """ Fetch a table of the database as a GeoDataFrame (the table can be
+    rotated before if needed) and tag it with the wind direction it
+    has been calculated for.
+
+    Parameters
+	_ _ _ _ _ _ _ _ _ _
+        cursor: conn.cursor
+            A cursor object, used to perform spatial SQL queries
+		tableName : String
+			Name of the table to fetch
+        srid: int
+            EPSG code of the table geometries
+        windDirection: float, default None
+            Wind direction used to calculate the table (no WIND_DIR column
+            is added if None)
+        rotationCenterCoordinates: tuple of float, default None
+            x and y values of the point used as center of rotation
+        rotateAngle: float, default None
+            Counter clock-wise rotation angle (in degree)
+
+    Returns
+	_ _ _ _ _ _ _ _ _ _
+		gdf: gpd.GeoDataFrame
+            Content of the table"""
+    rotatedTable = None
+    if rotationCenterCoordinates is not None and rotateAngle is not None:
+        rotatedTable = windRotation(cursor = cursor,
+                                    dicOfInputTables = {tableName: tableName},
+                                    rotateAngle = rotateAngle,
+                                    rotationCenterCoordinates = rotationCenterCoordinates)[0][tableName]
+    try:
+        gdf = fetchDataFrame(cursor = cursor,
+                             query = rotatedTable or tableName,
+                             geometryField = GEOM_FIELD).set_crs(srid)
+    finally:
+        # The rotated table is only needed to fetch the layer
+        if rotatedTable:
+            cursor.execute(f"DROP TABLE IF EXISTS {rotatedTable}")
+    if windDirection is not None:
+        gdf.insert(0, WIND_DIR_FIELD, float(windDirection))
+
+    return gdf
+
+def gridLattice(cursor, gridTable, srid, windDirection, rotationCenterCoordinates):
+    """ Describe the grid points (regular lattice in the frame rotated
+    according to the wind direction) by their lattice parameters and by the
+    affine transform giving the coordinates of each point in the initial frame:
+        X = GT0 + i * GT1 + j * GT2
+        Y = GT3 + i * GT4 + j * GT5
+    where i = ID_COL - COL_MIN and j = ID_ROW - ROW_MIN (same convention as
+    a GDAL geotransform, applied to pixel centers).
+
+    Parameters
+	_ _ _ _ _ _ _ _ _ _
+        cursor: conn.cursor
+            A cursor object, used to perform spatial SQL queries
+		gridTable : String
+			Name of the grid table (rotated frame, ID_COL and ID_ROW columns needed)
+        srid: int
+            EPSG code of the grid geometries
+        windDirection: float
+            Wind direction used to rotate the grid
+        rotationCenterCoordinates: tuple of float
+            x and y values of the point used as center of rotation
+
+    Returns
+	_ _ _ _ _ _ _ _ _ _
+		lattice: dictionary
+            Lattice parameters and affine transform of the grid"""
+    cursor.execute(f"""
+        SELECT  MIN(ID_COL), MAX(ID_COL), MIN(ID_ROW), MAX(ID_ROW),
+                MIN(ST_X({GEOM_FIELD})), MAX(ST_X({GEOM_FIELD})),
+                MIN(ST_Y({GEOM_FIELD})), MAX(ST_Y({GEOM_FIELD}))
+        FROM {gridTable}""")
+    col_min, col_max, row_min, row_max, xmin, xmax, ymin, ymax = cursor.fetchall()[0]
+    dx = (xmax - xmin) / max(col_max - col_min, 1)
+    dy = (ymax - ymin) / max(row_max - row_min, 1)
+    
+    # Row IDs increase from North to South in the rotated frame
+    cx, cy = rotationCenterCoordinates
+    angle = -degToRad(windDirection)
+    cos, sin = np.cos(angle), np.sin(angle)
+    
+    return {WIND_DIR_FIELD: float(windDirection),
+            "SRID": int(srid),
+            "COL_MIN": int(col_min),
+            "ROW_MIN": int(row_min),
+            "N_COLS": int(col_max - col_min + 1),
+            "N_ROWS": int(row_max - row_min + 1),
+            "DX": dx,
+            "DY": dy,
+            "CENTER_X": cx,
+            "CENTER_Y": cy,
+            "GT0": cx + (xmin - cx) * cos - (ymax - cy) * sin,
+            "GT1": dx * cos,
+            "GT2": dy * sin,
+            "GT3": cy + (xmin - cx) * sin + (ymax - cy) * cos,
+            "GT4": dx * sin,
+            "GT5": -dy * cos}
+
+def latticePoints(lattice, df_indic):
+    """ Materialize the grid points of a lattice in the initial frame.
+
+    Parameters
+	_ _ _ _ _ _ _ _ _ _
+		lattice : dictionary or pd.Series
+			Lattice parameters and affine transform of the grid
+        df_indic: pd.DataFrame
+            Grid points (ID, ID_COL and ID_ROW columns needed)
+
+    Returns
+	_ _ _ _ _ _ _ _ _ _
+		gdf_geom: gpd.GeoDataFrame
+            Grid points (ID as attribute, same index as 'df_indic')"""
+    import geopandas as gpd
+    
+    i = df_indic["ID_COL"].values - lattice["COL_MIN"]
+    j = df_indic["ID_ROW"].values - lattice["ROW_MIN"]
+    x = lattice["GT0"] + i * lattice["GT1"] + j * lattice["GT2"]
+    y = lattice["GT3"] + i * lattice["GT4"] + j * lattice["GT5"]
+    
+    return gpd.GeoDataFrame(df_indic[["ID"]],
+                            geometry = gpd.points_from_xy(x, y),
+                            crs = int(lattice["SRID"]))
+
+def writeContainer(containerPath, layers, attributeTables = {}):
+    """ Write a prepared scenario in a single GeoPackage file. Geometry
+    layers are written using GDAL while the attribute tables are written
+    directly in the SQLite database and registered as GeoPackage
+    'attributes' content.
+
+    Parameters
+	_ _ _ _ _ _ _ _ _ _
+		containerPath : String
+			Path of the GeoPackage file (overwritten if exists)
+        layers: dictionary of gpd.GeoDataFrame
+            Layer name as key and layer content as value
+        attributeTables: dictionary of pd.DataFrame, default {}
+            Table name as key and table content as value
+
+    Returns
+	_ _ _ _ _ _ _ _ _ _
+		containerPath: String
+            Path of the GeoPackage file"""
+    if os.path.isfile(containerPath):
+        os.remove(containerPath)
+    for name, gdf in layers.items():
+        gdf.to_file(containerPath, layer = name, driver = "GPKG")
+
+    conn = sqlite3.connect(containerPath)
+    try:
+        for name, df in attributeTables.items():
+            columns = [f'"{col}" {_SQLITE_TYPES.get(df[col].dtype.kind, "TEXT")}'
+                           for col in df.columns]
+            conn.execute(f'DROP TABLE IF EXISTS "{name}"')
+            conn.execute(f"""CREATE TABLE "{name}"(fid INTEGER PRIMARY KEY AUTOINCREMENT,
+                                                   {", ".join(columns)})""")
+            df.to_sql(name, conn, if_exists = "append", index = False)
+            conn.execute("""INSERT OR REPLACE INTO gpkg_contents(table_name, data_type, identifier)
+                            VALUES (?, 'attributes', ?)""", (name, name))
+        conn.commit()
+    finally:
+        conn.close()
+
+    return containerPath
+
+def appendContainer(containerPath, layers, attributeTables = {}):
+    """ Append the content of layers and attribute tables to the ones of an
+    existing GeoPackage file (e.g. outputs of additional wind directions).
+
+    Parameters
+	_ _ _ _ _ _ _ _ _ _
+		containerPath : String
+			Path of the existing GeoPackage file
+        layers: dictionary of gpd.GeoDataFrame
+            Layer name as key and content to append as value
+        attributeTables: dictionary of pd.DataFrame, default {}
+            Table name as key and content to append as value
+
+    Returns
+	_ _ _ _ _ _ _ _ _ _
+		containerPath: String
+            Path of the GeoPackage file"""
+    for name, gdf in layers.items():
+        gdf.to_file(containerPath, layer = name, driver = "GPKG", mode = "a")
+
+    conn = sqlite3.connect(containerPath)
+    try:
+        for name, df in attributeTables.items():
+            df.to_sql(name, conn, if_exists = "append", index = False)
+        conn.commit()
+    finally:
+        conn.close()
+
+    return containerPath
+
+def readAttributeTable(containerPath, tableName):
+    """ Read a non-spatial table of the container (the database is
+    memory-mapped for the reading).
+
+    Parameters
+	_ _ _ _ _ _ _ _ _ _
+		containerPath : String
+			Path of the GeoPackage file
+        tableName: String
+            Name of the table to read
+
+    Returns
+	_ _ _ _ _ _ _ _ _ _
+		df: pd.DataFrame
+            Content of the table (ordered by row ID)"""
+    conn = sqlite3.connect(f"file:{containerPath}?mode=ro", uri = True)
+    try:
+        conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+        df = pd.read_sql(f'SELECT * FROM "{tableName}" ORDER BY fid', conn)
+    finally:
+        conn.close()
+
+    return df.drop(columns = "fid")
+
+def readGrids(containerPath):
+    """ Read the grid indicators and the grid lattices of all wind directions
+    from the container, split them by wind direction and materialize the
+    grid points.
+
+    Parameters
+	_ _ _ _ _ _ _ _ _ _
+		containerPath : String
+			Path of the GeoPackage file
+
+    Returns
+	_ _ _ _ _ _ _ _ _ _
+		grids: dictionary of gpd.GeoDataFrame
+            Wind direction as key and grid point geometries as value
+        grid_indic: dictionary of pd.DataFrame
+            Wind direction as key and grid indicators as value (default
+            distance values are set to NaN)
+        lattices: dictionary of pd.Series
+            Wind direction as key and grid lattice as value"""
+    lattices = readAttributeTable(containerPath = containerPath,
+                                  tableName = GRID_LATTICE_TAB)\
+        .set_index(WIND_DIR_FIELD)
+    df_indic = readAttributeTable(containerPath = containerPath,
+                                  tableName = GRID_INDIC_TAB)\
+        .replace([DEFAULT_D_PARK_INPUT, DEFAULT_D_PARK_OUTPUT, DEFAULT_D_PARK],
+                 np.nan)
+
+    grid_indic = {d: df.drop(columns = WIND_DIR_FIELD).reset_index(drop = True)
+                     for d, df in df_indic.groupby(WIND_DIR_FIELD, sort = True)}
+    grids = {d: latticePoints(lattice = lattices.loc[d], df_indic = df)
+                for d, df in grid_indic.items()}
+
+    return grids, grid_indic, {d: lattices.loc[d] for d in grid_indic.keys()}
+
+def parkCenter(preparedDirectory):
+    """ Get the centroid of the park of a prepared scenario (from the
+    container if exists, otherwise from the park boundaries file).
+
+    Parameters
+	_ _ _ _ _ _ _ _ _ _
+		preparedDirectory : String
+			Directory of the prepared scenario
+
+    Returns
+	_ _ _ _ _ _ _ _ _ _
+		center: tuple of float
+            x and y coordinates of the park centroid"""
+    import geopandas as gpd
+    
+    containerPath = preparedDirectory + os.sep + PREPARED_SCENARIO_FILE
+    if os.path.isfile(containerPath):
+        gdf_park = gpd.read_file(containerPath, layer = PARK_BOUNDARIES_TAB)
+    else:
+        gdf_park = gpd.read_file(preparedDirectory + os.sep + PARK_BOUNDARIES_TAB + ".geojson")
+    centroid = gdf_park.unary_union.centroid
+    
+    return centroid.x, centroid.y
+
+def writeSettings(preparedDirectory, settings):
+    """ Save the settings used to prepare a scenario (needed to prepare the
+    missing wind directions later on).
+
+    Parameters
+	_ _ _ _ _ _ _ _ _ _
+		preparedDirectory : String
+			Directory of the prepared scenario
+        settings: dictionary
+            Input files and parameters of the preparation as well as the 
+            prepared wind directions
+
+    Returns
+	_ _ _ _ _ _ _ _ _ _
+		settingsPath: String
+            Path of the settings file"""
+    settingsPath = preparedDirectory + os.sep + PREPARATION_SETTINGS_FILE
+    with open(settingsPath, "w") as f:
+        json.dump(settings, f, indent = 1, 
+                  default = lambda x: x.item() if isinstance(x, np.generic) else str(x))
+    
+    return settingsPath
+
+def readSettings(preparedDirectory):
+    """ Read the settings used to prepare a scenario.
+
+    Parameters
+	_ _ _ _ _ _ _ _ _ _
+		preparedDirectory : String
+			Directory of the prepared scenario
+
+    Returns
+	_ _ _ _ _ _ _ _ _ _
+		settings: dictionary
+            Settings of the preparation (None if the scenario has been 
+            prepared without saving its settings)"""
+    settingsPath = preparedDirectory + os.sep + PREPARATION_SETTINGS_FILE
+    if not os.path.isfile(settingsPath):
+        return None
+    with open(settingsPath) as f:
+        return json.load(f)
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 23:37:52 2026
+
+@author: Jérémy Bernard, chercheur associé au Lab-STICC
+"""
+import os
+import time
+import sqlite3
+from contextlib import contextmanager, closing
+
+import numpy as np
+import pandas as pd
+
+from .globalVariables import RECORD_TIMINGS, TIMINGS_FILE, TIMINGS_HISTORY,\
+    PROGRESS_TEXT_PERIOD
+
+# Kinds of calculation (each has its own cost models)
+PREPARATION = "prepare"
+PROCESSING = "calc"
+
+class ProgressModel(object):
+    """ Progress of a calculation split into steps. The duration of each step
+    is estimated from its size (e.g. number of days or input file size)
+    using a linear cost model fitted on the durations recorded in the
+    previous runs. The progress (%) is sent to the feedback at each step
+    and within the steps ('advance'), as well as the estimated remaining
+    time. The durations of the current run are recorded once it is done."""
+
+    def __init__(self, feedback, kind, steps, timingsPath = TIMINGS_FILE,
+                 record = RECORD_TIMINGS):
+        """
+		Parameters
+		_ _ _ _ _ _ _ _ _ _
+
+            feedback: QgsProcessingFeedback
+                Object used to report progress and to check cancellation
+                (nothing is reported if None)
+            kind: String
+                Kind of calculation (the cost models are specific to a kind)
+            steps: list of tuple
+                Name and size of each step, in the order of the calculation
+                (a name can be used for several steps)
+            timingsPath: String, default TIMINGS_FILE
+                Path of the SQLite file where are recorded the durations
+            record: boolean, default RECORD_TIMINGS
+                Whether or not the durations of the run are recorded"""
+        self.feedback = feedback
+        self.kind = kind
+        self.steps = list(steps)
+        self.timingsPath = timingsPath
+        self.record = record
+        self.models = costModels(readTimings(timingsPath, kind)) if record else {}
+        self.estimates = estimateDurations(self.models, self.steps)
+        self.durations = []
+        self.current = -1
+        self.fraction = 0
+        self.stepStart = None
+        self.started = time.time()
+        self.lastText = self.started
+
+    @contextmanager
+    def step(self, name):
+        """ Context of the next step having this name (its duration is
+        measured and the progress is reported at its start and end)"""
+        self.start(name)
+        yield self
+        self.finish()
+
+    def plan(self, steps):
+        """ Add steps to be run right after the current step (e.g. once their
+        size is known)"""
+        self.steps[self.current + 1:self.current + 1] = list(steps)
+        self.estimates = estimateDurations(self.models, self.steps)
+
+    def start(self, name):
+        """ Start the next step having this name"""
+        following = [i for i, (n, _) in enumerate(self.steps)
+                     if n == name and i > self.current]
+        if not following:
+            # Step not planned: it is added to the calculation
+            self.steps.append((name, 0))
+            self.estimates.append(0)
+            following = [len(self.steps) - 1]
+        self.current = following[0]
+        self.fraction = 0
+        self.stepStart = time.time()
+        self.report()
+
+    def finish(self):
+        """ End the current step (its duration is kept to be recorded)"""
+        name, size = self.steps[self.current]
+        self.durations.append({"STEP": name,
+                               "SIZE": size,
+                               "DURATION": time.time() - self.stepStart})
+        self.fraction = 1
+        self.report()
+
+    def advance(self, fraction):
+        """ Report the progress within the current step and check whether
+        the calculation has been cancelled
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _
+
+            fraction: float
+                Fraction of the current step done (between 0 and 1)
+
+		Returns
+		_ _ _ _ _ _ _ _ _ _
+
+            canceled: boolean
+                Whether or not the calculation has been cancelled"""
+        self.fraction = min(max(fraction, 0), 1)
+        self.report()
+
+        return self.isCanceled()
+
+    def isCanceled(self):
+        return bool(self.feedback and self.feedback.isCanceled())
+
+    def progress(self):
+        """ Fraction of the calculation done (between 0 and 1)"""
+        total = sum(self.estimates)
+        if total == 0:
+            return 0
+        done = sum(self.estimates[:max(self.current, 0)])
+        if self.current >= 0:
+            done += self.fraction * self.estimates[self.current]
+
+        return min(done / total, 1)
+
+    def remainingTime(self):
+        """ Estimated remaining time (s), the estimates being corrected by
+        the ratio between the elapsed time and the estimated time of the
+        steps already done (None if it can not be estimated yet)"""
+        progress = self.progress()
+        if progress <= 0:
+            return None
+        elapsed = time.time() - self.started
+        if self.models:
+            estimatedElapsed = progress * sum(self.estimates)
+            correction = elapsed / estimatedElapsed if estimatedElapsed > 0 else 1
+            return (1 - progress) * sum(self.estimates) * correction
+        else:
+            return elapsed * (1 - progress) / progress
+
+    def report(self):
+        """ Send the progress (and regularly the remaining time) to the feedback"""
+        if not self.feedback:
+            return
+        self.feedback.setProgress(100 * self.progress())
+        now = time.time()
+        if now - self.lastText >= PROGRESS_TEXT_PERIOD:
+            self.lastText = now
+            remaining = self.remainingTime()
+            if remaining is not None:
+                self.feedback.setProgressText(f"{100 * self.progress():.0f} % done, remaining time estimated: {formatDuration(remaining)}")
+
+    def save(self):
+        """ Record the durations of the steps done (errors are only printed,
+        the timings are not needed by the calculation)"""
+        if not self.record or not self.durations:
+            return
+        try:
+            if os.path.dirname(self.timingsPath):
+                os.makedirs(os.path.dirname(self.timingsPath), exist_ok = True)
+            # The connection context only commits the transaction, the
+            # connection is closed by "closing"
+            with closing(_connect(self.timingsPath)) as conn, conn:
+                conn.executemany("""INSERT INTO TIMINGS(KIND, STEP, SIZE, DURATION, RECORDED)
+                                    VALUES (?, ?, ?, ?, ?)""",
+                                 [(self.kind, d["STEP"], float(d["SIZE"]),
+                                   d["DURATION"], time.time())
+                                  for d in self.durations])
+        except (sqlite3.Error, OSError) as e:
+            print(f"The timings could not be recorded in '{self.timingsPath}': {e}")
+
+
+def _connect(timingsPath):
+    """ Open the timing database (the table is created if needed)"""
+    conn = sqlite3.connect(timingsPath, timeout = 30)
+    conn.execute("""CREATE TABLE IF NOT EXISTS TIMINGS(
+                        KIND TEXT, STEP TEXT, SIZE REAL,
+                        DURATION REAL, RECORDED REAL)""")
+
+    return conn
+
+def readTimings(timingsPath, kind, history = TIMINGS_HISTORY):
+    """ Read the most recent durations recorded for each step of a kind of
+    calculation
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _
+
+            timingsPath: String
+                Path of the SQLite file where are recorded the durations
+            kind: String
+                Kind of calculation
+            history: int, default TIMINGS_HISTORY
+                Maximum number of durations kept for each step
+
+		Returns
+		_ _ _ _ _ _ _ _ _ _
+
+            df_timings: pd.DataFrame
+                Step name, size and duration (s) of the recorded steps"""
+    if not os.path.exists(timingsPath):
+        return pd.DataFrame(columns = ["STEP", "SIZE", "DURATION"])
+    try:
+        with closing(_connect(timingsPath)) as conn:
+            df_timings = pd.read_sql("""SELECT STEP, SIZE, DURATION FROM TIMINGS
+                                        WHERE KIND = ? ORDER BY RECORDED DESC""",
+                                     conn, params = [kind])
+    except sqlite3.Error:
+        return pd.DataFrame(columns = ["STEP", "SIZE", "DURATION"])
+
+    return df_timings.groupby("STEP").head(history)
+
+def costModels(df_timings):
+    """ Fit a linear cost model (duration = a + b * size) for each step.
+    If the sizes recorded for a step are all the same, the duration is
+    considered as proportional to the size.
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _
+
+            df_timings: pd.DataFrame
+                Step name, size and duration of the recorded steps
+
+		Returns
+		_ _ _ _ _ _ _ _ _ _
+
+            models: dictionary
+                Step name as key and coefficients (a, b) as value"""
+    models = {}
+    for name, df in df_timings.groupby("STEP"):
+        sizes = df["SIZE"].values.astype(float)
+        durations = df["DURATION"].values.astype(float)
+        if len(df) > 1 and np.ptp(sizes) > 0:
+            b, a = np.polyfit(sizes, durations, 1)
+            # A step can not be faster for a larger size
+            if b < 0:
+                a, b = durations.mean(), 0
+            models[name] = (max(a, 0), b)
+        elif sizes.mean() > 0:
+            models[name] = (0, durations.mean() / sizes.mean())
+        else:
+            models[name] = (durations.mean(), 0)
+
+    return models
+
+def estimateDurations(models, steps):
+    """ Estimate the duration of each step. The steps without cost model
+    are estimated using the mean rate (s per unit of size) of the steps
+    having one (or using their size only if no step has a cost model)."""
+    rates = [models[n][1] for n, _ in steps if n in models and models[n][1] > 0]
+    defaultRate = np.mean(rates) if rates else 1
+
+    return [models[n][0] + models[n][1] * size if n in models else defaultRate * size
+            for n, size in steps]
+
+def formatDuration(seconds):
+    """ Duration as text (e.g. '1 h 05 min', '3 min 20 s', '12 s')"""
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600} h {(seconds % 3600) // 60:02d} min"
+    elif seconds >= 60:
+        return f"{seconds // 60} min {seconds % 60:02d} s"
+    else:
+        return f"{seconds} s"
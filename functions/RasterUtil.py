@@ -0,0 +1,737 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 17:02:48 2026
+
+@author: Jérémy Bernard, chercheur associé au Lab-STICC
+"""
+import os
+import numpy as np
+from osgeo import gdal, ogr, osr
+
+from .globalVariables import MOSAIC_RULE, RASTER_BLOCK_SIZE, RASTER_NODATA,\
+    FILL_NODATA_MAX_DISTANCE
+
+# Rules available to combine overlapping rasters
+MOSAIC_RULES = ["min", "sum", "nearest"]
+
+# Linear (Delaunay) interpolation and polygon contours are available in GDAL
+# from version 3.1. With an older GDAL, the QGIS processing algorithms are used
+GDAL_HEADLESS = int(gdal.VersionInfo()) >= 3010000
+
+
+def rasterInfo(rasterPath):
+    """ Get the extent, the geotransform and the projection of a raster
+    (without reading its values)
+
+    Parameters
+	_ _ _ _ _ _ _ _ _ _
+		rasterPath : String
+			Path of the raster file
+
+    Returns
+	_ _ _ _ _ _ _ _ _ _
+		info: dictionary
+            Path, geotransform, size, projection, nodata value and extent
+            of the raster"""
+    raster = gdal.Open(rasterPath)
+    gt = raster.GetGeoTransform()
+    if gt[2] != 0 or gt[4] != 0:
+        raise ValueError(f"The raster '{rasterPath}' is rotated, it can not be mosaicked")
+    info = {"path": rasterPath,
+            "geotransform": gt,
+            "xsize": raster.RasterXSize,
+            "ysize": raster.RasterYSize,
+            "projection": raster.GetProjection(),
+            "nodata": raster.GetRasterBand(1).GetNoDataValue(),
+            "xmin": gt[0],
+            "xmax": gt[0] + raster.RasterXSize * gt[1],
+            "ymin": gt[3] + raster.RasterYSize * gt[5],
+            "ymax": gt[3]}
+    raster = None
+
+    return info
+
+def alignedGrid(infos, resolution = None):
+    """ Define a grid covering all rasters, aligned on multiples of the
+    resolution (so that mosaics of different sets of rasters can be
+    compared pixel by pixel)
+
+    Parameters
+	_ _ _ _ _ _ _ _ _ _
+		infos : list of dictionary
+			Information of each raster (see 'rasterInfo')
+        resolution: float, default None
+            Pixel size of the grid (finest resolution of the rasters if None)
+
+    Returns
+	_ _ _ _ _ _ _ _ _ _
+		geotransform: tuple
+            Geotransform of the grid
+        ncols: int
+            Number of columns of the grid
+        nrows: int
+            Number of rows of the grid"""
+    if resolution is None:
+        resolution = min([min(abs(i["geotransform"][1]), abs(i["geotransform"][5]))
+                              for i in infos])
+    xmin = np.floor(min([i["xmin"] for i in infos]) / resolution) * resolution
+    xmax = np.ceil(max([i["xmax"] for i in infos]) / resolution) * resolution
+    ymin = np.floor(min([i["ymin"] for i in infos]) / resolution) * resolution
+    ymax = np.ceil(max([i["ymax"] for i in infos]) / resolution) * resolution
+
+    return (float(xmin), resolution, 0, float(ymax), 0, -resolution),\
+        int(round((xmax - xmin) / resolution)),\
+            int(round((ymax - ymin) / resolution))
+
+def readWindow(info, xs, ys):
+    """ Read the values of a raster at the pixel centers of a tile (nearest
+    neighbour sampling). Only the window of the raster covering the tile
+    is read.
+
+    Parameters
+	_ _ _ _ _ _ _ _ _ _
+		info : dictionary
+			Information of the raster (see 'rasterInfo')
+        xs: np.array
+            x coordinates of the tile pixel centers (one per column)
+        ys: np.array
+            y coordinates of the tile pixel centers (one per row)
+
+    Returns
+	_ _ _ _ _ _ _ _ _ _
+		values: np.array
+            Raster values (NaN for nodata or outside the raster). None is
+            returned if the raster does not cover the tile"""
+    gt = info["geotransform"]
+    cols = np.floor((xs - gt[0]) / gt[1]).astype(int)
+    rows = np.floor((ys - gt[3]) / gt[5]).astype(int)
+    validCols = (cols >= 0) & (cols < info["xsize"])
+    validRows = (rows >= 0) & (rows < info["ysize"])
+    if not validCols.any() or not validRows.any():
+        return None
+    c0, c1 = cols[validCols].min(), cols[validCols].max()
+    r0, r1 = rows[validRows].min(), rows[validRows].max()
+
+    raster = gdal.Open(info["path"])
+    window = raster.GetRasterBand(1).ReadAsArray(int(c0), int(r0),
+                                                 int(c1 - c0 + 1),
+                                                 int(r1 - r0 + 1)).astype(float)
+    raster = None
+    maskNodata(window, info["nodata"])
+
+    values = np.full((ys.size, xs.size), np.nan)
+    values[np.ix_(validRows, validCols)] = window[np.ix_(rows[validRows] - r0,
+                                                         cols[validCols] - c0)]
+
+    return values
+
+def mosaicRasters(rasterPaths, outputPath, rule = MOSAIC_RULE, centers = None,
+                  resolution = None, blockSize = RASTER_BLOCK_SIZE):
+    """ Combine (possibly overlapping) rasters on a common aligned grid and
+    write the result in a tiled GeoTIFF. The output is calculated tile by
+    tile and only the windows of the rasters overlapping a tile are read,
+    thus the memory needed does not depend on the number of rasters.
+
+    Parameters
+	_ _ _ _ _ _ _ _ _ _
+		rasterPaths : list of String
+			Path of the rasters to combine (same projection needed)
+        outputPath: String
+            Path of the output GeoTIFF file
+        rule: String, default MOSAIC_RULE
+            Rule used where rasters overlap:
+                - "min": minimum value,
+                - "sum": sum of the values,
+                - "nearest": value of the raster having the nearest center
+        centers: list of tuple, default None
+            x and y coordinates of the center of each raster influence
+            (e.g. park centroid), needed only for the "nearest" rule
+        resolution: float, default None
+            Pixel size of the output (finest resolution of the rasters if None)
+        blockSize: int, default RASTER_BLOCK_SIZE
+            Size (in pixels) of the tiles of the output
+
+    Returns
+	_ _ _ _ _ _ _ _ _ _
+		outputPath: String
+            Path of the output GeoTIFF file"""
+    if rule not in MOSAIC_RULES:
+        raise ValueError(f"The mosaic rule should be one of {MOSAIC_RULES}")
+    if rule == "nearest" and (centers is None or len(centers) != len(rasterPaths)):
+        raise ValueError("The center of each raster is needed for the 'nearest' mosaic rule")
+    infos = [rasterInfo(path) for path in rasterPaths]
+    if len(set([i["projection"] for i in infos])) > 1:
+        raise ValueError("All rasters should have the same projection to be mosaicked")
+    bounds = np.array([[i["xmin"], i["xmax"], i["ymin"], i["ymax"]] for i in infos])
+
+    # Creates the output raster
+    geotransform, ncols, nrows = alignedGrid(infos = infos,
+                                             resolution = resolution)
+    res = geotransform[1]
+    output = gdal.GetDriverByName("GTiff").Create(outputPath, ncols, nrows, 1,
+                                                  gdal.GDT_Float32,
+                                                  options = ["TILED=YES",
+                                                             f"BLOCKXSIZE={blockSize}",
+                                                             f"BLOCKYSIZE={blockSize}",
+                                                             "COMPRESS=DEFLATE",
+                                                             "BIGTIFF=IF_SAFER"])
+    output.SetGeoTransform(geotransform)
+    output.SetProjection(infos[0]["projection"])
+    band = output.GetRasterBand(1)
+    band.SetNoDataValue(RASTER_NODATA)
+
+    for r0 in range(0, nrows, blockSize):
+        for c0 in range(0, ncols, blockSize):
+            xs = geotransform[0] + (np.arange(c0, min(c0 + blockSize, ncols)) + 0.5) * res
+            ys = geotransform[3] - (np.arange(r0, min(r0 + blockSize, nrows)) + 0.5) * res
+            tile = np.full((ys.size, xs.size), np.nan)
+            if rule == "nearest":
+                distance = np.full((ys.size, xs.size), np.inf)
+
+            # Only the rasters overlapping the tile are read
+            overlapping = np.where((bounds[:, 0] < xs[-1] + res / 2)
+                                   & (bounds[:, 1] > xs[0] - res / 2)
+                                   & (bounds[:, 2] < ys[0] + res / 2)
+                                   & (bounds[:, 3] > ys[-1] - res / 2))[0]
+            for k in overlapping:
+                values = readWindow(info = infos[k], xs = xs, ys = ys)
+                if values is None:
+                    continue
+                valid = ~np.isnan(values)
+                if rule == "min":
+                    tile = np.fmin(tile, values)
+                elif rule == "sum":
+                    tile = np.where(valid, np.nan_to_num(tile) + values, tile)
+                else:
+                    d = np.hypot(xs[np.newaxis, :] - centers[k][0],
+                                 ys[:, np.newaxis] - centers[k][1])
+                    closer = valid & (d < distance)
+                    tile[closer] = values[closer]
+                    distance[closer] = d[closer]
+
+            band.WriteArray(np.where(np.isnan(tile), RASTER_NODATA, tile).astype(np.float32),
+                            c0, r0)
+    band.FlushCache()
+
+    # Release memory to avoid error due to gdal
+    band = None
+    output = None
+
+    return outputPath
+
+class RasterStats(object):
+    """ Mean and extrema of raster values accumulated block by block"""
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.
+        self.min = np.nan
+        self.max = np.nan
+
+    def update(self, values):
+        """ Add the valid (not NaN) values of a block to the statistics"""
+        values = values[~np.isnan(values)]
+        if values.size:
+            self.count += values.size
+            self.sum += values.sum()
+            self.min = np.fmin(self.min, values.min())
+            self.max = np.fmax(self.max, values.max())
+
+    @property
+    def mean(self):
+        if self.count:
+            return self.sum / self.count
+        else:
+            return np.nan
+
+def maskNodata(values, nodata):
+    """ Set to NaN (in place) the values equal to the nodata value of the
+    raster and to RASTER_NODATA (whatever their sign and magnitude, the
+    values being compared with a tolerance since they may have been stored
+    as float32)"""
+    for value in set([nodata, RASTER_NODATA]):
+        if value is not None and not np.isnan(value):
+            values[np.isclose(values, value)] = np.nan
+
+    return values
+
+def readBlock(band, nodata, c0, r0, ncols, nrows):
+    """ Read a block of a raster band (nodata and RASTER_NODATA values are
+    set to NaN, see 'maskNodata')"""
+    return maskNodata(band.ReadAsArray(c0, r0, ncols, nrows).astype(float),
+                      nodata)
+
+def createRaster(outputPath, like, blockSize = RASTER_BLOCK_SIZE):
+    """ Create a tiled float GeoTIFF having the same grid as an existing raster
+
+    Parameters
+	_ _ _ _ _ _ _ _ _ _
+		outputPath : String
+			Path of the raster to create
+        like: gdal.Dataset
+            Raster giving the size, the geotransform and the projection
+        blockSize: int, default RASTER_BLOCK_SIZE
+            Size (in pixels) of the tiles of the output
+
+    Returns
+	_ _ _ _ _ _ _ _ _ _
+		output: gdal.Dataset
+            Raster created (nodata set to RASTER_NODATA)"""
+    output = gdal.GetDriverByName("GTiff").Create(outputPath, like.RasterXSize,
+                                                  like.RasterYSize, 1,
+                                                  gdal.GDT_Float32,
+                                                  options = ["TILED=YES",
+                                                             f"BLOCKXSIZE={blockSize}",
+                                                             f"BLOCKYSIZE={blockSize}",
+                                                             "COMPRESS=DEFLATE",
+                                                             "BIGTIFF=IF_SAFER"])
+    output.SetGeoTransform(like.GetGeoTransform())
+    output.SetProjection(like.GetProjection())
+    output.GetRasterBand(1).SetNoDataValue(RASTER_NODATA)
+
+    return output
+
+def rasterStats(rasterPath, blockSize = RASTER_BLOCK_SIZE):
+    """ Calculates the mean and the extrema of a raster reading it block by block
+
+    Parameters
+	_ _ _ _ _ _ _ _ _ _
+		rasterPath : String
+			Path of the raster
+        blockSize: int, default RASTER_BLOCK_SIZE
+            Size (in pixels) of the blocks read
+
+    Returns
+	_ _ _ _ _ _ _ _ _ _
+		stats: RasterStats
+            Mean and extrema of the raster"""
+    raster = gdal.Open(rasterPath)
+    band = raster.GetRasterBand(1)
+    nodata = band.GetNoDataValue()
+    stats = RasterStats()
+    for r0 in range(0, raster.RasterYSize, blockSize):
+        for c0 in range(0, raster.RasterXSize, blockSize):
+            stats.update(readBlock(band = band, 
+                                   nodata = nodata,
+                                   c0 = c0,
+                                   r0 = r0,
+                                   ncols = min(blockSize, raster.RasterXSize - c0),
+                                   nrows = min(blockSize, raster.RasterYSize - r0)))
+    # Release memory to avoid error due to gdal
+    band = None
+    raster = None
+
+    return stats
+
+def differenceRasters(altPath, refPath, outputPath = None, blockSize = RASTER_BLOCK_SIZE):
+    """ Calculates the difference between two rasters having the same grid
+    (alt - ref) block by block. The difference is written in a tiled GeoTIFF 
+    and the statistics of the three rasters are accumulated in the same pass
+    (the memory needed does not depend on the raster size).
+
+    Parameters
+	_ _ _ _ _ _ _ _ _ _
+		altPath : String
+			Path of the alternative raster
+        refPath: String
+            Path of the reference raster
+        outputPath: String, default None
+            Path of the difference raster (not saved if None)
+        blockSize: int, default RASTER_BLOCK_SIZE
+            Size (in pixels) of the blocks read
+
+    Returns
+	_ _ _ _ _ _ _ _ _ _
+		refStats: RasterStats
+            Mean and extrema of the reference raster
+		altStats: RasterStats
+            Mean and extrema of the alternative raster
+		diffStats: RasterStats
+            Mean and extrema of the difference"""
+    alt = gdal.Open(altPath)
+    ref = gdal.Open(refPath)
+    if (alt.RasterXSize, alt.RasterYSize) != (ref.RasterXSize, ref.RasterYSize):
+        raise ValueError(f"The rasters '{altPath}' and '{refPath}' should have the same size")
+    altBand = alt.GetRasterBand(1)
+    refBand = ref.GetRasterBand(1)
+    altNodata = altBand.GetNoDataValue()
+    refNodata = refBand.GetNoDataValue()
+    if outputPath:
+        output = createRaster(outputPath = outputPath,
+                              like = alt,
+                              blockSize = blockSize)
+        outputBand = output.GetRasterBand(1)
+
+    refStats = RasterStats()
+    altStats = RasterStats()
+    diffStats = RasterStats()
+    for r0 in range(0, alt.RasterYSize, blockSize):
+        for c0 in range(0, alt.RasterXSize, blockSize):
+            ncols = min(blockSize, alt.RasterXSize - c0)
+            nrows = min(blockSize, alt.RasterYSize - r0)
+            altValues = readBlock(altBand, altNodata, c0, r0, ncols, nrows)
+            refValues = readBlock(refBand, refNodata, c0, r0, ncols, nrows)
+            diff = altValues - refValues
+            refStats.update(refValues)
+            altStats.update(altValues)
+            diffStats.update(diff)
+            if outputPath:
+                outputBand.WriteArray(np.where(np.isnan(diff), RASTER_NODATA, diff).astype(np.float32),
+                                      c0, r0)
+
+    # Release memory to avoid error due to gdal
+    if outputPath:
+        outputBand.FlushCache()
+        outputBand = None
+        output = None
+    altBand = None
+    refBand = None
+    alt = None
+    ref = None
+
+    return refStats, altStats, diffStats
+
+def tinInterpolation(pointPath, zField, bounds, pixelSize, outputPath, epsg):
+    """ Linear interpolation (on the Delaunay triangulation) of point values
+    in a GeoTIFF (nodata outside the convex hull of the points)
+
+    Parameters
+	_ _ _ _ _ _ _ _ _ _
+		pointPath : String
+			Path of the point vector file
+        zField: String
+            Name of the field to interpolate
+        bounds: tuple of float
+            Extent of the raster (xmin, xmax, ymin, ymax)
+        pixelSize: float
+            Size of the raster pixels
+        outputPath: String
+            Path of the output raster
+        epsg: int
+            EPSG code of the points
+
+    Returns
+	_ _ _ _ _ _ _ _ _ _
+		outputPath: String
+            Path of the output raster"""
+    xmin, xmax, ymin, ymax = bounds
+    if not GDAL_HEADLESS:
+        import processing
+        layer = ogr.Open(pointPath).GetLayer()
+        fieldIndex = layer.GetLayerDefn().GetFieldIndex(zField)
+        layer = None
+        processing.run("qgis:tininterpolation", 
+                       {'INTERPOLATION_DATA':f'{pointPath}::~::0::~::{fieldIndex}::~::0',
+                        'METHOD':0,
+                        'EXTENT':f'{xmin},{xmax},{ymin},{ymax} [EPSG:{epsg}]',
+                        'PIXEL_SIZE':f'{pixelSize}',
+                        'OUTPUT':outputPath})
+        return outputPath
+    
+    width = max(int(round((xmax - xmin) / pixelSize)), 1)
+    height = max(int(round((ymax - ymin) / pixelSize)), 1)
+    gdal.Grid(destName = outputPath,
+              srcDS = pointPath,
+              options = gdal.GridOptions(format = "GTiff",
+                                         zfield = zField,
+                                         width = width,
+                                         height = height,
+                                         outputBounds = [xmin, ymax, xmax, ymin],
+                                         outputType = gdal.GDT_Float32,
+                                         outputSRS = f"EPSG:{epsg}",
+                                         algorithm = f"linear:radius=-1:nodata={RASTER_NODATA}"))
+    output = gdal.Open(outputPath, gdal.GA_Update)
+    output.GetRasterBand(1).SetNoDataValue(RASTER_NODATA)
+    # Release memory to avoid error due to gdal
+    output = None
+
+    return outputPath
+
+def latticeInterpolation(lattice, df_indic, values, bounds, pixelSize, outputPath,
+                         epsg, blockSize = RASTER_BLOCK_SIZE):
+    """ Bilinear interpolation in a GeoTIFF of values known at the points of
+    a grid lattice (see 'PreparedScenario.gridLattice'). Each pixel center
+    is located in the lattice using the inverse of the lattice affine
+    transform, thus the grid points do not need to be written and
+    triangulated. The pixels outside the lattice or surrounded by a point
+    having no value are nodata. The raster has the same grid as the one of
+    'tinInterpolation' and is written tile by tile.
+
+    Parameters
+	_ _ _ _ _ _ _ _ _ _
+		lattice : dictionary or pd.Series
+			Lattice parameters and affine transform of the grid (at least
+            two columns and two rows)
+        df_indic: pd.DataFrame
+            Grid points (ID_COL and ID_ROW columns needed)
+        values: np.array
+            Value of each grid point (same order as 'df_indic')
+        bounds: tuple of float
+            Extent of the raster (xmin, xmax, ymin, ymax)
+        pixelSize: float
+            Size of the raster pixels
+        outputPath: String
+            Path of the output raster
+        epsg: int
+            EPSG code of the grid
+        blockSize: int, default RASTER_BLOCK_SIZE
+            Size (in pixels) of the tiles of the output
+
+    Returns
+	_ _ _ _ _ _ _ _ _ _
+		outputPath: String
+            Path of the output raster"""
+    nCols, nRows = int(lattice["N_COLS"]), int(lattice["N_ROWS"])
+    if nCols < 2 or nRows < 2:
+        raise ValueError("The lattice should have at least two columns and two rows to be interpolated")
+    nodes = np.full((nRows, nCols), np.nan)
+    nodes[np.asarray(df_indic["ID_ROW"].values - lattice["ROW_MIN"], dtype = int),
+          np.asarray(df_indic["ID_COL"].values - lattice["COL_MIN"], dtype = int)] = values
+    # Gives the lattice position (i, j) of a point from its coordinates
+    inverse = np.linalg.inv([[lattice["GT1"], lattice["GT2"]],
+                             [lattice["GT4"], lattice["GT5"]]])
+
+    xmin, xmax, ymin, ymax = bounds
+    width = max(int(round((xmax - xmin) / pixelSize)), 1)
+    height = max(int(round((ymax - ymin) / pixelSize)), 1)
+    resX = (xmax - xmin) / width
+    resY = (ymax - ymin) / height
+    srs = osr.SpatialReference()
+    srs.ImportFromEPSG(int(epsg))
+    output = gdal.GetDriverByName("GTiff").Create(outputPath, width, height, 1,
+                                                  gdal.GDT_Float32,
+                                                  options = ["TILED=YES",
+                                                             f"BLOCKXSIZE={blockSize}",
+                                                             f"BLOCKYSIZE={blockSize}",
+                                                             "COMPRESS=DEFLATE",
+                                                             "BIGTIFF=IF_SAFER"])
+    output.SetGeoTransform((xmin, resX, 0, ymax, 0, -resY))
+    output.SetProjection(srs.ExportToWkt())
+    band = output.GetRasterBand(1)
+    band.SetNoDataValue(RASTER_NODATA)
+
+    for r0 in range(0, height, blockSize):
+        for c0 in range(0, width, blockSize):
+            xs = xmin + (np.arange(c0, min(c0 + blockSize, width)) + 0.5) * resX
+            ys = ymax - (np.arange(r0, min(r0 + blockSize, height)) + 0.5) * resY
+            dx, dy = np.meshgrid(xs - lattice["GT0"], ys - lattice["GT3"])
+            i = inverse[0, 0] * dx + inverse[0, 1] * dy
+            j = inverse[1, 0] * dx + inverse[1, 1] * dy
+            inside = (i >= 0) & (i <= nCols - 1) & (j >= 0) & (j <= nRows - 1)
+            i0 = np.clip(np.floor(i), 0, nCols - 2).astype(int)
+            j0 = np.clip(np.floor(j), 0, nRows - 2).astype(int)
+            fi = i - i0
+            fj = j - j0
+            tile = nodes[j0, i0] * (1 - fi) * (1 - fj) + nodes[j0, i0 + 1] * fi * (1 - fj)\
+                + nodes[j0 + 1, i0] * (1 - fi) * fj + nodes[j0 + 1, i0 + 1] * fi * fj
+            tile[~inside] = np.nan
+            band.WriteArray(np.where(np.isnan(tile), RASTER_NODATA, tile).astype(np.float32),
+                            c0, r0)
+    band.FlushCache()
+
+    # Release memory to avoid error due to gdal
+    band = None
+    output = None
+
+    return outputPath
+
+def clipRaster(rasterPath, maskPath, outputPath):
+    """ Clip a raster by the polygons of a vector file (crop to the polygons
+    extent, keeping the raster resolution)
+
+    Parameters
+	_ _ _ _ _ _ _ _ _ _
+		rasterPath : String
+			Path of the raster to clip
+        maskPath: String
+            Path of the polygon vector file
+        outputPath: String
+            Path of the output raster
+
+    Returns
+	_ _ _ _ _ _ _ _ _ _
+		outputPath: String
+            Path of the output raster"""
+    gt = rasterInfo(rasterPath)["geotransform"]
+    gdal.Warp(destNameOrDestDS = outputPath,
+              srcDSOrSrcDSTab = rasterPath,
+              options = gdal.WarpOptions(format = "GTiff",
+                                         cutlineDSName = maskPath,
+                                         cropToCutline = True,
+                                         xRes = abs(gt[1]),
+                                         yRes = abs(gt[5]),
+                                         dstNodata = RASTER_NODATA))
+
+    return outputPath
+
+def weightedMeanRasters(rasterPaths, weights, outputPath, blockSize = RASTER_BLOCK_SIZE):
+    """ Weighted average of rasters having the same grid, calculated block 
+    by block (a pixel is nodata if it is nodata in one of the rasters)
+
+    Parameters
+	_ _ _ _ _ _ _ _ _ _
+		rasterPaths : list of String
+			Path of the rasters to average
+        weights: list of float
+            Weight of each raster
+        outputPath: String
+            Path of the output raster
+        blockSize: int, default RASTER_BLOCK_SIZE
+            Size (in pixels) of the blocks read
+
+    Returns
+	_ _ _ _ _ _ _ _ _ _
+		outputPath: String
+            Path of the output raster"""
+    rasters = [gdal.Open(path) for path in rasterPaths]
+    if len(set([(r.RasterXSize, r.RasterYSize) for r in rasters])) > 1:
+        raise ValueError("The rasters to average should have the same size")
+    bands = [r.GetRasterBand(1) for r in rasters]
+    nodatas = [b.GetNoDataValue() for b in bands]
+    weights = np.array(weights, dtype = float) / np.sum(weights)
+    output = createRaster(outputPath = outputPath,
+                          like = rasters[0],
+                          blockSize = blockSize)
+    outputBand = output.GetRasterBand(1)
+
+    nx, ny = rasters[0].RasterXSize, rasters[0].RasterYSize
+    for r0 in range(0, ny, blockSize):
+        for c0 in range(0, nx, blockSize):
+            ncols = min(blockSize, nx - c0)
+            nrows = min(blockSize, ny - r0)
+            mean = np.zeros((nrows, ncols))
+            for band, nodata, w in zip(bands, nodatas, weights):
+                mean += w * readBlock(band, nodata, c0, r0, ncols, nrows)
+            outputBand.WriteArray(np.where(np.isnan(mean), RASTER_NODATA, mean).astype(np.float32),
+                                  c0, r0)
+
+    # Release memory to avoid error due to gdal
+    outputBand.FlushCache()
+    outputBand = None
+    output = None
+    bands = None
+    rasters = None
+
+    return outputPath
+
+def contourPolygons(rasterPath, outputPath, interval, offset = 0):
+    """ Convert a raster into polygons of values between two contours
+    (fields ELEV_MIN and ELEV_MAX) saved in a GeoJSON file
+
+    Parameters
+	_ _ _ _ _ _ _ _ _ _
+		rasterPath : String
+			Path of the raster
+        outputPath: String
+            Path of the output GeoJSON file
+        interval: float
+            Interval between two contours
+        offset: float, default 0
+            Value of one of the contours (the others are at 'offset' +/- 
+            n * 'interval')
+
+    Returns
+	_ _ _ _ _ _ _ _ _ _
+		outputPath: String
+            Path of the output GeoJSON file"""
+    if not GDAL_HEADLESS:
+        import processing
+        processing.run("gdal:contour_polygon", 
+                       {'INPUT':rasterPath,
+                        'BAND':1,
+                        'INTERVAL':f'{interval}',
+                        'CREATE_3D':False,
+                        'IGNORE_NODATA':False,
+                        'NODATA':None,
+                        'OFFSET':f'{offset}',
+                        'EXTRA':'','FIELD_NAME_MIN':'ELEV_MIN',
+                        'FIELD_NAME_MAX':'ELEV_MAX',
+                        'OUTPUT': outputPath})
+        return outputPath
+
+    raster = gdal.Open(rasterPath)
+    band = raster.GetRasterBand(1)
+    driver = ogr.GetDriverByName("GeoJSON")
+    if os.path.exists(outputPath):
+        driver.DeleteDataSource(outputPath)
+    output = driver.CreateDataSource(outputPath)
+    layer = output.CreateLayer("contour", 
+                               srs = osr.SpatialReference(wkt = raster.GetProjection()),
+                               geom_type = ogr.wkbMultiPolygon)
+    layer.CreateField(ogr.FieldDefn("ID", ogr.OFTInteger))
+    layer.CreateField(ogr.FieldDefn("ELEV_MIN", ogr.OFTReal))
+    layer.CreateField(ogr.FieldDefn("ELEV_MAX", ogr.OFTReal))
+    options = [f"LEVEL_INTERVAL={interval}",
+               f"LEVEL_BASE={offset}",
+               "ID_FIELD=0",
+               "ELEV_FIELD_MIN=1",
+               "ELEV_FIELD_MAX=2",
+               "POLYGONIZE=YES"]
+    if band.GetNoDataValue() is not None:
+        options.append(f"NODATA={band.GetNoDataValue()}")
+    gdal.ContourGenerateEx(band, layer, options = options)
+
+    # Release memory to avoid error due to gdal
+    layer = None
+    output = None
+    band = None
+    raster = None
+
+    return outputPath
+
+def fillNodata(rasterPath, maxSearchDist = FILL_NODATA_MAX_DISTANCE):
+    """ Fill the nodata pixels of a raster by inverse distance weighting of
+    the closest valid pixels (the raster file is not modified)
+
+    Parameters
+	_ _ _ _ _ _ _ _ _ _
+		rasterPath : String
+			Path of the raster
+        maxSearchDist: int, default FILL_NODATA_MAX_DISTANCE
+            Maximum distance (in pixels) where valid pixels are searched
+
+    Returns
+	_ _ _ _ _ _ _ _ _ _
+		filled: gdal.Dataset
+            In-memory copy of the raster with nodata pixels filled"""
+    filled = gdal.GetDriverByName("MEM").CreateCopy("", gdal.Open(rasterPath))
+    band = filled.GetRasterBand(1)
+    gdal.FillNodata(targetBand = band, 
+                    maskBand = None,
+                    maxSearchDist = maxSearchDist,
+                    smoothingIterations = 0)
+    band = None
+
+    return filled
+
+def sampleRaster(raster, xs, ys):
+    """ Get the raster value of the pixels intersecting points
+
+    Parameters
+	_ _ _ _ _ _ _ _ _ _
+		raster : String or gdal.Dataset
+			Path of the raster (or raster already opened)
+        xs: np.array
+            X coordinates of the points
+        ys: np.array
+            Y coordinates of the points
+
+    Returns
+	_ _ _ _ _ _ _ _ _ _
+		values: np.array
+            Value of each point (NaN if outside the raster or nodata)"""
+    if isinstance(raster, str):
+        raster = gdal.Open(raster)
+    gt = raster.GetGeoTransform()
+    band = raster.GetRasterBand(1)
+    array = readBlock(band, band.GetNoDataValue(), 0, 0, 
+                      raster.RasterXSize, raster.RasterYSize)
+    cols = np.floor((np.asarray(xs) - gt[0]) / gt[1]).astype(int)
+    rows = np.floor((np.asarray(ys) - gt[3]) / gt[5]).astype(int)
+    inside = (cols >= 0) & (cols < raster.RasterXSize) & (rows >= 0) & (rows < raster.RasterYSize)
+    values = np.full(cols.size, np.nan)
+    values[inside] = array[rows[inside], cols[inside]]
+    band = None
+
+    return values
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 18:47:12 2026
+
+@author: Jérémy Bernard, chercheur associé au Lab-STICC
+"""
+import os
+import json
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+
+import pandas as pd
+
+from .DataUtil import fileHash
+from .globalVariables import CATALOG_FILE, UPDATE_CATALOG
+
+# Kind of runs recorded in the catalog
+PREPARATION = "preprocessing"
+PROCESSING = "processing"
+COMPARISON = "comparison"
+RUN_KINDS = [PREPARATION, PROCESSING, COMPARISON]
+
+# Columns stored as JSON
+JSON_COLUMNS = ["INPUTS", "INPUT_HASHES", "OUTPUTS", "STATISTICS"]
+
+
+class ScenarioCatalog(object):
+    """ Local SQLite catalog of the runs (preprocessing, processing and
+    comparison). Each run is identified by its output directory, recorded
+    again if the same directory is used by a new run."""
+
+    def __init__(self, catalogPath = CATALOG_FILE):
+        """
+		Parameters
+		_ _ _ _ _ _ _ _ _ _
+
+            catalogPath: String, default CATALOG_FILE
+                Path of the SQLite catalog (created if it does not exist)"""
+        self.catalogPath = catalogPath
+        if os.path.dirname(catalogPath):
+            os.makedirs(os.path.dirname(catalogPath), exist_ok = True)
+        with closing(self.connect()) as conn, conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS RUNS(
+                    RUN_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+                    KIND TEXT NOT NULL,
+                    SCENARIO TEXT,
+                    WEATHER TEXT,
+                    SCENARIO_DIRECTORY TEXT,
+                    OUTPUT_DIRECTORY TEXT NOT NULL,
+                    INPUTS TEXT,
+                    INPUT_HASHES TEXT,
+                    OUTPUTS TEXT,
+                    STATISTICS TEXT,
+                    STARTED TEXT,
+                    DURATION REAL,
+                    UNIQUE(KIND, OUTPUT_DIRECTORY))""")
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS RUNS_SCENARIO_IDX
+                ON RUNS(KIND, SCENARIO, WEATHER)""")
+
+    def connect(self):
+        """ Open a connection to the catalog (waiting if it is locked by
+        another run). The connection is not closed when used as a context
+        manager (only the transaction is committed), thus it is wrapped in
+        'contextlib.closing'"""
+        return sqlite3.connect(self.catalogPath, timeout = 30)
+
+    def record(self, kind, outputDirectory, scenario = None, weather = None,
+               scenarioDirectory = None, inputs = {}, outputs = {},
+               statistics = {}, started = None, duration = None):
+        """ Record a run in the catalog (replace the previous run having the
+        same kind and output directory)
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _
+
+            kind: String
+                Kind of run (one of RUN_KINDS)
+            outputDirectory: String
+                Directory where are saved the run outputs
+            scenario: String, default None
+                Name of the scenario
+            weather: String, default None
+                Name of the weather scenario (processing only)
+            scenarioDirectory: String, default None
+                Directory of the scenario
+            inputs: dictionary, default {}
+                Name of the inputs as keys and file paths as values (the
+                file of each input is hashed)
+            outputs: dictionary, default {}
+                Name of the outputs as keys and file paths as values
+            statistics: dictionary, default {}
+                Summary statistics of the run
+            started: float, default None
+                Time when the run started (seconds since epoch)
+            duration: float, default None
+                Duration of the run (s)
+
+		Returns
+		_ _ _ _ _ _ _ _ _ _
+
+            runId: int
+                Identifier of the run in the catalog"""
+        if kind not in RUN_KINDS:
+            raise ValueError(f"The kind of run should be one of {RUN_KINDS}")
+        outputDirectory = os.path.abspath(outputDirectory)
+        if scenarioDirectory:
+            scenarioDirectory = os.path.abspath(scenarioDirectory)
+        if started is not None:
+            started = datetime.fromtimestamp(started).isoformat(timespec = "seconds")
+        input_hashes = {name: fileHash(path) for name, path in inputs.items()}
+
+        with closing(self.connect()) as conn, conn:
+            conn.execute("DELETE FROM RUNS WHERE KIND = ? AND OUTPUT_DIRECTORY = ?",
+                         (kind, outputDirectory))
+            cur = conn.execute("""
+                INSERT INTO RUNS(KIND, SCENARIO, WEATHER, SCENARIO_DIRECTORY,
+                                 OUTPUT_DIRECTORY, INPUTS, INPUT_HASHES, OUTPUTS,
+                                 STATISTICS, STARTED, DURATION)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                               (kind, scenario, weather, scenarioDirectory,
+                                outputDirectory,
+                                json.dumps(inputs),
+                                json.dumps(input_hashes),
+                                json.dumps(outputs),
+                                json.dumps(statistics, default = _toJson),
+                                started, duration))
+            runId = cur.lastrowid
+
+        return runId
+
+    def runs(self, kind = None, scenario = None, weather = None,
+             existing = True):
+        """ Query the runs of the catalog
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _
+
+            kind: String, default None
+                Kind of run (all kinds if None)
+            scenario: String, default None
+                Name of the scenario (all scenarios if None)
+            weather: String, default None
+                Name of the weather scenario (all weathers if None)
+            existing: boolean, default True
+                Whether or not only the runs whose output directory still
+                exists are returned
+
+		Returns
+		_ _ _ _ _ _ _ _ _ _
+
+            df_runs: pd.DataFrame
+                Runs (one row per run, RUN_ID as index), the JSON columns
+                being converted into dictionaries"""
+        conditions = []
+        values = []
+        for col, val in [("KIND", kind), ("SCENARIO", scenario), ("WEATHER", weather)]:
+            if val is not None:
+                conditions.append(f"{col} = ?")
+                values.append(val)
+        where = "WHERE " + " AND ".join(conditions) if conditions else ""
+        with closing(self.connect()) as conn, conn:
+            df_runs = pd.read_sql(f"SELECT * FROM RUNS {where} ORDER BY RUN_ID",
+                                  conn, params = values, index_col = "RUN_ID")
+        for col in JSON_COLUMNS:
+            df_runs[col] = df_runs[col].apply(lambda x: json.loads(x) if x else {})
+        if existing:
+            df_runs = df_runs[df_runs["OUTPUT_DIRECTORY"].apply(os.path.exists)]
+
+        return df_runs
+
+    def get(self, runId):
+        """ Get a run of the catalog as a dictionary (None if not found)"""
+        df_runs = self.runs(existing = False)
+        if runId in df_runs.index:
+            return df_runs.loc[runId].to_dict()
+        else:
+            return None
+
+    def directories(self, runIds):
+        """ Get the output directories of runs (in the order of the run IDs),
+        for example to feed a comparison of processing runs
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _
+
+            runIds: list of int
+                Identifiers of the runs
+
+		Returns
+		_ _ _ _ _ _ _ _ _ _
+
+            directories: list of String
+                Output directory of each run"""
+        df_runs = self.runs(existing = False)
+        missing = [r for r in runIds if r not in df_runs.index]
+        if missing:
+            raise ValueError(f"The runs {missing} are not in the catalog")
+
+        return df_runs.loc[runIds, "OUTPUT_DIRECTORY"].tolist()
+
+    def names(self, runIds):
+        """ Get the name ('scenario-weather') of runs, for example to name
+        the folders of a comparison of processing runs
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _
+
+            runIds: list of int
+                Identifiers of the runs
+
+		Returns
+		_ _ _ _ _ _ _ _ _ _
+
+            names: dictionary
+                Output directory of each run as key and its name as value"""
+        df_runs = self.runs(existing = False).loc[runIds]
+
+        return {d: "-".join([n for n in [s, w] if isinstance(n, str) and n])
+                for d, s, w in zip(df_runs["OUTPUT_DIRECTORY"],
+                                   df_runs["SCENARIO"],
+                                   df_runs["WEATHER"])}
+
+    def prune(self):
+        """ Remove the runs whose output directory does not exist anymore
+
+		Returns
+		_ _ _ _ _ _ _ _ _ _
+
+            nRemoved: int
+                Number of runs removed"""
+        df_runs = self.runs(existing = False)
+        removed = df_runs[~df_runs["OUTPUT_DIRECTORY"].apply(os.path.exists)].index
+        with closing(self.connect()) as conn, conn:
+            conn.executemany("DELETE FROM RUNS WHERE RUN_ID = ?",
+                             [(int(r), ) for r in removed])
+
+        return len(removed)
+
+
+def recordRun(kind, outputDirectory, catalogPath = CATALOG_FILE,
+              update = UPDATE_CATALOG, **kwargs):
+    """ Record a run in the catalog (see ScenarioCatalog.record). A catalog
+    that can not be updated does not stop the calculation (a message is
+    printed instead).
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _
+
+            kind: String
+                Kind of run (one of RUN_KINDS)
+            outputDirectory: String
+                Directory where are saved the run outputs
+            catalogPath: String, default CATALOG_FILE
+                Path of the SQLite catalog
+            update: boolean, default UPDATE_CATALOG
+                Whether or not the run is recorded
+            kwargs:
+                Other arguments of ScenarioCatalog.record
+
+		Returns
+		_ _ _ _ _ _ _ _ _ _
+
+            runId: int
+                Identifier of the run in the catalog (None if not recorded)"""
+    if not update:
+        return None
+    try:
+        return ScenarioCatalog(catalogPath).record(kind = kind,
+                                                   outputDirectory = outputDirectory,
+                                                   **kwargs)
+    except (sqlite3.Error, OSError) as e:
+        print(f"The run could not be recorded in the catalog '{catalogPath}': {e}")
+        return None
+
+def _toJson(value):
+    """ Convert numpy values (and other objects) into JSON serializable values"""
+    if hasattr(value, "item"):
+        return value.item()
+    else:
+        return str(value)
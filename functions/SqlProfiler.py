@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 09:12:40 2026
+
+@author: Jérémy Bernard, chercheur associé au Lab-STICC
+"""
+import inspect
+import re
+import time
+
+import pandas as pd
+
+from .DataUtil import splitStatements
+
+# SQL statements whose plan can be obtained with H2 'EXPLAIN ANALYZE'
+# without modifying the database
+_EXPLAINABLE_SELECT = re.compile(r"^\s*(SELECT\s.*)$", re.IGNORECASE | re.DOTALL)
+# (with or without the list of the columns of the created table)
+_EXPLAINABLE_CREATE = re.compile(r"^\s*CREATE\s+TABLE\s+[\w.\"]+(?:\s*\(.*?\))?\s+AS\s+(SELECT\s.*)$",
+                                 re.IGNORECASE | re.DOTALL)
+
+
+class ProfilingCursor(object):
+    """ Wraps a database cursor and records, for each executed statement
+    (the queries made of several statements are split), the calling 
+    function, the wind direction being processed, the wall time, the number
+    of rows affected and optionally the 'EXPLAIN ANALYZE' plan.
+    All other cursor attributes and methods are forwarded to the wrapped cursor."""
+
+    def __init__(self, cursor, connection = None, explain = False):
+        """
+		Parameters
+		_ _ _ _ _ _ _ _ _ _
+
+            cursor: conn.cursor
+                The cursor object to wrap
+            connection:
+                Connection object to the database (needed only if 'explain' is True
+                since plans are obtained from a separate cursor)
+            explain: boolean, default False
+                Whether or not the 'EXPLAIN ANALYZE' plan of each SELECT
+                (or CREATE TABLE ... AS SELECT) statement should be recorded.
+                Note that the SELECT queries are then executed twice"""
+        self._cursor = cursor
+        self._explainCursor = None
+        if explain and connection is not None:
+            self._explainCursor = connection.cursor()
+        self.windDirection = None
+        self.records = []
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def execute(self, operation, parameters = None):
+        if parameters is not None:
+            start = time.perf_counter()
+            result = self._cursor.execute(operation, parameters)
+            self._record(operation, time.perf_counter() - start, 1)
+
+            return result
+
+        # Each statement is timed (and explained right before being executed
+        # since the tables it uses may be dropped or modified by the next ones)
+        result = None
+        for statement in splitStatements(operation):
+            plan = None
+            if self._explainCursor is not None:
+                plan = self._explain(statement)
+            start = time.perf_counter()
+            result = self._cursor.execute(statement)
+            self._record(statement, time.perf_counter() - start, 1,
+                         plan = plan)
+
+        return result
+
+    def executemany(self, operation, seq_of_parameters):
+        seq_of_parameters = list(seq_of_parameters)
+        start = time.perf_counter()
+        result = self._cursor.executemany(operation, seq_of_parameters)
+        self._record(operation, time.perf_counter() - start,
+                     len(seq_of_parameters))
+
+        return result
+
+    def _record(self, operation, duration, nbExecutions, plan = None):
+        # Identify the first caller located outside of this module
+        frame = inspect.currentframe().f_back.f_back
+        caller = "{0}.{1}".format(frame.f_globals.get("__name__", "").split(".")[-1],
+                                  frame.f_code.co_name)
+        try:
+            rowcount = self._cursor.rowcount
+        except Exception:
+            rowcount = None
+
+        record = {"caller": caller,
+                  "line": frame.f_lineno,
+                  "wind_dir": self.windDirection,
+                  "duration": duration,
+                  "rowcount": rowcount,
+                  "executions": nbExecutions,
+                  "statement": " ".join(operation.split())}
+        if plan is not None:
+            record["plan"] = plan
+        self.records.append(record)
+
+    def _explain(self, statement):
+        """ 'EXPLAIN ANALYZE' plan of a statement (None if the statement
+        is not a SELECT or a CREATE TABLE ... AS SELECT)"""
+        match = _EXPLAINABLE_CREATE.match(statement) or _EXPLAINABLE_SELECT.match(statement)
+        if not match:
+            return None
+        try:
+            self._explainCursor.execute("EXPLAIN ANALYZE " + match.group(1))
+            return "\n".join([str(row[0]) for row in self._explainCursor.fetchall()])
+        except Exception as e:
+            return "Plan not available: {0}".format(e)
+
+    def writeReport(self, filePathBase):
+        """ Save the profile as a CSV file (statements sorted by decreasing
+        duration) and as a JSON file
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _
+
+            filePathBase: String
+                Path of the report without extension
+
+		Returns
+		_ _ _ _ _ _ _ _ _ _
+
+            profile: pd.DataFrame
+                The sorted profile"""
+        profile = pd.DataFrame(self.records)
+        if not profile.empty:
+            profile = profile.sort_values("duration", ascending = False)
+        profile.to_csv(filePathBase + ".csv", index = False)
+        profile.to_json(filePathBase + ".json", orient = "records", indent = 1)
+
+        return profile
+
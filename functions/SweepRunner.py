@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 21:12:40 2026
+
+@author: Jérémy Bernard, chercheur associé au Lab-STICC
+"""
+import os
+import json
+import shutil
+import inspect
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from .globalVariables import SWEEP_WORKERS, SWEEP_RESULTS_FILE, OUTPUT_PROCESSOR_FOLDER,\
+    BUILDING_STAGE_SETTINGS, CHECKPOINT_BUILDINGS_FOLDER
+from . import mainCalculations
+from .H2gisConnection import configureJava
+
+# Parameter only invalidating the processing stage (the preparation is reused)
+PROCESSING_PARAMETERS = ["weatherFilePath"]
+# Parameters of 'prepareData' set by the runner (all wind directions are
+# prepared so that the weather points of a same preparation can be
+# calculated at the same time)
+RUNNER_PARAMETERS = ["output_directory", "prefix", "feedback", "parkBatch",
+                     "nWorkers", "weatherFilePath", "windRose",
+                     "minDirectionWeight", "directions", "closeInstance",
+                     "buildingsCheckpoint"]
+# Parameters of 'prepareData' which can be swept (invalidating the preparation)
+PREPARATION_PARAMETERS = [p for p in inspect.signature(mainCalculations.prepareData).parameters
+                          if p not in RUNNER_PARAMETERS]
+# Preparation parameters invalidating the building stage (building indicators)
+BUILDING_PARAMETERS = [p for p in PREPARATION_PARAMETERS if p in BUILDING_STAGE_SETTINGS]
+# Preparation parameters only invalidating the stages following the building
+# stage (park covers and wind direction settings): the building stage
+# checkpoint is restored
+PARK_PARAMETERS = [p for p in PREPARATION_PARAMETERS if p not in BUILDING_PARAMETERS]
+
+
+def expandGrid(grid):
+    """ List the points of a parameter grid (all combinations of the values
+    of each parameter)
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _
+
+            grid: dictionary
+                Name of each parameter as key and list of its values as value
+
+		Returns
+		_ _ _ _ _ _ _ _ _ _
+
+            points: list of dictionary
+                Parameter values of each point"""
+    names = list(grid.keys())
+
+    return [dict(zip(names, values))
+            for values in itertools.product(*[grid[n] for n in names])]
+
+def stageKey(parameters, names):
+    """ Identifier of a stage: the values of the parameters it depends on"""
+    return json.dumps({n: parameters.get(n) for n in names},
+                      sort_keys = True, default = str)
+
+def prepareTask(parameters, outputDirectory, prefix, buildingsCheckpoint = None):
+    """ Prepares a scenario in a worker process, starting from a shared
+    building stage checkpoint if any (returns its directory, None if the
+    calculation has been cancelled)"""
+    # The database is removed once done (the workers run many tasks)
+    result = mainCalculations.prepareScenario(output_directory = outputDirectory,
+                                              prefix = prefix,
+                                              closeInstance = True,
+                                              buildingsCheckpoint = buildingsCheckpoint,
+                                              **parameters)
+    if result is None:
+        return None
+
+    return outputDirectory + os.sep + prefix
+
+def processTask(scenarioDirectory, weatherFilePath, prefix):
+    """ Calculates the park effects of a prepared scenario for a weather in
+    a worker process (returns the output directory and its statistics)"""
+    mainCalculations.processScenario(scenarioDirectory = scenarioDirectory,
+                                     weatherFilePath = weatherFilePath,
+                                     prefix = prefix)
+    outputDirectory = scenarioDirectory + os.sep + OUTPUT_PROCESSOR_FOLDER + os.sep + prefix
+
+    return outputDirectory, mainCalculations.processingStatistics(outputDirectory)
+
+def runSweep(outputDirectory, grid, baseParameters, prefix = "Sweep",
+             nWorkers = SWEEP_WORKERS, feedback = None):
+    """ Runs a parameter sweep. Each point of the grid is only calculated
+    for the stages its parameters invalidate: points differing only by the
+    weather reuse the same prepared scenario and preparations differing only
+    by PARK_PARAMETERS (e.g. park composition) reuse the same building stage
+    (building indicators). The remaining preparations and processings are 
+    run on a process pool (the preparations sharing a building stage start
+    from its checkpoint once the first of them is done, the processings of a
+    scenario start as soon as its preparation is done) and the results of 
+    all points are gathered in the SWEEP_RESULTS_FILE table.
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _
+
+            outputDirectory: String
+                Directory where are saved the scenarios of the sweep
+            grid: dictionary
+                Name of each swept parameter as key and list of its values
+                as value (any parameter of PREPARATION_PARAMETERS or
+                PROCESSING_PARAMETERS)
+            baseParameters: dictionary
+                Value of the parameters which are not swept (at least the
+                'prepareData' parameters without default value)
+            prefix: String, default "Sweep"
+                Prefix of the scenario names
+            nWorkers: int, default SWEEP_WORKERS
+                Number of processes running the calculations
+            feedback: QgsProcessingFeedback, default None
+                Object used to report progress and to check cancellation
+
+		Returns
+		_ _ _ _ _ _ _ _ _ _
+
+            df_results: pd.DataFrame
+                Parameters, directories, stages reused and statistics of
+                each point, or
+                the error message of the preparation or processing which
+                failed for the point ("ERROR" column) (None if the
+                calculation has been cancelled)"""
+    unknown = [p for p in list(grid.keys()) + list(baseParameters.keys())
+               if p not in PREPARATION_PARAMETERS + PROCESSING_PARAMETERS]
+    if unknown:
+        raise ValueError(f"The parameters {unknown} can not be swept")
+    points = [dict(baseParameters, **p) for p in expandGrid(grid)]
+    if [p for p in points if not p.get("weatherFilePath")]:
+        raise ValueError("A weather file ('weatherFilePath') is needed for each point")
+    if not os.path.exists(outputDirectory):
+        os.makedirs(outputDirectory)
+    configureJava(points[0]["plugin_directory"])
+
+    # Identify the distinct building stages, preparations and processings
+    # of the sweep (the building stage checkpoints are shared in a folder
+    # of the sweep)
+    buildingStages = {}
+    preparations = {}
+    weathers = {}
+    for p in points:
+        key = stageKey(p, PREPARATION_PARAMETERS)
+        if key not in preparations:
+            buildingKey = stageKey(p, BUILDING_PARAMETERS)
+            if buildingKey not in buildingStages:
+                buildingStages[buildingKey] = outputDirectory + os.sep + f"{prefix}_{CHECKPOINT_BUILDINGS_FOLDER}_{len(buildingStages)}"
+            preparations[key] = (f"{prefix}_{len(preparations)}",
+                                 {n: p[n] for n in PREPARATION_PARAMETERS if n in p},
+                                 buildingStages[buildingKey])
+        p["PREPARATION"] = preparations[key][0]
+        p["WEATHER"] = weathers.setdefault(p["weatherFilePath"],
+                                           f"Weather_{len(weathers)}")
+    processings = {}
+    for p in points:
+        processings.setdefault((p["PREPARATION"], p["WEATHER"]), p["weatherFilePath"])
+    if feedback:
+        feedback.setProgressText(f"{len(points)} points: {len(buildingStages)} building stages, {len(preparations)} preparations and {len(processings)} processings")
+    # Preparations waiting for the building stage they share
+    waiting = {}
+    buildingsCheckpoints = {}
+    for preparation, parameters, buildingsCheckpoint in preparations.values():
+        waiting.setdefault(buildingsCheckpoint, []).append((preparation, parameters))
+        buildingsCheckpoints[preparation] = buildingsCheckpoint
+
+    preparedDirectories = {}
+    processed = {}
+    # Error message of the failed preparations and processings (the points
+    # depending on them get an error row, the other points are calculated)
+    errors = {}
+    # Preparations started from the building stage of another one
+    reusedBuildings = set()
+    cancelled = False
+    nTasks = len(preparations) + len(processings)
+    with ProcessPoolExecutor(max_workers = nWorkers) as executor:
+        futures = {}
+        # The first preparation of each building stage calculates it
+        for buildingsCheckpoint, group in waiting.items():
+            preparation, parameters = group.pop(0)
+            futures[executor.submit(prepareTask,
+                                    parameters = parameters,
+                                    outputDirectory = outputDirectory,
+                                    prefix = preparation,
+                                    buildingsCheckpoint = buildingsCheckpoint)] = (preparation, None)
+        nDone = 0
+        while futures:
+            future = next(as_completed(futures))
+            preparation, weather = futures.pop(future)
+            nDone += 1
+            try:
+                result = future.result()
+            except Exception as e:
+                errors[(preparation, weather)] = f"{type(e).__name__}: {e}"
+                result = None
+                if feedback:
+                    feedback.setProgressText(f'{preparation} {weather or "preparation"} failed ({errors[(preparation, weather)]})')
+            if weather is None:
+                preparedDirectories[preparation] = result
+                # The other preparations of the building stage can start (they
+                # calculate their own building stage if it has failed)
+                buildingsCheckpoint = buildingsCheckpoints[preparation]
+                for prep, parameters in waiting.pop(buildingsCheckpoint, []):
+                    if result:
+                        reusedBuildings.add(prep)
+                    futures[executor.submit(prepareTask,
+                                            parameters = parameters,
+                                            outputDirectory = outputDirectory,
+                                            prefix = prep,
+                                            buildingsCheckpoint = buildingsCheckpoint if result else None)] = (prep, None)
+                # The processings of the scenario can start
+                if preparedDirectories[preparation]:
+                    for (prep, w), weatherFilePath in processings.items():
+                        if prep == preparation:
+                            futures[executor.submit(processTask,
+                                                    scenarioDirectory = preparedDirectories[preparation],
+                                                    weatherFilePath = weatherFilePath,
+                                                    prefix = w)] = (preparation, w)
+            elif result is not None:
+                processed[(preparation, weather)] = result
+            if feedback:
+                feedback.setProgressText(f'{preparation} {weather or "prepared"} ({nDone}/{nTasks})')
+                # Tasks not yet started are cancelled
+                if feedback.isCanceled():
+                    for f in futures:
+                        f.cancel()
+                    feedback.setProgressText("Calculation cancelled by user")
+                    cancelled = True
+                    break
+    
+    # The shared building stage checkpoints are not needed anymore
+    for buildingsCheckpoint in buildingStages.values():
+        shutil.rmtree(buildingsCheckpoint, ignore_errors = True)
+    if cancelled:
+        return None
+
+    # Tidy table of results (one row per point)
+    rows = []
+    firstPoints = [p["PREPARATION"] for p in points]
+    for i, p in enumerate(points):
+        outputs, statistics = processed.get((p["PREPARATION"], p["WEATHER"]), (None, {}))
+        row = {"POINT_ID": i}
+        row.update({n: p[n] for n in grid})
+        row.update({"PREPARATION": p["PREPARATION"],
+                    "PREPARED_DIRECTORY": preparedDirectories.get(p["PREPARATION"]),
+                    "PREPARATION_REUSED": firstPoints.index(p["PREPARATION"]) != i,
+                    "BUILDINGS_REUSED": firstPoints.index(p["PREPARATION"]) != i\
+                        or p["PREPARATION"] in reusedBuildings,
+                    "OUTPUT_DIRECTORY": outputs,
+                    "ERROR": errors.get((p["PREPARATION"], None),
+                                        errors.get((p["PREPARATION"], p["WEATHER"])))})
+        row.update(statistics)
+        rows.append(row)
+    df_results = pd.DataFrame(rows).set_index("POINT_ID")
+    df_results.to_csv(outputDirectory + os.sep + SWEEP_RESULTS_FILE)
+
+    return df_results
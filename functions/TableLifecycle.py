@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 16:21:07 2026
+
+@author: Jérémy Bernard, chercheur associé au Lab-STICC
+"""
+import os
+from contextlib import contextmanager
+
+import pandas as pd
+
+from .DataUtil import normalizeTableName
+from .globalVariables import DEBUG
+
+
+class Stage(object):
+    """ Tables declared by a calculation stage as outputs (kept after the
+    end of the stage)"""
+
+    def __init__(self, name):
+        self.name = name
+        self.outputs = set()
+
+    def keep(self, *tableNames):
+        """ Declare tables as outputs of the stage
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _
+
+            tableNames: String
+                Name of the tables to keep after the end of the stage"""
+        for t in tableNames:
+            self.outputs.add(normalizeTableName(t))
+
+
+class TableLifecycle(object):
+    """ Tracks the tables created by each stage of a calculation. At the end
+    of a stage, all the tables it has created are dropped except the ones
+    declared as outputs. These outputs are then dropped at the end of the
+    stage consuming them. The size of the database file is recorded after
+    each stage."""
+
+    def __init__(self, cursor, dbFilePath = None, keep = DEBUG):
+        """
+		Parameters
+		_ _ _ _ _ _ _ _ _ _
+
+            cursor: conn.cursor
+                A cursor object, used to perform queries
+            dbFilePath: String, default None
+                Path of the database file (used to record its size)
+            keep: boolean, default DEBUG
+                Whether or not all tables are kept (for debugging)"""
+        self.cursor = cursor
+        self.dbFilePath = dbFilePath
+        self.keep = keep
+        self.records = []
+        self.peakSize = self.dbSize()
+
+    def listTables(self):
+        """ Get the name of all tables of the database (views excepted)"""
+        self.cursor.execute("""
+            SELECT TABLE_NAME FROM INFORMATION_SCHEMA.TABLES
+            WHERE TABLE_SCHEMA = 'PUBLIC' AND TABLE_TYPE IN ('TABLE', 'BASE TABLE')""")
+
+        return set([row[0] for row in self.cursor.fetchall()])
+
+    def dbSize(self):
+        """ Get the size of the database file (in bytes)"""
+        if self.dbFilePath and os.path.exists(self.dbFilePath):
+            return os.path.getsize(self.dbFilePath)
+        else:
+            return None
+
+    @contextmanager
+    def stage(self, name, consumes = ()):
+        """ Context of a calculation stage. The tables created within the
+        context are dropped when leaving it (if not declared as outputs
+        using 'Stage.keep') as well as the tables consumed by the stage.
+        Nothing is dropped if an error is raised within the context.
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _
+
+            name: String
+                Name of the stage (used in the report)
+            consumes: list of String, default ()
+                Outputs of previous stages that are not needed anymore
+                once the stage is finished
+
+		Returns
+		_ _ _ _ _ _ _ _ _ _
+
+            stage: Stage
+                Object used to declare the outputs of the stage"""
+        before = self.listTables()
+        stage = Stage(name)
+        yield stage
+        created = self.listTables() - before
+        toDrop = (created - stage.outputs) | set([normalizeTableName(t) for t in consumes])
+        if not self.keep and toDrop:
+            self.cursor.execute("DROP TABLE IF EXISTS {0}".format(", ".join(sorted(toDrop))))
+        else:
+            toDrop = set()
+
+        size = self.dbSize()
+        if size is not None:
+            self.peakSize = max(self.peakSize or 0, size)
+        self.records.append({"stage": name,
+                             "created": len(created),
+                             "dropped": len(toDrop),
+                             "kept": ", ".join(sorted(created - toDrop)),
+                             "db_size": size})
+
+    def writeReport(self, filePath):
+        """ Save the database size after each stage (and its peak size) in
+        a CSV file
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _
+
+            filePath: String
+                Path of the report (including extension)
+
+		Returns
+		_ _ _ _ _ _ _ _ _ _
+
+            peakSize: int
+                Peak size of the database file (in bytes)"""
+        report = pd.DataFrame(self.records)
+        report = pd.concat([report,
+                            pd.DataFrame([{"stage": "PEAK", "db_size": self.peakSize}])],
+                           ignore_index = True)
+        report.to_csv(filePath, index = False)
+        if self.peakSize is not None:
+            print("Peak database size: {0:.1f} MB".format(self.peakSize / 2**20))
+
+        return self.peakSize
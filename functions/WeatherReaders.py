@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 23:58:14 2026
+
+Readers of the weather file formats. Each reader streams its file by chunks
+and returns the meteorological variables with their generic names (WDIR,
+WSPEED, T_AIR, RH, P_ATMO) and units (RH in %) indexed by local datetime. New formats are added
+by registering a subclass of 'WeatherReader' (see 'registerReader').
+
+@author: Jérémy Bernard, chercheur associé au Lab-STICC
+"""
+import os
+import json
+import inspect
+import hashlib
+from abc import ABC, abstractmethod
+
+import numpy as np
+import pandas as pd
+import pytz
+
+from .globalVariables import WDIR, WSPEED, T_AIR, RH, P_ATMO, DPV, WIND_SECTOR,\
+    N_DIRECTIONS, WEATHER_HOURS, WEATHER_CHUNK_SIZE, WEATHER_CACHE_DIRECTORY
+from .DataUtil import fileHash
+from . import coolparks_calc as calc_fct
+
+# Version of the cached weather tables (to increase when their content changes)
+CACHE_VERSION = 2
+
+
+class WeatherReader(ABC):
+    """ Reader of a weather file format (the subclasses implement 'canRead',
+    'utcOffset' and 'chunks')"""
+    # Name of the format
+    name = None
+    # Name (or position) of the column of each generic variable
+    columns = {}
+
+    def __init__(self, columns = None, utc = None):
+        """
+		Parameters
+		_ _ _ _ _ _ _ _ _ _
+
+            columns: dictionary, default None
+                Name of the column of each generic variable (WDIR, WSPEED,
+                T_AIR, RH, P_ATMO) if different from the default ones
+            utc: int, default None
+                UTC offset (hours) of the local time of the file if not
+                given in the file"""
+        self.columns = dict(self.columns, **(columns or {}))
+        self.utc = utc
+
+    @abstractmethod
+    def canRead(self, filePath):
+        """ Whether or not the file has this format"""
+
+    @abstractmethod
+    def utcOffset(self, filePath):
+        """ UTC offset (hours) of the local time of the file"""
+
+    @abstractmethod
+    def chunks(self, filePath, chunkSize):
+        """ Meteorological data of the file (generic column names, local
+        datetime index) by chunks of 'chunkSize' rows"""
+
+    def settings(self):
+        """ Settings of the reader (the cached tables depend on them)"""
+        return {"name": self.name,
+                "columns": self.columns,
+                "utc": self.utc}
+
+    def read(self, filePath, hours = WEATHER_HOURS, chunkSize = WEATHER_CHUNK_SIZE):
+        """ Read the meteorological data of a file
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _
+
+            filePath: String
+                Path of the weather file
+            hours: list of int, default WEATHER_HOURS
+                Hours of the day (local time) kept (all if None)
+            chunkSize: int, default WEATHER_CHUNK_SIZE
+                Number of rows read at once
+
+		Returns
+		_ _ _ _ _ _ _ _ _ _
+
+            df_met: pd.DataFrame
+                Meteorological data (generic column names, UTC datetime index)
+            utc: int
+                UTC offset (hours) of the local time of the weather file"""
+        utc = self.utcOffset(filePath)
+        selected = []
+        for chunk in self.chunks(filePath, chunkSize):
+            if hours is not None:
+                chunk = chunk[np.isin(chunk.index.hour, hours) & (chunk.index.minute == 0)]
+            selected.append(chunk)
+        df_met = pd.concat(selected).astype(float)
+        df_met.index = pd.DatetimeIndex(df_met.index)\
+            .tz_localize(pytz.FixedOffset(utc * 60)).tz_convert("UTC")
+
+        return df_met, utc
+
+
+class ShinyWeatherReader(WeatherReader):
+    """ Files of the Shiny Weather Data service (11 header lines, UTC offset
+    given in the 7th line, local datetime in the first column, relative
+    humidity given as a fraction)"""
+    name = "shiny"
+    columns = {WDIR: "wdir10",
+               WSPEED: "ws10",
+               T_AIR: "t2m",
+               RH: "r2m",
+               P_ATMO: "sp"}
+    headerLines = 11
+
+    def canRead(self, filePath):
+        with open(filePath, encoding = "utf-8", errors = "replace") as f:
+            return "shiny weather data" in f.readline().lower()
+
+    def utcOffset(self, filePath):
+        if self.utc is not None:
+            return self.utc
+        return int(pd.read_csv(filePath, nrows = 1, header = 6).columns[0].split(":")[1])
+
+    def chunks(self, filePath, chunkSize):
+        for chunk in pd.read_csv(filePath,
+                                 skiprows = self.headerLines,
+                                 index_col = 0,
+                                 parse_dates = True,
+                                 chunksize = chunkSize):
+            chunk = chunk[list(self.columns.values())]\
+                .rename(columns = {v: k for k, v in self.columns.items()})
+            # The relative humidity is converted from fraction to %
+            chunk[RH] = chunk[RH] * 100
+            yield chunk
+
+
+class EpwReader(WeatherReader):
+    """ EnergyPlus weather files (8 header lines, UTC offset given in the
+    LOCATION line, hours from 1 to 24). The months of a typical year coming
+    from different years are considered as a single year."""
+    name = "epw"
+    columns = {WDIR: 20,
+               WSPEED: 21,
+               T_AIR: 6,
+               RH: 8,
+               P_ATMO: 9}
+    headerLines = 8
+
+    def canRead(self, filePath):
+        return os.path.splitext(filePath)[1].lower() == ".epw"
+
+    def utcOffset(self, filePath):
+        if self.utc is not None:
+            return self.utc
+        with open(filePath, encoding = "utf-8", errors = "replace") as f:
+            return int(float(f.readline().split(",")[8]))
+
+    def chunks(self, filePath, chunkSize):
+        firstYear = None
+        previousYear = None
+        typicalYear = False
+        for chunk in pd.read_csv(filePath,
+                                 skiprows = self.headerLines,
+                                 header = None,
+                                 chunksize = chunkSize):
+            years = chunk[0].values
+            if firstYear is None:
+                firstYear = previousYear = years[0]
+            # Year changing elsewhere than on the 1st of January: typical year
+            newYear = (chunk[1].values == 1) & (chunk[2].values == 1) & (chunk[3].values == 1)
+            typicalYear = typicalYear\
+                or ((years != np.concatenate([[previousYear], years[:-1]])) & ~newYear).any()
+            previousYear = years[-1]
+            if typicalYear:
+                years = np.full(len(years), firstYear)
+            index = pd.to_datetime(pd.DataFrame({"year": years,
+                                                 "month": chunk[1].values,
+                                                 "day": chunk[2].values}))\
+                + pd.to_timedelta(chunk[3].values - 1, unit = "h")
+            yield pd.DataFrame({k: chunk[v].values for k, v in self.columns.items()},
+                               index = pd.DatetimeIndex(index))
+
+
+class CsvWeatherReader(WeatherReader):
+    """ CSV files having a datetime column (local time) and a column for
+    each generic variable (UTC offset given when creating the reader)"""
+    name = "csv"
+    columns = {WDIR: WDIR,
+               WSPEED: WSPEED,
+               T_AIR: T_AIR,
+               RH: RH,
+               P_ATMO: P_ATMO}
+    datetimeColumn = "datetime"
+
+    def canRead(self, filePath):
+        return os.path.splitext(filePath)[1].lower() in [".csv", ".txt"]
+
+    def utcOffset(self, filePath):
+        return self.utc or 0
+
+    def chunks(self, filePath, chunkSize):
+        for chunk in pd.read_csv(filePath,
+                                 index_col = self.datetimeColumn,
+                                 parse_dates = True,
+                                 chunksize = chunkSize):
+            yield chunk[list(self.columns.values())]\
+                .rename(columns = {v: k for k, v in self.columns.items()})
+
+
+# Readers of each format (the formats are tried in this order when the
+# format of a file is not given)
+READERS = {}
+
+def registerReader(readerClass):
+    """ Add a weather file format (subclass of 'WeatherReader' implementing
+    all its abstract methods)"""
+    if not issubclass(readerClass, WeatherReader) or inspect.isabstract(readerClass):
+        raise TypeError(f"'{readerClass.__name__}' is not a complete weather reader (methods not implemented: {sorted(getattr(readerClass, '__abstractmethods__', []))})")
+    if not readerClass.name:
+        raise TypeError(f"'{readerClass.__name__}' has no format name")
+    READERS[readerClass.name] = readerClass
+
+    return readerClass
+
+for readerClass in [ShinyWeatherReader, EpwReader, CsvWeatherReader]:
+    registerReader(readerClass)
+
+def getReader(filePath, weatherFormat = None, columns = None, utc = None):
+    """ Reader of a weather file
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _
+
+            filePath: String
+                Path of the weather file
+            weatherFormat: String, default None
+                Name of the format (identified from the file if None)
+            columns: dictionary, default None
+                Name of the column of each generic variable if different
+                from the default ones of the format
+            utc: int, default None
+                UTC offset (hours) of the local time if not given in the file
+
+		Returns
+		_ _ _ _ _ _ _ _ _ _
+
+            reader: WeatherReader
+                Reader of the file"""
+    if weatherFormat is not None:
+        if weatherFormat not in READERS:
+            raise ValueError(f"Unknown weather file format '{weatherFormat}' (available: {list(READERS.keys())})")
+        return READERS[weatherFormat](columns = columns, utc = utc)
+    for readerClass in READERS.values():
+        reader = readerClass(columns = columns, utc = utc)
+        if reader.canRead(filePath):
+            return reader
+    raise ValueError(f"The format of the weather file '{filePath}' is unknown")
+
+def readWeather(weatherFilePath, weatherFormat = None, columns = None,
+                utc = None, cacheDirectory = WEATHER_CACHE_DIRECTORY):
+    """ Read the meteorological data of a weather file (only the hours of
+    WEATHER_HOURS) and calculate the derived variables (DPV and wind
+    direction sector). The table is saved in the cache directory so that
+    the file is not read again as long as its content does not change.
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _
+
+            weatherFilePath: String
+                Path of the weather file
+            weatherFormat: String, default None
+                Name of the format (identified from the file if None)
+            columns: dictionary, default None
+                Name of the column of each generic variable if different
+                from the default ones of the format
+            utc: int, default None
+                UTC offset (hours) of the local time if not given in the file
+            cacheDirectory: String, default WEATHER_CACHE_DIRECTORY
+                Directory of the cached tables (no cache if None)
+
+		Returns
+		_ _ _ _ _ _ _ _ _ _
+
+            df_met: pd.DataFrame
+                Meteorological data (generic column names, UTC datetime index)
+            utc: int
+                UTC offset (hours) of the local time of the weather file"""
+    reader = getReader(filePath = weatherFilePath,
+                       weatherFormat = weatherFormat,
+                       columns = columns,
+                       utc = utc)
+
+    cachePath = None
+    if cacheDirectory:
+        # The table is identified by the file content and the reading settings
+        tableId = hashlib.sha1(json.dumps({"file": fileHash(weatherFilePath),
+                                           "reader": reader.settings(),
+                                           "hours": WEATHER_HOURS,
+                                           "directions": N_DIRECTIONS,
+                                           "version": CACHE_VERSION},
+                                          sort_keys = True, default = str)\
+                               .encode("utf-8")).hexdigest()[:16]
+        cachePath = os.path.join(cacheDirectory, f"weather_{tableId}.pkl")
+        if os.path.exists(cachePath):
+            try:
+                return pd.read_pickle(cachePath)
+            except Exception:
+                pass
+
+    df_met, utc = reader.read(weatherFilePath)
+    df_met[DPV] = calc_fct.dpv_calc(df_met)
+    df_met[WIND_SECTOR] = calc_fct.wind_sector(wd = df_met[WDIR].values,
+                                               dirs = np.arange(0, 360, 360. / N_DIRECTIONS))
+    if cachePath:
+        try:
+            os.makedirs(cacheDirectory, exist_ok = True)
+            pd.to_pickle((df_met, utc), cachePath)
+        except OSError:
+            pass
+
+    return df_met, utc
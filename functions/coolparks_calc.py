@@ -4,8 +4,11 @@ import numpy as np
 import pandas as pd
 from osgeo import gdal, gdalconst
 import itertools
+import datetime
+import pytz
 
 from . import DataUtil
+from . import CoefficientTables
 from . import loadData
 
 import string
@@ -230,7 +233,9 @@ def calc_morpho_t_effect(df_indic, ws_norm, day_hour):
                             value_max = COOLING_FACTORS[day_hour].loc["max","ws"])
     
     # Limit the values of the geospatial indicators to the range used for this indicator during the training phase
-    df_indic_lim = limit_geoindic(df_indic, TRANSPORT_EXTREMUM_VAL)
+    df_indic_lim = limit_geoindic(df_indic,
+                                  CoefficientTables.extremumValues(TRAINING_TRANSPORT_FILE,
+                                                                   COEFFICIENT_CACHE_DIRECTORY))
     
     # Test whether the formula type has a wind speed multiplicator
     if COEF_DT_MORPHO[day_hour].loc[WIND_FACTOR_NAME, "value"] == 0:
@@ -270,7 +275,9 @@ def calc_morpho_d_effect(df_indic, ws_norm, day_hour):
                             value_max = COOLING_FACTORS[day_hour].loc["max","ws"])
     
     # Limit the values of the geospatial indicators to the range used for this indicator during the training phase
-    df_indic_lim = limit_geoindic(df_indic, TRANSPORT_EXTREMUM_VAL)
+    df_indic_lim = limit_geoindic(df_indic,
+                                  CoefficientTables.extremumValues(TRAINING_TRANSPORT_FILE,
+                                                                   COEFFICIENT_CACHE_DIRECTORY))
     
     # Test whether the formula type has a wind speed multiplicator
     if COEF_D_MORPHO[day_hour].loc[WIND_FACTOR_NAME, "value"] == 0:
@@ -531,9 +538,8 @@ def build_impact_formula(df_indic, variable):
         bc = BUILDING_SIZE_CLASSES.loc[bc_c, "name"]
         
         # Load regression coefficients
-        df_coef = pd.read_csv(path_to_file + os.sep + f"{bc}_{gt}_{ot}.csv",
-                              header = 0,
-                              index_col = 0)
+        df_coef = CoefficientTables.readTable(path_to_file + os.sep + f"{bc}_{gt}_{ot}.csv",
+                                              COEFFICIENT_CACHE_DIRECTORY).copy()
         # Shutter is in lower case in the coefficients while in upper case otherwise...
         df_coef.loc[:, "var1"] = df_coef.loc[:, "var1"].str.upper()
         df_coef.loc[:, "var2"] = df_coef.loc[:, "var2"].str.upper()
@@ -562,3 +568,111 @@ def build_impact_formula(df_indic, variable):
         df_effect.loc[idx_build] = constant + linear_terms + cross_terms
     
     return df_effect
+
+def select_time_period(df_met, utc, day_hour):
+    """ Select the meteorological data of a given hour for each day of the
+    analysed period (START_DATE to END_DATE)
+    
+		Parameters
+		_ _ _ _ _ _ _ _ _ _ 
+  
+            df_met: pd.DataFrame
+                Meteorological data (see 'WeatherReaders.readWeather')
+            utc: int
+                UTC offset (hours) of the local time of the weather file
+            day_hour: int
+                Hour of the day to select (local time)
+        
+		Returns
+		_ _ _ _ _ _ _ _ _ _ 
+
+            df_met_sel: pd.DataFrame
+                Meteorological data of the selected dates"""
+    year = df_met.index.year.unique()[0]
+    start_day = int(START_DATE.split("/")[0])
+    start_month = int(START_DATE.split("/")[1])
+    end_day = int(END_DATE.split("/")[0])
+    end_month = int(END_DATE.split("/")[1])
+    selected_dates = pd.date_range(start = datetime.datetime(year, start_month, start_day, day_hour),
+                                   end = datetime.datetime(year, end_month, end_day),
+                                   freq = pd.offsets.Day(1),
+                                   tz = pytz.FixedOffset(utc *60))
+    
+    return df_met.reindex(selected_dates).dropna()
+
+def wind_sector(wd, dirs):
+    """ Identify the wind direction sector of wind direction values (each 
+    sector starts at its direction and covers 360 / number of directions)
+    
+		Parameters
+		_ _ _ _ _ _ _ _ _ _ 
+  
+            wd: float or np.array
+                Wind direction values (° from North)
+            dirs: np.array
+                Wind directions of the sectors (starting at 0°)
+        
+		Returns
+		_ _ _ _ _ _ _ _ _ _ 
+
+            Wind direction sector of each value"""
+    return np.asarray(dirs)[(np.mod(wd, 360) // (360. / len(dirs))).astype(int)]
+
+def direction_weights(df_met, utc, dirs, time_periods = [DAY_TIME, NIGHT_TIME]):
+    """ Calculates the number of days in each wind direction sector (wind 
+    rose) for each time period
+    
+		Parameters
+		_ _ _ _ _ _ _ _ _ _ 
+  
+            df_met: pd.DataFrame
+                Meteorological data (see 'WeatherReaders.readWeather')
+            utc: int
+                UTC offset (hours) of the local time of the weather file
+            dirs: np.array
+                Wind directions of the sectors (starting at 0°)
+            time_periods: list of int, default [DAY_TIME, NIGHT_TIME]
+                Hours of the day used to characterize each time period
+        
+		Returns
+		_ _ _ _ _ _ _ _ _ _ 
+
+            weights: pd.DataFrame
+                Number of days for each wind direction (index) and time period (columns)"""
+    weights = pd.DataFrame(0, index = np.asarray(dirs, dtype = float), 
+                           columns = time_periods)
+    for tp in time_periods:
+        df_met_sel = select_time_period(df_met = df_met, 
+                                        utc = utc,
+                                        day_hour = tp)
+        counts = pd.Series(wind_sector(wd = df_met_sel[WDIR].values,
+                                       dirs = weights.index)).value_counts()
+        weights.loc[counts.index, tp] = counts.values
+    
+    return weights
+
+def select_directions(weights, min_weight):
+    """ Select the wind directions having a relative weight higher than a
+    threshold for at least one time period
+    
+		Parameters
+		_ _ _ _ _ _ _ _ _ _ 
+  
+            weights: pd.DataFrame or pd.Series
+                Weight of each wind direction (index) for each time period (columns)
+            min_weight: float
+                Minimum relative weight (fraction of the time period) of a 
+                wind direction to be selected (directions having a null
+                weight are never selected)
+        
+		Returns
+		_ _ _ _ _ _ _ _ _ _ 
+
+            directions: list of float
+                Selected wind directions"""
+    if isinstance(weights, pd.Series):
+        weights = weights.to_frame()
+    rel_weights = weights / weights.sum()
+    selected = ((rel_weights >= min_weight) & (weights > 0)).any(axis = 1)
+    
+    return [float(d) for d in weights.index[selected]]
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 20:05:31 2026
+
+Command-line runner of the CoolParks calculations (no QGIS application
+needed). To be launched from the plugin directory:
+
+    python -m functions.coolparks_cli prepare --help
+    python -m functions.coolparks_cli calc --help
+    python -m functions.coolparks_cli compare --help
+    python -m functions.coolparks_cli catalog --help
+    python -m functions.coolparks_cli sweep --help
+    python -m functions.coolparks_cli serve --help
+
+@author: Jérémy Bernard, chercheur associé au Lab-STICC
+"""
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+from .globalVariables import *
+from .DataUtil import QgsProcessingException
+from . import mainCalculations
+from . import ScenarioCatalog
+from . import SweepRunner
+from . import JobService
+from .H2gisConnection import configureJava
+
+
+class ConsoleFeedback(object):
+    """ Print the progress of the calculations in the console (replace the
+    QGIS processing feedback)"""
+
+    def setProgressText(self, text):
+        print(text)
+
+    def pushWarning(self, text):
+        print(f"Warning: {text}")
+
+    def setProgress(self, progress):
+        pass
+
+    def isCanceled(self):
+        return False
+
+
+def scenarioPrefix(name):
+    """ Name of the folder of a scenario"""
+    return name.replace(" ", "_")
+
+def vectorEpsg(filePath):
+    """ EPSG code of a vector file"""
+    import geopandas as gpd
+    crs = gpd.read_file(filePath, rows = 1).crs
+    if crs is None:
+        raise QgsProcessingException(f'The coordinate system of "{filePath}" is not defined')
+
+    return crs.to_epsg()
+
+def prepare(args):
+    """ Prepares a scenario (see mainCalculations.prepareScenario)"""
+    plugin_directory = str(Path(__file__).parent.parent)
+
+    # Set the Java environment needed by H2GIS
+    configureJava(plugin_directory)
+
+    # All layers should have the same coordinate system
+    srid = vectorEpsg(args.buildings)
+    for filePath in [args.park_boundaries, args.park_ground, args.park_canopy]:
+        if vectorEpsg(filePath) != srid:
+            raise QgsProcessingException(f'Coordinate system of input building layer and "{filePath}" differs!')
+
+    result = mainCalculations.prepareScenario(plugin_directory = plugin_directory,
+                                              buildingFilePath = args.buildings,
+                                              parkBoundaryFilePath = args.park_boundaries,
+                                              parkCanopyFilePath = args.park_canopy,
+                                              parkGroundFilePath = args.park_ground,
+                                              srid = srid,
+                                              canopy_cover_type = args.canopy_type,
+                                              ground_cover_type = args.ground_type,
+                                              build_height = args.height,
+                                              build_age = args.age,
+                                              build_wwr = args.wwr,
+                                              build_shutter = args.shutter,
+                                              build_nat_ventil = args.nat_ventil,
+                                              default_build_height = args.default_height,
+                                              default_build_age = args.default_age,
+                                              default_build_wwr = args.default_wwr,
+                                              default_build_shutter = args.default_shutter,
+                                              default_build_nat_ventil = args.default_nat_ventil,
+                                              nAlongWind = N_ALONG_WIND_PARK,
+                                              nCrossWind = N_CROSS_WIND_PARK,
+                                              feedback = ConsoleFeedback(),
+                                              output_directory = args.output,
+                                              prefix = scenarioPrefix(args.scenario),
+                                              parkBatch = args.park_batch,
+                                              nWorkers = args.workers,
+                                              weatherFilePath = args.weather,
+                                              resume = args.resume,
+                                              closeInstance = True)
+    if result is None:
+        return 1
+    print(f"Scenario prepared in {args.output + os.sep + scenarioPrefix(args.scenario)}")
+
+    return 0
+
+def calc(args):
+    """ Calculates the effect of a prepared park for a weather file (see
+    mainCalculations.processScenario)"""
+    result = mainCalculations.processScenario(scenarioDirectory = args.scenario_directory,
+                                              weatherFilePath = args.weather,
+                                              prefix = scenarioPrefix(args.weather_name),
+                                              feedback = ConsoleFeedback())
+    if result is None:
+        return 1
+    print(f"Park effects saved in {os.path.dirname(result[-1])}")
+
+    return 0
+
+def compare(args):
+    """ Compares one or several alternatives with a reference scenario (see
+    mainCalculations.compareScenarios and mainCalculations.compareScenarioMatrix)"""
+    for directory in [args.reference] + args.alternatives:
+        if not os.path.exists(directory + os.sep + BUILD_INDEP_VAR + ".geojson"):
+            raise QgsProcessingException(f'The scenario "{directory}" does not contain any results')
+    if args.reference in args.alternatives:
+        raise QgsProcessingException('You are proposing to compare the same scenarios...')
+
+    if len(args.alternatives) == 1:
+        finalDirectory = mainCalculations.compareScenarios(refScenarioDirectory = args.reference,
+                                                           altScenarioDirectory = args.alternatives[0],
+                                                           change = args.change,
+                                                           outputDirectory = args.output,
+                                                           overwrite = args.overwrite)[0]
+        print(f"Comparison saved in {finalDirectory}")
+    else:
+        df_matrix, comparisonDirectories = \
+            mainCalculations.compareScenarioMatrix(refScenarioDirectory = args.reference,
+                                                   altScenarioDirectories = args.alternatives,
+                                                   change = args.change,
+                                                   outputDirectory = args.output,
+                                                   nWorkers = args.workers,
+                                                   overwrite = args.overwrite,
+                                                   feedback = ConsoleFeedback())
+        if df_matrix is None:
+            return 1
+        print(df_matrix.to_string())
+        print(f"Comparisons saved in {args.output}")
+
+    return 0
+
+def catalog(args):
+    """ List the runs recorded in the scenario catalog"""
+    scenarioCatalog = ScenarioCatalog.ScenarioCatalog(args.catalog)
+    if args.prune:
+        print(f"{scenarioCatalog.prune()} runs removed from the catalog")
+    df_runs = scenarioCatalog.runs(kind = args.kind,
+                                   scenario = args.scenario,
+                                   weather = args.weather_name)
+    print(df_runs[["KIND", "SCENARIO", "WEATHER", "OUTPUT_DIRECTORY",
+                   "STARTED", "DURATION"]].to_string())
+
+    return 0
+
+def sweep(args):
+    """ Runs a parameter sweep described in a JSON file (see
+    SweepRunner.runSweep): {"base": {parameter: value}, "grid": {parameter: [values]}}"""
+    with open(args.config) as f:
+        config = json.load(f)
+    baseParameters = config.get("base", {})
+    baseParameters.setdefault("plugin_directory", str(Path(__file__).parent.parent))
+    if "srid" not in baseParameters and "buildingFilePath" in baseParameters:
+        baseParameters["srid"] = vectorEpsg(baseParameters["buildingFilePath"])
+
+    df_results = SweepRunner.runSweep(outputDirectory = args.output,
+                                      grid = config.get("grid", {}),
+                                      baseParameters = baseParameters,
+                                      prefix = scenarioPrefix(args.prefix),
+                                      nWorkers = args.workers,
+                                      feedback = ConsoleFeedback())
+    if df_results is None:
+        return 1
+    print(df_results.to_string())
+    print(f"Sweep results saved in {args.output + os.sep + SWEEP_RESULTS_FILE}")
+
+    return 0
+
+def serve(args):
+    """ Runs the local job service (see JobService.serve)"""
+    JobService.serve(pluginDirectory = str(Path(__file__).parent.parent),
+                     host = args.host,
+                     port = args.port,
+                     nWorkers = args.workers)
+
+    return 0
+
+def parser():
+    """ Command-line arguments of each command"""
+    p = argparse.ArgumentParser(prog = "coolparks",
+                                description = "Run the CoolParks calculations without QGIS")
+    commands = p.add_subparsers(dest = "command", required = True)
+
+    p_prepare = commands.add_parser("prepare", help = "Prepare a scenario (urban morphology and park)")
+    p_prepare.add_argument("--scenario", default = DEFAULT_SCENARIO,
+                           help = "Scenario name for the current urban morphology and park")
+    p_prepare.add_argument("--output", default = TEMPO_DIRECTORY,
+                           help = "Directory to save the outputs")
+    p_prepare.add_argument("--buildings", required = True, help = "Building polygons")
+    p_prepare.add_argument("--height", help = "Building height field (unit: m)")
+    p_prepare.add_argument("--default-height", type = float, default = BUILDING_DEFAULT_HEIGHT,
+                           help = "Default building height (m)")
+    p_prepare.add_argument("--age", help = "Building construction year field")
+    p_prepare.add_argument("--default-age", type = int, default = BUILDING_DEFAULT_AGE,
+                           help = "Default building construction year")
+    p_prepare.add_argument("--wwr", help = "Building windows-to-wall ratio field (unit: %%)")
+    p_prepare.add_argument("--default-wwr", type = float, default = BUILDING_DEFAULT_WINDOWS_WALL_RATIO,
+                           help = "Default building windows-to-wall ratio (%%)")
+    p_prepare.add_argument("--shutter", help = "Building shutter opening field")
+    p_prepare.add_argument("--default-shutter", type = float, default = BUILDING_DEFAULT_SHUTTER,
+                           help = "Default building shutter opening (1 = open)")
+    p_prepare.add_argument("--nat-ventil", help = "Building natural ventilation rate field (unit: vol/h)")
+    p_prepare.add_argument("--default-nat-ventil", type = float, default = BUILDING_DEFAULT_NAT_VENTIL,
+                           help = "Default natural ventilation rate (vol/h)")
+    p_prepare.add_argument("--park-boundaries", required = True, help = "Park boundaries polygon")
+    p_prepare.add_argument("--park-ground", required = True, help = "Park ground cover polygons")
+    p_prepare.add_argument("--ground-type", required = True, help = "Park ground cover type field")
+    p_prepare.add_argument("--park-canopy", required = True, help = "Park canopy cover polygons")
+    p_prepare.add_argument("--canopy-type", required = True, help = "Park canopy cover type field")
+    p_prepare.add_argument("--park-batch", action = "store_true",
+                           help = "Prepare a scenario for each park of the park boundaries")
+    p_prepare.add_argument("--workers", type = int, default = PARK_BATCH_WORKERS,
+                           help = "Number of parks prepared in parallel (with --park-batch)")
+    p_prepare.add_argument("--weather", help = "Weather file used to select the wind directions to prepare")
+    p_prepare.add_argument("--resume", action = "store_true",
+                           help = "Resume an interrupted preparation of the scenario")
+    p_prepare.set_defaults(func = prepare)
+
+    p_calc = commands.add_parser("calc", help = "Calculate the park effects for a weather file")
+    p_calc.add_argument("--scenario-directory", required = True,
+                        help = "Directory of the prepared scenario")
+    p_calc.add_argument("--weather", required = True,
+                        help = "Input meteorological file (Shiny Weather Data .txt or .csv, EnergyPlus .epw or CSV)")
+    p_calc.add_argument("--weather-name", default = DEFAULT_WEATHER,
+                        help = "Weather scenario name")
+    p_calc.set_defaults(func = calc)
+
+    p_compare = commands.add_parser("compare", help = "Compare alternative scenarios with a reference")
+    p_compare.add_argument("--reference", required = True,
+                           help = "Directory of the reference scenario results")
+    p_compare.add_argument("--alternatives", required = True, nargs = "+",
+                           help = "Directories of the alternative scenario results")
+    p_compare.add_argument("--change", required = True, choices = list(LIST_OF_CHANGES),
+                           help = "Type of change between the scenarios")
+    p_compare.add_argument("--output", default = TEMPO_DIRECTORY,
+                           help = "Directory to save the comparisons")
+    p_compare.add_argument("--workers", type = int, default = COMPARISON_WORKERS,
+                           help = "Number of alternatives compared in parallel")
+    p_compare.add_argument("--overwrite", action = "store_true",
+                           help = "Replace existing comparison folders")
+    p_compare.set_defaults(func = compare)
+
+    p_catalog = commands.add_parser("catalog", help = "List the runs of the scenario catalog")
+    p_catalog.add_argument("--catalog", default = CATALOG_FILE, help = "Path of the catalog")
+    p_catalog.add_argument("--kind", choices = ScenarioCatalog.RUN_KINDS, help = "Kind of run")
+    p_catalog.add_argument("--scenario", help = "Scenario name")
+    p_catalog.add_argument("--weather-name", help = "Weather scenario name")
+    p_catalog.add_argument("--prune", action = "store_true",
+                           help = "Remove the runs whose outputs do not exist anymore")
+    p_catalog.set_defaults(func = catalog)
+
+    p_sweep = commands.add_parser("sweep", help = "Run a parameter sweep (JSON configuration)")
+    p_sweep.add_argument("--config", required = True,
+                         help = 'JSON file: {"base": {parameter: value}, "grid": {parameter: [values]}}')
+    p_sweep.add_argument("--output", default = TEMPO_DIRECTORY,
+                         help = "Directory to save the scenarios and the results table")
+    p_sweep.add_argument("--prefix", default = "Sweep", help = "Prefix of the scenario names")
+    p_sweep.add_argument("--workers", type = int, default = SWEEP_WORKERS,
+                         help = "Number of processes running the calculations")
+    p_sweep.set_defaults(func = sweep)
+
+    p_serve = commands.add_parser("serve", help = "Run the local job service used by the QGIS sessions")
+    p_serve.add_argument("--host", default = JOB_SERVICE_HOST, help = "Address of the service")
+    p_serve.add_argument("--port", type = int, default = JOB_SERVICE_PORT, help = "Port of the service")
+    p_serve.add_argument("--workers", type = int, default = JOB_SERVICE_WORKERS,
+                         help = "Number of jobs run at the same time")
+    p_serve.set_defaults(func = serve)
+
+    return p
+
+def main(argv = None):
+    args = parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except QgsProcessingException as e:
+        print(f"Error: {e}", file = sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
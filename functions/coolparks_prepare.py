@@ -4,9 +4,10 @@ from .globalVariables import *
 from . import DataUtil
 from . import loadData
 
-from qgis.core import QgsProcessingException
+from .DataUtil import QgsProcessingException
 
 import string
+from shapely.geometry import Polygon, LineString
 
 def creates_units_of_analysis(cursor, park_boundary_tab, srid,
                                 nCrossWindTot, wind_dir, distance_max):
@@ -87,42 +88,32 @@ def creates_units_of_analysis(cursor, park_boundary_tab, srid,
     nCrossWindOut = nCrossWind * 2
     
     # Creates rectangles and lines along 
-    list_rect = ["""('POLYGON(({0} {1}, {0} {2}, {3} {2}, {3} {1}, {0} {1}))',
-                    {4})
-                 """.format(park_bb_xmin + dx * i - dx * nCrossWindOut / 2,
-                            park_bb_ymin - park_bb_ysize,
-                            park_bb_ymin + 2 * park_bb_ysize,
-                            park_bb_xmin + dx * (i + 1) - dx * nCrossWindOut / 2,
-                            i + 1)
+    list_rect = [(Polygon([(park_bb_xmin + dx * i - dx * nCrossWindOut / 2, 
+                            park_bb_ymin - park_bb_ysize),
+                           (park_bb_xmin + dx * i - dx * nCrossWindOut / 2,
+                            park_bb_ymin + 2 * park_bb_ysize),
+                           (park_bb_xmin + dx * (i + 1) - dx * nCrossWindOut / 2,
+                            park_bb_ymin + 2 * park_bb_ysize),
+                           (park_bb_xmin + dx * (i + 1) - dx * nCrossWindOut / 2,
+                            park_bb_ymin - park_bb_ysize)]),
+                  i + 1)
                      for i in range(0, nCrossWind + nCrossWindOut)]
-    list_lines = ["""('LINESTRING({0} {1}, {0} {2})', {3})
-                 """.format(park_bb_xmin + dx * (i + 0.5) - dx * nCrossWindOut / 2,
-                            park_bb_ymin - park_bb_ysize,
-                            park_bb_ymin + 2 * park_bb_ysize,
-                            i + 1)
+    list_lines = [(LineString([(park_bb_xmin + dx * (i + 0.5) - dx * nCrossWindOut / 2,
+                                park_bb_ymin - park_bb_ysize),
+                               (park_bb_xmin + dx * (i + 0.5) - dx * nCrossWindOut / 2,
+                                park_bb_ymin + 2 * park_bb_ysize)]),
+                   i + 1)
                      for i in range(0, nCrossWind + nCrossWindOut)]
-    cursor.execute(
-        """
-        DROP TABLE IF EXISTS TEMPO, {0};
-        CREATE TABLE TEMPO({1} GEOMETRY, ID INT);
-        INSERT INTO TEMPO VALUES {2};
-        CREATE TABLE {0}
-            AS SELECT ST_SETSRID({1}, {3}) AS {1}, ID
-            FROM TEMPO;
-        DROP TABLE IF EXISTS TEMPO;
-        """.format( rec_ini                 , GEOM_FIELD, 
-                    ", ".join(list_rect)    , srid))
-    cursor.execute(
-        """
-        DROP TABLE IF EXISTS TEMPO, {0};
-        CREATE TABLE TEMPO({1} GEOMETRY, ID INT);
-        INSERT INTO TEMPO VALUES {2};
-        CREATE TABLE {0}
-            AS SELECT ST_SETSRID({1}, {3}) AS {1}, ID
-            FROM TEMPO;
-        DROP TABLE IF EXISTS TEMPO;
-        """.format( line_ini                , GEOM_FIELD, 
-                    ", ".join(list_lines)   , srid))                     
+    loadData.insertRows(cursor = cursor,
+                        tableName = rec_ini,
+                        columns = [(GEOM_FIELD, "GEOMETRY"), ("ID", "INT")],
+                        rows = list_rect,
+                        srid = srid)
+    loadData.insertRows(cursor = cursor,
+                        tableName = line_ini,
+                        columns = [(GEOM_FIELD, "GEOMETRY"), ("ID", "INT")],
+                        rows = list_lines,
+                        srid = srid)
     
     # Calculation of the longest transect within the park
     cursor.execute(
@@ -376,23 +367,17 @@ def creates_units_of_analysis(cursor, park_boundary_tab, srid,
    
                   
     # Creates cross wind lines
-    list_crosswind_lines = ["""('LINESTRING({0} {1}, {2} {1})', {3})
-                 """.format(park_bb_xmin - dx * nCrossWindOut / 2,
-                            park_bb_ymin - park_bb_ysize + i * CROSSWIND_LINE_DIST,
-                            park_bb_xmin + park_bb_xsize + dx * nCrossWindOut / 2,
-                            i + 1)
+    list_crosswind_lines = [(LineString([(park_bb_xmin - dx * nCrossWindOut / 2,
+                                          park_bb_ymin - park_bb_ysize + i * CROSSWIND_LINE_DIST),
+                                         (park_bb_xmin + park_bb_xsize + dx * nCrossWindOut / 2,
+                                          park_bb_ymin - park_bb_ysize + i * CROSSWIND_LINE_DIST)]),
+                             i + 1)
                      for i in range(0, int(3 * park_bb_ysize / CROSSWIND_LINE_DIST))]
-    cursor.execute(
-        """
-        DROP TABLE IF EXISTS TEMPO, {0};
-        CREATE TABLE TEMPO({1} GEOMETRY, ID INT);
-        INSERT INTO TEMPO VALUES {2};
-        CREATE TABLE {0}
-            AS SELECT ST_SETSRID({1}, {3}) AS {1}, ID
-            FROM TEMPO;
-        DROP TABLE IF EXISTS TEMPO;
-        """.format( crosswind_line                      , GEOM_FIELD, 
-                    ", ".join(list_crosswind_lines)     , srid))
+    loadData.insertRows(cursor = cursor,
+                        tableName = crosswind_line,
+                        columns = [(GEOM_FIELD, "GEOMETRY"), ("ID", "INT")],
+                        rows = list_crosswind_lines,
+                        srid = srid)
                   
     # Delete temporary tables if not debug mode              
     if not DEBUG:
@@ -406,11 +391,11 @@ def creates_units_of_analysis(cursor, park_boundary_tab, srid,
     
     return rec_coord_park_upstream, rec_coord_city_upstream, grid, crosswind_line, dx
 
-def loadInputData(cursor, parkBoundaryFilePath, parkGroundFilePath, 
-                  parkCanopyFilePath, buildingFilePath, srid, 
-                  canopy_cover_type, ground_cover_type, build_height,
-                  build_age, build_wwr, build_shutter, build_nat_ventil):
-    """ Load input data and makes some few tests.
+def loadInputData(cursor, parkBoundaryFilePath, buildingFilePath, srid, 
+                  build_height, build_age, build_wwr, build_shutter, 
+                  build_nat_ventil):
+    """ Load park boundary and building input data (the park covers are
+    loaded by 'loadParkCovers').
 
 		Parameters
 		_ _ _ _ _ _ _ _ _ _ 
@@ -419,18 +404,10 @@ def loadInputData(cursor, parkBoundaryFilePath, parkGroundFilePath,
 				A cursor object, used to perform queries        
             parkBoundaryFilePath: String
                 File path for park boundary input data
-            parkGroundFilePath: String
-                File path for park ground input data
-            parkCanopyFilePath: String
-                File path for park canopy input data
             buildingFilePath: String
                 File path for buildings input data
             srid: int
                 EPSG code that will be assigned to each input data
-            canopy_cover_type: string
-                Canopy cover type column name
-            ground_cover_type: string
-                Ground cover type column name
             build_height: string
                 Building height column name
             build_age: string
@@ -445,15 +422,9 @@ def loadInputData(cursor, parkBoundaryFilePath, parkGroundFilePath,
 		Returns
 		_ _ _ _ _ _ _ _ _ _ 
 
-			tempo_park_canopy: String
-				Name of the park canopy temporary table
-			tempo_park_ground: String
-				Name of the park ground temporary table
 			tempo_build: String
 				Name of the bulding temporary table"""    
     # Temporary tables (and prefix for temporary tables)
-    tempo_park_canopy = DataUtil.postfix("TEMPO_PARK_CANOPY")
-    tempo_park_ground = DataUtil.postfix("TEMPO_PARK_GROUND")
     tempo_build = DataUtil.postfix("TEMPO_BUILD")
     
     # Load files in the H2GIS database
@@ -474,6 +445,50 @@ def loadInputData(cursor, parkBoundaryFilePath, parkGroundFilePath,
                       srid = srid, 
                       srid_repro = None)
     
+    # Alter column names
+    renameColumns(cursor = cursor,
+                  dict_cols = {tempo_build: {build_height: HEIGHT_FIELD,
+                                             build_age: BUILDING_AGE,
+                                             build_wwr: BUILDING_WWR,
+                                             build_shutter: BUILDING_SHUTTER,
+                                             build_nat_ventil: BUILDING_NATURAL_VENT_RATE}})
+    
+    return tempo_build
+
+
+def loadParkCovers(cursor, parkGroundFilePath, parkCanopyFilePath, srid,
+                   canopy_cover_type, ground_cover_type):
+    """ Load park ground and canopy input data (only used to calculate the
+    park cover fractions, thus loaded once the building indicators are
+    calculated).
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _ 
+
+			cursor: conn.cursor
+				A cursor object, used to perform queries        
+            parkGroundFilePath: String
+                File path for park ground input data
+            parkCanopyFilePath: String
+                File path for park canopy input data
+            srid: int
+                EPSG code that will be assigned to each input data
+            canopy_cover_type: string
+                Canopy cover type column name
+            ground_cover_type: string
+                Ground cover type column name
+        
+		Returns
+		_ _ _ _ _ _ _ _ _ _ 
+
+			tempo_park_canopy: String
+				Name of the park canopy temporary table
+			tempo_park_ground: String
+				Name of the park ground temporary table"""
+    # Temporary tables (and prefix for temporary tables)
+    tempo_park_canopy = DataUtil.postfix("TEMPO_PARK_CANOPY")
+    tempo_park_ground = DataUtil.postfix("TEMPO_PARK_GROUND")
+    
     loadData.loadFile(cursor = cursor, 
                       filePath = parkCanopyFilePath, 
                       tableName = "TEMPO_PARK_CANOPY", 
@@ -487,13 +502,29 @@ def loadInputData(cursor, parkBoundaryFilePath, parkGroundFilePath,
                       srid_repro = None)
     
     # Alter column names
-    dict_cols = {"TEMPO_PARK_CANOPY": {canopy_cover_type: TYPE},
-                 "TEMPO_PARK_GROUND": {ground_cover_type: TYPE},
-                 tempo_build: {build_height: HEIGHT_FIELD,
-                               build_age: BUILDING_AGE,
-                               build_wwr: BUILDING_WWR,
-                               build_shutter: BUILDING_SHUTTER,
-                               build_nat_ventil: BUILDING_NATURAL_VENT_RATE}}
+    renameColumns(cursor = cursor,
+                  dict_cols = {"TEMPO_PARK_CANOPY": {canopy_cover_type: TYPE},
+                               "TEMPO_PARK_GROUND": {ground_cover_type: TYPE}})
+    
+    return tempo_park_canopy, tempo_park_ground
+
+
+def renameColumns(cursor, dict_cols):
+    """ Rename the columns of loaded tables (columns without name are skipped).
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _ 
+
+			cursor: conn.cursor
+				A cursor object, used to perform queries
+            dict_cols: dictionary
+                Table names as keys and dictionaries of the old column
+                names (keys) and new column names (values) as values
+        
+		Returns
+		_ _ _ _ _ _ _ _ _ _ 
+
+            None"""
     for t in dict_cols.keys():
         for old_col, new_col in dict_cols[t].items():
             if old_col:
@@ -501,17 +532,11 @@ def loadInputData(cursor, parkBoundaryFilePath, parkGroundFilePath,
                     f"""
                     ALTER TABLE {t} RENAME COLUMN {old_col} TO {new_col};
                     """)
-    
-    return tempo_park_canopy, tempo_park_ground, tempo_build
 
 
-def modifyInputData(cursor, tempo_park_canopy, tempo_park_ground, tempo_build,
-                    build_height, build_age, build_wwr, build_shutter, build_nat_ventil,
-                    default_build_height, default_build_age, 
-                    default_build_wwr, default_build_shutter,
-                    default_build_nat_ventil):
-    """ Modify or fill input data (buildings as well as park ground and canopy layers)
-    to have all needed data for the next steps.
+def modifyParkCovers(cursor, tempo_park_canopy, tempo_park_ground):
+    """ Explode the park ground and canopy layers, clip them to the park
+    boundaries and replace their string types by numbers.
 
 		Parameters
 		_ _ _ _ _ _ _ _ _ _ 
@@ -522,35 +547,11 @@ def modifyInputData(cursor, tempo_park_canopy, tempo_park_ground, tempo_build,
 				Name of the park canopy temporary table
 			tempo_park_ground: String
 				Name of the park ground temporary table
-			tempo_build: String
-				Name of the bulding temporary table
-            build_height: String
-                Name of the building height field
-            build_age: String
-                Name of the building age field
-            build_wwr: String
-                Name of the building windows-to-wall ratio field
-            build_shutter: String
-                Name of the building shutter opening field
-            build_nat_ventil: String
-                Name of the building natural ventilation rate field
-            default_build_height: int
-                Default building height value
-            default_build_age: int
-                Default building age (construction year)
-            default_build_wwr: float
-                Default building windows-to-wall ratio
-            default_build_shutter: float
-                Default building shutter opening
-            default_build_nat_ventil: float
-                Default building natural ventilation rate (vol/h)
-            
         
 		Returns
 		_ _ _ _ _ _ _ _ _ _ 
 
-            distance_max: float
-                Maximum distance where the park can have an impact outside its boundaries"""    
+            None"""
     # Explode the potential multipolygons in canopy and ground park data and replace string types by numbers
     sql_ctype_conv = ["WHEN {0} = ''{1}'' THEN {2} ".format(TYPE,
                                                             S_CANOPY[i],
@@ -602,26 +603,68 @@ def modifyInputData(cursor, tempo_park_canopy, tempo_park_ground, tempo_build,
                     TYPE                    , " ".join(sql_gtype_conv),
                     PARK_BOUNDARIES_TAB))
     
+    # Delete temporary tables if not debug mode              
+    if not DEBUG:
+        cursor.execute("DROP TABLE IF EXISTS TEMPO_PARK_CANOPY_1, TEMPO_PARK_GROUND_1")
+
+
+def modifyInputData(cursor, tempo_build, build_height, build_age, build_wwr,
+                    build_shutter, build_nat_ventil, default_build_height,
+                    default_build_age, default_build_wwr, 
+                    default_build_shutter, default_build_nat_ventil):
+    """ Modify or fill building input data to have all needed data for 
+    the next steps (the park covers are modified by 'modifyParkCovers').
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _ 
+
+			cursor: conn.cursor
+				A cursor object, used to perform queries
+			tempo_build: String
+				Name of the bulding temporary table
+            build_height: String
+                Name of the building height field
+            build_age: String
+                Name of the building age field
+            build_wwr: String
+                Name of the building windows-to-wall ratio field
+            build_shutter: String
+                Name of the building shutter opening field
+            build_nat_ventil: String
+                Name of the building natural ventilation rate field
+            default_build_height: int
+                Default building height value
+            default_build_age: int
+                Default building age (construction year)
+            default_build_wwr: float
+                Default building windows-to-wall ratio
+            default_build_shutter: float
+                Default building shutter opening
+            default_build_nat_ventil: float
+                Default building natural ventilation rate (vol/h)
+            
+        
+		Returns
+		_ _ _ _ _ _ _ _ _ _ 
+
+            distance_max: float
+                Maximum distance where the park can have an impact outside its boundaries"""    
     # Filter only buildings which are at a given distance from park boundaries
-    # AND filter out small buildings
-    cursor.execute(
-        f"""
-        SELECT SQRT(POWER(ST_XMAX({GEOM_FIELD})-ST_XMIN({GEOM_FIELD}),2)
-                    +POWER(ST_YMAX({GEOM_FIELD})-ST_YMIN({GEOM_FIELD}),2))
-        FROM {PARK_BOUNDARIES_TAB}
-        """)
-    distance_max = cursor.fetchall()[0][0]
-    distance_max = max(distance_max, MIN_PARK_BUFFER_DIST)
+    # AND filter out small buildings (a building close to several parks is kept once)
+    distance_max = calc_distance_max(cursor = cursor,
+                                     park_boundaries = PARK_BOUNDARIES_TAB)
     cursor.execute(
         f"""
         DROP TABLE IF EXISTS TEMPO_BUILDING_1;
         CREATE TABLE TEMPO_BUILDING_1
             AS SELECT a.*
-            FROM {tempo_build} AS a, {PARK_BOUNDARIES_TAB} AS b
-            WHERE ST_DWITHIN(a.{GEOM_FIELD}, 
-                             b.{GEOM_FIELD},
-                             {distance_max})
-                 AND ST_AREA(a.{GEOM_FIELD}) > {BUILDING_MINIMUM_SIZE}
+            FROM {tempo_build} AS a
+            WHERE ST_AREA(a.{GEOM_FIELD}) > {BUILDING_MINIMUM_SIZE}
+                AND EXISTS (SELECT 1 
+                            FROM {PARK_BOUNDARIES_TAB} AS b
+                            WHERE ST_DWITHIN(a.{GEOM_FIELD}, 
+                                             b.{GEOM_FIELD},
+                                             {distance_max}))
         """)
     
     # Fill missing building info with default values
@@ -692,56 +735,72 @@ def modifyInputData(cursor, tempo_park_canopy, tempo_park_ground, tempo_build,
         """)
     
     
-    # Create and fill building age class and all building characteristics
-    sql_properties = {}
+    # Store the building characteristics of each building size class and
+    # construction period in a lookup table
     properties = list(BUILDING_PROPERTIES[list(BUILDING_PROPERTIES.keys())[0]].columns)
     properties.remove("Name")
     properties.remove("period_start")
     properties.remove("period_end")
-        
-    for prop in properties:
-        sql_properties[prop] = f"""CAST(CASE  """
-        for buildt in BUILDING_SIZE_CLASSES.index:
-            sql_properties[prop] += f"""WHEN {BUILD_SIZE_CLASS} = {buildt}
-                                        THEN CASE""" 
-            for period in BUILDING_PROPERTIES[buildt].index:
-                sql_properties[prop] += f""" WHEN {BUILDING_AGE} >= {BUILDING_PROPERTIES[buildt].loc[period, "period_start"]} AND {BUILDING_AGE} < {BUILDING_PROPERTIES[buildt].loc[period, "period_end"]}
-                                             THEN {BUILDING_PROPERTIES[buildt].loc[period, prop]}"""
-            sql_properties[prop] +=" END "
-        sql_properties[prop] += f""" END AS DOUBLE) AS {prop}"""
+    loadData.insertRows(cursor = cursor,
+                        tableName = BUILDING_PROPERTIES_TAB,
+                        columns = [(BUILD_SIZE_CLASS, "INTEGER"),
+                                   ("PERIOD_START", "INTEGER"),
+                                   ("PERIOD_END", "INTEGER")]\
+                                + [(prop, "DOUBLE") for prop in properties],
+                        rows = [tuple([buildt,
+                                       BUILDING_PROPERTIES[buildt].loc[period, "period_start"],
+                                       BUILDING_PROPERTIES[buildt].loc[period, "period_end"]]
+                                      + [float(BUILDING_PROPERTIES[buildt].loc[period, prop])
+                                         for prop in properties])
+                                    for buildt in BUILDING_SIZE_CLASSES.index
+                                        for period in BUILDING_PROPERTIES[buildt].index])
+    cursor.execute(
+        f"""
+        CREATE INDEX IF NOT EXISTS id_class_period_{BUILDING_PROPERTIES_TAB} 
+            ON {BUILDING_PROPERTIES_TAB}({BUILD_SIZE_CLASS}, PERIOD_START)
+        """)
+    
+    # Fill all building characteristics according to building size class and age
     cursor.execute(
         f"""
         DROP TABLE IF EXISTS {BUILDINGS_TAB};
         CREATE TABLE {BUILDINGS_TAB}
-            AS SELECT   {ID_FIELD_BUILD},
-                        {GEOM_FIELD},
-                        {HEIGHT_FIELD},
-                        {BUILDING_WWR},
-                        {BUILDING_SHUTTER},
-                        {BUILDING_NATURAL_VENT_RATE},
-                        {BUILD_SIZE_CLASS},
-                        {", ".join(sql_properties.values())}
-            FROM TEMPO_BUILDING_3
+            AS SELECT   a.{ID_FIELD_BUILD},
+                        a.{GEOM_FIELD},
+                        a.{HEIGHT_FIELD},
+                        a.{BUILDING_WWR},
+                        a.{BUILDING_SHUTTER},
+                        a.{BUILDING_NATURAL_VENT_RATE},
+                        a.{BUILD_SIZE_CLASS},
+                        {", ".join([f"b.{prop}" for prop in properties])}
+            FROM TEMPO_BUILDING_3 AS a LEFT JOIN {BUILDING_PROPERTIES_TAB} AS b
+            ON a.{BUILD_SIZE_CLASS} = b.{BUILD_SIZE_CLASS}
+                AND a.{BUILDING_AGE} >= b.PERIOD_START
+                AND a.{BUILDING_AGE} < b.PERIOD_END
         """)    
     
     # Delete temporary tables if not debug mode              
     if not DEBUG:
         cursor.execute(
-            """
-            DROP TABLE IF EXISTS TEMPO_PARK_CANOPY_1, TEMPO_PARK_GROUND_1,
-            TEMPO_BUILDING_1, TEMPO_BUILDING_2, TEMPO_BUILDING_3;
+            f"""
+            DROP TABLE IF EXISTS TEMPO_BUILDING_1, TEMPO_BUILDING_2, TEMPO_BUILDING_3, 
+            {BUILDING_PROPERTIES_TAB};
             """)
             
     return distance_max
     
-def testInputData(cursor):
-    """ Test that the loaded input data are OK (after filling with missing values).
+def testInputData(cursor, singlePark = True):
+    """ Test that the loaded park boundaries are OK (the park covers are 
+    tested by 'testParkCovers').
 
 		Parameters
 		_ _ _ _ _ _ _ _ _ _ 
 
 			cursor: conn.cursor
 				A cursor object, used to perform queries
+            singlePark: boolean, default True
+                Whether or not exactly one park is expected in the park 
+                boundaries (several parks are allowed in batch mode)
         
 		Returns
 		_ _ _ _ _ _ _ _ _ _ 
@@ -753,42 +812,82 @@ def testInputData(cursor):
         SELECT COUNT(*) FROM {0}
         """.format(PARK_BOUNDARIES_TAB))
     nparks = cursor.fetchall()[0][0]
-    if nparks!=1:
+    if singlePark and nparks!=1:
         raise QgsProcessingException(f"""Verify your input data, there is {nparks} 
                                      parks in your park_boundaries
                                      input data whereas exactly one is needed !
                                      """)
-    
-    # Test that there is only limited surface superimposition of two ground types or canopy types
-    cursor.execute(
-        """
-        SELECT ST_AREA(ST_ACCUM({0}))/ST_AREA(ST_UNION(ST_ACCUM({0})))-1 AS F
-        FROM {1};
-        """.format(GEOM_FIELD                   , PARK_CANOPY))
-    canopy_duplic = cursor.fetchall()[0][0]
+    elif nparks < 1:
+        raise QgsProcessingException("""Verify your input data, there is no 
+                                     park in your park_boundaries input data !
+                                     """)
+
+
+def testParkCovers(cursor):
+    """ Test that the loaded park covers are OK (after filling with missing 
+    values): limited superimposition and ground covering each park.
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _ 
+
+			cursor: conn.cursor
+				A cursor object, used to perform queries
+        
+		Returns
+		_ _ _ _ _ _ _ _ _ _ 
+
+            None"""
     cursor.execute(
         """
-        SELECT ST_AREA(ST_ACCUM({0}))/ST_AREA(ST_UNION(ST_ACCUM({0})))-1 AS F
-        FROM {1};
-        """.format(GEOM_FIELD                   , PARK_GROUND))
-    ground_duplic = cursor.fetchall()[0][0]
+        SELECT COUNT(*) FROM {0}
+        """.format(PARK_BOUNDARIES_TAB))
+    nparks = cursor.fetchall()[0][0]
+    
+    # Test that there is only limited surface superimposition of two ground types or canopy types
+    canopy_duplic, _, canopy_ids = calc_superimposition(cursor = cursor,
+                                                        tableName = PARK_CANOPY)
+    ground_duplic, _, ground_ids = calc_superimposition(cursor = cursor,
+                                                        tableName = PARK_GROUND)
     if canopy_duplic > SUPERIMP_THRESH or ground_duplic > SUPERIMP_THRESH:
         raise QgsProcessingException(f"""Verify your input data, there is about 
                                      {str(int(canopy_duplic*100))} % superimposition in
                                      the canopy layer and {str(int(ground_duplic*100))} %
-                                     in the ground layer
+                                     in the ground layer (superimposed canopy polygons: 
+                                     {canopy_ids[:20]}, superimposed ground polygons: 
+                                     {ground_ids[:20]})
                                      """)
     
-    # Test that the park ground covers almost entirely the park
+    # Test that the park ground covers almost entirely each park (the ground
+    # polygons are unioned within each park so that their superimpositions
+    # are counted once)
+    tempo_parks = DataUtil.postfix("TEMPO_PARK_COVER")
+    cursor.execute(
+        """
+        DROP TABLE IF EXISTS {1};
+        CREATE TABLE {1}
+            AS SELECT ROWNUM() AS {2}, {0}
+            FROM {3};
+        {4};
+        """.format( GEOM_FIELD              , tempo_parks,
+                    PARK_ID_FIELD           , PARK_BOUNDARIES_TAB,
+                    DataUtil.createIndex(tableName=tempo_parks, 
+                                         fieldName=GEOM_FIELD,
+                                         isSpatial=True)))
     cursor.execute(
         """
         SELECT ST_AREA(ST_UNION(ST_ACCUM(ST_INTERSECTION(a.{0}, b.{0}))))/ST_AREA(b.{0})
         FROM {1} AS a, {2} AS b
         WHERE a.{0} && b.{0} AND ST_INTERSECTS(a.{0}, b.{0})
-        GROUP BY b.{0};
+        GROUP BY b.{3}, b.{0};
         """.format( GEOM_FIELD           , PARK_GROUND,
-                    PARK_BOUNDARIES_TAB))
-    ground_to_park_ratio = cursor.fetchall()[0][0]
+                    tempo_parks          , PARK_ID_FIELD))
+    ground_to_park_ratios = [row[0] for row in cursor.fetchall()]
+    cursor.execute(f"DROP TABLE IF EXISTS {tempo_parks}")
+    # A park not intersecting any ground polygon is not covered at all
+    if len(ground_to_park_ratios) < nparks:
+        ground_to_park_ratios.append(0)
+    # The least covered park is tested when there are several parks
+    ground_to_park_ratio = min(ground_to_park_ratios)
     if ground_to_park_ratio < GROUND_TO_PARK_RATIO:
         raise QgsProcessingException(f"""Verify your input data, there is 
                                      only {str(int(ground_to_park_ratio*100))} % 
@@ -798,42 +897,113 @@ def testInputData(cursor):
                                       """)    
     
 
-def calc_park_fractions(cursor, rect_park, ground_cover, canopy_cover, wind_dir):            
-    """ Calculates for each park corridor in a given direction the park
-    fraction of each combination of ground / canopy covers
+def calc_superimposition(cursor, tableName, threshold = SUPERIMP_THRESH,
+                         batchSize = SUPERIMP_BATCH_SIZE):
+    """ Calculates the superimposition rate of the polygons of a layer
+    (sum of the intersection areas of each pair of polygons divided by the 
+    sum of the polygon areas, thus the rate keeps increasing when a spot 
+    is covered by three or more polygons). Polygons 
+    are tested by batch and the calculation stops as soon as the
+    superimposition rate exceeds the threshold
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _ 
+
+			cursor: conn.cursor
+				A cursor object, used to perform queries
+            tableName: String
+                Name of the table containing the polygons (and an 'ID' field)
+            threshold: float, default SUPERIMP_THRESH
+                Superimposition rate above which the calculation stops
+            batchSize: int, default SUPERIMP_BATCH_SIZE
+                Number of polygons tested at once
+        
+		Returns
+		_ _ _ _ _ _ _ _ _ _ 
+
+            superimp_rate: float
+                Superimposition rate (only a lower bound when above 'threshold')
+            overlap_area: float
+                Area of the superimpositions (m²)
+            superimp_ids: list
+                IDs of the polygons superimposed to an other one"""
+    cursor.execute(
+        """
+        {0};{1};
+        """.format( DataUtil.createIndex(tableName=tableName, 
+                                         fieldName=GEOM_FIELD,
+                                         isSpatial=True),
+                    DataUtil.createIndex(tableName=tableName, 
+                                         fieldName="ID",
+                                         isSpatial=False)))
+    cursor.execute(
+        """
+        SELECT SUM(ST_AREA({0})), MIN(ID), MAX(ID) FROM {1};
+        """.format(GEOM_FIELD, tableName))
+    total_area, id_min, id_max = cursor.fetchall()[0]
+    
+    superimp_rate = 0
+    overlap_area = 0
+    superimp_ids = set()
+    if not total_area:
+        return superimp_rate, overlap_area, []
+    
+    for id_start in range(id_min, id_max + 1, batchSize):
+        # Only pairs where the first polygon belongs to the current batch
+        cursor.execute(
+            """
+            SELECT ID_A, ID_B, AREA
+            FROM (SELECT    a.ID AS ID_A,
+                            b.ID AS ID_B,
+                            ST_AREA(ST_INTERSECTION(a.{0}, b.{0})) AS AREA
+                  FROM {1} AS a, {1} AS b
+                  WHERE     a.ID >= {2} AND a.ID < {3}
+                            AND a.{0} && b.{0} AND a.ID < b.ID
+                            AND ST_INTERSECTS(a.{0}, b.{0}))
+            WHERE AREA > 0
+            """.format( GEOM_FIELD          , tableName,
+                        id_start            , id_start + batchSize))
+        for id_a, id_b, area in cursor.fetchall():
+            overlap_area += area
+            superimp_ids.update((id_a, id_b))
+        
+        superimp_rate = overlap_area / total_area
+        if superimp_rate > threshold:
+            break
+    
+    return superimp_rate, overlap_area, sorted(superimp_ids)
+
+
+def calc_park_cover_combination(cursor, ground_cover, canopy_cover):            
+    """ Combines the park ground and canopy covers into a single layer 
+    containing each combination of ground / canopy cover types (non existing
+    combinations being replaced). The combinations do not depend on wind
+    direction thus this layer is calculated once for all directions
 
 		Parameters
 		_ _ _ _ _ _ _ _ _ _ 
 
 			cursor: conn.cursor
 				A cursor object, used to perform queries        
-            rect_park: String
-                Table name where park boundaries are saved
             ground_cover: String
                 Table name where park ground cover types are saved
             canopy_cover: String
                 Table name where park canopy cover types are saved
-            wind_dir: float
-                wind direction (clock-wise, ° from North)
         
 		Returns
 		_ _ _ _ _ _ _ _ _ _ 
 
-            rect_park_frac: String
-                Name of the table where are saved park corridors with corresponding
-                cover fractions"""             
+            cover_combination: String
+                Name of the table where are saved the polygons of each
+                ground / canopy combination (with a spatial index)"""             
     
     # Temporary tables (and prefix for temporary tables)
     cover_combin = DataUtil.postfix("COVER_COMBINATION")
     cover_combin_poly = DataUtil.postfix("COVER_COMBINATION_POLY")
     cover_combin_plus_ground = DataUtil.postfix("COVER_COMBINATION_PLUS_GROUND")
-    cover_combin_plus_ground_repl = DataUtil.postfix("COVER_COMBINATION_PLUS_GROUND_REPL")
-    rect_park_frac_buf = DataUtil.postfix("RECT_PARK_FRAC_BUF")
-    rect_park_frac_buf2 = DataUtil.postfix("RECT_PARK_FRAC_BUF2")
-    
-    # Output table names
-    rect_park_frac = DataUtil.postfix("RECT_PARK_FRAC", str(wind_dir).replace(".", "_"))
     
+    # Output table name
+    cover_combination = PARK_COVER_COMBI
     
     # Combine ground and canopy layers
     cursor.execute(
@@ -925,12 +1095,56 @@ def calc_park_fractions(cursor, rect_park, ground_cover, canopy_cover, wind_dir)
         """.format( DataUtil.createIndex(tableName=cover_combin_plus_ground, 
                                          fieldName=TYPE,
                                          isSpatial=False),
-                    cover_combin_plus_ground_repl,
+                    cover_combination,
                     GEOM_FIELD,
                     " ".join(combi_replace_sql),
                     TYPE,
                     cover_combin_plus_ground))
+    cursor.execute(DataUtil.createIndex(tableName=cover_combination, 
+                                        fieldName=GEOM_FIELD,
+                                        isSpatial=True))
+
+    # Delete temporary tables if not debug mode              
+    if not DEBUG:
+        cursor.execute(
+            """
+            DROP TABLE IF EXISTS {0}, {1}, {2};
+            """.format( cover_combin                , cover_combin_poly,
+                        cover_combin_plus_ground))
+                    
+    return cover_combination
+
+
+def calc_park_fractions(cursor, rect_park, cover_combination, wind_dir):            
+    """ Calculates for each park corridor in a given direction the park
+    fraction of each combination of ground / canopy covers
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _ 
+
+			cursor: conn.cursor
+				A cursor object, used to perform queries        
+            rect_park: String
+                Table name where park boundaries are saved
+            cover_combination: String
+                Table name where park ground / canopy cover combinations are saved
+                (rotated in the same way as the corridors)
+            wind_dir: float
+                wind direction (clock-wise, ° from North)
+        
+		Returns
+		_ _ _ _ _ _ _ _ _ _ 
+
+            rect_park_frac: String
+                Name of the table where are saved park corridors with corresponding
+                cover fractions"""             
     
+    # Temporary tables (and prefix for temporary tables)
+    rect_park_frac_buf = DataUtil.postfix("RECT_PARK_FRAC_BUF")
+    rect_park_frac_buf2 = DataUtil.postfix("RECT_PARK_FRAC_BUF2")
+    
+    # Output table names
+    rect_park_frac = DataUtil.postfix("RECT_PARK_FRAC", str(wind_dir).replace(".", "_"))
     
     # Calculate fraction of each combination for each corridor
     cursor.execute(
@@ -949,14 +1163,14 @@ def calc_park_fractions(cursor, rect_park, ground_cover, canopy_cover, wind_dir)
         """.format( DataUtil.createIndex(tableName=rect_park, 
                                          fieldName=GEOM_FIELD,
                                          isSpatial=True),
-                    DataUtil.createIndex(tableName=cover_combin_plus_ground_repl, 
+                    DataUtil.createIndex(tableName=cover_combination, 
                                          fieldName=GEOM_FIELD,
                                          isSpatial=True),
                     rect_park_frac_buf,
                     GEOM_FIELD,
                     TYPE,
                     rect_park,
-                    cover_combin_plus_ground_repl,
+                    cover_combination,
                     ID_UPSTREAM,
                     DataUtil.createIndex(tableName=rect_park, 
                                          fieldName="ID",
@@ -964,7 +1178,7 @@ def calc_park_fractions(cursor, rect_park, ground_cover, canopy_cover, wind_dir)
                     DataUtil.createIndex(tableName=rect_park, 
                                          fieldName=ID_UPSTREAM,
                                          isSpatial=False),
-                    DataUtil.createIndex(tableName=cover_combin_plus_ground_repl, 
+                    DataUtil.createIndex(tableName=cover_combination, 
                                          fieldName=TYPE,
                                          isSpatial=False)))
         
@@ -1045,10 +1259,8 @@ def calc_park_fractions(cursor, rect_park, ground_cover, canopy_cover, wind_dir)
     if not DEBUG:
         cursor.execute(
             """
-            DROP TABLE IF EXISTS {0}, {1}, {2}, {3}, {4}, {5};
-            """.format( cover_combin                , cover_combin_poly,
-                        cover_combin_plus_ground    , cover_combin_plus_ground_repl,
-                        rect_park_frac_buf          , rect_park_frac_buf2))              
+            DROP TABLE IF EXISTS {0}, {1};
+            """.format( rect_park_frac_buf          , rect_park_frac_buf2))              
                     
     return rect_park_frac
 
@@ -1081,17 +1293,61 @@ def createsBlocks(cursor, inputBuildings, snappingTolerance = GEOMETRY_MERGE_TOL
     blockTable = DataUtil.prefix("block_table", prefix = "")
     buildingTable = DataUtil.prefix("building_table", prefix = "")
 
-    # Creates the block (a method based on network - such as H2network
-    # would be much more efficient)
+    # Temporary tables
+    buffBuild = DataUtil.postfix("BUFFERED_BUILDINGS")
+    buildCluster = DataUtil.postfix("BUILDING_CLUSTERS")
+    blockIni = DataUtil.postfix("BLOCK_INI")
+
+    # Buffers the buildings to merge the ones closer than the tolerance
     cursor.execute("""
        DROP TABLE IF EXISTS {0}; 
        CREATE TABLE {0} 
-            AS SELECT EXPLOD_ID AS {1}, ST_MAKEVALID(ST_SIMPLIFY(ST_NORMALIZE({2}), {5})) AS {2} 
-            FROM ST_EXPLODE ('(SELECT ST_UNION(ST_ACCUM(ST_BUFFER({2},{3},''join=mitre'')))
-                             AS {2} FROM {4})');
-            """.format(blockTable           , ID_FIELD_BLOCK,
+            AS SELECT {1}, ST_BUFFER({2},{3},'join=mitre') AS {2}
+            FROM {4};
+       {5};
+            """.format(buffBuild            , ID_FIELD_BUILD,
                         GEOM_FIELD          , snappingTolerance,
-                        inputBuildings      , GEOMETRY_SIMPLIFICATION_DISTANCE))
+                        inputBuildings      , DataUtil.createIndex(tableName=buffBuild, 
+                                                                   fieldName=GEOM_FIELD,
+                                                                   isSpatial=True)))
+    
+    # Identifies pairs of buildings touching each other (using the spatial index)
+    cursor.execute("""
+       SELECT a.{0}, b.{0}
+       FROM {1} AS a, {1} AS b
+       WHERE    a.{2} && b.{2} AND a.{0} < b.{0}
+                AND ST_INTERSECTS(a.{2}, b.{2})
+            """.format(ID_FIELD_BUILD       , buffBuild,
+                        GEOM_FIELD))
+    # Group buildings in clusters (connected components of touching buildings)
+    clusters = DataUtil.connectedComponents(cursor.fetchall())
+    loadData.insertRows(cursor = cursor,
+                        tableName = buildCluster,
+                        columns = [(ID_FIELD_BUILD, "INT"), ("ID_CLUSTER", "INT")],
+                        rows = clusters.items())
+    
+    # Union the buildings of each cluster independently (isolated buildings 
+    # are their own cluster) and creates the blocks
+    cursor.execute("""
+       {6};
+       DROP TABLE IF EXISTS {0}, {1}; 
+       CREATE TABLE {0}
+            AS SELECT   COALESCE(b.ID_CLUSTER, a.{2}) AS ID_CLUSTER,
+                        ST_UNION(ST_ACCUM(a.{3})) AS {3}
+            FROM {4} AS a LEFT JOIN {5} AS b
+            ON a.{2} = b.{2}
+            GROUP BY COALESCE(b.ID_CLUSTER, a.{2});
+       CREATE TABLE {1} 
+            AS SELECT   ROW_NUMBER() OVER (ORDER BY ID_CLUSTER, EXPLOD_ID) AS {7}, 
+                        ST_MAKEVALID(ST_SIMPLIFY(ST_NORMALIZE({3}), {8})) AS {3} 
+            FROM ST_EXPLODE ('{0}');
+            """.format(blockIni             , blockTable,
+                        ID_FIELD_BUILD      , GEOM_FIELD,
+                        buffBuild           , buildCluster,
+                        DataUtil.createIndex(tableName=buildCluster, 
+                                             fieldName=ID_FIELD_BUILD,
+                                             isSpatial=False),
+                        ID_FIELD_BLOCK      , GEOMETRY_SIMPLIFICATION_DISTANCE))
 
     # Identify building/block relations and convert building height to integer
     build_cols = DataUtil.getColumns(cursor = cursor,
@@ -1116,6 +1372,11 @@ def createsBlocks(cursor, inputBuildings, snappingTolerance = GEOMETRY_MERGE_TOL
                     DataUtil.createIndex(tableName=blockTable, 
                                          fieldName=GEOM_FIELD,
                                          isSpatial=True)))
+    
+    # Delete temporary tables if not debug mode              
+    if not DEBUG:
+        cursor.execute("""DROP TABLE IF EXISTS {0}, {1}, {2}
+                       """.format(buffBuild, buildCluster, blockIni))
                     
     return buildingTable, blockTable
 
@@ -1133,7 +1394,9 @@ def calc_rect_block_indic(cursor, blocks, rect_city, wind_dir):
             rect_city: String
                 Name of the table where urban corridors around the park are saved
             wind_dir: float
-                wind direction (clock-wise, ° from North)
+                wind direction (clock-wise, ° from North). If None, the input
+                tables gather all wind directions (WIND_DIR column) and the 
+                indicators are calculated for all directions at once
         
             
 		Returns
@@ -1146,7 +1409,7 @@ def calc_rect_block_indic(cursor, blocks, rect_city, wind_dir):
     correl_rect_blocks = DataUtil.postfix("CORREL_RECT_BLOCKS")
     
     # Output table names
-    rectIndicBlock = DataUtil.postfix("CITY_INDIC_BLOCKS", str(wind_dir).replace(".", "_"))
+    rectIndicBlock = DataUtil.postfix("CITY_INDIC_BLOCKS", DataUtil.directionSuffix(wind_dir))
 
     # Calculates the intersections between blocks and city "rectangles"
     cursor.execute(
@@ -1154,14 +1417,14 @@ def calc_rect_block_indic(cursor, blocks, rect_city, wind_dir):
         {0};{1};
         DROP TABLE IF EXISTS {2};
         CREATE TABLE {2}
-            AS SELECT   a.{3},
+            AS SELECT   {9}a.{3},
                         a.{8},
                         b.{4},
                         a.{5},
                         ST_AREA(ST_INTERSECTION(a.{5}, b.{5})) AS AREA_BLOCK_INTER,
                         ST_AREA(b.{5}) AS AREA_BLOCK_TOT
             FROM {6} AS a, {7} AS b
-            WHERE a.{5} && b.{5} AND ST_INTERSECTS(a.{5}, b.{5})
+            WHERE a.{5} && b.{5} AND ST_INTERSECTS(a.{5}, b.{5}){10}
         """.format( DataUtil.createIndex(tableName=blocks, 
                                          fieldName=GEOM_FIELD,
                                          isSpatial=True),
@@ -1171,7 +1434,8 @@ def calc_rect_block_indic(cursor, blocks, rect_city, wind_dir):
                     correl_rect_blocks          , "ID",
                     ID_FIELD_BLOCK              , GEOM_FIELD,
                     rect_city                   , blocks,
-                    ID_UPSTREAM))
+                    ID_UPSTREAM                 , DataUtil.directionKey(wind_dir, "a"),
+                    DataUtil.directionJoin(wind_dir)))
 
     # Calculates the indicators
     cursor.execute(
@@ -1179,14 +1443,14 @@ def calc_rect_block_indic(cursor, blocks, rect_city, wind_dir):
         {0};{7};{10};{11};
         DROP TABLE IF EXISTS {1};
         CREATE TABLE {1}
-            AS SELECT   b.{2}, 
+            AS SELECT   {12}b.{2}, 
                         b.{8},
                         b.{3},
                         COALESCE(SUM(a.AREA_BLOCK_INTER/a.AREA_BLOCK_TOT)/ST_AREA(a.{3}), 0) AS {4},
                         COALESCE(SUM(a.AREA_BLOCK_INTER)/ST_AREA(a.{3}), 0) AS {5}
             FROM {6} AS a RIGHT JOIN {9} AS b
-            ON a.{2} = b.{2} AND a.{8} = b.{8}
-            GROUP BY b.{2}, b.{8}
+            ON a.{2} = b.{2} AND a.{8} = b.{8}{13}
+            GROUP BY {12}b.{2}, b.{8}
         """.format( DataUtil.createIndex(tableName=correl_rect_blocks, 
                                          fieldName="ID",
                                          isSpatial=False),
@@ -1202,7 +1466,9 @@ def calc_rect_block_indic(cursor, blocks, rect_city, wind_dir):
                                          isSpatial=False),
                     DataUtil.createIndex(tableName=rect_city, 
                                          fieldName="ID",
-                                         isSpatial=False)))
+                                         isSpatial=False),
+                    DataUtil.directionKey(wind_dir, "b"),
+                    DataUtil.directionJoin(wind_dir)))
     
     # Delete temporary tables if not debug mode              
     if not DEBUG:
@@ -1226,7 +1492,9 @@ def calc_rect_build_height(cursor, buildings, rect_city, wind_dir):
             rect_city: String
                 Name of the table where urban corridors around the park are saved
             wind_dir: float
-                wind direction (clock-wise, ° from North)
+                wind direction (clock-wise, ° from North). If None, the input
+                tables gather all wind directions (WIND_DIR column) and the 
+                indicators are calculated for all directions at once
         
             
 		Returns
@@ -1239,7 +1507,7 @@ def calc_rect_build_height(cursor, buildings, rect_city, wind_dir):
     correl_rect_builds = DataUtil.postfix("CORREL_RECT_BUILDS")
     
     # Output table names
-    rectIndicBuild = DataUtil.postfix("CITY_INDIC_BUILDS", str(wind_dir).replace(".", "_"))
+    rectIndicBuild = DataUtil.postfix("CITY_INDIC_BUILDS", DataUtil.directionSuffix(wind_dir))
 
     # Calculates the intersections between buildings and city "rectangles"
     cursor.execute(
@@ -1247,13 +1515,13 @@ def calc_rect_build_height(cursor, buildings, rect_city, wind_dir):
         {0};{1};
         DROP TABLE IF EXISTS {2};
         CREATE TABLE {2}
-            AS SELECT   a.{3},
+            AS SELECT   {9}a.{3},
                         a.{8},
                         b.{4},
                         a.{5},
                         ST_AREA(ST_INTERSECTION(a.{5}, b.{5})) AS AREA_BUILD
             FROM {6} AS a, {7} AS b
-            WHERE a.{5} && b.{5} AND ST_INTERSECTS(a.{5}, b.{5})
+            WHERE a.{5} && b.{5} AND ST_INTERSECTS(a.{5}, b.{5}){10}
         """.format( DataUtil.createIndex(tableName=buildings, 
                                          fieldName=GEOM_FIELD,
                                          isSpatial=True),
@@ -1263,7 +1531,8 @@ def calc_rect_build_height(cursor, buildings, rect_city, wind_dir):
                     correl_rect_builds          , "ID",
                     HEIGHT_FIELD                , GEOM_FIELD,
                     rect_city                   , buildings,
-                    ID_UPSTREAM))
+                    ID_UPSTREAM                 , DataUtil.directionKey(wind_dir, "a"),
+                    DataUtil.directionJoin(wind_dir)))
 
     # Calculates the indicators
     cursor.execute(
@@ -1271,14 +1540,14 @@ def calc_rect_build_height(cursor, buildings, rect_city, wind_dir):
         {0};{7};{10};{11};
         DROP TABLE IF EXISTS {1};
         CREATE TABLE {1}
-            AS SELECT   b.{2}, 
+            AS SELECT   {13}b.{2}, 
                         b.{8},
                         b.{3},
                         COALESCE(EXP(1.0/COUNT(a.*)*SUM(LOG(a.{4}))),0) AS {5},
                         COALESCE(SUM(a.AREA_BUILD*a.{4})/SUM(a.AREA_BUILD), 0) AS {9}
             FROM {6} AS a RIGHT JOIN {12} AS b
-            ON a.{2} = b.{2} AND a.{8} = b.{8}
-            GROUP BY b.{2}, b.{8}
+            ON a.{2} = b.{2} AND a.{8} = b.{8}{14}
+            GROUP BY {13}b.{2}, b.{8}
         """.format( DataUtil.createIndex(tableName=correl_rect_builds, 
                                          fieldName="ID",
                                          isSpatial=False),
@@ -1295,7 +1564,9 @@ def calc_rect_build_height(cursor, buildings, rect_city, wind_dir):
                     DataUtil.createIndex(tableName=rect_city, 
                                          fieldName=ID_UPSTREAM,
                                          isSpatial=False),
-                    rect_city))
+                    rect_city,
+                    DataUtil.directionKey(wind_dir, "b"),
+                    DataUtil.directionJoin(wind_dir)))
     
     # Delete temporary tables if not debug mode              
     if not DEBUG:
@@ -1322,7 +1593,9 @@ def calc_street_indic(cursor, blocks, rect_city, crosswind_lines, wind_dir):
             crosswind_lines: String
                 Name of the table where cross wind lines are saved
             wind_dir: float
-                wind direction (clock-wise, ° from North)
+                wind direction (clock-wise, ° from North). If None, the input
+                tables gather all wind directions (WIND_DIR column) and the 
+                indicators are calculated for all directions at once
         
             
 		Returns
@@ -1342,7 +1615,7 @@ def calc_street_indic(cursor, blocks, rect_city, crosswind_lines, wind_dir):
     rect_indic_street_tempo = DataUtil.postfix("RECT_INDIC_STREET_TEMPO")
     
     # Output table names
-    rectIndicStreet = DataUtil.postfix("CITY_INDIC_STREET", str(wind_dir).replace(".", "_"))
+    rectIndicStreet = DataUtil.postfix("CITY_INDIC_STREET", DataUtil.directionSuffix(wind_dir))
 
     # Calculates the intersection of each line with each corridor
     cursor.execute(
@@ -1350,13 +1623,13 @@ def calc_street_indic(cursor, blocks, rect_city, crosswind_lines, wind_dir):
         {0};{1};
         DROP TABLE IF EXISTS {2};
         CREATE TABLE {2}
-            AS SELECT   a.{3} AS {4},
+            AS SELECT   {10}a.{3} AS {4},
                         a.{5},
                         a.{6},
                         b.{7},
                         ST_LENGTH(ST_INTERSECTION(a.{6}, b.{6})) AS L_rec
             FROM {8} AS a, {9} AS b
-            WHERE   a.{6} && b.{6} AND ST_INTERSECTS(a.{6}, b.{6})
+            WHERE   a.{6} && b.{6} AND ST_INTERSECTS(a.{6}, b.{6}){11}
         """.format( DataUtil.createIndex(tableName=crosswind_lines, 
                                          fieldName=GEOM_FIELD,
                                          isSpatial=True),
@@ -1366,7 +1639,9 @@ def calc_street_indic(cursor, blocks, rect_city, crosswind_lines, wind_dir):
                     rect_line_corr              , "ID",
                     "ID_RECT"                   , ID_UPSTREAM,
                     GEOM_FIELD                  , "ID", 
-                    rect_city                   , crosswind_lines))
+                    rect_city                   , crosswind_lines,
+                    DataUtil.directionKey(wind_dir, "a"),
+                    DataUtil.directionJoin(wind_dir)))
                     
     # Calculates the diff between crosswind lines and blocks (to get kind of "streets width")
     cursor.execute(
@@ -1374,15 +1649,15 @@ def calc_street_indic(cursor, blocks, rect_city, crosswind_lines, wind_dir):
         {0};{1};
         DROP TABLE IF EXISTS {2};
         CREATE TABLE {2}
-            AS SELECT   {3},
+            AS SELECT   {9}{3},
                         EXPLOD_ID AS {4},
                         {5},
                         ST_LENGTH({5}) AS {6}
-            FROM ST_EXPLODE('(  SELECT  a.{3}, 
+            FROM ST_EXPLODE('(  SELECT  {10}a.{3}, 
                                         ST_DIFFERENCE(a.{5}, ST_UNION(ST_ACCUM(b.{5}))) AS {5}
                                 FROM {7} AS a, {8} AS b
-                                WHERE a.{5} && b.{5} AND ST_INTERSECTS(a.{5}, b.{5})
-                                GROUP BY a.{5}, a.{3})')
+                                WHERE a.{5} && b.{5} AND ST_INTERSECTS(a.{5}, b.{5}){11}
+                                GROUP BY {10}a.{5}, a.{3})')
             WHERE NOT ST_ISEMPTY({5})
         """.format( DataUtil.createIndex(tableName=crosswind_lines, 
                                          fieldName=GEOM_FIELD,
@@ -1393,7 +1668,9 @@ def calc_street_indic(cursor, blocks, rect_city, crosswind_lines, wind_dir):
                     streets_tab                 , "ID",
                     ID_STREET                   , GEOM_FIELD,
                     STREET_WIDTH                , crosswind_lines,
-                    blocks))
+                    blocks                      , DataUtil.directionKey(wind_dir),
+                    DataUtil.directionKey(wind_dir, "a"),
+                    DataUtil.directionJoin(wind_dir)))
 
     # Calculates the block id of each street extremities to check that streets are real streets...
     cursor.execute(
@@ -1401,13 +1678,13 @@ def calc_street_indic(cursor, blocks, rect_city, crosswind_lines, wind_dir):
         {0};{1};
         DROP TABLE IF EXISTS {2};
         CREATE TABLE {2}
-            AS SELECT   a.{3},
+            AS SELECT   {10}a.{3},
                         a.{4},
                         a.{5},
                         a.{6},
                         b.{7}
             FROM {8} AS a, {9} AS b
-            WHERE a.{5} && b.{5} AND ST_INTERSECTS(a.{5}, b.{5})
+            WHERE a.{5} && b.{5} AND ST_INTERSECTS(a.{5}, b.{5}){11}
         """.format( DataUtil.createIndex(tableName=streets_tab, 
                                          fieldName=GEOM_FIELD,
                                          isSpatial=True),
@@ -1417,7 +1694,9 @@ def calc_street_indic(cursor, blocks, rect_city, crosswind_lines, wind_dir):
                     streets_extremities         , "ID",
                     ID_STREET                   , GEOM_FIELD,
                     STREET_WIDTH                , ID_FIELD_BLOCK, 
-                    streets_tab                 , blocks))
+                    streets_tab                 , blocks,
+                    DataUtil.directionKey(wind_dir, "a"),
+                    DataUtil.directionJoin(wind_dir)))
                     
     # Calculates the intersection of each street with each corridor
     cursor.execute(
@@ -1425,7 +1704,7 @@ def calc_street_indic(cursor, blocks, rect_city, crosswind_lines, wind_dir):
         {0};{1};{2};{12};
         DROP TABLE IF EXISTS {3};
         CREATE TABLE {3}
-            AS SELECT   a.{4}, 
+            AS SELECT   {14}a.{4}, 
                         a.{5},
                         b.{4} AS {6},
                         b.{13},
@@ -1435,8 +1714,8 @@ def calc_street_indic(cursor, blocks, rect_city, crosswind_lines, wind_dir):
                         MAX(a.{11}) AS ID_BLOCK1,
                         MIN(a.{11}) AS ID_BLOCK2
             FROM {9} AS a, {10} AS b
-            WHERE   a.{7} && b.{7} AND ST_INTERSECTS(a.{7}, b.{7})
-            GROUP BY a.{4}, a.{5}, b.{4}, b.{13}
+            WHERE   a.{7} && b.{7} AND ST_INTERSECTS(a.{7}, b.{7}){15}
+            GROUP BY {14}a.{4}, a.{5}, b.{4}, b.{13}
         """.format( DataUtil.createIndex(tableName=streets_extremities, 
                                          fieldName=GEOM_FIELD,
                                          isSpatial=True),
@@ -1454,7 +1733,9 @@ def calc_street_indic(cursor, blocks, rect_city, crosswind_lines, wind_dir):
                     DataUtil.createIndex(tableName=streets_extremities, 
                                          fieldName=ID_STREET,
                                          isSpatial=False),
-                    ID_UPSTREAM))
+                    ID_UPSTREAM,
+                    DataUtil.directionKey(wind_dir, "a"),
+                    DataUtil.directionJoin(wind_dir)))
                     
     # Keep only streets in a given corridor if at least one of the building 
     # is in the corridor and if the street is shared 
@@ -1464,7 +1745,7 @@ def calc_street_indic(cursor, blocks, rect_city, crosswind_lines, wind_dir):
         {0};{1};{2};{3};{4};{5};{6};{7};
         DROP TABLE IF EXISTS {8};
         CREATE TABLE {8}
-            AS SELECT   a.{9}, 
+            AS SELECT   {17}a.{9}, 
                         a.{10},
                         a.{11},
                         a.{12},
@@ -1472,9 +1753,9 @@ def calc_street_indic(cursor, blocks, rect_city, crosswind_lines, wind_dir):
                         a.{14},
                         b.L_REC
             FROM {15} AS a LEFT JOIN {16} AS b
-            ON a.{9} = b.{9} AND a.{10} = b.{10} AND a.{11} = b.{11}
+            ON a.{9} = b.{9} AND a.{10} = b.{10} AND a.{11} = b.{11}{18}
             WHERE a.L_INTER < b.L_REC AND a.ID_BLOCK1 <> a.ID_BLOCK2
-            GROUP BY a.{9}, a.{10}, a.{11}, a.{12}
+            GROUP BY {17}a.{9}, a.{10}, a.{11}, a.{12}
         """.format( DataUtil.createIndex(tableName=real_streets, 
                                          fieldName="ID_RECT",
                                          isSpatial=False),
@@ -1503,7 +1784,8 @@ def calc_street_indic(cursor, blocks, rect_city, crosswind_lines, wind_dir):
                     ID_UPSTREAM                 , "ID",
                     ID_STREET                   , GEOM_FIELD,
                     STREET_WIDTH                , real_streets,
-                    rect_line_corr))
+                    rect_line_corr              , DataUtil.directionKey(wind_dir, "a"),
+                    DataUtil.directionJoin(wind_dir)))
                     
                     
     # Calculates the median street width only if the street is shared 
@@ -1513,12 +1795,12 @@ def calc_street_indic(cursor, blocks, rect_city, crosswind_lines, wind_dir):
         {0};{1};
         DROP TABLE IF EXISTS {2};
         CREATE TABLE {2}
-            AS SELECT   {3},
+            AS SELECT   {8}{3},
                         {4},
                         {7},
                         CAST(MEDIAN({5}) AS DOUBLE) AS {5}
             FROM {6}
-            GROUP BY {3}, {4}, {7}
+            GROUP BY {8}{3}, {4}, {7}
         """.format( DataUtil.createIndex(tableName=splitted_streets_only, 
                                          fieldName="ID_RECT",
                                          isSpatial=False),
@@ -1527,7 +1809,8 @@ def calc_street_indic(cursor, blocks, rect_city, crosswind_lines, wind_dir):
                                          isSpatial=False),
                     first_street_indic          , "ID_RECT",
                     GEOM_FIELD                  , STREET_WIDTH,
-                    splitted_streets_only       , ID_UPSTREAM))
+                    splitted_streets_only       , ID_UPSTREAM,
+                    DataUtil.directionKey(wind_dir)))
                     
     # Calculates the density of street number per line only if the street is shared 
     # between two blocks and not a single one (only if real street)
@@ -1536,13 +1819,13 @@ def calc_street_indic(cursor, blocks, rect_city, crosswind_lines, wind_dir):
         {0};{1};{2};
         DROP TABLE IF EXISTS {4};
         CREATE TABLE {4}
-            AS SELECT   {5},
+            AS SELECT   {10}{5},
                         {6},
                         {7},
                         {9},
                         CAST(COUNT(*) AS DOUBLE) / (CAST(COUNT(*) AS DOUBLE) + MAX({3})) AS STREET_NUMBER_DENSITY
             FROM {8}
-            GROUP BY {5}, {6}, {7}, {9}
+            GROUP BY {10}{5}, {6}, {7}, {9}
         """.format( DataUtil.createIndex(tableName=splitted_streets_only, 
                                          fieldName="ID_RECT",
                                          isSpatial=False),
@@ -1555,7 +1838,7 @@ def calc_street_indic(cursor, blocks, rect_city, crosswind_lines, wind_dir):
                     "L_rec"                     , second_street_indic_buf,
                     "ID_RECT"                   , "ID",
                     GEOM_FIELD                  , splitted_streets_only,
-                    ID_UPSTREAM))
+                    ID_UPSTREAM                 , DataUtil.directionKey(wind_dir)))
                         
     # Calculates the mean density of street number and gather with previous indicator
     # Calculates also the fraction of opening of the park on the streets
@@ -1564,15 +1847,15 @@ def calc_street_indic(cursor, blocks, rect_city, crosswind_lines, wind_dir):
         {0};{1};{10};{11};
         DROP TABLE IF EXISTS {2};
         CREATE TABLE {2}
-            AS SELECT   a.{3} AS ID,
+            AS SELECT   {13}a.{3} AS ID,
                         a.{9},
                         a.{4},
                         a.{5},
                         AVG(b.STREET_NUMBER_DENSITY) AS {6},
                         AVG(b.STREET_NUMBER_DENSITY) * a.{5} AS {12}
             FROM {7} AS a LEFT JOIN {8} AS b
-            ON a.{3} = b.{3} AND a.{9} = b.{9}
-            GROUP BY b.{3}, a.{4}, a.{9}
+            ON a.{3} = b.{3} AND a.{9} = b.{9}{14}
+            GROUP BY {13}b.{3}, a.{4}, a.{9}
         """.format( DataUtil.createIndex(tableName=first_street_indic, 
                                          fieldName="ID_RECT",
                                          isSpatial=False),
@@ -1589,7 +1872,9 @@ def calc_street_indic(cursor, blocks, rect_city, crosswind_lines, wind_dir):
                     DataUtil.createIndex(tableName=second_street_indic_buf, 
                                          fieldName=ID_UPSTREAM,
                                          isSpatial=False),
-                    OPENING_FRACTION))
+                    OPENING_FRACTION,
+                    DataUtil.directionKey(wind_dir, "a"),
+                    DataUtil.directionJoin(wind_dir)))
     
     # Fill in some of the null value indicators
     cursor.execute(
@@ -1608,15 +1893,15 @@ def calc_street_indic(cursor, blocks, rect_city, crosswind_lines, wind_dir):
                               isSpatial=False)};
         DROP TABLE IF EXISTS {rectIndicStreet};
         CREATE TABLE {rectIndicStreet}
-            AS SELECT   a.ID,
+            AS SELECT   {DataUtil.directionKey(wind_dir, "a")}a.ID,
                         a.{ID_UPSTREAM},
                         a.{GEOM_FIELD},
                         b.{STREET_WIDTH},
                         COALESCE(b.{NB_STREET_DENSITY}, 0) AS {NB_STREET_DENSITY},
                         COALESCE(b.{OPENING_FRACTION}, 1) AS {OPENING_FRACTION}
             FROM {rect_city} AS a LEFT JOIN {rect_indic_street_tempo} AS b
-            ON a.{ID_UPSTREAM} = b.{ID_UPSTREAM} AND a.ID = b.ID
-            GROUP BY a.ID, a.{ID_UPSTREAM}
+            ON a.{ID_UPSTREAM} = b.{ID_UPSTREAM} AND a.ID = b.ID{DataUtil.directionJoin(wind_dir)}
+            GROUP BY {DataUtil.directionKey(wind_dir, "a")}a.ID, a.{ID_UPSTREAM}
         """)
                     
     # Delete temporary tables if not debug mode              
@@ -1631,8 +1916,11 @@ def calc_street_indic(cursor, blocks, rect_city, crosswind_lines, wind_dir):
             
     return rectIndicStreet
 
-def generic_facade_indicators(cursor, buildings, rsu, indic, wind_dir):
-    """ Calculates facade density per corridor.
+def calc_facade_segments(cursor, buildings):
+    """ Splits the building facades into segments and identifies for each 
+    segment the part shared with an other building. The table is calculated
+    once per scenario and then used by all facade indicators (whatever the
+    wind direction)
 
 		Parameters
 		_ _ _ _ _ _ _ _ _ _ 
@@ -1641,6 +1929,160 @@ def generic_facade_indicators(cursor, buildings, rsu, indic, wind_dir):
                 A cursor object, used to perform spatial SQL queries
             buildings: String
                 Name of the table where buildings are saved
+        
+            
+		Returns
+		_ _ _ _ _ _ _ _ _ _ 
+
+            facades: String
+                Name of the table containing the facade segments with
+                their building ID, length, azimuth, whether they are shared
+                with an other building and the height of facade free of
+                any adjacent building (FREE_HEIGHT)"""
+    print("Creates facade segments")
+    
+    # Temporary table names
+    seg_ini = DataUtil.postfix("SEGMENTS_INI")
+    seg_shared = DataUtil.postfix("SEGMENTS_SHARED")
+    seg_shared_union = DataUtil.postfix("SEGMENTS_SHARED_UNION")
+    seg_free = DataUtil.postfix("SEGMENTS_FREE")
+    seg_all = DataUtil.postfix("SEGMENTS_ALL")
+    
+    # Output table
+    facades = FACADE_SEGMENTS_TAB
+    
+    # Converts building boundaries into segments
+    cursor.execute(
+        f"""
+        DROP TABLE IF EXISTS {seg_ini};
+        CREATE TABLE {seg_ini}
+            AS SELECT   ROW_NUMBER() OVER (ORDER BY {ID_FIELD_BUILD}, EXPLOD_ID) AS ID_SEG,
+                        {ID_FIELD_BUILD},
+                        {HEIGHT_FIELD},
+                        BUILD_AREA,
+                        ST_AZIMUTH(ST_STARTPOINT({GEOM_FIELD}), ST_ENDPOINT({GEOM_FIELD})) AS AZIMUTH,
+                        {GEOM_FIELD}
+            FROM ST_EXPLODE('(SELECT    {ID_FIELD_BUILD},
+                                        {HEIGHT_FIELD},
+                                        ST_AREA({GEOM_FIELD}) AS BUILD_AREA,
+                                        ST_TOMULTISEGMENTS({GEOM_FIELD}) AS {GEOM_FIELD}
+                            FROM {buildings})');
+        {DataUtil.createIndex(tableName=seg_ini, 
+                              fieldName=GEOM_FIELD,
+                              isSpatial=True)};
+        {DataUtil.createIndex(tableName=seg_ini, 
+                              fieldName="ID_SEG",
+                              isSpatial=False)};
+        {DataUtil.createIndex(tableName=buildings, 
+                              fieldName=GEOM_FIELD,
+                              isSpatial=True)};
+        """)
+    
+    # Identifies the part of each segment shared with an other building 
+    # (the facade height exceeding the adjacent building is still free)
+    cursor.execute(
+        f"""
+        DROP TABLE IF EXISTS {seg_shared};
+        CREATE TABLE {seg_shared}
+            AS SELECT   a.ID_SEG,
+                        ST_COLLECTIONEXTRACT(ST_INTERSECTION(a.{GEOM_FIELD}, 
+                                                             ST_SNAP(ST_TOMULTILINE(b.{GEOM_FIELD}), 
+                                                                     a.{GEOM_FIELD}, 
+                                                                     {GEOMETRY_SNAP_TOLERANCE})),
+                                             2) AS {GEOM_FIELD},
+                        GREATEST(a.{HEIGHT_FIELD} - b.{HEIGHT_FIELD}, 0) AS FREE_HEIGHT
+            FROM {seg_ini} AS a, {buildings} AS b
+            WHERE   ST_EXPAND(a.{GEOM_FIELD}, {GEOMETRY_SNAP_TOLERANCE}, {GEOMETRY_SNAP_TOLERANCE}) && b.{GEOM_FIELD}
+                    AND a.{ID_FIELD_BUILD} <> b.{ID_FIELD_BUILD}
+                    AND ST_INTERSECTS(a.{GEOM_FIELD}, 
+                                      ST_SNAP(ST_TOMULTILINE(b.{GEOM_FIELD}), 
+                                              a.{GEOM_FIELD}, 
+                                              {GEOMETRY_SNAP_TOLERANCE}));
+        DROP TABLE IF EXISTS {seg_shared_union};
+        CREATE TABLE {seg_shared_union}
+            AS SELECT   ID_SEG,
+                        ST_UNION(ST_ACCUM({GEOM_FIELD})) AS {GEOM_FIELD}
+            FROM {seg_shared}
+            WHERE ST_LENGTH({GEOM_FIELD}) > 0
+            GROUP BY ID_SEG;
+        {DataUtil.createIndex(tableName=seg_shared_union, 
+                              fieldName="ID_SEG",
+                              isSpatial=False)};
+        """)
+    
+    # The rest of each segment is free
+    cursor.execute(
+        f"""
+        DROP TABLE IF EXISTS {seg_free};
+        CREATE TABLE {seg_free}
+            AS SELECT   a.ID_SEG,
+                        CASE    WHEN b.ID_SEG IS NULL
+                                THEN a.{GEOM_FIELD}
+                                ELSE ST_DIFFERENCE(a.{GEOM_FIELD}, b.{GEOM_FIELD})
+                        END AS {GEOM_FIELD}
+            FROM {seg_ini} AS a LEFT JOIN {seg_shared_union} AS b
+            ON a.ID_SEG = b.ID_SEG;
+        {DataUtil.createIndex(tableName=seg_free, 
+                              fieldName="ID_SEG",
+                              isSpatial=False)};
+        {DataUtil.createIndex(tableName=seg_shared, 
+                              fieldName="ID_SEG",
+                              isSpatial=False)};
+        """)
+    
+    # Gather free and shared parts of segments
+    cursor.execute(
+        f"""
+        DROP TABLE IF EXISTS {seg_all}, {facades};
+        CREATE TABLE {seg_all}
+            AS SELECT   b.ID_SEG, b.{ID_FIELD_BUILD}, b.{HEIGHT_FIELD}, b.BUILD_AREA,
+                        b.AZIMUTH, FALSE AS SHARED, b.{HEIGHT_FIELD} AS FREE_HEIGHT,
+                        a.{GEOM_FIELD}
+            FROM {seg_free} AS a LEFT JOIN {seg_ini} AS b
+            ON a.ID_SEG = b.ID_SEG
+            UNION ALL
+            SELECT      b.ID_SEG, b.{ID_FIELD_BUILD}, b.{HEIGHT_FIELD}, b.BUILD_AREA,
+                        b.AZIMUTH, TRUE AS SHARED, a.FREE_HEIGHT,
+                        a.{GEOM_FIELD}
+            FROM {seg_shared} AS a LEFT JOIN {seg_ini} AS b
+            ON a.ID_SEG = b.ID_SEG;
+        CREATE TABLE {facades}
+            AS SELECT   ROW_NUMBER() OVER (ORDER BY ID_SEG, SHARED, EXPLOD_ID) AS ID_FACADE,
+                        {ID_FIELD_BUILD}, {HEIGHT_FIELD}, BUILD_AREA, AZIMUTH,
+                        SHARED, FREE_HEIGHT, ST_LENGTH({GEOM_FIELD}) AS LENGTH,
+                        {GEOM_FIELD}
+            FROM ST_EXPLODE('{seg_all}')
+            WHERE ST_LENGTH({GEOM_FIELD}) > 0;
+        {DataUtil.createIndex(tableName=facades, 
+                              fieldName=GEOM_FIELD,
+                              isSpatial=True)};
+        {DataUtil.createIndex(tableName=facades, 
+                              fieldName=ID_FIELD_BUILD,
+                              isSpatial=False)};
+        """)
+
+    # Delete temporary tables if not debug mode              
+    if not DEBUG:
+        # The temporary tables are deleted
+        cursor.execute(
+            f"""
+            DROP TABLE IF EXISTS {seg_ini}, {seg_shared}, {seg_shared_union},
+                                 {seg_free}, {seg_all}
+            """)
+
+    return facades
+
+def generic_facade_indicators(cursor, facades, rsu, indic, wind_dir):
+    """ Calculates facade density per corridor.
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _ 
+
+            cursor: conn.cursor
+                A cursor object, used to perform spatial SQL queries
+            facades: String
+                Name of the table where facade segments are saved
+                (see 'calc_facade_segments')
             rsu: String
                 Name of the table where urban corridors around the park are saved
             indic: String
@@ -1648,7 +2090,9 @@ def generic_facade_indicators(cursor, buildings, rsu, indic, wind_dir):
                     -> FREE_FACADE_FRACTION
                     -> ASPECT_RATIO
             wind_dir: float
-                wind direction (clock-wise, ° from North)
+                wind direction (clock-wise, ° from North). If None, the input
+                tables gather all wind directions (WIND_DIR column) and the 
+                indicators are calculated for all directions at once
         
             
 		Returns
@@ -1659,157 +2103,71 @@ def generic_facade_indicators(cursor, buildings, rsu, indic, wind_dir):
                 and the facade indicator results"""
                 
     # Temporary table names
-    correl_rsu_builds = DataUtil.postfix("CORREL_RSU_BUILDS")
-    buildLine = DataUtil.postfix("build_Line")
-    buildLineRsu = DataUtil.postfix("build_Line_rsu")
-    sharedLineRsu = DataUtil.postfix("share_Line_rsu")
+    facadeRsu = DataUtil.postfix("facade_rsu")
+    facadeBuildRsu = DataUtil.postfix("facade_build_rsu")
     onlyBuildRsu = DataUtil.postfix("only_Build_rsu")
 
     # Output table
-    rsuFacadeIndic = DataUtil.postfix(indic + "_INDIC", str(wind_dir).replace(".", "_"))
+    rsuFacadeIndic = DataUtil.postfix(indic + "_INDIC", DataUtil.directionSuffix(wind_dir))
 
-    # Calculates the intersections between buildings and city "rectangles"
+    # Calculates the length of each facade segment within each RSU
     cursor.execute(
         """ 
         {0};{1};
         DROP TABLE IF EXISTS {2};
         CREATE TABLE {2}
-            AS SELECT   a.{3},
-                        a.{4},
-                        b.{5},
-                        b.{6},
-                        b.{9}
-            FROM {7} AS a, {8} AS b
-            WHERE a.{5} && b.{5} AND ST_INTERSECTS(a.{5}, b.{5})
-        """.format( DataUtil.createIndex(tableName=buildings, 
+            AS SELECT   {8}b.ID,
+                        b.{3},
+                        ST_AREA(b.{4}) AS RSU_AREA,
+                        a.{5},
+                        a.BUILD_AREA,
+                        a.FREE_HEIGHT,
+                        CASE    WHEN ST_COVERS(b.{4}, a.{4})
+                                THEN a.LENGTH
+                                ELSE ST_LENGTH(ST_INTERSECTION(a.{4}, b.{4}))
+                        END AS LENGTH
+            FROM {6} AS a, {7} AS b
+            WHERE a.{4} && b.{4} AND ST_INTERSECTS(a.{4}, b.{4}){9}
+        """.format( DataUtil.createIndex(tableName=facades, 
                                          fieldName=GEOM_FIELD,
                                          isSpatial=True),
                     DataUtil.createIndex(tableName=rsu, 
                                          fieldName=GEOM_FIELD,
                                          isSpatial=True),
-                    correl_rsu_builds         , "ID",
-                    ID_UPSTREAM                , GEOM_FIELD,
-                    HEIGHT_FIELD               , rsu,
-                    buildings                  , ID_FIELD_BUILD))
-
+                    facadeRsu                  , ID_UPSTREAM,
+                    GEOM_FIELD                 , ID_FIELD_BUILD,
+                    facades                    , rsu,
+                    DataUtil.directionKey(wind_dir, "b"),
+                    DataUtil.directionJoin(wind_dir)))
 
-    # Convert the building polygons into lines and create the intersection with corridors polygons
-    cursor.execute(
-        """ 
-        {0};{1};{2};{3};    
-        """.format( DataUtil.createIndex(tableName=correl_rsu_builds, 
-                                        fieldName="ID",
-                                        isSpatial=False),
-                    DataUtil.createIndex(tableName=rsu, 
-                                         fieldName="ID",
-                                         isSpatial=False),
-                    DataUtil.createIndex(tableName=correl_rsu_builds, 
-                                         fieldName=ID_UPSTREAM,
-                                         isSpatial=False),
-                    DataUtil.createIndex(tableName=rsu, 
-                                         fieldName=ID_UPSTREAM,
-                                         isSpatial=False)))
-    cursor.execute(f"""
-        DROP TABLE IF EXISTS {buildLine};
-        CREATE TABLE {buildLine}
-            AS SELECT   a.{ID_FIELD_BUILD}, a.ID, a.{ID_UPSTREAM},
-                        ST_AREA(a.{GEOM_FIELD}) AS BUILD_AREA,
-                        ST_AREA(b.{GEOM_FIELD}) AS RSU_AREA,
-                        ST_CollectionExtract(ST_INTERSECTION(ST_TOMULTILINE(a.{GEOM_FIELD}), b.{GEOM_FIELD}), 2) AS {GEOM_FIELD},
-                        a.{HEIGHT_FIELD}
-            FROM {correl_rsu_builds} AS a LEFT JOIN {rsu} AS b
-            ON a.ID = b.ID AND a.{ID_UPSTREAM} = b.{ID_UPSTREAM}
-        """)
-
-    # Keep only intersected facades within a given distance and calculate their area per RSU
-    cursor.execute(
-        """ 
-        {0};{1};{2};{3};    
-        """.format( DataUtil.createIndex(tableName=buildLine, 
-                                        fieldName=GEOM_FIELD,
-                                        isSpatial=True),
-                    DataUtil.createIndex(tableName=buildLine, 
-                                         fieldName="ID",
-                                         isSpatial=False),
-                    DataUtil.createIndex(tableName=buildLine, 
-                                         fieldName=ID_FIELD_BUILD,
-                                         isSpatial=False),
-                     DataUtil.createIndex(tableName=buildLine, 
-                                          fieldName=ID_UPSTREAM,
-                                          isSpatial=False)))
+    # Sums the free facade area and the building area by building and then by RSU
     cursor.execute(
         f"""
-        DROP TABLE IF EXISTS {sharedLineRsu};
-        CREATE TABLE {sharedLineRsu} 
-            AS SELECT   SUM(ST_LENGTH(  ST_INTERSECTION(a.{GEOM_FIELD}, 
-                                                        ST_SNAP(b.{GEOM_FIELD}, 
-                                                                a.{GEOM_FIELD}, 
-                                                                {GEOMETRY_SNAP_TOLERANCE})
-                                                        )
-                                        )
-                            *LEAST(a.{HEIGHT_FIELD}, b.{HEIGHT_FIELD})) AS FACADE_AREA,
-                        a.ID,
-                        a.{ID_UPSTREAM}
-            FROM    {buildLine} AS a LEFT JOIN {buildLine} AS b
-                    ON a.ID = b.ID
-            WHERE       a.{GEOM_FIELD} && b.{GEOM_FIELD} AND ST_INTERSECTS(a.{GEOM_FIELD}, 
-                        ST_SNAP(b.{GEOM_FIELD}, a.{GEOM_FIELD}, {GEOMETRY_SNAP_TOLERANCE})) AND
-                        a.{ID_FIELD_BUILD} <> b.{ID_FIELD_BUILD}
-            GROUP BY a.ID, a.{ID_UPSTREAM};""")
-
-    # Calculates the building facade area within each RSU
-    cursor.execute(
-        """ 
-        {0};{1};   
-        """.format( DataUtil.createIndex(tableName=buildLine, 
-                                        fieldName="ID",
-                                        isSpatial=False),
-                    DataUtil.createIndex(tableName=buildLine, 
-                                         fieldName=ID_UPSTREAM,
-                                         isSpatial=False)))
-    cursor.execute(
-        f"""
-        DROP TABLE IF EXISTS {buildLineRsu};
-        CREATE TABLE {buildLineRsu}
-            AS SELECT   ID, 
-                        MIN(RSU_AREA) AS RSU_AREA, 
-                        SUM(BUILD_AREA) AS BUILD_AREA,
+        DROP TABLE IF EXISTS {facadeBuildRsu};
+        CREATE TABLE {facadeBuildRsu}
+            AS SELECT   {DataUtil.directionKey(wind_dir)}ID, 
                         {ID_UPSTREAM},
-                        SUM(ST_LENGTH({GEOM_FIELD}) * {HEIGHT_FIELD}) AS FACADE_AREA
-            FROM {buildLine}
-            GROUP BY ID, {ID_UPSTREAM};""")
+                        {ID_FIELD_BUILD},
+                        MIN(RSU_AREA) AS RSU_AREA, 
+                        MIN(BUILD_AREA) AS BUILD_AREA,
+                        SUM(LENGTH * FREE_HEIGHT) AS FACADE_AREA
+            FROM {facadeRsu}
+            GROUP BY {DataUtil.directionKey(wind_dir)}ID, {ID_UPSTREAM}, {ID_FIELD_BUILD};""")
 
     # Calculates the facade indicator needed by RSU¨
     if indic == FREE_FACADE_FRACTION:
-        sql_indic = """COALESCE((a.FACADE_AREA-b.FACADE_AREA)/(a.FACADE_AREA-b.FACADE_AREA+a.RSU_AREA),
-                                a.FACADE_AREA/(a.FACADE_AREA+a.RSU_AREA)) AS {FREE_FACADE_FRACTION}"""
+        sql_indic = f"""SUM(FACADE_AREA)/(SUM(FACADE_AREA)+MIN(RSU_AREA)) AS {FREE_FACADE_FRACTION}"""
     elif indic == ASPECT_RATIO:
-        sql_indic = """COALESCE(0.5*(a.FACADE_AREA-b.FACADE_AREA)/(a.RSU_AREA-a.BUILD_AREA),
-                                0.5*a.FACADE_AREA/(a.RSU_AREA-a.BUILD_AREA)) AS {ASPECT_RATIO}"""
-    cursor.execute(
-        """ 
-        {0};{1};{2};{3};    
-        """.format( DataUtil.createIndex(tableName=buildLineRsu, 
-                                        fieldName="ID",
-                                        isSpatial=False),
-                    DataUtil.createIndex(tableName=sharedLineRsu, 
-                                         fieldName="ID",
-                                         isSpatial=False),
-                    DataUtil.createIndex(tableName=buildLineRsu, 
-                                         fieldName=ID_UPSTREAM,
-                                         isSpatial=False),
-                    DataUtil.createIndex(tableName=sharedLineRsu, 
-                                         fieldName=ID_UPSTREAM,
-                                         isSpatial=False)))
+        sql_indic = f"""0.5*SUM(FACADE_AREA)/(MIN(RSU_AREA)-SUM(BUILD_AREA)) AS {ASPECT_RATIO}"""
     cursor.execute(
         f"""
         DROP TABLE IF EXISTS {onlyBuildRsu};
         CREATE TABLE {onlyBuildRsu}
-            AS SELECT   a.ID,
-                        a.{ID_UPSTREAM},
+            AS SELECT   {DataUtil.directionKey(wind_dir)}ID,
+                        {ID_UPSTREAM},
                         {sql_indic}
-            FROM {buildLineRsu} AS a LEFT JOIN {sharedLineRsu} AS b
-            ON a.ID = b.ID AND a.{ID_UPSTREAM} = b.{ID_UPSTREAM}""")
+            FROM {facadeBuildRsu}
+            GROUP BY {DataUtil.directionKey(wind_dir)}ID, {ID_UPSTREAM}""")
 
     # Join RSU having no buildings and set their value to 0
     cursor.execute(
@@ -1831,25 +2189,24 @@ def generic_facade_indicators(cursor, buildings, rsu, indic, wind_dir):
         f"""
         DROP TABLE IF EXISTS {rsuFacadeIndic};
         CREATE TABLE {rsuFacadeIndic}
-            AS SELECT   a.ID,
+            AS SELECT   {DataUtil.directionKey(wind_dir, "a")}a.ID,
                         a.{ID_UPSTREAM},
                         a.{GEOM_FIELD},
                         COALESCE(b.{indic}, 0) AS {indic}
             FROM {rsu} AS a LEFT JOIN {onlyBuildRsu} AS b
-            ON a.ID = b.ID AND a.{ID_UPSTREAM} = b.{ID_UPSTREAM}""")
+            ON a.ID = b.ID AND a.{ID_UPSTREAM} = b.{ID_UPSTREAM}{DataUtil.directionJoin(wind_dir)}""")
 
     # Delete temporary tables if not debug mode              
     if not DEBUG:
         # The temporary tables are deleted
         cursor.execute(
             f"""
-            DROP TABLE IF EXISTS {buildLine}, {buildLineRsu}, {sharedLineRsu},
-                                 {onlyBuildRsu}, {correl_rsu_builds}
+            DROP TABLE IF EXISTS {facadeRsu}, {facadeBuildRsu}, {onlyBuildRsu}
             """)
         
     return rsuFacadeIndic
 
-def calc_build_indic(cursor, buildings, blocks, prefix):
+def calc_build_indic(cursor, buildings, blocks, facades, prefix):
     """ Calculates buiding indicators
 
 		Parameters
@@ -1861,6 +2218,9 @@ def calc_build_indic(cursor, buildings, blocks, prefix):
                 Name of the table where buildings are saved
             blocks: String
                 Name of the table where blocks are saved
+            facades: String
+                Name of the table where facade segments are saved
+                (see 'calc_facade_segments')
             prefix: String
                 Prefix to add at the beginning of the output table
         
@@ -1873,7 +2233,6 @@ def calc_build_indic(cursor, buildings, blocks, prefix):
                 and the indicators results"""
     
     # Temporary table names
-    shared_wall = DataUtil.postfix("SHARED_WALL")
     shared_wall_frac = DataUtil.postfix("SHARED_WALL_FRAC")
     geometry_types = DataUtil.postfix("GEOMETRY_TYPES")
     rsu = DataUtil.postfix("RSU")
@@ -1882,45 +2241,18 @@ def calc_build_indic(cursor, buildings, blocks, prefix):
     # Output table
     build_indic = DataUtil.postfix("BUILD_INDIC", "")
 
-    
-    # Identify shared walls
-    cursor.execute(
-        """ 
-        {0};{1};   
-        """.format( DataUtil.createIndex(tableName=buildings, 
-                                         fieldName=ID_FIELD_BUILD,
-                                         isSpatial=False),
-                    DataUtil.createIndex(tableName=buildings, 
-                                         fieldName=GEOM_FIELD,
-                                         isSpatial=True)))
-    cursor.execute(
-    f"""
-    DROP TABLE IF EXISTS {shared_wall};
-    CREATE TABLE {shared_wall}
-        AS SELECT 
-            ST_INTERSECTION(a.{GEOM_FIELD},
-                            b.{GEOM_FIELD}) AS {GEOM_FIELD},
-            a.{ID_FIELD_BUILD}, 
-            ST_PERIMETER(a.{GEOM_FIELD}) + 
-            ST_PERIMETER(ST_HOLES(a.{GEOM_FIELD})) AS PERIMETER
-        FROM {buildings} a, {buildings} b 
-        WHERE a.{GEOM_FIELD} && b.{GEOM_FIELD} 
-            AND ST_INTERSECTS(a.{GEOM_FIELD}, b.{GEOM_FIELD}) 
-            AND a.{ID_FIELD_BUILD} <> b.{ID_FIELD_BUILD}
-    """)
-    
     # Calculate the ratio of linear of wall shared with other buildings
     cursor.execute(
         """ {0};   
-        """.format( DataUtil.createIndex(tableName=shared_wall, 
+        """.format( DataUtil.createIndex(tableName=facades, 
                                          fieldName=ID_FIELD_BUILD,
                                          isSpatial=False)))
     cursor.execute(
     f"""
     DROP TABLE IF EXISTS {shared_wall_frac};
     CREATE TABLE {shared_wall_frac}
-        AS SELECT   SUM(st_length({GEOM_FIELD})/perimeter) AS SHARED_WALL_FRAC,
-                    {ID_FIELD_BUILD} FROM {shared_wall}
+        AS SELECT   SUM(CASE WHEN SHARED THEN LENGTH ELSE 0 END) / SUM(LENGTH) AS SHARED_WALL_FRAC,
+                    {ID_FIELD_BUILD} FROM {facades}
         GROUP BY {ID_FIELD_BUILD};
     """)
         
@@ -1951,7 +2283,7 @@ def calc_build_indic(cursor, buildings, blocks, prefix):
     # Calculate the orientation of each geometry
     geometry_orientation = building_orientation(cursor = cursor,
                                                 buildings = geometry_types, 
-                                                shared_wall = shared_wall)
+                                                facades = facades)
         
     # Calculate the aspect ratio in a 'BLOCK_BUFFER_INDIC' m buffer around each block
     cursor.execute(
@@ -1964,7 +2296,7 @@ def calc_build_indic(cursor, buildings, blocks, prefix):
             FROM {blocks}
         """)
     block_aspect_ratio = generic_facade_indicators(cursor = cursor,
-                                                   buildings = buildings, 
+                                                   facades = facades, 
                                                    rsu = rsu, 
                                                    indic = ASPECT_RATIO,
                                                    wind_dir = "")
@@ -2001,14 +2333,14 @@ def calc_build_indic(cursor, buildings, blocks, prefix):
         # The temporary tables are deleted
         cursor.execute(
             f"""
-            DROP TABLE IF EXISTS {shared_wall}, {shared_wall_frac}, 
+            DROP TABLE IF EXISTS {shared_wall_frac}, 
             {geometry_types}, {rsu}, {geometry_orientation},
             {block_aspect_ratio}, {aspect_and_height}
             """)
 
     return build_indic
 
-def building_orientation(cursor, buildings, shared_wall):
+def building_orientation(cursor, buildings, facades):
     """ Calculates buiding orientation (South, West, North, East)
 
 		Parameters
@@ -2018,8 +2350,9 @@ def building_orientation(cursor, buildings, shared_wall):
                 A cursor object, used to perform spatial SQL queries
             buildings: String
                 Name of the table where buildings containing geometry type are saved
-            shared_wall: String
-                Name of the table where shared walls between buildings are saved
+            facades: String
+                Name of the table where facade segments are saved
+                (see 'calc_facade_segments')
         
             
 		Returns
@@ -2032,17 +2365,18 @@ def building_orientation(cursor, buildings, shared_wall):
     # Temporary table names
     all_facade_linear = DataUtil.postfix("ALL_FACADE_LINEAR")
     sum_facade_linear = DataUtil.postfix("SUM_FACADE_LINEAR")
+    orientations = DataUtil.postfix("ORIENTATIONS")
     all_orientations_for_all = DataUtil.postfix("ALL_ORIENTATIONS_FOR_ALL")
     orientation_ranking = DataUtil.postfix("ORIENTATION_RANKING")
     
     # Output table
     geometry_orientation = DataUtil.postfix("GEOMETRY_ORIENTATION", "")
 
-    # Calculates the linear of facade being shared and not being shared and
-    # the corresponding facade orientation (4 different possibles)
-    casewhen_sql = [f"""WHEN ST_AZIMUTH(ST_STARTPOINT({GEOM_FIELD}), ST_ENDPOINT({GEOM_FIELD})) >= {ORIENTATIONS.loc[i, "lower_limit"]}
+    # Calculates the linear of facade not being shared and the corresponding 
+    # facade orientation (4 different possibles)
+    casewhen_sql = [f"""WHEN AZIMUTH >= {ORIENTATIONS.loc[i, "lower_limit"]}
                              {ORIENTATIONS.loc[i, "operation"]}
-                             ST_AZIMUTH(ST_STARTPOINT({GEOM_FIELD}), ST_ENDPOINT({GEOM_FIELD})) < {ORIENTATIONS.loc[i, "upper_limit"]}
+                             AZIMUTH < {ORIENTATIONS.loc[i, "upper_limit"]}
                          THEN {i}""" for i in ORIENTATIONS.index]
     cursor.execute(
         f"""
@@ -2050,36 +2384,26 @@ def building_orientation(cursor, buildings, shared_wall):
         CREATE TABLE {all_facade_linear}
             AS SELECT   {ID_FIELD_BUILD},
                         CASE {" ".join(casewhen_sql)} END AS ORIENTATION,
-                        ST_LENGTH({GEOM_FIELD}) AS LINEAR,
-                        {BUILD_GEOM_TYPE}
-            FROM ST_EXPLODE('(SELECT    {ID_FIELD_BUILD},
-                                        {BUILD_GEOM_TYPE},
-                                        ST_TOMULTISEGMENTS({GEOM_FIELD}) AS {GEOM_FIELD}
-                            FROM {buildings})')
-            UNION ALL
-            SELECT   {ID_FIELD_BUILD},
-                        CASE {" ".join(casewhen_sql)} END AS ORIENTATION,
-                        -ST_LENGTH({GEOM_FIELD}) AS LINEAR,
-                        null AS {BUILD_GEOM_TYPE}
-            FROM ST_EXPLODE('(SELECT    {ID_FIELD_BUILD},
-                                        ST_TOMULTISEGMENTS({GEOM_FIELD}) AS {GEOM_FIELD}
-                            FROM {shared_wall})')
+                        LENGTH AS LINEAR
+            FROM {facades}
+            WHERE NOT SHARED
         """)
 
         
     # By default, set facade length to 0 m to each orientation
-    cursor.execute(f"SELECT {ID_FIELD_BUILD}, {BUILD_GEOM_TYPE} FROM {buildings}")
-    build_info = cursor.fetchall()
-    sql_values = [f"({i[0]}, {i[1]}, {j}, 0)" 
-                  for i in build_info for j in ORIENTATIONS.index]
+    loadData.insertRows(cursor = cursor,
+                        tableName = orientations,
+                        columns = [("ORIENTATION", "INTEGER")],
+                        rows = [(i, ) for i in ORIENTATIONS.index])
     cursor.execute(
         f"""
         DROP TABLE IF EXISTS {all_orientations_for_all};
-        CREATE TABLE {all_orientations_for_all}({ID_FIELD_BUILD} INTEGER,
-                                                {BUILD_GEOM_TYPE} INTEGER,
-                                                ORIENTATION INTEGER,
-                                                LINEAR DOUBLE)
-            AS VALUES {", ".join(sql_values)};
+        CREATE TABLE {all_orientations_for_all}
+            AS SELECT   a.{ID_FIELD_BUILD},
+                        a.{BUILD_GEOM_TYPE},
+                        b.ORIENTATION,
+                        CAST(0 AS DOUBLE) AS LINEAR
+            FROM {buildings} AS a, {orientations} AS b;
         """)    
     
     # Calculates the total length by building by orientation
@@ -2198,16 +2522,16 @@ def building_orientation(cursor, buildings, shared_wall):
             WHERE {BUILD_GEOM_TYPE} = 4          
         """)
     
-    return geometry_orientation
-    
     # Delete temporary tables if not debug mode              
     if not DEBUG:
         # The temporary tables are deleted
         cursor.execute(
             f"""
             DROP TABLE IF EXISTS {all_facade_linear}, {sum_facade_linear},
-                    {all_orientations_for_all}, {orientation_ranking}
+                    {orientations}, {all_orientations_for_all}, {orientation_ranking}
             """)
+    
+    return geometry_orientation
             
 def joinTables(cursor, tablesAndId, outputTableName):
     """ Join many tables in one based on one or several ids
@@ -2276,4 +2600,108 @@ def joinTables(cursor, tablesAndId, outputTableName):
     #              LEFT JOIN {rect_city_indic4} AS d ON a.ID = d.ID AND a.{ID_UPSTREAM} = d.{ID_UPSTREAM}
     #     """)
                 
-    return outputTableName
\ No newline at end of file
+    return outputTableName
+def gatherDirections(cursor, dicOfTables, outputTableName):
+    """ Gather the tables calculated for several wind directions in a 
+    single table (the wind direction is stored in a WIND_DIR column)
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _ 
+
+            cursor: conn.cursor
+                A cursor object, used to perform spatial SQL queries
+            dicOfTables: dictionary
+                Wind direction as key and table name as value (all tables
+                should have the same columns)
+            outputTableName: String
+                Name of the table gathering all directions
+        
+            
+		Returns
+		_ _ _ _ _ _ _ _ _ _ 
+
+            outputTableName: String
+                Name of the table gathering all directions"""
+    columns = DataUtil.getColumns(cursor = cursor,
+                                  tableName = list(dicOfTables.values())[0])
+    sql_union = " UNION ALL ".join([f"""
+                                    SELECT  CAST({d} AS DOUBLE) AS {WIND_DIR_FIELD},
+                                            {", ".join(columns)}
+                                    FROM {t}"""
+                                        for d, t in dicOfTables.items()])
+    cursor.execute(
+        f"""
+        DROP TABLE IF EXISTS {outputTableName};
+        CREATE TABLE {outputTableName}
+            AS {sql_union}
+        """)
+    
+    return outputTableName
+
+def extractDirection(cursor, tableName, wind_dir, outputTableName):
+    """ Extract from a table gathering all wind directions the rows of
+    a given direction (the WIND_DIR column is removed)
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _ 
+
+            cursor: conn.cursor
+                A cursor object, used to perform spatial SQL queries
+            tableName: String
+                Name of the table gathering all directions
+            wind_dir: float
+                wind direction (clock-wise, ° from North)
+            outputTableName: String
+                Name of the table containing the direction 'wind_dir'
+        
+            
+		Returns
+		_ _ _ _ _ _ _ _ _ _ 
+
+            outputTableName: String
+                Name of the table containing the direction 'wind_dir'"""
+    columns = DataUtil.getColumns(cursor = cursor,
+                                  tableName = tableName)
+    columns.remove(WIND_DIR_FIELD)
+    cursor.execute(
+        f"""
+        {DataUtil.createIndex(tableName=tableName, 
+                              fieldName=WIND_DIR_FIELD,
+                              isSpatial=False)};
+        DROP TABLE IF EXISTS {outputTableName};
+        CREATE TABLE {outputTableName}
+            AS SELECT   {", ".join(columns)}
+            FROM {tableName}
+            WHERE {WIND_DIR_FIELD} = {wind_dir}
+        """)
+    
+    return outputTableName
+
+def calc_distance_max(cursor, park_boundaries):
+    """ Calculates the maximum distance where a park can have an impact 
+    outside its boundaries (diagonal of the park envelope, bounded by
+    MIN_PARK_BUFFER_DIST). If there are several parks, the maximum of
+    all parks is returned.
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _ 
+
+			cursor: conn.cursor
+				A cursor object, used to perform queries
+			park_boundaries: String
+				Name of the table containing the park boundaries
+        
+		Returns
+		_ _ _ _ _ _ _ _ _ _ 
+
+            distance_max: float
+                Maximum distance where the park can have an impact outside its boundaries"""
+    cursor.execute(
+        f"""
+        SELECT MAX(SQRT(POWER(ST_XMAX({GEOM_FIELD})-ST_XMIN({GEOM_FIELD}),2)
+                        +POWER(ST_YMAX({GEOM_FIELD})-ST_YMIN({GEOM_FIELD}),2)))
+        FROM {park_boundaries}
+        """)
+    distance_max = cursor.fetchall()[0][0]
+    
+    return max(distance_max, MIN_PARK_BUFFER_DIST)
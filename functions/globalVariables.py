@@ -11,6 +11,8 @@ import tempfile
 import os
 from pathlib import Path
 
+from .CoefficientTables import LazyTables
+
 DEFAULT_SCENARIO = "Reference_scenario"
 DEFAULT_WEATHER = "Reference_weather"
 
@@ -20,12 +22,36 @@ DELETE_OUTPUT_IF_EXISTS = True
 # Output folder names
 OUTPUT_PREPROCESSOR_FOLDER = "1_Prepared_data"
 OUTPUT_PROCESSOR_FOLDER = "2_Calculated_park_effects"
+# Checkpoints of an unfinished preparation (removed once the scenario is
+# prepared): list of the stages done, database after the building stage and
+# outputs of each wind direction
+CHECKPOINT_FOLDER = "checkpoints"
+CHECKPOINT_FILE = "CHECKPOINTS.json"
+CHECKPOINT_DATABASE_FILE = "DATABASE.zip"
+# Checkpoints of the building stage are in their own folder since they only
+# depend on the settings of the building stage (the park covers being
+# loaded after this stage): preparations differing only by their park
+# covers or their wind direction settings can share them
+CHECKPOINT_BUILDINGS_FOLDER = "checkpoints_buildings"
+BUILDING_STAGE_SETTINGS = ["buildingFilePath", "parkBoundaryFilePath", "srid",
+                           "build_height", "build_age", "build_wwr",
+                           "build_shutter", "build_nat_ventil",
+                           "default_build_height", "default_build_age",
+                           "default_build_wwr", "default_build_shutter",
+                           "default_build_nat_ventil"]
 
 # File base names
 OUTPUT_T = "OUTPUT_T"
 OUTPUT_DT = "OUTPUT_deltaT"
 WIND_DIR_RATE = "WIND_DIR"
 BUILD_INDEP_VAR = "BUILD_INDEP_VAR"
+# Single file gathering the prepared scenario (grid and indicators of all
+# wind directions, building indicators and park boundaries)
+PREPARED_SCENARIO_FILE = "PREPARED_SCENARIO.gpkg"
+PREPARATION_SETTINGS_FILE = "PREPARATION_SETTINGS.json"
+# Also export the grid and indicators of each wind direction as .geojson
+# and .csv files (the prepared scenario file is always written)
+SAVE_DIRECTION_FILES = False
 
 # Informations to set the DB used for geographical calculations
 INSTANCE_NAME = "coolparks"
@@ -34,6 +60,33 @@ INSTANCE_PASS = "sa"
 NEW_DB = True
 ADD_SUFFIX_NAME = True
 
+# Number of rows sent at once to the DB when bulk inserting Python data
+BULK_INSERT_BATCH_SIZE = 5000
+# Number of rows fetched at once from the DB when reading a table in Python
+BULK_FETCH_BATCH_SIZE = 50000
+
+# Local catalog recording each preprocessing, processing and comparison run
+# (inputs hashes, outputs, summary statistics and timings)
+UPDATE_CATALOG = True
+CATALOG_FILE = os.path.join(str(Path.home()), ".coolparks", "SCENARIO_CATALOG.sqlite")
+
+# Durations of the calculation steps recorded after each run (used to
+# estimate the remaining time of the next runs): number of recent runs used
+# for each step and minimum period between two remaining time messages (s)
+RECORD_TIMINGS = True
+TIMINGS_FILE = os.path.join(str(Path.home()), ".coolparks", "TIMINGS.sqlite")
+TIMINGS_HISTORY = 30
+PROGRESS_TEXT_PERIOD = 10
+
+# Local job service shared by several QGIS sessions: address, number of jobs
+# run at the same time, polling period of the clients (s) and URL used by the
+# QGIS algorithms (jobs run within QGIS if not set)
+JOB_SERVICE_HOST = "127.0.0.1"
+JOB_SERVICE_PORT = 8765
+JOB_SERVICE_WORKERS = 2
+JOB_SERVICE_POLLING = 1
+JOB_SERVICE_URL = os.environ.get("COOLPARKS_JOB_SERVICE")
+
 # Where to save the current JAVA path
 JAVA_PATH_FILENAME = "JavaPath.csv"
 
@@ -43,6 +96,8 @@ TEMPO_DIRECTORY = tempfile.gettempdir()
 
 # Superimposition threshold accepted in park canopy and park ground data
 SUPERIMP_THRESH = 0.05
+# Number of polygons tested at once when looking for superimpositions
+SUPERIMP_BATCH_SIZE = 500
 
 # Merge building geometries as block when closer than 'GEOMETRY_MERGE_TOLERANCE'
 GEOMETRY_MERGE_TOLERANCE = 0.05
@@ -87,13 +142,19 @@ DEFAULT_CORRIDOR_AREA = -999
 # Table names
 BUILDINGS_TAB = "BUILDINGS"
 PARK_BOUNDARIES_TAB = "PARK_BOUNDARIES"
+PARK_BOUNDARIES_ALL_TAB = "PARK_BOUNDARIES_ALL"
 PARK_CANOPY = "PARK_CANOPY"
 PARK_GROUND = "PARK_GROUND"
+PARK_COVER_COMBI = "PARK_COVER_COMBINATION"
 BLOCK_TAB = "BLOCKS"
+FACADE_SEGMENTS_TAB = "FACADE_SEGMENTS"
+BUILDING_PROPERTIES_TAB = "BUILDING_PROPERTIES"
 OUTPUT_CITY_INDIC = "CITY_INDIC"
 OUTPUT_PARK_INDIC = "PARK_INDIC"
 OUTPUT_BUILD_INDIC = "BUILD_INDIC"
 OUTPUT_GRID = "OUTPUT_GRID"
+GRID_INDIC_TAB = "GRID_INDIC"
+GRID_LATTICE_TAB = "GRID_LATTICE"
 
 # Field names
 GEOM_FIELD = "THE_GEOM"
@@ -103,6 +164,8 @@ TYPE = "TYPE"
 ID_FIELD_BUILD = "ID_BUILD"
 ID_FIELD_BLOCK = "ID_BLOCK"
 ID_UPSTREAM = "ID_UPSTREAM"
+WIND_DIR_FIELD = "WIND_DIR"
+PARK_ID_FIELD = "PARK_ID"
 ID_STREET = "ID_STREET"
 COMBI_FIELD_BASE = "FRAC_{0}_COMBI"
 BLOCK_NB_DENSITY = "BLOCK_NB_DENSITY"
@@ -144,7 +207,43 @@ THERM_COMFORT_IMPACT_REL = "THERM_COMFORT_IMPACT_REL"
 # DB name
 DB_NAME = "coolparks"
 
-DEBUG = True
+# Keep all intermediate tables in the database (for debugging)
+DEBUG = False
+# Name of the report giving the database size after each preprocessing stage
+DB_SIZE_FILE = "DB_SIZE.csv"
+
+# Record the duration (and optionally the query plan) of each SQL query
+# of the preprocessing and save the report in the prepared data folder
+SQL_PROFILE = False
+SQL_PROFILE_EXPLAIN = False
+SQL_PROFILE_FILE = "SQL_PROFILE"
+
+# Calculates the city indicators of all wind directions in a single set of 
+# queries (corridors and obstacles of all directions stored in the same 
+# tables with a WIND_DIR key) instead of one set of queries per direction
+ALL_DIRECTIONS_AT_ONCE = False
+
+# Number of parks prepared in parallel in batch mode (each park is prepared
+# in its own copy of the database)
+PARK_BATCH_WORKERS = 4
+
+# When a weather file (or a wind rose) is given at preparation time, only
+# the wind directions having a relative weight higher than this threshold 
+# (for at least one time period) are prepared. The directions missing for a
+# later weather file are prepared on demand if LAZY_PREPARATION is True
+MIN_DIRECTION_WEIGHT = 0.
+LAZY_PREPARATION = True
+
+# Rule used where park influences overlap when combined in a single map
+# ("min", "sum" or "nearest")
+MOSAIC_RULE = "min"
+# Size of the tiles (pixels) used to stream the raster calculations and 
+# nodata value of the output rasters
+RASTER_BLOCK_SIZE = 512
+RASTER_NODATA = -9999
+# Maximum distance (pixels) used to fill the nodata pixels of the deltaT 
+# rasters before sampling them at the building centroids
+FILL_NODATA_MAX_DISTANCE = 100
 
 # Series of canopy and ground park types and combinations of each
 S_GROUND = pd.Series({1: "terre",
@@ -311,6 +410,7 @@ T_AIR = "Ta"
 RH = "RH"
 P_ATMO = "Patmo"
 DPV = "DPV"
+WIND_SECTOR = "wind_sector"
 
 # length of the edge of the pattern ("motif") used for creating the empirical models
 PATTERN_SIZE = 10
@@ -319,6 +419,13 @@ PATTERN_SIZE = 10
 DAY_TIME = 12
 NIGHT_TIME = 23
 
+# Weather files are read by chunks of WEATHER_CHUNK_SIZE rows, keeping only
+# the hours used by the calculations. The table read (with the derived
+# variables) is saved in the cache directory for the next calculations
+WEATHER_HOURS = [DAY_TIME, NIGHT_TIME]
+WEATHER_CHUNK_SIZE = 100000
+WEATHER_CACHE_DIRECTORY = os.path.join(str(Path.home()), ".coolparks", "weather")
+
 # Max distance for which the cooling is considered
 MAX_DIST = {DAY_TIME: 50, NIGHT_TIME: 300}
 
@@ -330,47 +437,32 @@ COOLING_FACTORS = {12 : pd.DataFrame({"dpv" : [11.8559505666779, 28.670673995194
                                       "ws" : [1.6, 4.6]},
                                      index = ["min", "max"])}
 
-# Empirical model coefficients for park cooling
+# Empirical model coefficients for park cooling (tables read on first use,
+# a binary copy being kept in the cache directory)
+COEFFICIENT_CACHE_DIRECTORY = os.path.join(str(Path.home()), ".coolparks", "coefficients")
 COOLING_CREATION_PATH = os.path.join(Path(os.path.dirname(os.path.abspath(__file__))).parents[0], "Resources", "empirical_coefficients", "cooling_creation")
-COEF_COOLING_RATE = {DAY_TIME: pd.read_csv(COOLING_CREATION_PATH + os.sep + f"cooling_rate_{DAY_TIME}.csv",
-                                           header = 0,
-                                           index_col = 0),
-                     NIGHT_TIME : pd.read_csv(COOLING_CREATION_PATH + os.sep + f"cooling_rate_{NIGHT_TIME}.csv",
-                                              header = 0,
-                                              index_col = 0)}
-COEF_SURF_TEMP = {DAY_TIME: pd.read_csv(COOLING_CREATION_PATH + os.sep + f"surface_temp_{DAY_TIME}.csv",
-                                        header = 0,
-                                        index_col = 0),
-                  NIGHT_TIME : pd.read_csv(COOLING_CREATION_PATH + os.sep + f"surface_temp_{NIGHT_TIME}.csv",
-                                           header = 0,
-                                           index_col = 0)}
+COEF_COOLING_RATE = LazyTables({DAY_TIME: COOLING_CREATION_PATH + os.sep + f"cooling_rate_{DAY_TIME}.csv",
+                                NIGHT_TIME: COOLING_CREATION_PATH + os.sep + f"cooling_rate_{NIGHT_TIME}.csv"},
+                               cacheDirectory = COEFFICIENT_CACHE_DIRECTORY)
+COEF_SURF_TEMP = LazyTables({DAY_TIME: COOLING_CREATION_PATH + os.sep + f"surface_temp_{DAY_TIME}.csv",
+                             NIGHT_TIME: COOLING_CREATION_PATH + os.sep + f"surface_temp_{NIGHT_TIME}.csv"},
+                            cacheDirectory = COEFFICIENT_CACHE_DIRECTORY)
 
 # Empirical model coefficients for park cool air diffusion
 WIND_FACTOR_NAME = "wind_factor"
 CONSTANT_NAME = "constant"
 COOLING_TRANSPORT_PATH = os.path.join(Path(os.path.dirname(os.path.abspath(__file__))).parents[0], "Resources", "empirical_coefficients", "cooled_air_transport")
-COEF_DT_MORPHO = {DAY_TIME: pd.read_csv(COOLING_TRANSPORT_PATH + os.sep + f"dt_morpho_{DAY_TIME}.csv",
-                                        header = 0,
-                                        index_col = 0),
-                  NIGHT_TIME : pd.read_csv(COOLING_TRANSPORT_PATH + os.sep + f"dt_morpho_{NIGHT_TIME}.csv",
-                                           header = 0,
-                                           index_col = 0)}
-COEF_D_MORPHO = {DAY_TIME: pd.read_csv(COOLING_TRANSPORT_PATH + os.sep + f"d_morpho_{DAY_TIME}.csv",
-                                       header = 0,
-                                       index_col = 0),
-                 NIGHT_TIME : pd.read_csv(COOLING_TRANSPORT_PATH + os.sep + f"d_morpho_{NIGHT_TIME}.csv",
-                                          header = 0,
-                                          index_col = 0)}
-
-# Maximum and minimum values achievable for the spatial indicators (due to training data calibration)
+COEF_DT_MORPHO = LazyTables({DAY_TIME: COOLING_TRANSPORT_PATH + os.sep + f"dt_morpho_{DAY_TIME}.csv",
+                             NIGHT_TIME: COOLING_TRANSPORT_PATH + os.sep + f"dt_morpho_{NIGHT_TIME}.csv"},
+                            cacheDirectory = COEFFICIENT_CACHE_DIRECTORY)
+COEF_D_MORPHO = LazyTables({DAY_TIME: COOLING_TRANSPORT_PATH + os.sep + f"d_morpho_{DAY_TIME}.csv",
+                            NIGHT_TIME: COOLING_TRANSPORT_PATH + os.sep + f"d_morpho_{NIGHT_TIME}.csv"},
+                           cacheDirectory = COEFFICIENT_CACHE_DIRECTORY)
+
+# Maximum and minimum values achievable for the spatial indicators (due to
+# training data calibration, see CoefficientTables.extremumValues)
 TRAINING_TRANSPORT_PATH = os.path.join(Path(os.path.dirname(os.path.abspath(__file__))).parents[0], "Resources", "cooling_transport_results")
-TRANSPORT_EXTREMUM_VAL = pd.concat([pd.read_csv(TRAINING_TRANSPORT_PATH + os.sep + f"training_data_{DAY_TIME}h.csv",
-                                                header = 0,
-                                                index_col = 0).max().rename("MAX"),
-                                    pd.read_csv(TRAINING_TRANSPORT_PATH + os.sep + f"training_data_{DAY_TIME}h.csv",
-                                                header = 0,
-                                                index_col = 0).min().rename("MIN")],
-                                   axis = 1)
+TRAINING_TRANSPORT_FILE = TRAINING_TRANSPORT_PATH + os.sep + f"training_data_{DAY_TIME}h.csv"
 
 # Empirical model coefficients for building energy and building thermal comfort
 BUILD_ENERGY_PATH = os.path.join(Path(os.path.dirname(os.path.abspath(__file__))).parents[0], "Resources", "empirical_coefficients", "building_energy")
@@ -409,3 +501,12 @@ NB_SIGN_DIGITS = 2
 REF_SCEN = "REFERENCE_SCENARIO"
 ALT_SCEN = "ALTERNATIVE_REFERENCE_SCENARIO"
 DIFF_SCEN = "DIFF_SCEN"
+# Comparison of several alternatives with a same reference scenario: number
+# of alternatives compared in parallel and name of the consolidated table
+COMPARISON_WORKERS = 4
+COMPARISON_MATRIX_FILE = "Comparison_matrix.csv"
+SCENARIO_FIELD = "SCENARIO"
+# Parameter sweep: number of processes running the calculations and name of
+# the results table
+SWEEP_WORKERS = 2
+SWEEP_RESULTS_FILE = "Sweep_results.csv"
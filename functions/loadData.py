@@ -79,4 +79,60 @@ def loadFile(cursor, filePath, tableName, srid = None, srid_repro = None):
                        tableName,
                        reproject_function,
                        reproject_srid))
-        
\ No newline at end of file
+        
+def insertRows(cursor, tableName, columns, rows, srid = None,
+               batchSize = BULK_INSERT_BATCH_SIZE):
+    """ Create a table and fill it with data coming from Python using batched
+    prepared statements. Geometries are sent as WKB (much faster to parse
+    for the DB than a huge WKT 'INSERT INTO ... VALUES' query)
+    
+		Parameters
+		_ _ _ _ _ _ _ _ _ _ 
+
+            cursor: conn.cursor
+                A cursor object, used to perform spatial SQL queries
+            tableName: String
+                Name of the table to create (dropped first if already exists)
+            columns: list of tuples
+                Name and SQL type of each column of the table 
+                (e.g. [("THE_GEOM", "GEOMETRY"), ("ID", "INT")])
+            rows: iterable of tuples
+                Values to insert (one tuple per row, ordered as 'columns'). 
+                Values of 'GEOMETRY' columns should be shapely geometries
+            srid: int, default None
+                SRID to set to the geometries
+            batchSize: int, default BULK_INSERT_BATCH_SIZE
+                Number of rows sent to the DB at once
+            
+		Returns
+		_ _ _ _ _ _ _ _ _ _ 
+
+            None"""
+    # Identify the geometry columns (converted to WKB before being sent)
+    isGeom = [colType.upper() == "GEOMETRY" for colName, colType in columns]
+    if srid is None:
+        srid = 0
+    
+    cursor.execute("""
+       DROP TABLE IF EXISTS {0};
+       CREATE TABLE {0}({1});
+       """.format(tableName, 
+                  ", ".join([f"{colName} {colType}" for colName, colType in columns])))
+    
+    # Hexadecimal WKB strings are converted back to binary by the DB
+    placeholders = [f"ST_SETSRID(ST_GEOMFROMWKB(CAST(? AS BINARY)), {srid})" if g else "?"
+                        for g in isGeom]
+    query = "INSERT INTO {0} VALUES ({1})".format(tableName, ", ".join(placeholders))
+    
+    batch = []
+    for row in rows:
+        # NumPy scalars are not understood by the JDBC driver
+        batch.append(tuple([val.wkb_hex if g and val is not None 
+                            else val.item() if isinstance(val, np.generic)
+                            else val
+                                for val, g in zip(row, isGeom)]))
+        if len(batch) >= batchSize:
+            cursor.executemany(query, batch)
+            batch = []
+    if batch:
+        cursor.executemany(query, batch)
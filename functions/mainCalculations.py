@@ -9,27 +9,106 @@ Created on Tue Jun 13 12:30:25 2023
 import tempfile
 import numpy as np
 import os
+import shutil
 import time
+import threading
 from pathlib import Path
 import geopandas as gpd
 import pandas as pd
-import datetime
-import processing
 from shapely.geometry import Polygon
-from qgis.core import QgsCoordinateReferenceSystem, QgsProcessingException
-from qgis.analysis import QgsNativeAlgorithms
 from osgeo import gdal
-import pytz
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from . import coolparks_prepare as prep_fct
 from . import coolparks_calc as calc_fct
 from .globalVariables import *
 from . import H2gisConnection
 from . import Obstacles
-from .DataUtil import getColumns, round_to
+from .DataUtil import getColumns, round_to, fetchDataFrame, QgsProcessingException
 from . import saveData
+from . import SqlProfiler
+from . import PreparedScenario
+from . import RasterUtil
+from . import ScenarioCatalog
+from . import Checkpoints
+from . import ProgressModel
+from . import WeatherReaders
+from .TableLifecycle import TableLifecycle
     
 
+def prepareScenario(output_directory, prefix, feedback = None, **kwargs):
+    """ Creates the folders of a new scenario, prepares its data (see 
+    'prepareData') and records the preparation in the scenario catalog
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _ 
+
+            output_directory: String
+                Directory where is created the scenario folder
+            prefix: String
+                Name of the scenario (name of its folder)
+            feedback: QgsProcessingFeedback, default None
+                Object used to report progress and to check cancellation
+            kwargs:
+                Other arguments of 'prepareData' (the scenario folder may
+                already exist if 'resume' is True)
+
+		Returns
+		_ _ _ _ _ _ _ _ _ _ 
+
+            cursor: conn.cursor
+                A cursor object, used to perform spatial SQL queries
+            output: String or dictionary
+                Output of 'prepareData' (None if the calculation has been cancelled)"""
+    # Creates the output folder if it does not exist
+    if not os.path.exists(output_directory):
+        if os.path.exists(Path(output_directory).parent.absolute()):
+            os.mkdir(output_directory)
+        else:
+            raise QgsProcessingException('The output directory does not exist, neither its parent directory')
+    # Create the folder for the scenario to be run (an interrupted
+    # preparation continues in its existing folder)
+    if os.path.exists(output_directory + os.path.sep + prefix) and not kwargs.get("resume"):
+        raise QgsProcessingException(f'The folder "{prefix}" already exists in "{output_directory}" directory. Please change "Scenario name" or remove the corresponding directory')
+    
+    # Create the output folder for the preprocessors and processors
+    os.makedirs(output_directory + os.path.sep + prefix + os.sep + OUTPUT_PREPROCESSOR_FOLDER, exist_ok = True)
+    os.makedirs(output_directory + os.path.sep + prefix + os.sep + OUTPUT_PROCESSOR_FOLDER, exist_ok = True)
+    
+    # Make the calculations
+    started = time.time()
+    result = prepareData(output_directory = output_directory,
+                         prefix = prefix,
+                         feedback = feedback,
+                         **kwargs)
+    if not result:
+        return None
+    cursor, output = result
+    
+    # Record the preprocessing (of each park in batch mode) in the scenario catalog
+    if isinstance(output, dict):
+        preparedDirectories = list(output.values())
+    else:
+        preparedDirectories = [output_directory + os.sep + prefix + os.sep + OUTPUT_PREPROCESSOR_FOLDER]
+    for preparedDirectory in preparedDirectories:
+        settings = PreparedScenario.readSettings(preparedDirectory)
+        ScenarioCatalog.recordRun(kind = ScenarioCatalog.PREPARATION,
+                                  outputDirectory = preparedDirectory,
+                                  scenario = Path(preparedDirectory).parent.name,
+                                  scenarioDirectory = str(Path(preparedDirectory).parent),
+                                  inputs = {"buildings": kwargs.get("buildingFilePath"),
+                                            "park_boundaries": kwargs.get("parkBoundaryFilePath"),
+                                            "park_canopy": kwargs.get("parkCanopyFilePath"),
+                                            "park_ground": kwargs.get("parkGroundFilePath")},
+                                  outputs = {"prepared_scenario": preparedDirectory + os.sep + PREPARED_SCENARIO_FILE,
+                                             "settings": preparedDirectory + os.sep + PREPARATION_SETTINGS_FILE,
+                                             "db_size": preparedDirectory + os.sep + DB_SIZE_FILE},
+                                  statistics = {"directions": settings["directions"] if settings else None},
+                                  started = started,
+                                  duration = time.time() - started)
+    
+    return cursor, output
+
 def prepareData(plugin_directory, 
                 buildingFilePath,
                 parkBoundaryFilePath,
@@ -52,13 +131,76 @@ def prepareData(plugin_directory,
                 nCrossWind = N_CROSS_WIND_PARK,
                 feedback = None,
                 output_directory = TEMPO_DIRECTORY,
-                prefix = DEFAULT_SCENARIO):
+                prefix = DEFAULT_SCENARIO,
+                profile = SQL_PROFILE,
+                allDirectionsAtOnce = ALL_DIRECTIONS_AT_ONCE,
+                parkBatch = False,
+                nWorkers = PARK_BATCH_WORKERS,
+                weatherFilePath = None,
+                windRose = None,
+                minDirectionWeight = MIN_DIRECTION_WEIGHT,
+                directions = None,
+                resume = False,
+                closeInstance = False,
+                buildingsCheckpoint = None):
     
     # Define the entire output directory path
     final_output_dir = output_directory+os.sep+prefix+os.sep+OUTPUT_PREPROCESSOR_FOLDER
     
-    # Define temporary tables
-    city_all_indic = "CITY_ALL_INDIC"
+    # Settings saved with the prepared scenario (needed to prepare later on
+    # the wind directions which are not prepared now)
+    settings = {"plugin_directory": plugin_directory,
+                "buildingFilePath": buildingFilePath,
+                "parkBoundaryFilePath": parkBoundaryFilePath,
+                "parkCanopyFilePath": parkCanopyFilePath,
+                "parkGroundFilePath": parkGroundFilePath,
+                "srid": srid,
+                "canopy_cover_type": canopy_cover_type,
+                "ground_cover_type": ground_cover_type,
+                "build_height": build_height,
+                "build_age": build_age,
+                "build_wwr": build_wwr,
+                "build_shutter": build_shutter,
+                "build_nat_ventil": build_nat_ventil,
+                "default_build_height": default_build_height,
+                "default_build_age": default_build_age,
+                "default_build_wwr": default_build_wwr,
+                "default_build_shutter": default_build_shutter,
+                "default_build_nat_ventil": default_build_nat_ventil,
+                "nAlongWind": nAlongWind,
+                "nCrossWind": nCrossWind,
+                "allDirectionsAtOnce": allDirectionsAtOnce}
+    
+    # Only the wind directions having a significant weight in the weather
+    # data (or in the wind rose) are prepared
+    if directions is None:
+        directions = np.arange(0, 360, 360 / N_DIRECTIONS)
+        if weatherFilePath:
+            df_met, utc = WeatherReaders.readWeather(weatherFilePath = weatherFilePath)
+            windRose = calc_fct.direction_weights(df_met = df_met,
+                                                  utc = utc,
+                                                  dirs = directions)
+        if windRose is not None:
+            directions = calc_fct.select_directions(weights = windRose,
+                                                    min_weight = minDirectionWeight)
+    if len(directions) == 0:
+        raise QgsProcessingException("No wind direction to prepare, decrease the minimum direction weight")
+    
+    # Steps of the preparation, their duration being estimated from the
+    # size of the building file (MB)
+    size = os.path.getsize(buildingFilePath) / 1e6 if os.path.isfile(buildingFilePath) else 1
+    # (the parks of a batch are added once identified)
+    if parkBatch:
+        steps = [("load", size), ("buildings", size), ("covers", size)]
+    else:
+        steps = [("load", size), ("buildings", size), ("covers", size)]\
+            + [("direction", size)] * len(directions)\
+            + [("city all directions", size * len(directions))] * allDirectionsAtOnce\
+            + [("save direction", size)] * len(directions)\
+            + [("save", size)]
+    progress = ProgressModel.ProgressModel(feedback = feedback,
+                                           kind = ProgressModel.PREPARATION,
+                                           steps = steps)
     
     ############################################################################
     ################################ SCRIPT ####################################
@@ -76,230 +218,1124 @@ def prepareData(plugin_directory,
     dBDir = os.path.join(plugin_directory, 'functions')
     #print(dBDir)
     if ADD_SUFFIX_NAME:
-        suffix = str(time.time()).replace(".", "_")
+        suffix = f'{os.getpid()}_{threading.get_ident()}_' + str(time.time()).replace(".", "_")
     else:
         suffix = ""
+    # Checkpoints of the preparation (an interrupted preparation restarts
+    # from the database saved after the building stage if resumed)
+    checkpoints = Checkpoints.Checkpoints(directory = output_directory + os.sep + prefix + os.sep + CHECKPOINT_FOLDER,
+                                          inputs = dict(settings, parkBatch = parkBatch),
+                                          resume = resume,
+                                          feedback = feedback)
+    # The building stage checkpoint only depends on the building stage 
+    # settings, it may thus be shared by other preparations (it is then
+    # used even if the preparation is not resumed, and kept once done)
+    buildingInputs = dict({n: settings[n] for n in BUILDING_STAGE_SETTINGS},
+                          parkBatch = parkBatch)
+    if buildingsCheckpoint:
+        buildingCheckpoints = Checkpoints.Checkpoints(directory = buildingsCheckpoint,
+                                                      inputs = buildingInputs,
+                                                      resume = True,
+                                                      feedback = feedback)
+    else:
+        buildingCheckpoints = Checkpoints.Checkpoints(directory = output_directory + os.sep + prefix + os.sep + CHECKPOINT_BUILDINGS_FOLDER,
+                                                      inputs = buildingInputs,
+                                                      resume = resume,
+                                                      feedback = feedback)
+    resumeBuildings = buildingCheckpoints.done("buildings")
+    if resumeBuildings:
+        H2gisConnection.restoreH2gisInstance(backupFile = buildingCheckpoints.output("buildings", "database"),
+                                             localH2InstanceDir = TEMPO_DIRECTORY + os.sep + INSTANCE_NAME + suffix)
     cursor, conn, localH2InstanceDir = \
         H2gisConnection.startH2gisInstance(dbDirectory = dBDir,
                                            dbInstanceDir = TEMPO_DIRECTORY,
-                                           suffix = suffix)
+                                           suffix = suffix,
+                                           newDB = not resumeBuildings)
+    try:
+        # Wraps the cursor to record the duration of each query
+        if profile:
+            cursor = SqlProfiler.ProfilingCursor(cursor = cursor,
+                                                 connection = conn,
+                                                 explain = SQL_PROFILE_EXPLAIN)
     
-    if feedback:
-        feedback.setProgressText('Load and test input data')
-        if feedback.isCanceled():
-            feedback.setProgressText("Calculation cancelled by user")
-            return {}
-    # Load park boundaries, park ground and canopy layers and building tables
-    tempo_park_canopy, tempo_park_ground, tempo_build = \
-        prep_fct.loadInputData(cursor = cursor, 
-                               parkBoundaryFilePath = parkBoundaryFilePath,
-                               parkGroundFilePath = parkGroundFilePath, 
-                               parkCanopyFilePath = parkCanopyFilePath, 
-                               buildingFilePath = buildingFilePath, 
-                               srid = srid,
-                               canopy_cover_type = canopy_cover_type,
-                               ground_cover_type = ground_cover_type,
-                               build_height = build_height,
-                               build_age = build_age,
-                               build_wwr = build_wwr,
-                               build_shutter = build_shutter,
-                               build_nat_ventil = build_nat_ventil)
+        # Drops the intermediate tables of each stage once its outputs are consumed
+        lifecycle = TableLifecycle(cursor = cursor,
+                                   dbFilePath = localH2InstanceDir + H2gisConnection.DB_EXTENSION,
+                                   keep = DEBUG)
+    
+        if resumeBuildings:
+            if feedback:
+                feedback.setProgressText('Resume the preparation from the building stage checkpoint')
+            values = buildingCheckpoints.get("buildings")
+            buildings, blocks, facades, building_indic = \
+                [values[t] for t in ["buildings", "blocks", "facades", "building_indic"]]
+            distance_max = values["distance_max"]
+        else:
+            if feedback:
+                feedback.setProgressText('Load and test input data')
+                if feedback.isCanceled():
+                    feedback.setProgressText("Calculation cancelled by user")
+                    return {}
+            progress.start("load")
+            with lifecycle.stage("load") as stage:
+                # Load park boundaries and building tables
+                tempo_build = prep_fct.loadInputData(cursor = cursor, 
+                                                     parkBoundaryFilePath = parkBoundaryFilePath,
+                                                     buildingFilePath = buildingFilePath, 
+                                                     srid = srid,
+                                                     build_height = build_height,
+                                                     build_age = build_age,
+                                                     build_wwr = build_wwr,
+                                                     build_shutter = build_shutter,
+                                                     build_nat_ventil = build_nat_ventil)
+                
+                # Update column names if needed
+                if build_height:
+                    build_height = HEIGHT_FIELD
+                if build_age:
+                    build_age = BUILDING_AGE
+                if build_wwr:
+                    build_wwr = BUILDING_WWR
+                if build_shutter:
+                    build_shutter = BUILDING_SHUTTER
+                if build_nat_ventil:
+                    build_nat_ventil = BUILDING_NATURAL_VENT_RATE
             
-    # Update column names if needed
-    if build_height:
-        build_height = HEIGHT_FIELD
-    if build_age:
-        build_age = BUILDING_AGE
-    if build_wwr:
-        build_wwr = BUILDING_WWR
-    if build_shutter:
-        build_shutter = BUILDING_SHUTTER
-    if build_nat_ventil:
-        build_nat_ventil = BUILDING_NATURAL_VENT_RATE
-        
-    # Modify and filter input data
-    distance_max =  prep_fct.modifyInputData(cursor = cursor, 
-                                             tempo_park_canopy = tempo_park_canopy, 
-                                             tempo_park_ground = tempo_park_ground, 
-                                             tempo_build = tempo_build,
-                                             build_height = build_height,
-                                             build_age = build_age,
-                                             build_wwr = build_wwr,
-                                             build_shutter = build_shutter,
-                                             build_nat_ventil = build_nat_ventil,
-                                             default_build_height = default_build_height, 
-                                             default_build_age = default_build_age,
-                                             default_build_wwr = default_build_wwr,
-                                             default_build_shutter = default_build_shutter,
-                                             default_build_nat_ventil = default_build_nat_ventil)
-
-    # Test input data
-    prep_fct.testInputData(cursor = cursor)
+                # Modify and filter input data
+                distance_max =  prep_fct.modifyInputData(cursor = cursor, 
+                                                         tempo_build = tempo_build,
+                                                         build_height = build_height,
+                                                         build_age = build_age,
+                                                         build_wwr = build_wwr,
+                                                         build_shutter = build_shutter,
+                                                         build_nat_ventil = build_nat_ventil,
+                                                         default_build_height = default_build_height, 
+                                                         default_build_age = default_build_age,
+                                                         default_build_wwr = default_build_wwr,
+                                                         default_build_shutter = default_build_shutter,
+                                                         default_build_nat_ventil = default_build_nat_ventil)
     
+                # Test input data
+                prep_fct.testInputData(cursor = cursor,
+                                       singlePark = not parkBatch)
+                stage.keep(BUILDINGS_TAB, PARK_BOUNDARIES_TAB)
+            progress.finish()
     
-    if feedback:
-        feedback.setProgressText('Calculates building indicators')
-        if feedback.isCanceled():
-            feedback.setProgressText("Calculation cancelled by user")
+    
+            if feedback:
+                feedback.setProgressText('Calculates building indicators')
+                if feedback.isCanceled():
+                    feedback.setProgressText("Calculation cancelled by user")
+                    return {}
+            progress.start("buildings")
+            with lifecycle.stage("buildings") as stage:
+                # Calculates blocks from building geometries
+                buildings, blocks = prep_fct.createsBlocks(cursor = cursor,
+                                                           inputBuildings = BUILDINGS_TAB)
+        
+                # Splits facades into segments (shared or not with other buildings)
+                facades = prep_fct.calc_facade_segments(cursor = cursor,
+                                                        buildings = buildings)
+        
+                # Calculates buildings indicators
+                building_indic = prep_fct.calc_build_indic(cursor = cursor,
+                                                           buildings = buildings,
+                                                           blocks = blocks,
+                                                           facades = facades,
+                                                           prefix = prefix)
+                stage.keep(buildings, blocks, facades, building_indic)
+            progress.finish()
+        
+            # Save the database (the preparation can restart from here)
+            backupFile = H2gisConnection.backupH2gisInstance(cur = cursor,
+                                                             localH2InstanceDir = localH2InstanceDir)
+            shutil.move(backupFile, buildingCheckpoints.path(CHECKPOINT_DATABASE_FILE))
+            buildingCheckpoints.record("buildings",
+                                       outputs = {"database": CHECKPOINT_DATABASE_FILE},
+                                       values = {"buildings": buildings,
+                                                 "blocks": blocks,
+                                                 "facades": facades,
+                                                 "building_indic": building_indic,
+                                                 "distance_max": float(distance_max)})
+        
+        # The park covers are loaded after the building stage checkpoint
+        # (they only feed the cover combination and the park fractions)
+        if feedback:
+            feedback.setProgressText('Load and test park covers')
+            if feedback.isCanceled():
+                feedback.setProgressText("Calculation cancelled by user")
+                return {}
+        progress.start("covers")
+        with lifecycle.stage("covers") as stage:
+            tempo_park_canopy, tempo_park_ground = \
+                prep_fct.loadParkCovers(cursor = cursor,
+                                        parkGroundFilePath = parkGroundFilePath, 
+                                        parkCanopyFilePath = parkCanopyFilePath, 
+                                        srid = srid,
+                                        canopy_cover_type = canopy_cover_type,
+                                        ground_cover_type = ground_cover_type)
+            prep_fct.modifyParkCovers(cursor = cursor,
+                                      tempo_park_canopy = tempo_park_canopy,
+                                      tempo_park_ground = tempo_park_ground)
+            prep_fct.testParkCovers(cursor = cursor)
+            
+            # Combines park ground and canopy covers (independent of the wind direction)
+            cover_combination = prep_fct.calc_park_cover_combination(cursor = cursor,
+                                                                     ground_cover = PARK_GROUND,
+                                                                     canopy_cover = PARK_CANOPY)
+            stage.keep(cover_combination)
+        progress.finish()
+    
+        if parkBatch:
+            # Each park is prepared in its own copy of the database
+            output = prepareParks(cursor = cursor,
+                                  dbDirectory = dBDir,
+                                  localH2InstanceDir = localH2InstanceDir,
+                                  buildings = buildings,
+                                  blocks = blocks,
+                                  facades = facades,
+                                  building_indic = building_indic,
+                                  cover_combination = cover_combination,
+                                  srid = srid,
+                                  nCrossWind = nCrossWind,
+                                  output_directory = output_directory,
+                                  prefix = prefix,
+                                  feedback = feedback,
+                                  profile = profile,
+                                  allDirectionsAtOnce = allDirectionsAtOnce,
+                                  nWorkers = nWorkers,
+                                  directions = directions,
+                                  settings = settings,
+                                  checkpoints = checkpoints,
+                                  progress = progress)
+        else:
+            output = prepareDirections(cursor = cursor,
+                                       lifecycle = lifecycle,
+                                       buildings = buildings,
+                                       blocks = blocks,
+                                       facades = facades,
+                                       building_indic = building_indic,
+                                       cover_combination = cover_combination,
+                                       srid = srid,
+                                       distance_max = distance_max,
+                                       nCrossWind = nCrossWind,
+                                       final_output_dir = final_output_dir,
+                                       prefix = prefix,
+                                       feedback = feedback,
+                                       profile = profile,
+                                       allDirectionsAtOnce = allDirectionsAtOnce,
+                                       directions = directions,
+                                       settings = settings,
+                                       checkpoints = checkpoints,
+                                       progress = progress)
+        if output is None:
             return {}
-    # Calculates blocks from building geometries
-    buildings, blocks = prep_fct.createsBlocks(cursor = cursor,
-                                               inputBuildings = BUILDINGS_TAB)
     
-    # Calculates buildings indicators
-    building_indic = prep_fct.calc_build_indic(cursor = cursor,
-                                               buildings = buildings,
-                                               blocks = blocks,
-                                               prefix = prefix)
+        # The scenario is prepared, the checkpoints are not needed anymore
+        # (except the shared building stage checkpoint)
+        checkpoints.clear()
+        if not buildingsCheckpoint:
+            buildingCheckpoints.clear()
     
-    # Save building indicators
-    saveData.saveTable(cursor = cursor,
-                       tableName = building_indic, 
-                       filedir = f"""{final_output_dir+os.sep}{OUTPUT_BUILD_INDIC}.geojson""", 
-                       delete = True)
+        # Record the duration of each step (used to estimate the next ones)
+        progress.save()
+    
+        # Save the SQL profile of the preprocessing
+        if profile:
+            cursor.writeReport(final_output_dir + os.sep + SQL_PROFILE_FILE)
+    
+        # Save the database size after each stage
+        lifecycle.writeReport(final_output_dir + os.sep + DB_SIZE_FILE)
+        
+        return cursor, output
+    finally:
+        # The database is removed when the caller does not use it
+        if closeInstance:
+            H2gisConnection.closeAndRemoveH2gisInstance(localH2InstanceDir = localH2InstanceDir,
+                                                        conn = conn,
+                                                        cur = cursor)
+
+def prepareDirections(cursor, lifecycle, buildings, blocks, facades, 
+                      building_indic, cover_combination, srid, distance_max,
+                      nCrossWind, final_output_dir, prefix, feedback = None,
+                      profile = SQL_PROFILE, 
+                      allDirectionsAtOnce = ALL_DIRECTIONS_AT_ONCE,
+                      directions = None, settings = None, checkpoints = None,
+                      progress = None):
+    """ Calculates the park and city indicators of the corridors of each
+    wind direction for the park contained in the PARK_BOUNDARIES table and
+    save them (as well as the building indicators) in the prepared scenario.
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _ 
+
+            cursor: conn.cursor
+                A cursor object, used to perform spatial SQL queries
+            lifecycle: TableLifecycle
+                Object dropping the tables of each stage once consumed
+            buildings: String
+                Name of the building table
+            blocks: String
+                Name of the block table
+            facades: String
+                Name of the facade segment table
+            building_indic: String
+                Name of the building indicator table
+            cover_combination: String
+                Name of the park ground and canopy cover combination table
+            srid: int
+                EPSG code of the input data
+            distance_max: float
+                Maximum distance where the park can have an impact outside its boundaries
+            nCrossWind: int
+                Number of cross-wind corridors in the park
+            final_output_dir: String
+                Directory where the prepared scenario is saved
+            prefix: String
+                Name of the scenario (used as table name prefix)
+            feedback: QgsProcessingFeedback, default None
+                Object used to report progress and to check cancellation
+            profile: boolean, default SQL_PROFILE
+                Whether or not the cursor records the queries (ProfilingCursor)
+            allDirectionsAtOnce: boolean, default ALL_DIRECTIONS_AT_ONCE
+                Whether or not the city indicators of all directions are 
+                calculated at once
+            directions: list of float, default None
+                Wind directions to prepare (N_DIRECTIONS directions if None)
+            settings: dictionary, default None
+                Settings of the preparation, saved with the prepared 
+                directions in the scenario if not None
+            checkpoints: Checkpoints, default None
+                Checkpoints of the preparation: the outputs of each direction
+                are recorded and the directions already recorded are not
+                prepared again
+            progress: ProgressModel, default None
+                Progress of the preparation ("direction", "city all 
+                directions", "save direction" and "save" steps)
+            
+		Returns
+		_ _ _ _ _ _ _ _ _ _ 
+
+            city_all_indic: String
+                Name of the city indicator table of the last wind direction
+                (None if the calculation has been cancelled)"""
+    # Outputs of each wind direction (saved at the end in a single file)
+    prepared_lattices = {}
+    prepared_grids = {}
+    prepared_city = {}
+    prepared_park = {}
+    
+    # Define a set of obstacles in a dictionary before the rotation
+    dicOfTables = { BUILDINGS_TAB         : buildings,
+                    PARK_BOUNDARIES_TAB   : PARK_BOUNDARIES_TAB,
+                    PARK_COVER_COMBI      : cover_combination,
+                    BLOCK_TAB             : blocks,
+                    FACADE_SEGMENTS_TAB   : facades}
+    # Obstacles used only for the city indicators (rotated at once for all 
+    # directions when the city indicators are calculated for all directions at once)
+    cityObstacles = [BUILDINGS_TAB, BLOCK_TAB, FACADE_SEGMENTS_TAB]
+    if directions is None:
+        directions = np.arange(0, 360, 360 / N_DIRECTIONS)
+    if progress is None:
+        progress = ProgressModel.ProgressModel(feedback = None,
+                                               kind = ProgressModel.PREPARATION,
+                                               steps = [],
+                                               record = False)
+    
+    # The outputs of the directions recorded in the checkpoints are reloaded
+    toPrepare = []
+    for d in directions:
+        if checkpoints and checkpoints.done(Checkpoints.directionStage(d)):
+            containerPath = checkpoints.output(Checkpoints.directionStage(d), "container")
+            prepared_city[d] = gpd.read_file(containerPath, layer = OUTPUT_CITY_INDIC)
+            prepared_park[d] = gpd.read_file(containerPath, layer = OUTPUT_PARK_INDIC)
+            prepared_grids[d] = PreparedScenario.readAttributeTable(containerPath = containerPath,
+                                                                    tableName = GRID_INDIC_TAB)
+            prepared_lattices[d] = PreparedScenario.readAttributeTable(containerPath = containerPath,
+                                                                       tableName = GRID_LATTICE_TAB).iloc[0].to_dict()
+        else:
+            toPrepare.append(d)
+    if feedback and len(toPrepare) < len(directions):
+        feedback.setProgressText(f'{len(directions) - len(toPrepare)} directions resumed from the checkpoints')
+    
+    if allDirectionsAtOnce and toPrepare:
+        with lifecycle.stage("rotation all directions") as stage:
+            rotationCenterCoordinates = Obstacles.rotationCenter(cursor = cursor,
+                                                                 tables = dicOfTables.values())
+            dicRotatedAllDir = Obstacles.windRotationAllDirections(cursor = cursor,
+                                                                   dicOfInputTables = {t: dicOfTables[t] 
+                                                                                       for t in cityObstacles},
+                                                                   rotateAngles = toPrepare,
+                                                                   rotationCenterCoordinates = rotationCenterCoordinates)
+            stage.keep(*dicRotatedAllDir.values())
+    else:
+        rotationCenterCoordinates = None
     
     # ----------------------------------------------------------------------
     # FOR EACH WIND DIRECTION
-    # ----------------------------------------------------------------------        
-    for it, d in enumerate(np.arange(0, 360, 360 / N_DIRECTIONS)):
+    # ----------------------------------------------------------------------
+    rect_city = {}
+    crosswind_lines = {}
+    grid = {}
+    rect_park_frac = {}
+    city_all_indic = {}
+    for it, d in enumerate(toPrepare):
         if feedback:
-            feedback.setProgressText(f'Geography characterization for direction {d}° ({it+1}/{N_DIRECTIONS})')
+            feedback.setProgressText(f'Geography characterization for direction {d}° ({it+1}/{len(toPrepare)})')
             if feedback.isCanceled():
                 cursor.close()
                 feedback.setProgressText("Calculation cancelled by user")
-                return {}
-        
-        # ----------------------------------------------------------------------
-        # 2. ROTATE PARK AND BUILDINGS
-        # ---------------------------------------------------------------------- 
-        # Define a set of obstacles in a dictionary before the rotation
-        dicOfTables = { BUILDINGS_TAB         : buildings,
-                        PARK_BOUNDARIES_TAB   : PARK_BOUNDARIES_TAB,
-                        PARK_CANOPY           : PARK_CANOPY,
-                        PARK_GROUND           : PARK_GROUND,
-                        BLOCK_TAB             : blocks}
+                return None
+        if profile:
+            cursor.windDirection = d
         
-        # Rotate obstacles
-        dicRotatedTables, rotationCenterCoordinates = \
-            Obstacles.windRotation(cursor = cursor,
-                                   dicOfInputTables = dicOfTables,
-                                   rotateAngle = d,
-                                   rotationCenterCoordinates = None,
-                                   prefix = prefix)
+        progress.start("direction")
+        with lifecycle.stage(f"direction {d}") as stage:
+            # ----------------------------------------------------------------------
+            # 2. ROTATE PARK AND BUILDINGS
+            # ---------------------------------------------------------------------- 
+            # Rotate obstacles
+            if allDirectionsAtOnce:
+                dicToRotate = {t: dicOfTables[t] for t in dicOfTables if t not in cityObstacles}
+            else:
+                dicToRotate = dicOfTables
+            dicRotatedTables, rotationCenterCoordinates = \
+                Obstacles.windRotation(cursor = cursor,
+                                       dicOfInputTables = dicToRotate,
+                                       rotateAngle = d,
+                                       rotationCenterCoordinates = rotationCenterCoordinates,
+                                       prefix = prefix)
+            progress.advance(1 / 4)
+            
+            # ----------------------------------------------------------------------
+            # 3. DIVIDE PARKS AND SURROUNDING IN ALONG-WIND "CORRIDORS"
+            # ----------------------------------------------------------------------
+            rect_park, rect_city[d], grid[d], crosswind_lines[d], dx = \
+                prep_fct.creates_units_of_analysis(cursor = cursor, 
+                                                   park_boundary_tab = dicRotatedTables[PARK_BOUNDARIES_TAB],
+                                                   srid = srid, 
+                                                   nCrossWindTot = nCrossWind,
+                                                   wind_dir = d,
+                                                   distance_max = distance_max)
+            progress.advance(2 / 4)
+            
+            # ----------------------------------------------------------------------
+            # 4. CALCULATES FRACTION OF EACH COMBINATION OF GROUND / CANOPY TYPES
+            # ----------------------------------------------------------------------
+            rect_park_frac[d] = prep_fct.calc_park_fractions(cursor = cursor,
+                                                             rect_park = rect_park,
+                                                             cover_combination = dicRotatedTables[PARK_COVER_COMBI],
+                                                             wind_dir = d)
+            stage.keep(grid[d], rect_park_frac[d])
+            progress.advance(3 / 4)
+            
+            if allDirectionsAtOnce:
+                stage.keep(rect_city[d], crosswind_lines[d])
+            else:
+                city_all_indic[d] = calcCityIndicators(cursor = cursor,
+                                                       dicRotatedTables = dicRotatedTables,
+                                                       rect_city = rect_city[d],
+                                                       crosswind_lines = crosswind_lines[d],
+                                                       wind_dir = d,
+                                                       outputTableName = prefix + OUTPUT_CITY_INDIC + str(d).replace(".", "_"))
+                stage.keep(city_all_indic[d])
+        progress.finish()
     
+    # Calculates the city indicators of all directions at once
+    if allDirectionsAtOnce and toPrepare:
+        if feedback:
+            feedback.setProgressText('City characterization for all directions')
+            if feedback.isCanceled():
+                cursor.close()
+                feedback.setProgressText("Calculation cancelled by user")
+                return None
+        if profile:
+            cursor.windDirection = None
+        progress.start("city all directions")
+        with lifecycle.stage("city all directions",
+                             consumes = list(rect_city.values())\
+                                 + list(crosswind_lines.values())\
+                                 + list(dicRotatedAllDir.values())) as stage:
+            city_all_indic_all_dir = \
+                calcCityIndicators(cursor = cursor,
+                                   dicRotatedTables = dicRotatedAllDir,
+                                   rect_city = prep_fct.gatherDirections(cursor = cursor,
+                                                                         dicOfTables = rect_city,
+                                                                         outputTableName = "RECT_COORD_CITY_UPSTREAM_ALL"),
+                                   crosswind_lines = prep_fct.gatherDirections(cursor = cursor,
+                                                                               dicOfTables = crosswind_lines,
+                                                                               outputTableName = "CROSSWIND_LINE_ALL"),
+                                   wind_dir = None,
+                                   outputTableName = prefix + OUTPUT_CITY_INDIC + "ALL")
+            for d in toPrepare:
+                city_all_indic[d] = prep_fct.extractDirection(cursor = cursor,
+                                                              tableName = city_all_indic_all_dir,
+                                                              wind_dir = d,
+                                                              outputTableName = prefix + OUTPUT_CITY_INDIC + str(d).replace(".", "_"))
+            stage.keep(*city_all_indic.values())
+        progress.finish()
         
-        # ----------------------------------------------------------------------
-        # 3. DIVIDE PARKS AND SURROUNDING IN ALONG-WIND "CORRIDORS"
-        # ----------------------------------------------------------------------
-        rect_park, rect_city, grid, crosswind_lines, dx = \
-            prep_fct.creates_units_of_analysis(cursor = cursor, 
-                                               park_boundary_tab = dicRotatedTables[PARK_BOUNDARIES_TAB],
-                                               srid = srid, 
-                                               nCrossWindTot = nCrossWind,
-                                               wind_dir = d,
-                                               distance_max = distance_max)
-        
-        # ----------------------------------------------------------------------
-        # 4. CALCULATES FRACTION OF EACH COMBINATION OF GROUND / CANOPY TYPES
-        # ----------------------------------------------------------------------
-        rect_park_frac = prep_fct.calc_park_fractions(cursor = cursor,
-                                                      rect_park = rect_park,
-                                                      ground_cover = dicRotatedTables[PARK_GROUND],
-                                                      canopy_cover = dicRotatedTables[PARK_CANOPY],
-                                                      wind_dir = d)
-        
-        # ----------------------------------------------------------------------
-        # 5. CALCULATES FRACTION OF BLOCKS AND DENSITY NUMBER
-        # ----------------------------------------------------------------------
-        rect_city_indic1 = prep_fct.calc_rect_block_indic(cursor = cursor,
-                                                          blocks = dicRotatedTables[BLOCK_TAB],
-                                                          rect_city = rect_city,
-                                                          wind_dir = d)
-
-        # ----------------------------------------------------------------------
-        # 6. CALCULATES MEAN BUILDING HEIGHT
-        # ----------------------------------------------------------------------
-        rect_city_indic2 = prep_fct.calc_rect_build_height(cursor = cursor,
-                                                           buildings = dicRotatedTables[BUILDINGS_TAB],
-                                                           rect_city = rect_city,
-                                                           wind_dir = d)    
+    # ----------------------------------------------------------------------
+    # 10. SAVE OUTPUTS
+    # ----------------------------------------------------------------------
+    for d in toPrepare:
+        if progress.isCanceled():
+            cursor.close()
+            feedback.setProgressText("Calculation cancelled by user")
+            return None
+        if profile:
+            cursor.windDirection = d
+        progress.start("save direction")
+        with lifecycle.stage(f"save direction {d}",
+                             consumes = [grid[d], city_all_indic[d], rect_park_frac[d]]):
+            tablesAndId = {grid[d] : ["ID_COL", ID_UPSTREAM],
+                           city_all_indic[d] : ["ID", ID_UPSTREAM],
+                           rect_park_frac[d] : ["ID", ID_UPSTREAM]}
+            output_grid = prep_fct.joinTables(cursor = cursor, 
+                                              tablesAndId = tablesAndId,
+                                              outputTableName = prefix + "grid_geom_n_indic" + str(d).replace(".", "_"))
+            # Grid points are stored as a lattice, the other outputs are rotated 
+            # back to their initial position
+            prepared_lattices[d] = PreparedScenario.gridLattice(cursor = cursor,
+                                                                gridTable = grid[d],
+                                                                srid = srid,
+                                                                windDirection = d,
+                                                                rotationCenterCoordinates = rotationCenterCoordinates)
+            grid_cols = getColumns(cursor = cursor,
+                                   tableName = output_grid)
+            grid_cols.remove(GEOM_FIELD)
+            prepared_grids[d] = fetchDataFrame(cursor = cursor,
+                                               query = f"""SELECT {d} AS {WIND_DIR_FIELD}, 
+                                                                  {",".join(grid_cols)} 
+                                                           FROM {output_grid}""")
+            prepared_city[d] = PreparedScenario.fetchLayer(cursor = cursor,
+                                                           tableName = city_all_indic[d],
+                                                           srid = srid,
+                                                           windDirection = d,
+                                                           rotationCenterCoordinates = rotationCenterCoordinates,
+                                                           rotateAngle = -d)
+            prepared_park[d] = PreparedScenario.fetchLayer(cursor = cursor,
+                                                           tableName = rect_park_frac[d],
+                                                           srid = srid,
+                                                           windDirection = d,
+                                                           rotationCenterCoordinates = rotationCenterCoordinates,
+                                                           rotateAngle = -d)
         
-        # ----------------------------------------------------------------------
-        # 7. CALCULATES STREET INDICATORS
-        # ----------------------------------------------------------------------
-        rect_city_indic3 = prep_fct.calc_street_indic(cursor = cursor,
-                                                      blocks = dicRotatedTables[BLOCK_TAB],
-                                                      rect_city = rect_city,
-                                                      crosswind_lines = crosswind_lines,
-                                                      wind_dir = d)
-            
-        # ----------------------------------------------------------------------
-        # 8. CALCULATES FACADE FRACTION INDICATOR
-        # ----------------------------------------------------------------------
-        rect_city_indic4 = prep_fct.generic_facade_indicators(cursor = cursor,
-                                                              buildings = dicRotatedTables[BUILDINGS_TAB],
-                                                              rsu = rect_city,
-                                                              indic = FREE_FACADE_FRACTION,
-                                                              wind_dir = d)
-
-        # ----------------------------------------------------------------------
-        # 9. GATHER ALL CITY INDICATORS
-        # ----------------------------------------------------------------------
-        tablesAndId = {rect_city_indic1 : ["ID", ID_UPSTREAM],
-                       rect_city_indic2 : ["ID", ID_UPSTREAM],
-                       rect_city_indic3 : ["ID", ID_UPSTREAM],
-                       rect_city_indic4 : ["ID", ID_UPSTREAM]}
-        city_all_indic = prep_fct.joinTables(cursor = cursor, 
-                                             tablesAndId = tablesAndId,
-                                             outputTableName = prefix + OUTPUT_CITY_INDIC + str(d).replace(".", "_"))
+        # Record the outputs of the direction in the checkpoints
+        if checkpoints:
+            containerName = f"""direction_{str(d).replace(".", "_")}.gpkg"""
+            PreparedScenario.writeContainer(containerPath = checkpoints.path(containerName),
+                                            layers = {OUTPUT_CITY_INDIC: prepared_city[d],
+                                                      OUTPUT_PARK_INDIC: prepared_park[d]},
+                                            attributeTables = {GRID_INDIC_TAB: prepared_grids[d],
+                                                               GRID_LATTICE_TAB: pd.DataFrame([prepared_lattices[d]])})
+            checkpoints.record(Checkpoints.directionStage(d),
+                               outputs = {"container": containerName})
         
-        # ----------------------------------------------------------------------
-        # 10. SAVE OUTPUTS
-        # ----------------------------------------------------------------------
-        tablesAndId = {grid : ["ID_COL", ID_UPSTREAM],
-                       city_all_indic : ["ID", ID_UPSTREAM],
-                       rect_park_frac : ["ID", ID_UPSTREAM]}
-        output_grid = prep_fct.joinTables(cursor = cursor, 
-                                          tablesAndId = tablesAndId,
-                                          outputTableName = prefix + "grid_geom_n_indic" + str(d).replace(".", "_"))
-        # Separate the grid geometry from the grid indicators
-        all_cols_without_geom = getColumns(cursor = cursor,
-                                           tableName = output_grid)
-        all_cols_without_geom.remove(GEOM_FIELD)
-        cursor.execute(f"""
-                       DROP TABLE IF EXISTS {OUTPUT_GRID + str(d).replace(".", "_")};
-                       CREATE TABLE {OUTPUT_GRID + str(d).replace(".", "_")}
-                           AS SELECT ID, {GEOM_FIELD}
-                           FROM {output_grid};
-                       CALL CSVWRITE('{final_output_dir+os.sep}{OUTPUT_GRID}_{str(d).replace(".", "_")}.csv',
-                                     '(SELECT {",".join(all_cols_without_geom)} FROM {output_grid})');
-                       """)
-        saveData.saveTable(cursor = cursor,
-                           tableName = OUTPUT_GRID + str(d).replace(".", "_"), 
-                           filedir = f"""{final_output_dir+os.sep}{OUTPUT_GRID}_{str(d).replace(".", "_")}.geojson""", 
-                           delete = True, 
-                           rotationCenterCoordinates = rotationCenterCoordinates, 
-                           rotateAngle = -d)
-        saveData.saveTable(cursor = cursor,
-                           tableName = city_all_indic, 
-                           filedir = f"""{final_output_dir+os.sep}{OUTPUT_CITY_INDIC}_{str(d).replace(".", "_")}.geojson""", 
-                           delete = True, 
-                           rotationCenterCoordinates = rotationCenterCoordinates, 
-                           rotateAngle = -d)
-        saveData.saveTable(cursor = cursor,
-                           tableName = rect_park_frac, 
-                           filedir = f"""{final_output_dir+os.sep}{OUTPUT_PARK_INDIC}_{str(d).replace(".", "_")}.geojson""", 
-                           delete = True, 
-                           rotationCenterCoordinates = rotationCenterCoordinates, 
-                           rotateAngle = -d)
-    
-    # Save also the park  in the output folder
+        # Export also the files of each direction if needed
+        if SAVE_DIRECTION_FILES:
+            prepared_grids[d].drop(columns = WIND_DIR_FIELD)\
+                .to_csv(f"""{final_output_dir+os.sep}{OUTPUT_GRID}_{str(d).replace(".", "_")}.csv""",
+                        index = False)
+            PreparedScenario.latticePoints(lattice = prepared_lattices[d],
+                                           df_indic = prepared_grids[d])\
+                .to_file(f"""{final_output_dir+os.sep}{OUTPUT_GRID}_{str(d).replace(".", "_")}.geojson""",
+                         driver = "GeoJSON")
+            prepared_city[d].drop(columns = WIND_DIR_FIELD)\
+                .to_file(f"""{final_output_dir+os.sep}{OUTPUT_CITY_INDIC}_{str(d).replace(".", "_")}.geojson""",
+                         driver = "GeoJSON")
+            prepared_park[d].drop(columns = WIND_DIR_FIELD)\
+                .to_file(f"""{final_output_dir+os.sep}{OUTPUT_PARK_INDIC}_{str(d).replace(".", "_")}.geojson""",
+                         driver = "GeoJSON")
+        progress.finish()
+    
+    # Save also the park and the building indicators in the output folder
     saveData.saveTable(cursor = cursor,
                        tableName = PARK_BOUNDARIES_TAB, 
                        filedir = f"""{final_output_dir+os.sep+PARK_BOUNDARIES_TAB}.geojson""", 
-                       delete = True)        
+                       delete = True)
+    saveData.saveTable(cursor = cursor,
+                       tableName = building_indic, 
+                       filedir = f"""{final_output_dir+os.sep}{OUTPUT_BUILD_INDIC}.geojson""", 
+                       delete = True)
+    
+    # Save all outputs of the preprocessing in a single file
+    if feedback:
+        feedback.setProgressText('Save the prepared scenario')
+    progress.start("save")
+    PreparedScenario.writeContainer(containerPath = final_output_dir + os.sep + PREPARED_SCENARIO_FILE,
+                                    layers = {OUTPUT_CITY_INDIC: pd.concat([prepared_city[d] for d in directions],
+                                                                           ignore_index = True),
+                                              OUTPUT_PARK_INDIC: pd.concat([prepared_park[d] for d in directions],
+                                                                           ignore_index = True),
+                                              OUTPUT_BUILD_INDIC: PreparedScenario.fetchLayer(cursor = cursor,
+                                                                                              tableName = building_indic,
+                                                                                              srid = srid),
+                                              PARK_BOUNDARIES_TAB: PreparedScenario.fetchLayer(cursor = cursor,
+                                                                                               tableName = PARK_BOUNDARIES_TAB,
+                                                                                               srid = srid)},
+                                    attributeTables = {GRID_INDIC_TAB: pd.concat([prepared_grids[d] for d in directions],
+                                                                                 ignore_index = True),
+                                                       GRID_LATTICE_TAB: pd.DataFrame([prepared_lattices[d] for d in directions])})
+    
+    # Save the settings and the prepared directions
+    if settings is not None:
+        PreparedScenario.writeSettings(preparedDirectory = final_output_dir,
+                                       settings = dict(settings,
+                                                       parkBoundaryFilePath = f"""{final_output_dir+os.sep+PARK_BOUNDARIES_TAB}.geojson""",
+                                                       directions = [float(d) for d in directions]))
+    progress.finish()
+    
+    return prefix + OUTPUT_CITY_INDIC + str(directions[-1]).replace(".", "_")
+
+def prepareParks(cursor, dbDirectory, localH2InstanceDir, buildings, blocks,
+                 facades, building_indic, cover_combination, srid, nCrossWind,
+                 output_directory, prefix, feedback = None, 
+                 profile = SQL_PROFILE, 
+                 allDirectionsAtOnce = ALL_DIRECTIONS_AT_ONCE,
+                 nWorkers = PARK_BATCH_WORKERS, directions = None,
+                 settings = None, checkpoints = None, progress = None):
+    """ Prepares a scenario for each park of the PARK_BOUNDARIES table.
+    The database (containing the building and park cover tables shared by
+    all parks) is copied once for each park and the parks are prepared in
+    parallel. The scenario of each park is saved in the folder
+    'prefix_parkId' of the output directory.
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _ 
+
+            cursor: conn.cursor
+                A cursor object, used to perform spatial SQL queries
+            dbDirectory: String
+                Directory where is stored the H2GIS jar
+            localH2InstanceDir: String
+                File directory of the database (without extension)
+            buildings: String
+                Name of the building table
+            blocks: String
+                Name of the block table
+            facades: String
+                Name of the facade segment table
+            building_indic: String
+                Name of the building indicator table
+            cover_combination: String
+                Name of the park ground and canopy cover combination table
+            srid: int
+                EPSG code of the input data
+            nCrossWind: int
+                Number of cross-wind corridors in the park
+            output_directory: String
+                Directory where are saved the scenarios
+            prefix: String
+                Name of the scenario (the park ID is added for each park)
+            feedback: QgsProcessingFeedback, default None
+                Object used to report progress and to check cancellation
+            profile: boolean, default SQL_PROFILE
+                Whether or not the queries of each park are recorded
+            allDirectionsAtOnce: boolean, default ALL_DIRECTIONS_AT_ONCE
+                Whether or not the city indicators of all directions are 
+                calculated at once
+            nWorkers: int, default PARK_BATCH_WORKERS
+                Number of parks prepared in parallel
+            directions: list of float, default None
+                Wind directions to prepare (N_DIRECTIONS directions if None)
+            settings: dictionary, default None
+                Settings of the preparation, saved in each park scenario if not None
+            checkpoints: Checkpoints, default None
+                Checkpoints of the preparation: each park prepared is recorded
+                (and not prepared again) and each park records its own
+                directions
+            progress: ProgressModel, default None
+                Progress of the preparation (a "parks" step is added, its
+                size being the number of parks to prepare)
+            
+		Returns
+		_ _ _ _ _ _ _ _ _ _ 
+
+            preparedScenarios: dictionary
+                Park ID as key and directory of the prepared scenario as value
+                (None if the calculation has been cancelled)"""
+    # Identify each park
+    cursor.execute(f"""
+        DROP TABLE IF EXISTS {PARK_BOUNDARIES_ALL_TAB};
+        CREATE TABLE {PARK_BOUNDARIES_ALL_TAB}
+            AS SELECT ROWNUM() AS {PARK_ID_FIELD}, a.*
+            FROM {PARK_BOUNDARIES_TAB} AS a
+        """)
+    cursor.execute(f"""
+        SELECT {PARK_ID_FIELD} FROM {PARK_BOUNDARIES_ALL_TAB} ORDER BY {PARK_ID_FIELD}
+        """)
+    parkIds = [row[0] for row in cursor.fetchall()]
+    
+    # The parks recorded in the checkpoints are already prepared
+    preparedScenarios = {}
+    if checkpoints:
+        for parkId in parkIds:
+            if checkpoints.done(f"park {parkId}"):
+                preparedScenarios[parkId] = checkpoints.get(f"park {parkId}")["directory"]
+        parkIds = [parkId for parkId in parkIds if parkId not in preparedScenarios]
+    if progress:
+        progress.plan([("parks", len(parkIds))])
+        progress.start("parks")
+    
+    # Copy the database once (each park restores its own database from the copy)
+    backupFile = H2gisConnection.backupH2gisInstance(cur = cursor,
+                                                     localH2InstanceDir = localH2InstanceDir)
+    
+    # Error message of each park which could not be prepared (the other
+    # parks are prepared anyway)
+    failures = {}
+    try:
+        with ThreadPoolExecutor(max_workers = nWorkers) as executor:
+            futures = {executor.submit(preparePark,
+                                       dbDirectory = dbDirectory,
+                                       backupFile = backupFile,
+                                       localH2InstanceDir = localH2InstanceDir,
+                                       parkId = parkId,
+                                       buildings = buildings,
+                                       blocks = blocks,
+                                       facades = facades,
+                                       building_indic = building_indic,
+                                       cover_combination = cover_combination,
+                                       srid = srid,
+                                       nCrossWind = nCrossWind,
+                                       output_directory = output_directory,
+                                       prefix = prefix,
+                                       feedback = feedback,
+                                       profile = profile,
+                                       allDirectionsAtOnce = allDirectionsAtOnce,
+                                       directions = directions,
+                                       settings = settings,
+                                       checkpoints = checkpoints): parkId
+                           for parkId in parkIds}
+            for i, future in enumerate(as_completed(futures)):
+                parkId = futures[future]
+                try:
+                    parkDirectory = future.result()
+                except Exception as e:
+                    failures[parkId] = f"{type(e).__name__}: {e}"
+                    parkDirectory = None
+                    if feedback:
+                        feedback.setProgressText(f'Park {parkId} could not be prepared ({failures[parkId]})')
+                if parkDirectory:
+                    preparedScenarios[parkId] = parkDirectory
+                    if checkpoints:
+                        checkpoints.record(f"park {parkId}",
+                                           values = {"directory": parkDirectory})
+                    if feedback:
+                        feedback.setProgressText(f'Park {parkId} prepared ({i+1}/{len(parkIds)})')
+                if progress:
+                    progress.advance((i + 1) / len(parkIds))
+                # Parks not yet started are cancelled (the running parks 
+                # stop by themselves since they share the feedback)
+                if feedback and feedback.isCanceled():
+                    for f in futures:
+                        f.cancel()
+                    feedback.setProgressText("Calculation cancelled by user")
+                    preparedScenarios = None
+                    break
+    finally:
+        os.remove(backupFile)
+    if failures:
+        raise QgsProcessingException("The following parks could not be prepared (the other parks are prepared):\n"\
+                                     + "\n".join([f"    - park {parkId}: {failures[parkId]}"
+                                                   for parkId in sorted(failures)]))
+    if progress and preparedScenarios is not None:
+        progress.finish()
+    
+    return preparedScenarios
+
+def preparePark(dbDirectory, backupFile, localH2InstanceDir, parkId, buildings,
+                blocks, facades, building_indic, cover_combination, srid,
+                nCrossWind, output_directory, prefix, feedback = None,
+                profile = SQL_PROFILE,
+                allDirectionsAtOnce = ALL_DIRECTIONS_AT_ONCE, directions = None,
+                settings = None, checkpoints = None):
+    """ Prepares the scenario of a single park (of the PARK_BOUNDARIES_ALL
+    table) in its own copy of the database.
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _ 
+
+            dbDirectory: String
+                Directory where is stored the H2GIS jar
+            backupFile: String
+                Path of the zip file containing the database copy
+            localH2InstanceDir: String
+                File directory of the copied database (without extension)
+            parkId: int
+                ID of the park to prepare
+            buildings: String
+                Name of the building table
+            blocks: String
+                Name of the block table
+            facades: String
+                Name of the facade segment table
+            building_indic: String
+                Name of the building indicator table
+            cover_combination: String
+                Name of the park ground and canopy cover combination table
+            srid: int
+                EPSG code of the input data
+            nCrossWind: int
+                Number of cross-wind corridors in the park
+            output_directory: String
+                Directory where are saved the scenarios
+            prefix: String
+                Name of the scenario (the park ID is added)
+            feedback: QgsProcessingFeedback, default None
+                Object used to check cancellation (shared by all parks)
+            profile: boolean, default SQL_PROFILE
+                Whether or not the queries are recorded
+            allDirectionsAtOnce: boolean, default ALL_DIRECTIONS_AT_ONCE
+                Whether or not the city indicators of all directions are 
+                calculated at once
+            directions: list of float, default None
+                Wind directions to prepare (N_DIRECTIONS directions if None)
+            settings: dictionary, default None
+                Settings of the preparation, saved in the park scenario if not None
+            checkpoints: Checkpoints, default None
+                Checkpoints of the batch preparation (the park records its
+                directions in its own checkpoint folder)
+            
+		Returns
+		_ _ _ _ _ _ _ _ _ _ 
+
+            final_output_dir: String
+                Directory of the prepared scenario (None if the calculation
+                has been cancelled)"""
+    # Creates the folders of the park scenario
+    parkPrefix = f"{prefix}_{parkId}"
+    for folder in [OUTPUT_PREPROCESSOR_FOLDER, OUTPUT_PROCESSOR_FOLDER]:
+        os.makedirs(output_directory + os.sep + parkPrefix + os.sep + folder,
+                    exist_ok = True)
+    final_output_dir = output_directory + os.sep + parkPrefix + os.sep + OUTPUT_PREPROCESSOR_FOLDER
+    if checkpoints:
+        checkpoints = checkpoints.child(output_directory + os.sep + parkPrefix + os.sep + CHECKPOINT_FOLDER)
+    
+    # Opens a copy of the database
+    H2gisConnection.restoreH2gisInstance(backupFile = backupFile,
+                                         localH2InstanceDir = f"{localH2InstanceDir}_{parkId}")
+    cursor, conn, parkInstanceDir = \
+        H2gisConnection.startH2gisInstance(dbDirectory = dbDirectory,
+                                           dbInstanceDir = os.path.dirname(localH2InstanceDir),
+                                           instanceName = os.path.basename(localH2InstanceDir),
+                                           suffix = f"_{parkId}",
+                                           newDB = False)
+    if profile:
+        cursor = SqlProfiler.ProfilingCursor(cursor = cursor,
+                                             connection = conn,
+                                             explain = SQL_PROFILE_EXPLAIN)
+    lifecycle = TableLifecycle(cursor = cursor,
+                               dbFilePath = parkInstanceDir + H2gisConnection.DB_EXTENSION,
+                               keep = DEBUG)
+    
+    try:
+        # Keeps only the park of interest
+        cursor.execute(f"""
+            DROP TABLE IF EXISTS {PARK_BOUNDARIES_TAB};
+            CREATE TABLE {PARK_BOUNDARIES_TAB}
+                AS SELECT * FROM {PARK_BOUNDARIES_ALL_TAB} 
+                WHERE {PARK_ID_FIELD} = {parkId}
+            """)
+        distance_max = prep_fct.calc_distance_max(cursor = cursor,
+                                                  park_boundaries = PARK_BOUNDARIES_TAB)
+        
+        output = prepareDirections(cursor = cursor,
+                                   lifecycle = lifecycle,
+                                   buildings = buildings,
+                                   blocks = blocks,
+                                   facades = facades,
+                                   building_indic = building_indic,
+                                   cover_combination = cover_combination,
+                                   srid = srid,
+                                   distance_max = distance_max,
+                                   nCrossWind = nCrossWind,
+                                   final_output_dir = final_output_dir,
+                                   prefix = parkPrefix,
+                                   feedback = feedback,
+                                   profile = profile,
+                                   allDirectionsAtOnce = allDirectionsAtOnce,
+                                   directions = directions,
+                                   settings = settings,
+                                   checkpoints = checkpoints)
+        if output is None:
+            return None
+        if checkpoints:
+            checkpoints.clear()
+        
+        if profile:
+            cursor.writeReport(final_output_dir + os.sep + SQL_PROFILE_FILE)
+        lifecycle.writeReport(final_output_dir + os.sep + DB_SIZE_FILE)
+    finally:
+        if DEBUG:
+            cursor.close()
+            conn.close()
+        else:
+            H2gisConnection.closeAndRemoveH2gisInstance(localH2InstanceDir = parkInstanceDir,
+                                                        conn = conn,
+                                                        cur = cursor)
+    
+    return final_output_dir
+
+def prepareMissingDirections(preprocessOutputPath, directions, feedback = None):
+    """ Prepares wind directions which have not been prepared yet for a
+    scenario (using the settings saved with the scenario) and add them
+    to its prepared scenario file.
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _ 
+
+            preprocessOutputPath: String
+                Directory of the scenario
+            directions: list of float
+                Wind directions to prepare
+            feedback: QgsProcessingFeedback, default None
+                Object used to report progress and to check cancellation
+            
+		Returns
+		_ _ _ _ _ _ _ _ _ _ 
+
+            directions: list of float
+                All wind directions prepared for the scenario (None if the
+                calculation has been cancelled)"""
+    final_input_dir = preprocessOutputPath + os.sep + OUTPUT_PREPROCESSOR_FOLDER
+    settings = PreparedScenario.readSettings(preparedDirectory = final_input_dir)
+    if settings is None:
+        raise QgsProcessingException(f"""The wind directions {directions} have not been
+                                     prepared and the settings of the preparation are
+                                     missing, please prepare again the scenario""")
+    
+    # Prepares the missing directions in a temporary scenario (its database
+    # is removed once the preparation is done)
+    tempDirectory = tempfile.mkdtemp(dir = TEMPO_DIRECTORY)
+    try:
+        tempPrefix = os.path.basename(preprocessOutputPath)
+        os.makedirs(tempDirectory + os.sep + tempPrefix + os.sep + OUTPUT_PREPROCESSOR_FOLDER)
+        result = prepareData(**{k: v for k, v in settings.items() if k != "directions"},
+                             directions = directions,
+                             feedback = feedback,
+                             output_directory = tempDirectory,
+                             prefix = tempPrefix,
+                             closeInstance = True)
+        if not result:
+            return None
+        
+        # Add the new directions to the prepared scenario
+        tempContainer = tempDirectory + os.sep + tempPrefix + os.sep\
+            + OUTPUT_PREPROCESSOR_FOLDER + os.sep + PREPARED_SCENARIO_FILE
+        PreparedScenario.appendContainer(containerPath = final_input_dir + os.sep + PREPARED_SCENARIO_FILE,
+                                         layers = {layer: gpd.read_file(tempContainer, layer = layer)
+                                                       for layer in [OUTPUT_CITY_INDIC, OUTPUT_PARK_INDIC]},
+                                         attributeTables = {table: PreparedScenario.readAttributeTable(containerPath = tempContainer,
+                                                                                                       tableName = table)
+                                                                for table in [GRID_INDIC_TAB, GRID_LATTICE_TAB]})
+        settings["directions"] = sorted(settings["directions"] + [float(d) for d in directions])
+        PreparedScenario.writeSettings(preparedDirectory = final_input_dir,
+                                       settings = settings)
+    finally:
+        shutil.rmtree(tempDirectory, ignore_errors = True)
+    
+    return settings["directions"]
+
+def calcCityIndicators(cursor, dicRotatedTables, rect_city, crosswind_lines, 
+                       wind_dir, outputTableName):
+    """ Calculates and gathers all city indicators of the urban corridors
+    (blocks, building height, streets and facades).
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _ 
+
+            cursor: conn.cursor
+                A cursor object, used to perform spatial SQL queries
+            dicRotatedTables: dictionary
+                Type of obstacle as key and name of the rotated table as value
+            rect_city: String
+                Name of the table where urban corridors around the park are saved
+            crosswind_lines: String
+                Name of the table where cross wind lines are saved
+            wind_dir: float
+                wind direction (clock-wise, ° from North). If None, the input
+                tables gather all wind directions (WIND_DIR column)
+            outputTableName: String
+                Name of the table gathering all city indicators
+            
+		Returns
+		_ _ _ _ _ _ _ _ _ _ 
+
+            outputTableName: String
+                Name of the table gathering all city indicators"""
+    # ----------------------------------------------------------------------
+    # 5. CALCULATES FRACTION OF BLOCKS AND DENSITY NUMBER
+    # ----------------------------------------------------------------------
+    rect_city_indic1 = prep_fct.calc_rect_block_indic(cursor = cursor,
+                                                      blocks = dicRotatedTables[BLOCK_TAB],
+                                                      rect_city = rect_city,
+                                                      wind_dir = wind_dir)
+
+    # ----------------------------------------------------------------------
+    # 6. CALCULATES MEAN BUILDING HEIGHT
+    # ----------------------------------------------------------------------
+    rect_city_indic2 = prep_fct.calc_rect_build_height(cursor = cursor,
+                                                       buildings = dicRotatedTables[BUILDINGS_TAB],
+                                                       rect_city = rect_city,
+                                                       wind_dir = wind_dir)    
+    
+    # ----------------------------------------------------------------------
+    # 7. CALCULATES STREET INDICATORS
+    # ----------------------------------------------------------------------
+    rect_city_indic3 = prep_fct.calc_street_indic(cursor = cursor,
+                                                  blocks = dicRotatedTables[BLOCK_TAB],
+                                                  rect_city = rect_city,
+                                                  crosswind_lines = crosswind_lines,
+                                                  wind_dir = wind_dir)
         
-    return cursor, city_all_indic
+    # ----------------------------------------------------------------------
+    # 8. CALCULATES FACADE FRACTION INDICATOR
+    # ----------------------------------------------------------------------
+    rect_city_indic4 = prep_fct.generic_facade_indicators(cursor = cursor,
+                                                          facades = dicRotatedTables[FACADE_SEGMENTS_TAB],
+                                                          rsu = rect_city,
+                                                          indic = FREE_FACADE_FRACTION,
+                                                          wind_dir = wind_dir)
+
+    # ----------------------------------------------------------------------
+    # 9. GATHER ALL CITY INDICATORS
+    # ----------------------------------------------------------------------
+    keys = ["ID", ID_UPSTREAM]
+    if wind_dir is None:
+        keys.append(WIND_DIR_FIELD)
+    tablesAndId = {rect_city_indic1 : keys,
+                   rect_city_indic2 : keys,
+                   rect_city_indic3 : keys,
+                   rect_city_indic4 : keys}
+    
+    return prep_fct.joinTables(cursor = cursor, 
+                               tablesAndId = tablesAndId,
+                               outputTableName = outputTableName)
+
+def processScenario(scenarioDirectory, weatherFilePath, prefix = DEFAULT_WEATHER,
+                    feedback = None):
+    """ Calculates the effect of a prepared park on the air temperature of
+    its surroundings and on the buildings for a weather file, and records
+    the calculation in the scenario catalog
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _ 
+
+            scenarioDirectory: String
+                Directory of the prepared scenario
+            weatherFilePath: String
+                Path of the weather file
+            prefix: String, default DEFAULT_WEATHER
+                Name of the weather scenario (name of its output folder)
+            feedback: QgsProcessingFeedback, default None
+                Object used to report progress and to check cancellation
+
+		Returns
+		_ _ _ _ _ _ _ _ _ _ 
+
+            output_t_path: dictionary
+                Path of the air temperature raster for each time period
+            output_dt_path: dictionary
+                Path of the deltaT raster for each time period
+            deltaT_min_value: float
+                Minimum deltaT (day and night)
+            deltaT_max_value: float
+                Maximum deltaT (day and night)
+            gdf_build: gpd.GeoDataFrame
+                Impact of the park on the buildings
+            output_build_path: String
+                Path of the building impact file
+            (None if the calculation has been cancelled)"""
+    # Creates the output folder if it does not exist
+    outputDirectory = scenarioDirectory + os.sep + OUTPUT_PROCESSOR_FOLDER + os.sep + prefix
+    if os.path.exists(scenarioDirectory + os.sep + OUTPUT_PROCESSOR_FOLDER):
+        if os.path.exists(outputDirectory):
+            raise QgsProcessingException(f'"{prefix}" folder already exists in "{scenarioDirectory + os.sep + OUTPUT_PROCESSOR_FOLDER}"')
+        else:
+            os.mkdir(outputDirectory)   
+    else:
+        raise QgsProcessingException(f'"{scenarioDirectory}" should contain a folder called "{OUTPUT_PROCESSOR_FOLDER}". It is not the directory of a preprocessed scenario.')
+    
+    started = time.time()
+    # Steps of the processing (the steps of the park effect calculation are
+    # added once the weather data are read)
+    progress = ProgressModel.ProgressModel(feedback = feedback,
+                                           kind = ProgressModel.PROCESSING,
+                                           steps = [("buildings", 1)])
+    if feedback:
+        feedback.setProgressText("Calculate park effect on air temperature")
+        if feedback.isCanceled():
+            feedback.setProgressText("Calculation cancelled by user")
+            return None
+    # Calculates the effect of the park on its surrounding
+    result = calcParkInfluence(weatherFilePath = weatherFilePath, 
+                               preprocessOutputPath = scenarioDirectory,
+                               prefix = prefix,
+                               feedback = feedback,
+                               progress = progress)
+    if not result:
+        return None
+    output_t_path, output_dt_path, deltaT_min_value, deltaT_max_value = result
+    
+    if feedback:
+        feedback.setProgressText("Calculate park effect on building energy and thermal comfort")
+        if feedback.isCanceled():
+            feedback.setProgressText("Calculation cancelled by user")
+            return None
+    # Calculates the impact of the cooling on the buildings
+    with progress.step("buildings"):
+        gdf_build, output_build_path = \
+            calcBuildingImpact(preprocessOutputPath = scenarioDirectory,
+                               prefix = prefix)
+    
+    # Record the duration of each step (used to estimate the next ones)
+    progress.save()
+    
+    # Record the processing in the scenario catalog
+    statistics = processingStatistics(outputDirectory)
+    statistics["deltaT_min"] = deltaT_min_value
+    statistics["deltaT_max"] = deltaT_max_value
+    ScenarioCatalog.recordRun(kind = ScenarioCatalog.PROCESSING,
+                              outputDirectory = outputDirectory,
+                              scenario = Path(scenarioDirectory).name,
+                              weather = prefix,
+                              scenarioDirectory = scenarioDirectory,
+                              inputs = {"weather": weatherFilePath,
+                                        "prepared_scenario": scenarioDirectory + os.sep + OUTPUT_PREPROCESSOR_FOLDER\
+                                            + os.sep + PREPARED_SCENARIO_FILE},
+                              outputs = dict({f"{OUTPUT_DT}_{tp}h": output_dt_path[tp] for tp in output_dt_path},
+                                             **{f"{OUTPUT_T}_{tp}h": output_t_path[tp] for tp in output_t_path},
+                                             **{BUILD_INDEP_VAR: output_build_path}),
+                              statistics = statistics,
+                              started = started,
+                              duration = time.time() - started)
+    
+    return output_t_path, output_dt_path, deltaT_min_value, deltaT_max_value,\
+        gdf_build, output_build_path
+
+def processingStatistics(outputDirectory):
+    """ Summary statistics of the park effects calculated for a weather 
+    scenario: global building effects and mean deltaT of each time period
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _ 
+
+            outputDirectory: String
+                Directory of the weather scenario results
+
+		Returns
+		_ _ _ _ _ _ _ _ _ _ 
+
+            statistics: dictionary
+                Name of each statistic as key and its value as value"""
+    statistics = globalBuildingEffect(readScenarioBuildings(outputDirectory))
+    for tp in [DAY_TIME, NIGHT_TIME]:
+        statistics[f"{OUTPUT_DT}_{tp}h"] = \
+            RasterUtil.rasterStats(f'{outputDirectory + os.sep + OUTPUT_DT}_{str(tp)}h').mean
+    
+    return statistics
 
 def calcParkInfluence(weatherFilePath, 
                       preprocessOutputPath,
@@ -307,313 +1343,331 @@ def calcParkInfluence(weatherFilePath,
                       feedback = None,
                       startDate = START_DATE,
                       endDate = END_DATE,
-                      wdir = "wdir10",
-                      wspeed = "ws10",
-                      tair = "t2m",
-                      rh = "r2m",
-                      pa = "sp"):
+                      wdir = None,
+                      wspeed = None,
+                      tair = None,
+                      rh = None,
+                      pa = None,
+                      progress = None,
+                      weatherFormat = None):
     # Define the entire input and output directory paths
     final_output_dir = preprocessOutputPath+os.sep+OUTPUT_PROCESSOR_FOLDER+os.sep+prefix
     final_input_dir = preprocessOutputPath+os.sep+OUTPUT_PREPROCESSOR_FOLDER
+    # Temporary files are saved in a folder specific to this calculation
+    # (several calculations may run at the same time)
+    tempo_dir = tempfile.mkdtemp(dir = TEMPO_DIRECTORY)
+    try:
+        # Get the number of directions used for the calculations (for example reading the write metadata)
+        ndir = N_DIRECTIONS
+        dirs = np.arange(0, 360, 360./ndir)
     
-    # Get the number of directions used for the calculations (for example reading the write metadata)
-    ndir = N_DIRECTIONS
-    dirs = np.arange(0, 360, 360./ndir)
-    
-    # Load grid info for each direction
-    gridFileDic = {d: f"""{OUTPUT_GRID}_{str(float(d)).replace(".", "_")}""" 
-                           for d in dirs}
-    grids = {i: gpd.read_file(final_input_dir + os.sep + gridFileDic[i] + ".geojson") 
-                    for i in gridFileDic.keys()}
-    grid_indic = {i: pd.read_csv(final_input_dir + os.sep + gridFileDic[i] + ".csv",
-                                 na_values = [DEFAULT_D_PARK_INPUT, DEFAULT_D_PARK_OUTPUT, DEFAULT_D_PARK]) 
-                    for i in gridFileDic.keys()}
-    
-    # For each direction, identify points that are before the park, within the park or after the park
-    grid_ind_city_before, grid_ind_park, grid_ind_city_after = \
-        calc_fct.identify_point_position(grid_indic)
-    
-    # Fill missing ID_UPSTREAM since grid points may have not intersect some upstream city geometries
-    grid_ind_city_before = calc_fct.remove_null_upstream(grid_indic = grid_ind_city_before, start = 1)
-    grid_ind_park = calc_fct.remove_null_upstream(grid_indic = grid_ind_park, start = 1)
-    grid_ind_city_after = calc_fct.remove_null_upstream(grid_indic = grid_ind_city_after, start = 2)
-    
-    # Rename the columns in the park indic dataframe (needed to have strings in SQL, int needed in Python)
-    for d in grid_ind_park.keys():
-        frac_cols = grid_ind_park[d].columns[grid_ind_park[d].columns.str.contains("FRAC_")]
-        grid_ind_park[d].rename({col: int(col.split("_")[1]) for col in frac_cols}, 
-                                axis = 1, 
-                                inplace = True)
-
-    # Read meteorological data and set the right datetime index UTC info
-    df_met = pd.read_csv(weatherFilePath, 
-                         skiprows = 11, 
-                         index_col = 0, 
-                         parse_dates = True)[[wdir, wspeed, tair, rh, pa]]
-    
-    # Consider that the datetime index are local time
-    utc = int(pd.read_csv(weatherFilePath, nrows = 1, header = 6).columns[0].split(":")[1])
-    df_met.index = df_met.index.tz_localize(pytz.FixedOffset(utc * 60)).tz_convert("UTC")
-    
-    # Select only useful dates and times for analysis
-    year = df_met.index.year.unique()[0]
-    start_day = int(START_DATE.split("/")[0])
-    start_month = int(START_DATE.split("/")[1])
-    end_day = int(END_DATE.split("/")[0])
-    end_month = int(END_DATE.split("/")[1])
-    
-    # Convert variables into generic names
-    df_met.rename(columns = {wdir: WDIR, 
-                             wspeed: WSPEED, 
-                             tair: T_AIR, 
-                             rh: RH, 
-                             pa: P_ATMO}, inplace = True)
-
-    # For each time period (day - 0PM - and night - 11 PM)
-    output_t_path = {}
-    output_dt_path = {}
-    for tp in [DAY_TIME, NIGHT_TIME]:
-        if feedback:
-            if tp == NIGHT_TIME:
-                feedback.setProgressText("Calculate night-time park effect")
-            else:
-                feedback.setProgressText("Calculate day-time park effect")
-            if feedback.isCanceled():
-                feedback.setProgressText("Calculation cancelled by user")
-                return {}
-        # Spatial variations of air temperature and deltaT generated by the park
-        # are averaged only at the end. Thus need to sum by wind direction
-        # and also to sum the wight (nb of days in wind each direction)
-        weights = pd.Series({d: 0 for d in dirs}) # Weights used for averaging the effect of the park over the entire period
-        grid_sum_tair = pd.DataFrame(columns = grid_indic.keys(), 
-                                     index = range(0, max([grid_indic[i].index.size for i in grid_indic.keys()])))
-        grid_sum_tair.loc[:,:] = 0
-        grid_sum_deltatair = grid_sum_tair.copy(deep = True)
-        
-        selected_dates = pd.date_range(start = datetime.datetime(year, start_month, start_day, tp),
-                                       end = datetime.datetime(year, end_month, end_day),
-                                       freq = pd.offsets.Day(1),
-                                       tz = pytz.FixedOffset(utc *60))
-        df_met_sel = df_met.reindex(selected_dates).dropna()
+        # Read meteorological data and set the right datetime index UTC info
+        # (default column names of the weather file format if not given)
+        columns = {WDIR: wdir, WSPEED: wspeed, T_AIR: tair, RH: rh, P_ATMO: pa}
+        df_met, utc = WeatherReaders.readWeather(weatherFilePath = weatherFilePath,
+                                                 weatherFormat = weatherFormat,
+                                                 columns = {k: v for k, v in columns.items() if v is not None})
+    
+        # Prepare the wind directions occurring in the weather data if they
+        # have not been prepared yet
+        settings = PreparedScenario.readSettings(preparedDirectory = final_input_dir)
+        if settings is not None and LAZY_PREPARATION:
+            weights_all = calc_fct.direction_weights(df_met = df_met,
+                                                     utc = utc,
+                                                     dirs = dirs)
+            missing_dirs = [d for d in weights_all.index[weights_all.sum(axis = 1) > 0]
+                                if d not in settings["directions"]]
+            if missing_dirs:
+                if feedback:
+                    feedback.setProgressText(f"Prepare the missing wind directions {missing_dirs}")
+                if prepareMissingDirections(preprocessOutputPath = preprocessOutputPath,
+                                            directions = missing_dirs,
+                                            feedback = feedback) is None:
+                    return {}
+    
+        # Load grid info for each direction (from the prepared scenario file if
+        # exists, otherwise from the files of each direction)
+        containerPath = final_input_dir + os.sep + PREPARED_SCENARIO_FILE
+        if os.path.isfile(containerPath):
+            grids, grid_indic, lattices = PreparedScenario.readGrids(containerPath = containerPath)
+            gdf_park = gpd.read_file(containerPath, layer = PARK_BOUNDARIES_TAB)
+        else:
+            gridFileDic = {d: f"""{OUTPUT_GRID}_{str(float(d)).replace(".", "_")}""" 
+                                   for d in dirs}
+            grids = {i: gpd.read_file(final_input_dir + os.sep + gridFileDic[i] + ".geojson") 
+                            for i in gridFileDic.keys()}
+            grid_indic = {i: pd.read_csv(final_input_dir + os.sep + gridFileDic[i] + ".csv",
+                                         na_values = [DEFAULT_D_PARK_INPUT, DEFAULT_D_PARK_OUTPUT, DEFAULT_D_PARK]) 
+                            for i in gridFileDic.keys()}
+            gdf_park = gpd.read_file(os.path.join(final_input_dir, PARK_BOUNDARIES_TAB + ".geojson"))
+            # The grid lattices are only stored in the prepared scenario file
+            lattices = {}
+    
+        # For each direction, identify points that are before the park, within the park or after the park
+        grid_ind_city_before, grid_ind_park, grid_ind_city_after = \
+            calc_fct.identify_point_position(grid_indic)
+    
+        # Fill missing ID_UPSTREAM since grid points may have not intersect some upstream city geometries
+        grid_ind_city_before = calc_fct.remove_null_upstream(grid_indic = grid_ind_city_before, start = 1)
+        grid_ind_park = calc_fct.remove_null_upstream(grid_indic = grid_ind_park, start = 1)
+        grid_ind_city_after = calc_fct.remove_null_upstream(grid_indic = grid_ind_city_after, start = 2)
+    
+        # Rename the columns in the park indic dataframe (needed to have strings in SQL, int needed in Python)
+        for d in grid_ind_park.keys():
+            frac_cols = grid_ind_park[d].columns[grid_ind_park[d].columns.str.contains("FRAC_")]
+            grid_ind_park[d].rename({col: int(col.split("_")[1]) for col in frac_cols}, 
+                                    axis = 1, 
+                                    inplace = True)
+    
+        # Select only useful dates and times for analysis (days having a 
+        # wind direction which has not been prepared are not considered)
+        df_met_tp = {}
+        for tp in [DAY_TIME, NIGHT_TIME]:
+            df_met_tp[tp] = calc_fct.select_time_period(df_met = df_met,
+                                                        utc = utc,
+                                                        day_hour = tp)
+            prepared = df_met_tp[tp][WIND_SECTOR].isin(list(grid_indic.keys()))
+            if feedback and not prepared.all():
+                feedback.pushWarning(f"""{(~prepared).sum()} days out of {prepared.size} are not considered at {tp}h: their wind directions {sorted(df_met_tp[tp].loc[~prepared, WIND_SECTOR].unique())} have not been prepared""")
+            df_met_tp[tp] = df_met_tp[tp][prepared]
+    
+        # Steps of the calculation: their duration depends on the number of
+        # days and on the number of wind directions
+        if progress is None:
+            progress = ProgressModel.ProgressModel(feedback = feedback,
+                                                   kind = ProgressModel.PROCESSING,
+                                                   steps = [])
+        progress.plan([(f"days {tp}h", len(df_met_tp[tp])) for tp in [DAY_TIME, NIGHT_TIME]]\
+                      + [(f"rasters {tp}h", len(grid_indic)) for tp in [DAY_TIME, NIGHT_TIME]]\
+                      + [("contours", len(grid_indic))])
+
+        # For each time period (day - 0PM - and night - 11 PM)
+        output_t_path = {}
+        output_dt_path = {}
+        for tp in [DAY_TIME, NIGHT_TIME]:
+            if feedback:
+                if tp == NIGHT_TIME:
+                    feedback.setProgressText("Calculate night-time park effect")
+                else:
+                    feedback.setProgressText("Calculate day-time park effect")
+                if feedback.isCanceled():
+                    feedback.setProgressText("Calculation cancelled by user")
+                    return {}
+            # Spatial variations of air temperature and deltaT generated by the park
+            # are averaged only at the end. Thus need to sum by wind direction
+            # and also to sum the wight (nb of days in wind each direction)
+            weights = pd.Series({d: 0 for d in dirs}) # Weights used for averaging the effect of the park over the entire period
+            grid_sum_tair = pd.DataFrame(columns = grid_indic.keys(), 
+                                         index = range(0, max([grid_indic[i].index.size for i in grid_indic.keys()])))
+            grid_sum_tair.loc[:,:] = 0
+            grid_sum_deltatair = grid_sum_tair.copy(deep = True)
         
-        # Calculates the DPV
-        df_met_sel[DPV] = calc_fct.dpv_calc(df_met_sel)
+            df_met_sel = df_met_tp[tp]
         
-        # Normalize the meteorological cooling factors (wind speed and dpv) in order to have them between -1 and 1
-        df_ws_norm = calc_fct.normalize_factor(value = df_met_sel[WSPEED], 
-                                               value_min = COOLING_FACTORS[tp].loc["min","ws"], 
-                                               value_max = COOLING_FACTORS[tp].loc["max","ws"])
-        df_dpv_norm = calc_fct.normalize_factor(value = df_met_sel[DPV], 
-                                                value_min = COOLING_FACTORS[tp].loc["min","dpv"], 
-                                                value_max = COOLING_FACTORS[tp].loc["max","dpv"])
+            # Normalize the meteorological cooling factors (wind speed and dpv) in order to have them between -1 and 1
+            df_ws_norm = calc_fct.normalize_factor(value = df_met_sel[WSPEED], 
+                                                   value_min = COOLING_FACTORS[tp].loc["min","ws"], 
+                                                   value_max = COOLING_FACTORS[tp].loc["max","ws"])
+            df_dpv_norm = calc_fct.normalize_factor(value = df_met_sel[DPV], 
+                                                    value_min = COOLING_FACTORS[tp].loc["min","dpv"], 
+                                                    value_max = COOLING_FACTORS[tp].loc["max","dpv"])
         
-        # For each day, sum the effect of the park on the air temperature
-        # (sum on a different grid depending on wind direction)
-        for d in df_met_sel.index:
-            wd = df_met_sel.loc[d, WDIR]
-            wd_range = [i for i in dirs if (wd >= i and wd < i + 360./ndir)][0]
-            print(wd_range)
-            if wd_range == 45:
-                print("ok")
-            weights[wd_range] += 1
+            # For each day, sum the effect of the park on the air temperature
+            # (sum on a different grid depending on wind direction)
+            progress.start(f"days {tp}h")
+            for i, d in enumerate(df_met_sel.index):
+                wd_range = df_met_sel.loc[d, WIND_SECTOR]
+                weights[wd_range] += 1
             
-            grid_sum_tair[wd_range], grid_sum_deltatair[wd_range] = \
-                calc_fct.air_cooling_and_diffusion(grid_sum_tair = grid_sum_tair[wd_range],
-                                                   grid_sum_deltatair = grid_sum_deltatair[wd_range],
-                                                   grid_ind_city_before = grid_ind_city_before[wd_range],
-                                                   grid_ind_park = grid_ind_park[wd_range],
-                                                   grid_ind_city_after = grid_ind_city_after[wd_range],
-                                                   tair = df_met_sel.loc[d, T_AIR],
-                                                   ws_norm = df_ws_norm[d],
-                                                   dpv_norm = df_dpv_norm[d],
-                                                   max_dist = MAX_DIST[tp],
-                                                   day_hour = tp)
+                grid_sum_tair[wd_range], grid_sum_deltatair[wd_range] = \
+                    calc_fct.air_cooling_and_diffusion(grid_sum_tair = grid_sum_tair[wd_range],
+                                                       grid_sum_deltatair = grid_sum_deltatair[wd_range],
+                                                       grid_ind_city_before = grid_ind_city_before[wd_range],
+                                                       grid_ind_park = grid_ind_park[wd_range],
+                                                       grid_ind_city_after = grid_ind_city_after[wd_range],
+                                                       tair = df_met_sel.loc[d, T_AIR],
+                                                       ws_norm = df_ws_norm[d],
+                                                       dpv_norm = df_dpv_norm[d],
+                                                       max_dist = MAX_DIST[tp],
+                                                       day_hour = tp)
+                if progress.advance((i + 1) / len(df_met_sel)):
+                    feedback.setProgressText("Calculation cancelled by user")
+                    return {}
+            progress.finish()
         
-        # Get the maximum extent of the grids
-        xmin = min([grids[i].geometry.x.min() for i in grid_sum_tair.columns])
-        xmax = max([grids[i].geometry.x.max() for i in grid_sum_tair.columns]) 
-        ymin = min([grids[i].geometry.y.min() for i in grid_sum_tair.columns])
-        ymax = max([grids[i].geometry.y.max() for i in grid_sum_tair.columns]) 
-        epsg = grids[0].crs.to_epsg()
+            # Get the maximum extent of the grids
+            xmin = min([grids[i].geometry.x.min() for i in grid_sum_tair.columns])
+            xmax = max([grids[i].geometry.x.max() for i in grid_sum_tair.columns]) 
+            ymin = min([grids[i].geometry.y.min() for i in grid_sum_tair.columns])
+            ymax = max([grids[i].geometry.y.max() for i in grid_sum_tair.columns]) 
+            epsg = gdf_park.crs.to_epsg()
         
-        # Calculate the output raster grid size
-        output_grid_size = ((ymax-ymin) * (xmax-xmin) / NB_OUTPUT_CELL)**0.5
+            # Calculate the output raster grid size
+            output_grid_size = ((ymax-ymin) * (xmax-xmin) / NB_OUTPUT_CELL)**0.5
         
-        # Create the polygon use to keep values (outside the park)
-        gdf_all = gpd.GeoSeries([Polygon([(xmin, ymin), (xmax, ymin), 
-                                          (xmax, ymax), (xmin, ymax),
-                                          (xmin, ymin)])]).set_crs(epsg)
-        gdf_park = gpd.read_file(os.path.join(final_input_dir, PARK_BOUNDARIES_TAB + ".geojson"))
-        gdf_city = gdf_all.difference(gdf_park)
-        gdf_city.to_file(TEMPO_DIRECTORY + os.sep + "city.geojson",
-                         driver = "GeoJSON")
+            # Create the polygon use to keep values (outside the park)
+            gdf_all = gpd.GeoSeries([Polygon([(xmin, ymin), (xmax, ymin), 
+                                              (xmax, ymax), (xmin, ymax),
+                                              (xmin, ymin)])]).set_crs(epsg)
+            gdf_city = gdf_all.difference(gdf_park)
+            gdf_city.to_file(tempo_dir + os.sep + "city.geojson",
+                             driver = "GeoJSON")
         
-        # Calculates mean value for each wind direction, join grid point geometry and save into a file
-        output_file = {}
-        output_T_file = {}
-        output_dT_file = {}
-        rlayer_T = {}
-        rlayer_dT = {}
-        raster_t_list = []
-        raster_dt_list = []
-        average_formula_t = ""
-        average_formula_dt = ""
-        i = 0
-        weight_sum = weights.sum()
-        for wd in grid_sum_tair.columns:
-            if weights[wd] != 0:
-                grid_tair = grids[wd].join((grid_sum_tair[wd] / weights[wd]).rename("tair").astype(float))
-                grid_deltat = grids[wd].join((grid_sum_deltatair[wd] / weights[wd]).rename("tair").astype(float))
-                output_T_file[wd] = f"""{OUTPUT_T}_{str(float(wd)).replace(".", "_")}"""
-                output_dT_file[wd] = f"""{OUTPUT_DT}_{str(float(wd)).replace(".", "_")}"""
-                grid_tair.to_file(TEMPO_DIRECTORY + os.sep + output_T_file[wd] + ".geojson",
-                                  driver = "GeoJSON")
-                grid_deltat.to_file(TEMPO_DIRECTORY + os.sep + output_dT_file[wd] + ".geojson",
-                                    driver = "GeoJSON")
-                
-                # Interpolate and save the data in a raster file (same extent for all wind directions)
-                processing.run("qgis:tininterpolation", 
-                               {'INTERPOLATION_DATA':f'{TEMPO_DIRECTORY + os.sep + output_T_file[wd] + ".geojson"}::~::0::~::1::~::0',
-                                'METHOD':0,
-                                'EXTENT':f'{xmin-100},{xmax+100},{ymin-100},{ymax+100} [EPSG:{epsg}]',
-                                'PIXEL_SIZE':f'{output_grid_size}',
-                                'OUTPUT':f'{final_output_dir + os.sep + output_T_file[wd]}_{str(tp)}h.tif'})
-                processing.run("qgis:tininterpolation", 
-                               {'INTERPOLATION_DATA':f'{TEMPO_DIRECTORY + os.sep + output_dT_file[wd] + ".geojson"}::~::0::~::1::~::0',
-                                'METHOD':0,
-                                'EXTENT':f'{xmin-100},{xmax+100},{ymin-100},{ymax+100} [EPSG:{epsg}]',
-                                'PIXEL_SIZE':f'{output_grid_size}',
-                                'OUTPUT':f'{TEMPO_DIRECTORY + os.sep + output_dT_file[wd]}'})                
-                processing.run("gdal:cliprasterbymasklayer", 
-                               {'INPUT':f'{TEMPO_DIRECTORY + os.sep + output_dT_file[wd]}',
-                                'MASK':TEMPO_DIRECTORY + os.sep + "city.geojson",
-                                'SOURCE_CRS':QgsCoordinateReferenceSystem(f'EPSG:{epsg}'),
-                                'TARGET_CRS':None,
-                                'TARGET_EXTENT':None,
-                                'NODATA':None,
-                                'ALPHA_BAND':False,
-                                'CROP_TO_CUTLINE':True,
-                                'KEEP_RESOLUTION':True,
-                                'SET_RESOLUTION':False,
-                                'X_RESOLUTION':None,
-                                'Y_RESOLUTION':None,
-                                'MULTITHREADING':False,
-                                'OPTIONS':'','DATA_TYPE':0,
-                                'EXTRA':'',
-                                'OUTPUT':f'{final_output_dir + os.sep + output_dT_file[wd]}_{str(tp)}h.tif'})
+            # Calculates mean value for each wind direction, join grid point geometry and save into a file
+            output_file = {}
+            output_T_file = {}
+            output_dT_file = {}
+            rlayer_T = {}
+            rlayer_dT = {}
+            raster_t_list = []
+            raster_dt_list = []
+            raster_weights = []
+            progress.start(f"rasters {tp}h")
+            for i, wd in enumerate(grid_sum_tair.columns):
+                if progress.advance(i / len(grid_sum_tair.columns)):
+                    feedback.setProgressText("Calculation cancelled by user")
+                    return {}
+                if weights[wd] != 0:
+                    grid_tair = grids[wd].join((grid_sum_tair[wd] / weights[wd]).rename("tair").astype(float))
+                    grid_deltat = grids[wd].join((grid_sum_deltatair[wd] / weights[wd]).rename("tair").astype(float))
+                    output_T_file[wd] = f"""{OUTPUT_T}_{str(float(wd)).replace(".", "_")}"""
+                    output_dT_file[wd] = f"""{OUTPUT_DT}_{str(float(wd)).replace(".", "_")}"""
                 
-                raster_t_list.append(f'{final_output_dir + os.sep + output_T_file[wd]}_{str(tp)}h.tif')
-                raster_dt_list.append(f'{final_output_dir + os.sep + output_dT_file[wd]}_{str(tp)}h.tif')
+                    # Interpolate and save the data in a raster file (same extent for all wind directions)
+                    rasterArgs = {"bounds": (xmin-100, xmax+100, ymin-100, ymax+100),
+                                  "pixelSize": output_grid_size,
+                                  "epsg": epsg}
+                    if wd in lattices and min(lattices[wd]["N_COLS"], lattices[wd]["N_ROWS"]) > 1:
+                        # Bilinear interpolation directly on the stored lattice
+                        RasterUtil.latticeInterpolation(lattice = lattices[wd],
+                                                        df_indic = grid_indic[wd],
+                                                        values = grid_tair["tair"].values,
+                                                        outputPath = f'{final_output_dir + os.sep + output_T_file[wd]}_{str(tp)}h.tif',
+                                                        **rasterArgs)
+                        RasterUtil.latticeInterpolation(lattice = lattices[wd],
+                                                        df_indic = grid_indic[wd],
+                                                        values = grid_deltat["tair"].values,
+                                                        outputPath = f'{tempo_dir + os.sep + output_dT_file[wd]}',
+                                                        **rasterArgs)
+                    else:
+                        # Grid points without lattice (prepared by a former
+                        # version) or on a single line: TIN interpolation
+                        grid_tair.to_file(tempo_dir + os.sep + output_T_file[wd] + ".geojson",
+                                          driver = "GeoJSON")
+                        grid_deltat.to_file(tempo_dir + os.sep + output_dT_file[wd] + ".geojson",
+                                            driver = "GeoJSON")
+                        RasterUtil.tinInterpolation(pointPath = tempo_dir + os.sep + output_T_file[wd] + ".geojson",
+                                                    zField = "tair",
+                                                    outputPath = f'{final_output_dir + os.sep + output_T_file[wd]}_{str(tp)}h.tif',
+                                                    **rasterArgs)
+                        RasterUtil.tinInterpolation(pointPath = tempo_dir + os.sep + output_dT_file[wd] + ".geojson",
+                                                    zField = "tair",
+                                                    outputPath = f'{tempo_dir + os.sep + output_dT_file[wd]}',
+                                                    **rasterArgs)
+                    RasterUtil.clipRaster(rasterPath = f'{tempo_dir + os.sep + output_dT_file[wd]}',
+                                          maskPath = tempo_dir + os.sep + "city.geojson",
+                                          outputPath = f'{final_output_dir + os.sep + output_dT_file[wd]}_{str(tp)}h.tif')
                 
-                average_formula_t += f' + {output_T_file[wd]}_{str(tp)}h@1 * {weights[wd]} / {weight_sum}'
-                average_formula_dt += f' + {output_dT_file[wd]}_{str(tp)}h@1 * {weights[wd]} / {weight_sum}'
+                    raster_t_list.append(f'{final_output_dir + os.sep + output_T_file[wd]}_{str(tp)}h.tif')
+                    raster_dt_list.append(f'{final_output_dir + os.sep + output_dT_file[wd]}_{str(tp)}h.tif')
+                    raster_weights.append(weights[wd])
                 
-                # # Average the temperature using grid from all directions
-                # raster_t_buf = gdal.Open(f'{final_output_dir + os.sep + output_T_file[wd]}_{str(tp)}h.tif')
-                # raster_dt_buf = gdal.Open(f'{final_output_dir + os.sep + output_dT_file[wd]}_{str(tp)}h.tif')
+                    # # Average the temperature using grid from all directions
+                    # raster_t_buf = gdal.Open(f'{final_output_dir + os.sep + output_T_file[wd]}_{str(tp)}h.tif')
+                    # raster_dt_buf = gdal.Open(f'{final_output_dir + os.sep + output_dT_file[wd]}_{str(tp)}h.tif')
                 
-                # array_t_buf = raster_t_buf.ReadAsArray()
-                # array_dt_buf = raster_dt_buf.ReadAsArray()
-                # array_t_buf[array_t_buf == -9999] = np.nan
-                # array_dt_buf[array_dt_buf == -9999] = np.nan
-                # if i==0:
-                #     t_final = array_t_buf * weights[wd] / weight_sum
-                #     dt_final = array_dt_buf * weights[wd] / weight_sum
+                    # array_t_buf = raster_t_buf.ReadAsArray()
+                    # array_dt_buf = raster_dt_buf.ReadAsArray()
+                    # array_t_buf[array_t_buf == -9999] = np.nan
+                    # array_dt_buf[array_dt_buf == -9999] = np.nan
+                    # if i==0:
+                    #     t_final = array_t_buf * weights[wd] / weight_sum
+                    #     dt_final = array_dt_buf * weights[wd] / weight_sum
                     
-                #     x_count_t, y_count_t = raster_t_buf.RasterXSize, raster_t_buf.RasterYSize
-                #     x_count_dt, y_count_dt = raster_dt_buf.RasterXSize, raster_dt_buf.RasterYSize
-                #     geotransform = raster_t_buf.GetGeoTransform()
-                #     projection = raster_t_buf.GetProjection()
-                # else:
-                #     t_final += array_t_buf * weights[wd] / weight_sum
-                #     dt_final += array_dt_buf * weights[wd] / weight_sum
-                # i += 1
+                    #     x_count_t, y_count_t = raster_t_buf.RasterXSize, raster_t_buf.RasterYSize
+                    #     x_count_dt, y_count_dt = raster_dt_buf.RasterXSize, raster_dt_buf.RasterYSize
+                    #     geotransform = raster_t_buf.GetGeoTransform()
+                    #     projection = raster_t_buf.GetProjection()
+                    # else:
+                    #     t_final += array_t_buf * weights[wd] / weight_sum
+                    #     dt_final += array_dt_buf * weights[wd] / weight_sum
+                    # i += 1
                 
-                # # Release memory to avoid error due to gdal
-                # raster_t_buf = None
-                # raster_dt_buf = None
-                # array_t_buf = None
-                # array_dt_buf = None
-
-        output_t_path[tp] = f'{final_output_dir + os.sep + OUTPUT_T}_{str(tp)}h'
-        output_dt_path[tp] = f'{final_output_dir + os.sep + OUTPUT_DT}_{str(tp)}h'
+                    # # Release memory to avoid error due to gdal
+                    # raster_t_buf = None
+                    # raster_dt_buf = None
+                    # array_t_buf = None
+                    # array_dt_buf = None
+
+            output_t_path[tp] = f'{final_output_dir + os.sep + OUTPUT_T}_{str(tp)}h'
+            output_dt_path[tp] = f'{final_output_dir + os.sep + OUTPUT_DT}_{str(tp)}h'
         
-        # Average the deltaT and T using all directions
-        processing.run("qgis:rastercalculator", 
-                       {'EXPRESSION':average_formula_t,
-                        'LAYERS':raster_t_list,
-                        'CELLSIZE':0,'EXTENT':None,'CRS':None,'OUTPUT':output_t_path[tp]})
-        processing.run("qgis:rastercalculator", 
-                       {'EXPRESSION':average_formula_dt,
-                        'LAYERS':raster_dt_list,
-                        'CELLSIZE':0,'EXTENT':None,'CRS':None,'OUTPUT':output_dt_path[tp]})        
+            # Average the deltaT and T using all directions
+            RasterUtil.weightedMeanRasters(rasterPaths = raster_t_list,
+                                           weights = raster_weights,
+                                           outputPath = output_t_path[tp])
+            RasterUtil.weightedMeanRasters(rasterPaths = raster_dt_list,
+                                           weights = raster_weights,
+                                           outputPath = output_dt_path[tp])
+            progress.finish()
         
-    ######################################################################
-    ################# SAVE RESULTS AS CONTOUR ############################
-    ######################################################################
-    # Calculates DTmin and DTmax over day and night-time to have a unique legend for day and night
-    deltaT_min_value = 0
-    deltaT_max_value = 0
-    for tp in [DAY_TIME, NIGHT_TIME]:
-        # Calculates 
-        raster_dt_final = gdal.Open(f'{output_dt_path[tp]}')
-        array_dt_final = raster_dt_final.ReadAsArray()
-        array_dt_final = array_dt_final[array_dt_final>-9999]
-        dT_min = np.nanmin(array_dt_final)
-        dT_max = np.nanmax(array_dt_final)
-        if dT_min < deltaT_min_value:
-            deltaT_min_value = dT_min
-        if dT_max > deltaT_max_value:
-            deltaT_max_value = dT_max
-        # Release memory to avoid error due to gdal
-        raster_dt_final = None
-        array_dt_final = None
-    interval_isovalues_dT = round_to((deltaT_max_value-deltaT_min_value) / NB_ISOVALUES,
-                                             2)
+        ######################################################################
+        ################# SAVE RESULTS AS CONTOUR ############################
+        ######################################################################
+        # Calculates DTmin and DTmax over day and night-time to have a unique legend for day and night
+        progress.start("contours")
+        deltaT_min_value = 0
+        deltaT_max_value = 0
+        for tp in [DAY_TIME, NIGHT_TIME]:
+            # Calculates 
+            raster_dt_final = gdal.Open(f'{output_dt_path[tp]}')
+            array_dt_final = raster_dt_final.ReadAsArray()
+            array_dt_final = array_dt_final[array_dt_final>-9999]
+            dT_min = np.nanmin(array_dt_final)
+            dT_max = np.nanmax(array_dt_final)
+            if dT_min < deltaT_min_value:
+                deltaT_min_value = dT_min
+            if dT_max > deltaT_max_value:
+                deltaT_max_value = dT_max
+            # Release memory to avoid error due to gdal
+            raster_dt_final = None
+            array_dt_final = None
+        interval_isovalues_dT = round_to((deltaT_max_value-deltaT_min_value) / NB_ISOVALUES,
+                                                 2)
             
     
-    for tp in [DAY_TIME, NIGHT_TIME]:
-        # Save the final air temperature as a contour
-        raster_t_final = gdal.Open(f'{output_t_path[tp]}')
-        array_t_final = raster_t_final.ReadAsArray()
-        array_t_final = array_t_final[array_t_final>-9999]
-        interval_isovalues_T = round_to((np.nanmax(array_t_final)-np.nanmin(array_t_final)) / NB_ISOVALUES,
-                                                 2)
+        for tp in [DAY_TIME, NIGHT_TIME]:
+            # Save the final air temperature as a contour
+            raster_t_final = gdal.Open(f'{output_t_path[tp]}')
+            array_t_final = raster_t_final.ReadAsArray()
+            array_t_final = array_t_final[array_t_final>-9999]
+            interval_isovalues_T = round_to((np.nanmax(array_t_final)-np.nanmin(array_t_final)) / NB_ISOVALUES,
+                                                     2)
         
-        # Release memory to avoid error due to gdal
-        raster_t_final = None
-        array_t_final = None
+            # Release memory to avoid error due to gdal
+            raster_t_final = None
+            array_t_final = None
                 
-        # Save the final air temperature as a contour
-        processing.run("gdal:contour_polygon", 
-                       {'INPUT':output_t_path[tp],
-                        'BAND':1,
-                        'INTERVAL':f'{interval_isovalues_T}',
-                        'CREATE_3D':False,
-                        'IGNORE_NODATA':False,
-                        'NODATA':None,
-                        'OFFSET':f'{0 + interval_isovalues_T / 2}',
-                        'EXTRA':'','FIELD_NAME_MIN':'ELEV_MIN',
-                        'FIELD_NAME_MAX':'ELEV_MAX',
-                        'OUTPUT': output_t_path[tp] + ".geojson"})
+            # Save the final air temperature as a contour
+            RasterUtil.contourPolygons(rasterPath = output_t_path[tp],
+                                       outputPath = output_t_path[tp] + ".geojson",
+                                       interval = interval_isovalues_T,
+                                       offset = 0 + interval_isovalues_T / 2)
         
-        # Save the final delta air temperature as a contour
-        processing.run("gdal:contour_polygon", 
-                       {'INPUT':output_dt_path[tp],
-                        'BAND':1,
-                        'INTERVAL':f'{interval_isovalues_dT}',
-                        'CREATE_3D':False,
-                        'IGNORE_NODATA':False,
-                        'NODATA':None,
-                        'OFFSET':f'{0 + interval_isovalues_dT / 2}',
-                        'EXTRA':'','FIELD_NAME_MIN':'ELEV_MIN',
-                        'FIELD_NAME_MAX':'ELEV_MAX',
-                        'OUTPUT': output_dt_path[tp] + ".geojson"})
+            # Save the final delta air temperature as a contour
+            RasterUtil.contourPolygons(rasterPath = output_dt_path[tp],
+                                       outputPath = output_dt_path[tp] + ".geojson",
+                                       interval = interval_isovalues_dT,
+                                       offset = 0 + interval_isovalues_dT / 2)
         
-        # Save the weights
-        weights.to_csv(f'{final_output_dir + os.sep + WIND_DIR_RATE}_{str(tp)}h.csv')
+            # Save the weights
+            weights.to_csv(f'{final_output_dir + os.sep + WIND_DIR_RATE}_{str(tp)}h.csv')
+        progress.finish()
         
-    return output_t_path, output_dt_path, deltaT_min_value, deltaT_max_value
+        return output_t_path, output_dt_path, deltaT_min_value, deltaT_max_value
+    finally:
+        # Remove the temporary files (also when cancelled or failed)
+        shutil.rmtree(tempo_dir, ignore_errors = True)
 
 
 def calcBuildingImpact(preprocessOutputPath,
@@ -629,40 +1683,24 @@ def calcBuildingImpact(preprocessOutputPath,
                       for tp in [DAY_TIME, NIGHT_TIME]}
     
     # Get the centroid of each building
-    centroid = processing.run("native:centroids",
-                              {'INPUT':buildingPath,
-                               'ALL_PARTS':False,
-                               'OUTPUT':'TEMPORARY_OUTPUT'})
+    gdf_points = gpd.read_file(buildingPath)
+    centroid = gdf_points.centroid
+    df_points = pd.DataFrame(gdf_points.drop("geometry", axis = 1))
     
     # Apply the same method for day and night data
-    for i, tp in enumerate(output_dt_path):
+    for tp in output_dt_path:
         # Fill deltaT nan values since some pixels near the park containing buildings might be nan
-        filled = processing.run("grass7:r.fillnulls",
-                                {'input':output_dt_path[tp],
-                                 'method':0,'tension':40,'smooth':0.1,'edge':3,'npmin':600,
-                                 'segmax':300,'lambda':0.01,'output':'TEMPORARY_OUTPUT',
-                                 'GRASS_REGION_PARAMETER':None,
-                                 'GRASS_REGION_CELLSIZE_PARAMETER':0,
-                                 'GRASS_RASTER_FORMAT_OPT':'',
-                                 'GRASS_RASTER_FORMAT_META':''})
+        filled = RasterUtil.fillNodata(output_dt_path[tp])
         
         # Assign to each building the deltaT value of the pixel intersecting the building centroid
-        if i == 0:
-            input_vector = centroid['OUTPUT']
-            output_vector = 'TEMPORARY_OUTPUT'
-        else:
-            input_vector = build_indep_var['OUTPUT']
-            output_vector = f'{TEMPO_DIRECTORY + os.sep}tmp_deltaT.geojson'
-        build_indep_var = processing.run("native:rastersampling",
-                                         {'INPUT':input_vector,
-                                          'RASTERCOPY':filled['output'],
-                                          'COLUMN_PREFIX':f'{DELTA_T + str(tp)}h',
-                                          'OUTPUT':output_vector})
+        df_points[f'{DELTA_T + str(tp)}h1'] = RasterUtil.sampleRaster(raster = filled,
+                                                                      xs = centroid.x.values,
+                                                                      ys = centroid.y.values)
+        # Release memory to avoid error due to gdal
+        filled = None
         
     # Load the independent variables
-    df_points = gpd.read_file(build_indep_var['OUTPUT'])\
-                       .drop("geometry", axis = 1)\
-                           .set_index(ID_FIELD_BUILD)
+    df_points = df_points.set_index(ID_FIELD_BUILD)
                            
     # Calculates the amplification factor for each building
     deltaT_list = [f'{DELTA_T + str(tp)}h1' for tp in output_dt_path.keys()]
@@ -686,35 +1724,149 @@ def calcBuildingImpact(preprocessOutputPath,
     
     return gdf_build, output_vector
     
+def readScenarioBuildings(scenarioDirectory):
+    """ Reads the building effects of a scenario and calculates the floor
+    area of each building
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _ 
+
+            scenarioDirectory: String
+                Directory of the scenario results
+
+		Returns
+		_ _ _ _ _ _ _ _ _ _ 
+
+            gdf_build: gpd.GeoDataFrame
+                Building effects of the scenario (with a FLOOR_AREA column)"""
+    gdf_build = gpd.read_file(scenarioDirectory + os.sep + BUILD_INDEP_VAR + ".geojson")
+    gdf_build[FLOOR_AREA] = gdf_build.area * np.trunc(gdf_build[HEIGHT_FIELD] / BUILDING_DEFAULT_FLOOR_HEIGHT)
+    
+    return gdf_build
+
+def globalBuildingEffect(gdf_build):
+    """ Calculates the global energy impact of a scenario (the reference for %
+    is without park) and its mean thermal comfort impact weighted by the
+    floor area of the buildings
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _ 
+
+            gdf_build: gpd.GeoDataFrame
+                Building effects of the scenario (with a FLOOR_AREA column)
+
+		Returns
+		_ _ _ _ _ _ _ _ _ _ 
+
+            build_glob: dictionary
+                Energy impact (kWh/year), thermal comfort impact (°C.h/year)
+                and their relative values (%)"""
+    nrj_tot = (gdf_build[ENERGY_IMPACT_ABS].divide(gdf_build[ENERGY_IMPACT_REL]/100)\
+               .mul(gdf_build[FLOOR_AREA])).sum()
+    nrj_impact_tot = (gdf_build[ENERGY_IMPACT_ABS].mul(gdf_build[FLOOR_AREA])).sum()
+    tc_tot = (gdf_build[THERM_COMFORT_IMPACT_ABS].divide(gdf_build[THERM_COMFORT_IMPACT_REL]/100)\
+              .mul(gdf_build[FLOOR_AREA])).sum()/(gdf_build[FLOOR_AREA].sum())
+    tc_impact_tot = (gdf_build[THERM_COMFORT_IMPACT_ABS]\
+              .mul(gdf_build[FLOOR_AREA])).sum()/(gdf_build[FLOOR_AREA].sum())
+    
+    return {ENERGY_IMPACT_ABS: -nrj_impact_tot,
+            ENERGY_IMPACT_REL: -nrj_impact_tot / nrj_tot * 100,
+            THERM_COMFORT_IMPACT_ABS: -tc_impact_tot,
+            THERM_COMFORT_IMPACT_REL: -tc_impact_tot / tc_tot * 100}
+
 def compareScenarios(refScenarioDirectory, 
                      altScenarioDirectory,
                      change,
-                     outputDirectory):
+                     outputDirectory,
+                     gdf_build_ref = None,
+                     gdf_build_alt = None,
+                     refDeltaTStats = None,
+                     overwrite = False,
+                     refName = None,
+                     altName = None):
+    """ Calculates the difference of effects between an alternative and a 
+    reference scenario
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _ 
+
+            refScenarioDirectory: String
+                Directory of the reference scenario results
+            altScenarioDirectory: String
+                Directory of the alternative scenario results
+            change: String
+                Type of change between the scenarios (one of LIST_OF_CHANGES)
+            outputDirectory: String
+                Directory where is created the comparison folder
+            gdf_build_ref: gpd.GeoDataFrame, default None
+                Building effects of the reference scenario (read from
+                'refScenarioDirectory' if None)
+            gdf_build_alt: gpd.GeoDataFrame, default None
+                Building effects of the alternative scenario (read from
+                'altScenarioDirectory' if None)
+            refDeltaTStats: dictionary, default None
+                Statistics (RasterUtil.RasterStats) of the reference deltaT
+                raster for each time period (calculated if None)
+            overwrite: boolean, default False
+                Whether or not an existing comparison folder is replaced
+            refName: String, default None
+                Name of the reference scenario used to name the comparison
+                folder (derived from 'refScenarioDirectory' if None)
+            altName: String, default None
+                Name of the alternative scenario used to name the comparison
+                folder (derived from 'altScenarioDirectory' if None)
+
+		Returns
+		_ _ _ _ _ _ _ _ _ _ 
+
+            finalDirectory: String
+                Directory where are saved the comparison results
+            dict_build_glob: dictionary
+                Global building effects of both scenarios
+            diff_build_path: String
+                Path of the building effect differences (None if not calculated)
+            diff_deltaT_path: dictionary
+                Path of the deltaT difference raster for each time period
+            diff_T_path: dictionary
+                Path of the air temperature difference raster for each time period
+            diff_build_extremums: dictionary
+                Min and max of each building effect difference
+            dict_deltaT_glob: dictionary
+                Mean deltaT of both scenarios and of their difference for 
+                each time period
+            diff_raster_extremums: dictionary
+                Min and max of the deltaT and T difference rasters for each
+                time period"""
     # Create the name for the folder that will be used to save results comparison
-    ref_scenario_name = Path(refScenarioDirectory).parent.parent.name
-    ref_scenario_name += f'-{Path(refScenarioDirectory).name}'
-    alt_scenario_name = Path(altScenarioDirectory).parent.parent.name
-    alt_scenario_name += f'-{Path(altScenarioDirectory).name}'
+    if refName:
+        ref_scenario_name = refName
+    else:
+        ref_scenario_name = Path(refScenarioDirectory).parent.parent.name
+        ref_scenario_name += f'-{Path(refScenarioDirectory).name}'
+    if altName:
+        alt_scenario_name = altName
+    else:
+        alt_scenario_name = Path(altScenarioDirectory).parent.parent.name
+        alt_scenario_name += f'-{Path(altScenarioDirectory).name}'
     comparison_name = alt_scenario_name + "_VS_" + ref_scenario_name
     finalDirectory = outputDirectory + os.sep + comparison_name
     
     # Creates the output folder if it does not exist
     if not os.path.exists(outputDirectory):
-        os.mkdir(outputDirectory)
-    if os.path.exists(outputDirectory + os.sep + comparison_name):
+        os.makedirs(outputDirectory, exist_ok = True)
+    if os.path.exists(outputDirectory + os.sep + comparison_name) and not overwrite:
         raise QgsProcessingException(f'{comparison_name} folder already exists in {outputDirectory}')
     else:
+        shutil.rmtree(finalDirectory, ignore_errors = True)
         os.mkdir(finalDirectory)
     
-    # Read Building energy and comfort files
-    BUILD_ref = refScenarioDirectory + os.sep + BUILD_INDEP_VAR + ".geojson"
-    BUILD_alt = altScenarioDirectory + os.sep + BUILD_INDEP_VAR + ".geojson"
-    gdf_build_ref = gpd.read_file(BUILD_ref)
-    gdf_build_alt = gpd.read_file(BUILD_alt)
+    started = time.time()
     
-    # Add and calculate a floor area column for each building
-    gdf_build_ref[FLOOR_AREA] = gdf_build_ref.area * np.trunc(gdf_build_ref[HEIGHT_FIELD] / BUILDING_DEFAULT_FLOOR_HEIGHT)
-    gdf_build_alt[FLOOR_AREA] = gdf_build_alt.area * np.trunc(gdf_build_alt[HEIGHT_FIELD] / BUILDING_DEFAULT_FLOOR_HEIGHT)
+    # Read Building energy and comfort files (with the floor area of each building)
+    if gdf_build_ref is None:
+        gdf_build_ref = readScenarioBuildings(refScenarioDirectory)
+    if gdf_build_alt is None:
+        gdf_build_alt = readScenarioBuildings(altScenarioDirectory)
     
     # Calculate the building energy and comfort differences
     list_var_abs = [ENERGY_IMPACT_ABS, THERM_COMFORT_IMPACT_ABS]
@@ -729,33 +1881,19 @@ def compareScenarios(refScenarioDirectory,
                             for var in diff_build.columns}
     
     
-    # Calculate the global energy impact for ref and alt (the reference for % is without park)
-    nrj_ref_tot = (gdf_build_ref[ENERGY_IMPACT_ABS].divide(gdf_build_ref[ENERGY_IMPACT_REL]/100)\
-                   .mul(gdf_build_ref[FLOOR_AREA])).sum()
-    nrj_impact_ref_tot = (gdf_build_ref[ENERGY_IMPACT_ABS].mul(gdf_build_ref[FLOOR_AREA])).sum()
-    nrj_alt_tot = (gdf_build_alt[ENERGY_IMPACT_ABS].divide(gdf_build_alt[ENERGY_IMPACT_REL]/100)\
-                   .mul(gdf_build_alt[FLOOR_AREA])).sum()
-    nrj_impact_alt_tot = (gdf_build_alt[ENERGY_IMPACT_ABS].mul(gdf_build_alt[FLOOR_AREA])).sum()
-    
-    # Calculate the mean thermal impact weighted by the area of building
-    tc_ref_tot = (gdf_build_ref[THERM_COMFORT_IMPACT_ABS].divide(gdf_build_ref[THERM_COMFORT_IMPACT_REL]/100)\
-                  .mul(gdf_build_ref[FLOOR_AREA])).sum()/(gdf_build_ref[FLOOR_AREA].sum())
-    tc_impact_ref_tot = (gdf_build_ref[THERM_COMFORT_IMPACT_ABS]\
-                  .mul(gdf_build_ref[FLOOR_AREA])).sum()/(gdf_build_ref[FLOOR_AREA].sum())
-    tc_alt_tot = (gdf_build_alt[THERM_COMFORT_IMPACT_ABS].divide(gdf_build_alt[THERM_COMFORT_IMPACT_REL]/100)\
-                  .mul(gdf_build_alt[FLOOR_AREA])).sum()/(gdf_build_alt[FLOOR_AREA].sum())
-    tc_impact_alt_tot = (gdf_build_alt[THERM_COMFORT_IMPACT_ABS]\
-                  .mul(gdf_build_alt[FLOOR_AREA])).sum()/(gdf_build_alt[FLOOR_AREA].sum())
+    # Calculate the global energy and thermal comfort impacts for ref and alt
+    build_glob_ref = globalBuildingEffect(gdf_build_ref)
+    build_glob_alt = globalBuildingEffect(gdf_build_alt)
     
     # Write global results into a file
-    dict_build_glob = {"ENERGY_IMPACT_REF" : f'{round_to(-nrj_impact_ref_tot, NB_SIGN_DIGITS)}kWh/year '+\
-                                               f'({round_to(-nrj_impact_ref_tot / nrj_ref_tot * 100, NB_SIGN_DIGITS)}%)',
-                       "THERM_COMFORT_REF" : f'{round_to(-tc_impact_ref_tot, NB_SIGN_DIGITS)}°C.h/year '+\
-                                               f'({round_to(-tc_impact_ref_tot / tc_ref_tot * 100, NB_SIGN_DIGITS)}%)',
-                       "ENERGY_IMPACT_ALT" : f'{round_to(-nrj_impact_alt_tot, NB_SIGN_DIGITS)}kWh/year '+\
-                                               f'({round_to(-nrj_impact_alt_tot / nrj_alt_tot * 100, NB_SIGN_DIGITS)}%)',
-                       "THERM_COMFORT_ALT" : f'{round_to(-tc_impact_alt_tot, NB_SIGN_DIGITS)}°C.h/year '+\
-                                               f'({round_to(-tc_impact_alt_tot / tc_alt_tot * 100, NB_SIGN_DIGITS)}%)'}
+    dict_build_glob = {"ENERGY_IMPACT_REF" : f'{round_to(build_glob_ref[ENERGY_IMPACT_ABS], NB_SIGN_DIGITS)}kWh/year '+\
+                                               f'({round_to(build_glob_ref[ENERGY_IMPACT_REL], NB_SIGN_DIGITS)}%)',
+                       "THERM_COMFORT_REF" : f'{round_to(build_glob_ref[THERM_COMFORT_IMPACT_ABS], NB_SIGN_DIGITS)}°C.h/year '+\
+                                               f'({round_to(build_glob_ref[THERM_COMFORT_IMPACT_REL], NB_SIGN_DIGITS)}%)',
+                       "ENERGY_IMPACT_ALT" : f'{round_to(build_glob_alt[ENERGY_IMPACT_ABS], NB_SIGN_DIGITS)}kWh/year '+\
+                                               f'({round_to(build_glob_alt[ENERGY_IMPACT_REL], NB_SIGN_DIGITS)}%)',
+                       "THERM_COMFORT_ALT" : f'{round_to(build_glob_alt[THERM_COMFORT_IMPACT_ABS], NB_SIGN_DIGITS)}°C.h/year '+\
+                                               f'({round_to(build_glob_alt[THERM_COMFORT_IMPACT_REL], NB_SIGN_DIGITS)}%)'}
     pd.Series(dict_build_glob)\
         .to_csv(finalDirectory + os.sep + "Global_building_effect.csv")
     
@@ -772,90 +1910,241 @@ def compareScenarios(refScenarioDirectory,
     diff_deltaT_path = {}
     diff_T_path = {}
     dict_deltaT_glob = {}
+    diff_raster_extremums = {}
     for tp in [DAY_TIME, NIGHT_TIME]:
+        deltaT_ref_path = refScenarioDirectory + os.sep + OUTPUT_DT + "_" + str(tp) + "h"
         if change == 'buildings characteristics':
             diff_deltaT_path[tp] = None
             diff_T_path[tp] = None
-            # Calculate the mean of each deltaT scenario + the scenario difference
-            deltaT_ref_path = refScenarioDirectory + os.sep + OUTPUT_DT + "_" + str(tp) + "h"
-            raster_dt_ref = gdal.Open(f'{deltaT_ref_path}')
-            dt_array_ref = raster_dt_ref.ReadAsArray()
-            val_ref = round_to(np.nanmean(dt_array_ref[(dt_array_ref>-9999) * (dt_array_ref<9999)] ), NB_SIGN_DIGITS)
+            diff_raster_extremums[tp] = {OUTPUT_DT: None, OUTPUT_T: None}
+            # Calculate the mean of the deltaT of the reference scenario
+            if refDeltaTStats:
+                dt_ref_stats = refDeltaTStats[tp]
+            else:
+                dt_ref_stats = RasterUtil.rasterStats(deltaT_ref_path)
+            val_ref = round_to(dt_ref_stats.mean, NB_SIGN_DIGITS)
             dict_deltaT_glob[tp] = {REF_SCEN: str(val_ref),
                                     ALT_SCEN: str(val_ref),
                                     DIFF_SCEN: str(0)}
         else:
-            deltaT_ref_path = refScenarioDirectory + os.sep + OUTPUT_DT + "_" + str(tp) + "h"
             deltaT_alt_path = altScenarioDirectory + os.sep + OUTPUT_DT + "_" + str(tp) + "h"   
             T_ref_path = refScenarioDirectory + os.sep + OUTPUT_T + "_" + str(tp) + "h" 
             T_alt_path = altScenarioDirectory + os.sep + OUTPUT_T + "_" + str(tp) + "h"
             
-            # Calculate the deltaT difference
+            # Calculate the deltaT difference and the mean of each deltaT 
+            # scenario + the scenario difference (in a single pass, block by block)
             diff_deltaT_path[tp] = finalDirectory + os.sep + OUTPUT_DT + "_" + str(tp) + "h"
             diff_T_path[tp] = None
-            processing.run("gdal:rastercalculator", 
-                           {'INPUT_A':deltaT_alt_path,
-                            'BAND_A':1,
-                            'INPUT_B':deltaT_ref_path,
-                            'BAND_B':1,
-                            'INPUT_C':None,
-                            'BAND_C':None,
-                            'INPUT_D':None,
-                            'BAND_D':None,
-                            'INPUT_E':None,
-                            'BAND_E':None,
-                            'INPUT_F':None,
-                            'BAND_F':None,
-                            'FORMULA':'A -B',
-                            'NO_DATA':None,
-                            'RTYPE':5,
-                            'OPTIONS':'',
-                            'EXTRA':'',
-                            'OUTPUT': diff_deltaT_path[tp]})
-            
-            # Calculate the mean of each deltaT scenario + the scenario difference
-            raster_dt_ref = gdal.Open(f'{deltaT_ref_path}')
-            raster_dt_alt = gdal.Open(f'{deltaT_alt_path}')
-            raster_dt_diff = gdal.Open(f'{diff_deltaT_path[tp]}')
-            dt_array_ref = raster_dt_ref.ReadAsArray()
-            dt_array_alt = raster_dt_alt.ReadAsArray()
-            dt_array_diff = raster_dt_diff.ReadAsArray()
-            val_ref = round_to(np.nanmean(dt_array_ref[(dt_array_ref>-9999) * (dt_array_ref<9999)] ), NB_SIGN_DIGITS)
-            val_alt = round_to(np.nanmean(dt_array_alt[(dt_array_alt>-9999) * (dt_array_alt<9999)]), NB_SIGN_DIGITS)
-            val_diff = round_to(np.nanmean(dt_array_diff[(dt_array_diff>-9999) * (dt_array_diff<9999)]), NB_SIGN_DIGITS)
+            dt_ref_stats, dt_alt_stats, dt_diff_stats = \
+                RasterUtil.differenceRasters(altPath = deltaT_alt_path,
+                                             refPath = deltaT_ref_path,
+                                             outputPath = diff_deltaT_path[tp])
+            val_ref = round_to(dt_ref_stats.mean, NB_SIGN_DIGITS)
+            val_alt = round_to(dt_alt_stats.mean, NB_SIGN_DIGITS)
+            val_diff = round_to(dt_diff_stats.mean, NB_SIGN_DIGITS)
             
             dict_deltaT_glob[tp] = {REF_SCEN: str(val_ref),
                                     ALT_SCEN: str(val_alt),
                                     DIFF_SCEN: str(val_diff)}
-                                         
-            # Release memory to avoid error due to gdal
-            raster_dt_ref = None
-            raster_dt_alt = None
-            raster_dt_diff = None    
+            diff_raster_extremums[tp] = {OUTPUT_DT: (dt_diff_stats.min, dt_diff_stats.max),
+                                         OUTPUT_T: None}
                 
             if change == "park_composition":
                 diff_deltaT_path[tp] = None
                 diff_T_path[tp] = finalDirectory + os.sep + OUTPUT_T + "_" + str(tp) + "h"
                 # Calculate the air temperature difference
-                processing.run("gdal:rastercalculator", 
-                               {'INPUT_A':T_alt_path,
-                                'BAND_A':1,
-                                'INPUT_B':T_ref_path,
-                                'BAND_B':1,
-                                'INPUT_C':None,
-                                'BAND_C':None,
-                                'INPUT_D':None,
-                                'BAND_D':None,
-                                'INPUT_E':None,
-                                'BAND_E':None,
-                                'INPUT_F':None,
-                                'BAND_F':None,
-                                'FORMULA':'A -B',
-                                'NO_DATA':None,
-                                'RTYPE':5,
-                                'OPTIONS':'',
-                                'EXTRA':'',
-                                'OUTPUT': diff_T_path[tp]})
+                t_diff_stats = RasterUtil.differenceRasters(altPath = T_alt_path,
+                                                            refPath = T_ref_path,
+                                                            outputPath = diff_T_path[tp])[2]
+                diff_raster_extremums[tp] = {OUTPUT_DT: None,
+                                             OUTPUT_T: (t_diff_stats.min, t_diff_stats.max)}
+            
+    # Record the comparison in the scenario catalog
+    ScenarioCatalog.recordRun(kind = ScenarioCatalog.COMPARISON,
+                              outputDirectory = finalDirectory,
+                              scenario = comparison_name,
+                              inputs = {REF_SCEN: refScenarioDirectory + os.sep + BUILD_INDEP_VAR + ".geojson",
+                                        ALT_SCEN: altScenarioDirectory + os.sep + BUILD_INDEP_VAR + ".geojson"},
+                              outputs = dict({f"{OUTPUT_DT}_{tp}h": diff_deltaT_path[tp] for tp in diff_deltaT_path},
+                                             **{f"{OUTPUT_T}_{tp}h": diff_T_path[tp] for tp in diff_T_path},
+                                             **{BUILD_INDEP_VAR: diff_build_path}),
+                              statistics = dict(dict_build_glob,
+                                                **{f"{OUTPUT_DT}_{tp}h": dict_deltaT_glob[tp] for tp in dict_deltaT_glob}),
+                              started = started,
+                              duration = time.time() - started)
             
     return finalDirectory, dict_build_glob, diff_build_path, diff_deltaT_path,\
-        diff_T_path, diff_build_extremums, dict_deltaT_glob
\ No newline at end of file
+        diff_T_path, diff_build_extremums, dict_deltaT_glob, diff_raster_extremums
+
+def compareScenarioMatrix(refScenarioDirectory, 
+                          altScenarioDirectories,
+                          change,
+                          outputDirectory,
+                          nWorkers = COMPARISON_WORKERS,
+                          overwrite = False,
+                          names = None,
+                          feedback = None):
+    """ Compares several alternative scenarios with a same reference scenario.
+    The reference building effects and deltaT statistics are calculated once
+    and the alternatives are compared in parallel. The difference layers of
+    each alternative are saved in its own comparison folder and the global
+    effects of all scenarios are gathered in the COMPARISON_MATRIX_FILE table.
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _ 
+
+            refScenarioDirectory: String
+                Directory of the reference scenario results
+            altScenarioDirectories: list of String
+                Directories of the alternative scenario results
+            change: String
+                Type of change between the reference and the alternatives
+                (one of LIST_OF_CHANGES)
+            outputDirectory: String
+                Directory where are saved the comparison folders and the
+                consolidated table
+            nWorkers: int, default COMPARISON_WORKERS
+                Number of alternatives compared in parallel
+            overwrite: boolean, default False
+                Whether or not existing comparison folders are replaced
+            names: dictionary, default None
+                Scenario directory as key and name used for the comparison
+                folders as value (e.g. ScenarioCatalog.names, derived from
+                the directories if None)
+            feedback: QgsProcessingFeedback, default None
+                Object used to report progress and to check cancellation
+
+		Returns
+		_ _ _ _ _ _ _ _ _ _ 
+
+            df_matrix: pd.DataFrame
+                Global building effects and mean deltaT of the reference and
+                of each alternative (and their difference with the reference)
+                (None if the calculation has been cancelled)
+            comparisonDirectories: dictionary
+                Alternative directory as key and comparison folder as value"""
+    # Load the reference once for all alternatives
+    gdf_build_ref = readScenarioBuildings(refScenarioDirectory)
+    refDeltaTStats = {tp: RasterUtil.rasterStats(refScenarioDirectory + os.sep\
+                                                 + OUTPUT_DT + "_" + str(tp) + "h")
+                      for tp in [DAY_TIME, NIGHT_TIME]}
+    ref_row = globalBuildingEffect(gdf_build_ref)
+    for tp in [DAY_TIME, NIGHT_TIME]:
+        ref_row[f"{OUTPUT_DT}_{tp}h"] = round_to(refDeltaTStats[tp].mean, NB_SIGN_DIGITS)
+    
+    if names is None:
+        names = {}
+    
+    def compareAlternative(altScenarioDirectory):
+        gdf_build_alt = readScenarioBuildings(altScenarioDirectory)
+        comparison = compareScenarios(refScenarioDirectory = refScenarioDirectory,
+                                      altScenarioDirectory = altScenarioDirectory,
+                                      change = change,
+                                      outputDirectory = outputDirectory,
+                                      gdf_build_ref = gdf_build_ref,
+                                      gdf_build_alt = gdf_build_alt,
+                                      refDeltaTStats = refDeltaTStats,
+                                      overwrite = overwrite,
+                                      refName = names.get(refScenarioDirectory),
+                                      altName = names.get(altScenarioDirectory))
+        alt_row = globalBuildingEffect(gdf_build_alt)
+        for tp in [DAY_TIME, NIGHT_TIME]:
+            alt_row[f"{OUTPUT_DT}_{tp}h"] = float(comparison[6][tp][ALT_SCEN])
+        return comparison[0], alt_row
+    
+    rows = {refScenarioDirectory: ref_row}
+    comparisonDirectories = {}
+    with ThreadPoolExecutor(max_workers = nWorkers) as executor:
+        futures = {executor.submit(compareAlternative, altScenarioDirectory): altScenarioDirectory
+                   for altScenarioDirectory in altScenarioDirectories}
+        for i, future in enumerate(as_completed(futures)):
+            comparisonDirectories[futures[future]], rows[futures[future]] = future.result()
+            if feedback:
+                feedback.setProgressText(f'{futures[future]} compared ({i+1}/{len(futures)})')
+                # Alternatives not yet started are cancelled
+                if feedback.isCanceled():
+                    for f in futures:
+                        f.cancel()
+                    feedback.setProgressText("Calculation cancelled by user")
+                    return None, comparisonDirectories
+    
+    # Consolidated table (reference first, then alternatives in the input order)
+    df_matrix = pd.DataFrame.from_dict({d: rows[d] for d in [refScenarioDirectory] + list(altScenarioDirectories)},
+                                       orient = "index")
+    for col in ref_row.keys():
+        df_matrix[col + "_DIFF"] = df_matrix[col] - ref_row[col]
+    df_matrix.index.name = SCENARIO_FIELD
+    df_matrix.to_csv(outputDirectory + os.sep + COMPARISON_MATRIX_FILE)
+    
+    return df_matrix, comparisonDirectories
+
+def mosaicParkInfluences(scenarioDirectories,
+                         outputDirectory,
+                         prefix = DEFAULT_WEATHER,
+                         rule = MOSAIC_RULE,
+                         resolution = None,
+                         feedback = None):
+    """ Combine the air temperature and deltaT rasters of several park
+    scenarios (e.g. prepared in batch mode) in city-wide maps.
+
+		Parameters
+		_ _ _ _ _ _ _ _ _ _ 
+
+            scenarioDirectories: list of String
+                Directory of each park scenario
+            outputDirectory: String
+                Directory where are saved the city-wide maps
+            prefix: String, default DEFAULT_WEATHER
+                Name of the weather scenario used in each park scenario
+            rule: String, default MOSAIC_RULE
+                Rule used where park influences overlap ("min", "sum" or 
+                "nearest"). The "sum" rule is applied only to deltaT (the
+                minimum air temperature is kept)
+            resolution: float, default None
+                Pixel size of the maps (finest resolution of the rasters if None)
+            feedback: QgsProcessingFeedback, default None
+                Object used to report progress and to check cancellation
+            
+		Returns
+		_ _ _ _ _ _ _ _ _ _ 
+
+            output_t_path: dictionary
+                Path of the air temperature map of each time period
+            output_dt_path: dictionary
+                Path of the deltaT map of each time period"""
+    if not os.path.exists(outputDirectory):
+        os.makedirs(outputDirectory)
+    
+    # Park centroids are needed to identify the nearest park
+    if rule == "nearest":
+        centers = [PreparedScenario.parkCenter(d + os.sep + OUTPUT_PREPROCESSOR_FOLDER)
+                       for d in scenarioDirectories]
+    else:
+        centers = None
+    
+    output_t_path = {}
+    output_dt_path = {}
+    for tp in [DAY_TIME, NIGHT_TIME]:
+        if feedback:
+            feedback.setProgressText(f'Mosaic the park influences ({tp}h)')
+            if feedback.isCanceled():
+                feedback.setProgressText("Calculation cancelled by user")
+                return {}
+        input_dir = [d + os.sep + OUTPUT_PROCESSOR_FOLDER + os.sep + prefix 
+                         for d in scenarioDirectories]
+        output_dt_path[tp] = \
+            RasterUtil.mosaicRasters(rasterPaths = [d + os.sep + f"{OUTPUT_DT}_{str(tp)}h"
+                                                        for d in input_dir],
+                                     outputPath = outputDirectory + os.sep + f"{OUTPUT_DT}_{str(tp)}h.tif",
+                                     rule = rule,
+                                     centers = centers,
+                                     resolution = resolution)
+        output_t_path[tp] = \
+            RasterUtil.mosaicRasters(rasterPaths = [d + os.sep + f"{OUTPUT_T}_{str(tp)}h"
+                                                        for d in input_dir],
+                                     outputPath = outputDirectory + os.sep + f"{OUTPUT_T}_{str(tp)}h.tif",
+                                     rule = "min" if rule == "sum" else rule,
+                                     centers = centers,
+                                     resolution = resolution)
+    
+    return output_t_path, output_dt_path
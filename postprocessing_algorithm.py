@@ -53,13 +53,10 @@ from qgis.core import (QgsProcessing,
 from qgis.PyQt.QtWidgets import QMessageBox
 
 from pathlib import Path
-import geopandas as gpd
 from qgis.PyQt.QtGui import QIcon
 import inspect
-import processing
 
 from .functions.coolparks_postprocess import loadCoolParksRaster, loadCoolParksVector, Renamer
-from .functions import mainCalculations
 from .functions.globalVariables import *
 from .functions import WriteMetadata
 from .functions.DataUtil import trunc_to, round_to
@@ -116,6 +113,12 @@ class CoolParksAnalyzerAlgorithm(QgsProcessingAlgorithm):
         Here is where the processing itself takes place.
         """
         
+        # The calculation modules are only imported when the algorithm runs
+        # (they would slow down the loading of QGIS)
+        import geopandas as gpd
+        import processing
+        from .functions import JobService
+        
         refScenarioDirectory = self.parameterAsString(parameters, self.SCENARIO_REF_DIRECTORY, context)
         altScenarioDirectory = self.parameterAsString(parameters, self.SCENARIO_ALT_DIRECTORY, context)
         changes = self.parameterAsString(parameters, self.CHANGES, context)
@@ -188,11 +191,12 @@ class CoolParksAnalyzerAlgorithm(QgsProcessingAlgorithm):
         
         # Calculates the difference of effects between the two scenarios
         finalDirectory, dict_build_glob, diff_build_path, diff_deltaT_path,\
-            diff_T_path, diff_build_extremums, dict_deltaT_glob = \
-                mainCalculations.compareScenarios(refScenarioDirectory = refScenarioDirectory, 
-                                                  altScenarioDirectory = altScenarioDirectory,
-                                                  change = changes_string,
-                                                  outputDirectory = outputDirectory)
+            diff_T_path, diff_build_extremums, dict_deltaT_glob, diff_raster_extremums = \
+                JobService.execute(JobService.COMPARE,
+                                   refScenarioDirectory = refScenarioDirectory, 
+                                   altScenarioDirectory = altScenarioDirectory,
+                                   change = changes_string,
+                                   outputDirectory = outputDirectory)
         
 
         # Use the directory name used for the scenario comparison as a 
@@ -217,24 +221,18 @@ class CoolParksAnalyzerAlgorithm(QgsProcessingAlgorithm):
             #     diff_deltaT_path[tp] = refScenarioDirectory + os.sep + OUTPUT_DT + "_" + str(tp) + "h"
             
             if diff_deltaT_path[tp]:  
-                layer_stat = processing.run("native:rasterlayerstatistics", 
-                                            {'INPUT':diff_deltaT_path[tp],
-                                            'BAND':1,
-                                            'OUTPUT_HTML_FILE':'TEMPORARY_OUTPUT'})
-                if layer_stat['MIN'] < deltaT_min_value:
-                    deltaT_min_value = layer_stat['MIN']
-                if layer_stat['MAX'] > deltaT_max_value:
-                    deltaT_max_value = layer_stat['MAX']
+                dt_min, dt_max = diff_raster_extremums[tp][OUTPUT_DT]
+                if dt_min < deltaT_min_value:
+                    deltaT_min_value = dt_min
+                if dt_max > deltaT_max_value:
+                    deltaT_max_value = dt_max
                     
             if diff_T_path[tp]:  
-                layer_stat = processing.run("native:rasterlayerstatistics", 
-                                            {'INPUT':diff_T_path[tp],
-                                            'BAND':1,
-                                            'OUTPUT_HTML_FILE':'TEMPORARY_OUTPUT'})
-                if layer_stat['MIN'] < T_min_value:
-                    T_min_value = layer_stat['MIN']
-                if layer_stat['MAX'] > T_max_value:
-                    T_max_value = layer_stat['MAX']      
+                t_min, t_max = diff_raster_extremums[tp][OUTPUT_T]
+                if t_min < T_min_value:
+                    T_min_value = t_min
+                if t_max > T_max_value:
+                    T_max_value = t_max
                     
         # Calculates the number of significant digits
         if NB_ISOVALUES < 10:
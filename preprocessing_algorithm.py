@@ -57,11 +57,9 @@ from qgis.PyQt.QtGui import QIcon
 import inspect
 import unidecode
 
-from .functions import mainCalculations
 from .functions.globalVariables import *
 from .functions import WriteMetadata
 
-from .functions.H2gisConnection import getJavaDir, setJavaDir, saveJavaDir
 
 
 
@@ -95,6 +93,9 @@ class CoolParksPreparerAlgorithm(QgsProcessingAlgorithm):
     PARK_GROUND_TYPE_FIELD = "PARK_GROUND_TYPE"
     PARK_CANOPY_TYPE_FIELD = "PARK_CANOPY_TYPE"
     
+    RESUME = "RESUME"
+    PROFILE = "PROFILE"
+    
     # Output variables    
     OUTPUT_DIRECTORY = "COOLPARKS_OUTPUT"
     SCENARIO_NAME = "SCENARIO_NAME"
@@ -249,6 +250,20 @@ class CoolParksPreparerAlgorithm(QgsProcessingAlgorithm):
                 self.PARK_CANOPY_TABLE_NAME,
                 QgsProcessingParameterField.String,
                 optional = False))
+        
+        # Continue an interrupted preparation of the same scenario
+        self.addParameter(
+            QgsProcessingParameterBoolean(
+                self.RESUME,
+                self.tr('Resume an interrupted preparation of this scenario (skip the stages and wind directions already done)'),
+                defaultValue = False))
+        
+        # Record the duration of each SQL query in a profile saved with the outputs
+        self.addParameter(
+            QgsProcessingParameterBoolean(
+                self.PROFILE,
+                self.tr('Save a profile of the SQL queries (duration of each query)'),
+                defaultValue = SQL_PROFILE))
     
         self.addParameter(
             QgsProcessingParameterFolderDestination(
@@ -265,6 +280,10 @@ class CoolParksPreparerAlgorithm(QgsProcessingAlgorithm):
             import jaydebeapi
         except:
             raise QgsProcessingException("'jaydebeapi' Python package is missing.")
+        # The calculation modules are only imported when the algorithm runs
+        # (they would slow down the loading of QGIS)
+        from .functions import JobService
+        from .functions.H2gisConnection import getJavaDir, setJavaDir, saveJavaDir
 
         # Get the plugin directory to save some useful files
         plugin_directory = self.plugin_dir = os.path.dirname(__file__)
@@ -350,22 +369,8 @@ class CoolParksPreparerAlgorithm(QgsProcessingAlgorithm):
         outputDirectory = self.parameterAsString(parameters, self.OUTPUT_DIRECTORY, context)
         scenarioName = self.parameterAsString(parameters, self.SCENARIO_NAME, context)
         prefix = unidecode.unidecode(scenarioName).replace(" ", "_")
-        
-        # Creates the output folder if it does not exist
-        if not os.path.exists(outputDirectory):
-            if os.path.exists(Path(outputDirectory).parent.absolute()):
-                os.mkdir(outputDirectory)
-            else:
-                raise QgsProcessingException('The output directory does not exist, neither its parent directory')
-        # Create the folder for the scenario to be run
-        if os.path.exists(outputDirectory + os.path.sep + prefix):
-            raise QgsProcessingException(f'The folder "{prefix}" already exists in "{outputDirectory}" directory. Please change "Scenario name" or remove the corresponding directory')
-        else:
-            os.mkdir(outputDirectory + os.path.sep + prefix)
-        
-        # Create the output folder for the preprocessors and processors
-        os.mkdir(outputDirectory + os.path.sep + prefix + os.sep + OUTPUT_PREPROCESSOR_FOLDER)
-        os.mkdir(outputDirectory + os.path.sep + prefix + os.sep + OUTPUT_PROCESSOR_FOLDER)
+        resume = self.parameterAsBool(parameters, self.RESUME, context)
+        profile = self.parameterAsBool(parameters, self.PROFILE, context)
         
         # if feedback:
         #     feedback.setProgressText("Writing settings for this model run to specified output folder (Filename: RunInfoURock_YYYY_DOY_HHMM.txt)")
@@ -375,32 +380,37 @@ class CoolParksPreparerAlgorithm(QgsProcessingAlgorithm):
         #                                 profileFile,
         #                                 meshSize, dz)
         
-        # Make the calculations
-        cursor, cityAllIndic = \
-            mainCalculations.prepareData(plugin_directory = plugin_directory, 
-                                         buildingFilePath = build_file,
-                                         parkBoundaryFilePath = park_bound_file,
-                                         parkCanopyFilePath = park_canopy_file,
-                                         parkGroundFilePath = park_ground_file,
-                                         srid = srid_build,
-                                         canopy_cover_type = parkCanopyType,
-                                         ground_cover_type = parkGroundType,
-                                         build_height = buildHeight,
-                                         build_age = buildAge,
-                                         build_wwr = buildWWR,
-                                         build_shutter = buildShutter,
-                                         build_nat_ventil = buildNatVentil,
-                                         default_build_height = def_build_height,
-                                         default_build_age = def_build_age,
-                                         default_build_wwr = def_build_wwr,                                        
-                                         default_build_shutter = def_build_shutter,                                        
-                                         default_build_nat_ventil = def_build_nat_ventil,                                       
-                                         nAlongWind = N_ALONG_WIND_PARK,
-                                         nCrossWind = N_CROSS_WIND_PARK,
-                                         feedback = feedback,
-                                         output_directory = outputDirectory,
-                                         prefix = prefix)
+        # Make the calculations (the scenario folders are created first)
+        result = \
+            JobService.execute(JobService.PREPARE,
+                               plugin_directory = plugin_directory, 
+                               buildingFilePath = build_file,
+                               parkBoundaryFilePath = park_bound_file,
+                               parkCanopyFilePath = park_canopy_file,
+                               parkGroundFilePath = park_ground_file,
+                               srid = srid_build,
+                               canopy_cover_type = parkCanopyType,
+                               ground_cover_type = parkGroundType,
+                               build_height = buildHeight,
+                               build_age = buildAge,
+                               build_wwr = buildWWR,
+                               build_shutter = buildShutter,
+                               build_nat_ventil = buildNatVentil,
+                               default_build_height = def_build_height,
+                               default_build_age = def_build_age,
+                               default_build_wwr = def_build_wwr,                                        
+                               default_build_shutter = def_build_shutter,                                        
+                               default_build_nat_ventil = def_build_nat_ventil,                                       
+                               nAlongWind = N_ALONG_WIND_PARK,
+                               nCrossWind = N_CROSS_WIND_PARK,
+                               feedback = feedback,
+                               output_directory = outputDirectory,
+                               prefix = prefix,
+                               profile = profile,
+                               resume = resume)
         
+        if result is None:
+            return {}
 
         # Return the output file names
         return {self.OUTPUT_DIRECTORY: outputDirectory,
@@ -48,16 +48,13 @@ from qgis.core import (QgsProcessing,
                        QgsProcessingContext,
                        QgsProcessingParameterEnum,
                        QgsProcessingParameterFile,
-                       QgsProcessingException,
                        QgsLayerTreeGroup)
 # qgis.utils import iface
 from pathlib import Path
 from qgis.PyQt.QtGui import QIcon
 import inspect
 import unidecode
-import geopandas as gpd
 
-from .functions import mainCalculations
 from .functions.globalVariables import *
 from .functions import WriteMetadata
 from .functions.DataUtil import trunc_to, round_to
@@ -100,7 +97,7 @@ class CoolParksProcessorAlgorithm(QgsProcessingAlgorithm):
         self.addParameter(
             QgsProcessingParameterFile(
                 self.WEATHER_FILE,
-                self.tr('Input meteorological file (.txt or .csv)')))
+                self.tr('Input meteorological file (Shiny Weather Data .txt or .csv, EnergyPlus .epw or CSV)')))
 
     def processAlgorithm(self, parameters, context, feedback):
         """
@@ -112,21 +109,15 @@ class CoolParksProcessorAlgorithm(QgsProcessingAlgorithm):
         # except:
         #     raise QgsProcessingException("'jaydebeapi' Python package is missing.")
         
+        # The calculation modules are only imported when the algorithm runs
+        # (they would slow down the loading of QGIS)
+        from .functions import JobService
+        
         scenarioDirectory = self.parameterAsString(parameters, self.SCENARIO_DIRECTORY, context)
         weatherFile = self.parameterAsString(parameters, self.WEATHER_FILE, context)
         weatherScenario = self.parameterAsString(parameters, self.WEATHER_SCENARIO, context)
         prefix = unidecode.unidecode(weatherScenario).replace(" ", "_")
         
-        # Creates the output folder if it does not exist
-        if os.path.exists(scenarioDirectory + os.sep + OUTPUT_PROCESSOR_FOLDER):
-            if os.path.exists(scenarioDirectory + os.sep + OUTPUT_PROCESSOR_FOLDER + os.sep + prefix):
-                raise QgsProcessingException(f'"{prefix}" folder already exists in "{scenarioDirectory + os.sep + OUTPUT_PROCESSOR_FOLDER}"')
-            else:
-                os.mkdir(scenarioDirectory + os.sep + OUTPUT_PROCESSOR_FOLDER + os.sep + prefix)   
-        else:
-            raise QgsProcessingException(f'"{scenarioDirectory}" should contain a folder called "{OUTPUT_PROCESSOR_FOLDER}". It is not the directory of a preprocessed scenario.')
-        
-
         # if feedback:
         #     feedback.setProgressText("Writing settings for this model run to specified output folder (Filename: RunInfoURock_YYYY_DOY_HHMM.txt)")
         # WriteMetadataURock.writeRunInfo(outputDirectory, build_file, heightBuild,
@@ -135,27 +126,17 @@ class CoolParksProcessorAlgorithm(QgsProcessingAlgorithm):
         #                                 profileFile,
         #                                 meshSize, dz)
         
-        if feedback:
-            feedback.setProgressText("Calculate park effect on air temperature")
-            if feedback.isCanceled():
-                feedback.setProgressText("Calculation cancelled by user")
-                return {}
-        # Calculates the effect of the park on its surrounding
-        output_t_path, output_dt_path, deltaT_min_value, deltaT_max_value = \
-            mainCalculations.calcParkInfluence(weatherFilePath = weatherFile, 
-                                               preprocessOutputPath = scenarioDirectory,
-                                               prefix = prefix,
-                                               feedback = feedback)
-        
-        if feedback:
-            feedback.setProgressText("Calculate park effect on building energy and thermal comfort")
-            if feedback.isCanceled():
-                feedback.setProgressText("Calculation cancelled by user")
-                return {}
-        # Calculates the impact of the cooling on the buildings
-        gdf_build, output_build_path = \
-            mainCalculations.calcBuildingImpact(preprocessOutputPath = scenarioDirectory,
-                                                prefix = prefix)
+        # Calculates the effect of the park on its surrounding and on the buildings
+        # (the output folder is created first)
+        result = JobService.execute(JobService.CALC,
+                                    scenarioDirectory = scenarioDirectory,
+                                    weatherFilePath = weatherFile,
+                                    prefix = prefix,
+                                    feedback = feedback)
+        if result is None:
+            return {}
+        output_t_path, output_dt_path, deltaT_min_value, deltaT_max_value,\
+            gdf_build, output_build_path = result
         
         ######################################################################
         ######################## LOAD DATA INTO QGIS #########################
@@ -1,2 +1,6 @@
 # import qgis libs so that ve set the correct sip api version
-import qgis   # pylint: disable=W0611  # NOQA
\ No newline at end of file
+try:
+    import qgis   # pylint: disable=W0611  # NOQA
+except ImportError:
+    # The tests of the functions not depending on QGIS can still be run
+    pass
@@ -0,0 +1,146 @@
+# coding=utf-8
+"""Tests of the checkpoints of an unfinished preparation.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+__author__ = 'Jérémy Bernard'
+__date__ = '2026-10-19'
+__copyright__ = '(C) 2026 by Jérémy Bernard'
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from ..functions import Checkpoints
+
+
+class CheckpointsTest(unittest.TestCase):
+    """Test the recording and the reuse of the checkpoints"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.checkpointDirectory = os.path.join(self.directory, "checkpoints")
+        self.inputPath = os.path.join(self.directory, "buildings.geojson")
+        with open(self.inputPath, "w") as f:
+            f.write("{}")
+        self.inputs = {"buildingFilePath": self.inputPath, "srid": 2154}
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors = True)
+
+    def checkpoints(self, inputs = None, resume = True, feedback = None):
+        return Checkpoints.Checkpoints(directory = self.checkpointDirectory,
+                                       inputs = inputs or self.inputs,
+                                       resume = resume,
+                                       feedback = feedback)
+
+    def recordDirection(self, checkpoints, windDirection):
+        stage = Checkpoints.directionStage(windDirection)
+        with open(checkpoints.path("direction.gpkg"), "w") as f:
+            f.write("outputs")
+        checkpoints.record(stage,
+                           outputs = {"container": "direction.gpkg"},
+                           values = {"table": "CITY_INDIC"})
+        return stage
+
+    def test_record(self):
+        checkpoints = self.checkpoints()
+        stage = self.recordDirection(checkpoints, 90)
+        self.assertEqual(stage, "direction 90.0")
+        self.assertTrue(checkpoints.done(stage))
+        self.assertFalse(checkpoints.done("buildings"))
+        self.assertEqual(checkpoints.get(stage), {"table": "CITY_INDIC"})
+        self.assertEqual(checkpoints.output(stage, "container"),
+                         os.path.join(self.checkpointDirectory, "direction.gpkg"))
+
+    def test_resume(self):
+        """The stages recorded with the same inputs are reused"""
+        stage = self.recordDirection(self.checkpoints(), 90)
+        self.assertTrue(self.checkpoints().done(stage))
+
+    def test_not_resumed(self):
+        """The checkpoints are removed when the preparation is not resumed"""
+        stage = self.recordDirection(self.checkpoints(), 90)
+        checkpoints = self.checkpoints(resume = False)
+        self.assertFalse(checkpoints.done(stage))
+        self.assertFalse(os.path.exists(checkpoints.path("direction.gpkg")))
+
+    def test_output_removed(self):
+        """A stage whose outputs do not exist anymore is not done"""
+        checkpoints = self.checkpoints()
+        stage = self.recordDirection(checkpoints, 90)
+        os.remove(checkpoints.path("direction.gpkg"))
+        self.assertFalse(checkpoints.done(stage))
+
+    def test_other_inputs(self):
+        """The checkpoints recorded with other inputs are not used and the
+        user is warned"""
+        stage = self.recordDirection(self.checkpoints(), 90)
+        feedback = mock.Mock()
+        checkpoints = self.checkpoints(inputs = dict(self.inputs, srid = 4326),
+                                       feedback = feedback)
+        self.assertFalse(checkpoints.done(stage))
+        feedback.pushWarning.assert_called_once()
+        self.assertIn("other inputs", feedback.pushWarning.call_args.args[0])
+
+    def test_other_inputs_without_feedback(self):
+        self.recordDirection(self.checkpoints(), 90)
+        with mock.patch("builtins.print") as printed:
+            self.checkpoints(inputs = dict(self.inputs, srid = 4326))
+        printed.assert_called_once()
+
+    def test_child(self):
+        """The checkpoints of a sub-preparation share the inputs of the parent"""
+        feedback = mock.Mock()
+        checkpoints = self.checkpoints(feedback = feedback)
+        child = checkpoints.child(os.path.join(self.directory, "park1"))
+        self.assertEqual(child.key, checkpoints.key)
+        self.assertEqual(child.inputs, checkpoints.inputs)
+        self.assertIs(child.feedback, feedback)
+        stage = self.recordDirection(child, 0)
+        self.assertTrue(child.child(os.path.join(self.directory, "park1")).done(stage))
+        self.assertFalse(checkpoints.done(stage))
+
+    def test_clear(self):
+        checkpoints = self.checkpoints()
+        stage = self.recordDirection(checkpoints, 90)
+        checkpoints.clear()
+        self.assertFalse(checkpoints.done(stage))
+        self.assertFalse(os.path.exists(self.checkpointDirectory))
+
+
+class InputKeyTest(unittest.TestCase):
+    """Test the identifier of the inputs of a preparation"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.inputPath = os.path.join(self.directory, "buildings.geojson")
+        with open(self.inputPath, "w") as f:
+            f.write("{}")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors = True)
+
+    def test_settings(self):
+        self.assertEqual(Checkpoints.inputKey({"srid": 2154, "nCrossWind": 3}),
+                         Checkpoints.inputKey({"nCrossWind": 3, "srid": 2154}))
+        self.assertNotEqual(Checkpoints.inputKey({"srid": 2154}),
+                            Checkpoints.inputKey({"srid": 4326}))
+
+    def test_file_content(self):
+        """The key changes when the content of an input file changes"""
+        key = Checkpoints.inputKey({"buildingFilePath": self.inputPath})
+        self.assertEqual(Checkpoints.inputKey({"buildingFilePath": self.inputPath}), key)
+        with open(self.inputPath, "w") as f:
+            f.write('{"type": "FeatureCollection"}')
+        self.assertNotEqual(Checkpoints.inputKey({"buildingFilePath": self.inputPath}), key)
+
+
+if __name__ == "__main__":
+    unittest.main()
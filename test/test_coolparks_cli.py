@@ -0,0 +1,130 @@
+# coding=utf-8
+"""Tests of the command-line arguments of the CoolParks calculations.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+__author__ = 'Jérémy Bernard'
+__date__ = '2026-10-19'
+__copyright__ = '(C) 2026 by Jérémy Bernard'
+
+import importlib.util
+import unittest
+from unittest import mock
+
+# The calculation modules need GDAL (but not QGIS)
+HAS_GDAL = importlib.util.find_spec("osgeo") is not None
+if HAS_GDAL:
+    from ..functions import coolparks_cli
+    from ..functions.DataUtil import QgsProcessingException
+    from ..functions.globalVariables import DEFAULT_SCENARIO, DEFAULT_WEATHER,\
+        BUILDING_DEFAULT_HEIGHT, PARK_BATCH_WORKERS, JOB_SERVICE_PORT
+
+PREPARE_ARGS = ["prepare",
+                "--buildings", "buildings.shp",
+                "--park-boundaries", "park.shp",
+                "--park-ground", "ground.shp",
+                "--ground-type", "TYPE",
+                "--park-canopy", "canopy.shp",
+                "--canopy-type", "TYPE"]
+
+
+@unittest.skipUnless(HAS_GDAL, "GDAL is not installed")
+class CliArgumentsTest(unittest.TestCase):
+    """Test the parsing of the arguments of each command"""
+
+    def test_prepare_defaults(self):
+        """The optional arguments of 'prepare' have their default values"""
+        args = coolparks_cli.parser().parse_args(PREPARE_ARGS)
+        self.assertIs(args.func, coolparks_cli.prepare)
+        self.assertEqual(args.scenario, DEFAULT_SCENARIO)
+        self.assertEqual(args.park_boundaries, "park.shp")
+        self.assertEqual(args.default_height, BUILDING_DEFAULT_HEIGHT)
+        self.assertEqual(args.workers, PARK_BATCH_WORKERS)
+        self.assertIsNone(args.height)
+        self.assertIsNone(args.weather)
+        self.assertFalse(args.park_batch)
+        self.assertFalse(args.resume)
+
+    def test_prepare_options(self):
+        """Typed options and flags of 'prepare' are converted"""
+        args = coolparks_cli.parser().parse_args(PREPARE_ARGS
+                                                 + ["--default-height", "12.5",
+                                                    "--default-age", "1990",
+                                                    "--park-batch",
+                                                    "--workers", "2",
+                                                    "--resume"])
+        self.assertEqual(args.default_height, 12.5)
+        self.assertEqual(args.default_age, 1990)
+        self.assertEqual(args.workers, 2)
+        self.assertTrue(args.park_batch)
+        self.assertTrue(args.resume)
+
+    def test_required_arguments(self):
+        """A command or a required argument missing is an error"""
+        p = coolparks_cli.parser()
+        with mock.patch("sys.stderr"):
+            with self.assertRaises(SystemExit):
+                p.parse_args([])
+            with self.assertRaises(SystemExit):
+                p.parse_args(PREPARE_ARGS[:-2])
+            with self.assertRaises(SystemExit):
+                p.parse_args(["calc", "--weather", "weather.csv"])
+
+    def test_calc(self):
+        args = coolparks_cli.parser().parse_args(["calc",
+                                                  "--scenario-directory", "scenario",
+                                                  "--weather", "weather.csv"])
+        self.assertIs(args.func, coolparks_cli.calc)
+        self.assertEqual(args.weather_name, DEFAULT_WEATHER)
+
+    def test_compare(self):
+        """The alternatives are a list and the change should be a known one"""
+        args = coolparks_cli.parser().parse_args(["compare",
+                                                  "--reference", "ref",
+                                                  "--alternatives", "alt1", "alt2",
+                                                  "--change", "weather"])
+        self.assertIs(args.func, coolparks_cli.compare)
+        self.assertEqual(args.alternatives, ["alt1", "alt2"])
+        self.assertFalse(args.overwrite)
+        with mock.patch("sys.stderr"):
+            with self.assertRaises(SystemExit):
+                coolparks_cli.parser().parse_args(["compare",
+                                                   "--reference", "ref",
+                                                   "--alternatives", "alt1",
+                                                   "--change", "unknown"])
+
+    def test_serve(self):
+        args = coolparks_cli.parser().parse_args(["serve", "--workers", "3"])
+        self.assertIs(args.func, coolparks_cli.serve)
+        self.assertEqual(args.port, JOB_SERVICE_PORT)
+        self.assertEqual(args.workers, 3)
+
+    def test_prepare_database_removed(self):
+        """The H2GIS database of a headless preparation is removed once done"""
+        args = coolparks_cli.parser().parse_args(PREPARE_ARGS)
+        with mock.patch.object(coolparks_cli, "configureJava"),\
+                mock.patch.object(coolparks_cli, "vectorEpsg", return_value = 2154),\
+                mock.patch.object(coolparks_cli.mainCalculations, "prepareScenario",
+                                  return_value = ("cursor", "directory")) as prepare,\
+                mock.patch("sys.stdout"):
+            self.assertEqual(coolparks_cli.prepare(args), 0)
+        self.assertTrue(prepare.call_args.kwargs["closeInstance"])
+
+    def test_main_error(self):
+        """An error of the calculation is printed and gives the exit code 1"""
+        def failingCalc(args):
+            raise QgsProcessingException("calculation error")
+        with mock.patch.object(coolparks_cli, "calc", failingCalc),\
+                mock.patch("sys.stderr"):
+            self.assertEqual(coolparks_cli.main(["calc",
+                                                 "--scenario-directory", "scenario",
+                                                 "--weather", "weather.csv"]),
+                             1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+# coding=utf-8
+"""Tests of the validation of the park input data.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+__author__ = 'Jérémy Bernard'
+__date__ = '2026-10-19'
+__copyright__ = '(C) 2026 by Jérémy Bernard'
+
+import itertools
+import re
+import unittest
+
+from ..functions.coolparks_prepare import calc_superimposition
+from ..functions.globalVariables import SUPERIMP_THRESH
+
+
+class PolygonCursor(object):
+    """ Cursor answering the queries of 'calc_superimposition' for square
+    polygons given by their ID, area and the area shared by each pair"""
+
+    def __init__(self, areas, overlaps):
+        self.areas = areas
+        self.overlaps = overlaps
+        self.pairQueries = 0
+        self.result = []
+
+    def execute(self, query):
+        if "SUM(ST_AREA" in query:
+            self.result = [(sum(self.areas.values()) if self.areas else None,
+                            min(self.areas, default = None),
+                            max(self.areas, default = None))]
+        elif "ID_A, ID_B" in query:
+            self.pairQueries += 1
+            start, end = [int(v) for v in re.search(r"a.ID >= (\d+) AND a.ID < (\d+)",
+                                                    query).groups()]
+            self.result = [(a, b, area) for (a, b), area in self.overlaps.items()
+                           if start <= a < end]
+        else:
+            self.result = []
+
+    def fetchall(self):
+        return self.result
+
+
+def stacked(nPolygons, area = 100.):
+    """ Identical polygons stacked on each other"""
+    ids = range(1, nPolygons + 1)
+    return PolygonCursor({i: area for i in ids},
+                         {pair: area for pair in itertools.combinations(ids, 2)})
+
+
+class SuperimpositionTest(unittest.TestCase):
+    """Test the superimposition rate of the polygons of a layer"""
+
+    def test_no_superimposition(self):
+        cursor = PolygonCursor({1: 100., 2: 50.}, {})
+        self.assertEqual(calc_superimposition(cursor, "GROUND"), (0, 0, []))
+
+    def test_empty_layer(self):
+        self.assertEqual(calc_superimposition(PolygonCursor({}, {}), "GROUND"),
+                         (0, 0, []))
+
+    def test_stacked_polygons(self):
+        """The rate is above the threshold and increases with the number of
+        polygons stacked on the same spot"""
+        rates = []
+        for nPolygons in [2, 3, 4]:
+            rate, overlap, ids = calc_superimposition(stacked(nPolygons), "GROUND",
+                                                      batchSize = 10)
+            self.assertGreater(rate, SUPERIMP_THRESH)
+            self.assertEqual(ids, list(range(1, nPolygons + 1)))
+            rates.append(rate)
+        self.assertEqual(rates, [0.5, 1., 1.5])
+
+    def test_partial_superimposition(self):
+        cursor = PolygonCursor({1: 100., 2: 100., 3: 200.}, {(1, 2): 8.})
+        rate, overlap, ids = calc_superimposition(cursor, "GROUND", batchSize = 1)
+        self.assertAlmostEqual(rate, 0.02)
+        self.assertEqual(overlap, 8.)
+        self.assertEqual(ids, [1, 2])
+        self.assertEqual(cursor.pairQueries, 3)
+
+    def test_early_exit(self):
+        """The batches are not tested anymore once the threshold is exceeded"""
+        cursor = stacked(4)
+        rate, overlap, ids = calc_superimposition(cursor, "GROUND", batchSize = 1)
+        self.assertEqual(cursor.pairQueries, 1)
+        self.assertEqual(rate, 0.75)
+        self.assertEqual(ids, [1, 2, 3, 4])
+
+
+if __name__ == "__main__":
+    unittest.main()
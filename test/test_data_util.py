@@ -0,0 +1,217 @@
+# coding=utf-8
+"""Tests of the database utilities.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+__author__ = 'Jérémy Bernard'
+__date__ = '2026-10-19'
+__copyright__ = '(C) 2026 by Jérémy Bernard'
+
+import unittest
+
+import geopandas as gpd
+from shapely.geometry import Point
+
+from ..functions import DataUtil
+
+
+class FetchCursor(object):
+    """ Cursor returning given rows batch by batch"""
+
+    def __init__(self, columns, rows):
+        self.description = [(c, ) for c in columns]
+        self.rows = list(rows)
+        self.queries = []
+        self.batchSizes = []
+
+    def execute(self, query):
+        self.queries.append(query)
+
+    def fetchmany(self, size):
+        self.batchSizes.append(size)
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+
+class FetchDataFrameTest(unittest.TestCase):
+    """Test the fetch of query results by batches"""
+
+    def test_batches(self):
+        cursor = FetchCursor(["ID", "VALUE"], [(i, i / 2) for i in range(7)])
+        df = DataUtil.fetchDataFrame(cursor = cursor, query = "TAB", batchSize = 3)
+        self.assertEqual(cursor.queries, ["SELECT * FROM TAB"])
+        self.assertEqual(cursor.batchSizes, [3, 3, 3, 3])
+        self.assertListEqual(list(df.columns), ["ID", "VALUE"])
+        self.assertListEqual(list(df.index), list(range(7)))
+        self.assertListEqual(list(df["VALUE"]), [i / 2 for i in range(7)])
+
+    def test_empty(self):
+        df = DataUtil.fetchDataFrame(cursor = FetchCursor(["ID", "VALUE"], []),
+                                     query = "SELECT ID, VALUE FROM TAB")
+        self.assertTrue(df.empty)
+        self.assertListEqual(list(df.columns), ["ID", "VALUE"])
+
+    def test_geometries(self):
+        """The WKB geometries are decoded (null geometries kept) and the
+        geometry column is the last one"""
+        rows = [(i, "DB geometry", Point(i, 2 * i).wkb_hex if i != 3 else None)
+                for i in range(5)]
+        cursor = FetchCursor(["THE_GEOM", "ID", "WKB_THE_GEOM"],
+                             [(g, i, w) for i, g, w in rows])
+        gdf = DataUtil.fetchDataFrame(cursor = cursor, query = "TAB",
+                                      geometryField = "THE_GEOM", batchSize = 2)
+        self.assertIsInstance(gdf, gpd.GeoDataFrame)
+        self.assertIn("RAWTOHEX(ST_ASBINARY(THE_GEOM))", cursor.queries[0])
+        self.assertListEqual(list(gdf.columns), ["ID", "THE_GEOM"])
+        self.assertEqual(gdf.geometry.name, "THE_GEOM")
+        self.assertTrue(gdf.geometry[4].equals(Point(4, 8)))
+        self.assertIsNone(gdf.geometry[3])
+
+    def test_geometries_empty(self):
+        gdf = DataUtil.fetchDataFrame(cursor = FetchCursor(["ID", "THE_GEOM", "WKB_THE_GEOM"], []),
+                                      query = "TAB",
+                                      geometryField = "THE_GEOM")
+        self.assertIsInstance(gdf, gpd.GeoDataFrame)
+        self.assertListEqual(list(gdf.columns), ["ID", "THE_GEOM"])
+
+
+
+class SplitStatementsTest(unittest.TestCase):
+    """Test the split of SQL scripts into statements"""
+
+    def test_statements(self):
+        self.assertEqual(DataUtil.splitStatements("DROP TABLE A; CREATE TABLE A(ID INT)"),
+                         ["DROP TABLE A", "CREATE TABLE A(ID INT)"])
+
+    def test_semicolon_in_strings(self):
+        """Semicolons within quotes (escaped quotes included) are kept"""
+        sql = """SELECT 'a;b' AS X FROM A; SELECT 'it''s; ok', "COL;1" FROM B"""
+        self.assertEqual(DataUtil.splitStatements(sql),
+                         ["SELECT 'a;b' AS X FROM A",
+                          """SELECT 'it''s; ok', "COL;1" FROM B"""])
+
+    def test_trailing_whitespace(self):
+        """No empty statement is returned"""
+        self.assertEqual(DataUtil.splitStatements("\n  DROP TABLE A;\n\t ;  \n"),
+                         ["DROP TABLE A"])
+        self.assertEqual(DataUtil.splitStatements("  ;\n"), [])
+
+    def test_comments(self):
+        """Comments are removed (with the semicolons and quotes they contain)"""
+        sql = """-- Remove the table; it's recreated
+                 DROP TABLE A; /* temporary; table */
+                 CREATE TABLE A AS SELECT '--not a comment' AS X -- end;
+                 """
+        self.assertEqual(DataUtil.splitStatements(sql),
+                         ["DROP TABLE A",
+                          "CREATE TABLE A AS SELECT '--not a comment' AS X"])
+        self.assertEqual(DataUtil.splitStatements("SELECT 1; -- last comment"),
+                         ["SELECT 1"])
+
+
+class RegistryCursor(object):
+    """ Cursor giving the columns of any table and recording the queries"""
+
+    def __init__(self, columns = ("ID", "THE_GEOM")):
+        self.columns = columns
+        self.queries = []
+        self.description = None
+        self.fail = False
+
+    def execute(self, query):
+        if self.fail:
+            raise RuntimeError("query error")
+        self.queries.append(query)
+        self.description = [(c, ) for c in self.columns]
+
+
+class MetadataCursorTest(unittest.TestCase):
+    """Test the registry of the table metadata"""
+
+    def setUp(self):
+        self.db = RegistryCursor()
+        self.cursor = DataUtil.MetadataCursor(self.db)
+
+    def columnQueries(self):
+        return len([q for q in self.db.queries if "LIMIT 0" in q])
+
+    def test_columns_read_once(self):
+        self.assertEqual(DataUtil.getColumns(self.cursor, "tab"), ["ID", "THE_GEOM"])
+        self.assertEqual(DataUtil.getColumns(self.cursor, "TAB"), ["ID", "THE_GEOM"])
+        self.assertEqual(self.columnQueries(), 1)
+
+    def test_table_modified(self):
+        """The columns are read again once the table is modified"""
+        for query in ["DROP TABLE IF EXISTS B, TAB",
+                      "CREATE TABLE TAB AS SELECT * FROM B",
+                      "ALTER TABLE TAB ADD COLUMN X INT",
+                      "ALTER TABLE B RENAME TO TAB",
+                      "CALL SHPREAD('buildings.shp', 'TAB')"]:
+            DataUtil.getColumns(self.cursor, "TAB")
+            self.cursor.execute(query)
+            DataUtil.getColumns(self.cursor, "TAB")
+        self.assertEqual(self.columnQueries(), 6)
+
+    def test_other_table_modified(self):
+        DataUtil.getColumns(self.cursor, "TAB")
+        self.cursor.execute("DROP TABLE TAB2; CREATE TABLE TAB3 AS SELECT * FROM TAB")
+        DataUtil.getColumns(self.cursor, "TAB")
+        self.assertEqual(self.columnQueries(), 1)
+
+    def test_statements_in_strings_and_comments(self):
+        """Statements within strings or comments do not modify the registry,
+        statements following a comment do"""
+        DataUtil.getColumns(self.cursor, "TAB")
+        self.cursor.execute("SELECT 'DROP TABLE TAB; ok' AS X /* ; DROP TABLE TAB */")
+        DataUtil.getColumns(self.cursor, "TAB")
+        self.assertEqual(self.columnQueries(), 1)
+        self.cursor.execute("-- the table is recreated\nDROP TABLE TAB;\n  ")
+        DataUtil.getColumns(self.cursor, "TAB")
+        self.assertEqual(self.columnQueries(), 2)
+
+    def test_existing_index(self):
+        """The creation of an index known to exist is not sent to the database"""
+        query = DataUtil.createIndex("TAB", "ID", False)
+        self.cursor.execute(query)
+        self.cursor.execute("SELECT 1;" + query + " ")
+        self.assertEqual(self.db.queries, [query, "SELECT 1"])
+        self.assertIsNone(self.cursor.execute(query))
+        self.assertEqual(len(self.db.queries), 2)
+        # The index is dropped with the table
+        self.cursor.execute("DROP TABLE TAB;" + query)
+        self.assertEqual(self.db.queries[-1], "DROP TABLE TAB;" + query)
+
+    def test_index_type(self):
+        """A spatial index is created on a column having a B-tree index (and
+        conversely), an index having another name is also created"""
+        btree = DataUtil.createIndex("TAB", "THE_GEOM", False)
+        spatial = DataUtil.createIndex("TAB", "THE_GEOM", True)
+        self.cursor.execute(btree)
+        self.cursor.execute(spatial)
+        self.cursor.execute(spatial)
+        self.assertEqual(self.db.queries, [btree, spatial])
+        self.cursor.execute("DROP TABLE TAB")
+        self.cursor.execute(spatial)
+        self.cursor.execute(btree)
+        self.assertEqual(self.db.queries[-2:], [spatial, btree])
+        renamed = "CREATE INDEX IF NOT EXISTS other_name ON tab(the_geom)"
+        self.cursor.execute(renamed)
+        self.assertEqual(self.db.queries[-1], renamed)
+
+    def test_error(self):
+        """The registry is cleared when a query fails"""
+        DataUtil.getColumns(self.cursor, "TAB")
+        self.cursor.execute(DataUtil.createIndex("TAB", "ID", False))
+        self.db.fail = True
+        with self.assertRaises(RuntimeError):
+            self.cursor.execute("UPDATE TAB SET ID = 1")
+        self.assertEqual(self.cursor.tableColumns, {})
+        self.assertEqual(self.cursor.tableIndexes, set())
+
+
+if __name__ == "__main__":
+    unittest.main()
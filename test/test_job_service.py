@@ -0,0 +1,218 @@
+# coding=utf-8
+"""Tests of the queue and of the HTTP interface of the local job service.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+__author__ = 'Jérémy Bernard'
+__date__ = '2026-10-19'
+__copyright__ = '(C) 2026 by Jérémy Bernard'
+
+import importlib.util
+import json
+import os
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+from unittest import mock
+
+# The calculation modules need GDAL (but not QGIS)
+HAS_GDAL = importlib.util.find_spec("osgeo") is not None
+if HAS_GDAL:
+    from ..functions import JobService
+
+
+class FakeCalculation(object):
+    """ Replace the calculations: each call waits until it is released and
+    records its parameters"""
+
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+
+    def __call__(self, kind, parameters, feedback = None):
+        self.calls.append(parameters)
+        self.release.wait(10)
+        if parameters.get("fail"):
+            raise RuntimeError("calculation error")
+        return [parameters.get("output_directory")]
+
+
+@unittest.skipUnless(HAS_GDAL, "GDAL is not installed")
+class JobQueueTest(unittest.TestCase):
+    """Test the queue and the cache of the jobs"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.inputPath = os.path.join(self.directory.name, "buildings.geojson")
+        with open(self.inputPath, "w") as f:
+            f.write("buildings v1")
+        os.makedirs(os.path.join(self.directory.name, "Scenario"))
+        self.parameters = {"output_directory": self.directory.name,
+                           "prefix": "Scenario",
+                           "buildingFilePath": self.inputPath}
+        self.calculation = FakeCalculation()
+        patcher = mock.patch.object(JobService, "runJob", self.calculation)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.queue = JobService.JobQueue(nWorkers = 1)
+
+    def tearDown(self):
+        self.calculation.release.set()
+        self.queue.executor.shutdown(wait = True)
+        self.directory.cleanup()
+
+    def wait(self, job):
+        job.future.result(timeout = 10)
+
+    def test_workers(self):
+        """The jobs beyond the number of workers wait in the queue"""
+        first = self.queue.submit(JobService.PREPARE, self.parameters)
+        second = self.queue.submit(JobService.PREPARE, dict(self.parameters, prefix = "Other"))
+        self.assertEqual(second.status, JobService.QUEUED)
+        self.calculation.release.set()
+        self.wait(first)
+        self.wait(second)
+        self.assertEqual(first.status, JobService.DONE)
+        self.assertEqual(second.status, JobService.DONE)
+        self.assertEqual(first.result, [self.directory.name])
+
+    def test_identical_jobs(self):
+        """A job identical to a queued, running or done one is not run again"""
+        first = self.queue.submit(JobService.PREPARE, self.parameters)
+        self.assertIs(self.queue.submit(JobService.PREPARE, dict(self.parameters)), first)
+        self.calculation.release.set()
+        self.wait(first)
+        self.assertIs(self.queue.submit(JobService.PREPARE, dict(self.parameters)), first)
+        self.assertEqual(len(self.calculation.calls), 1)
+
+    def test_key(self):
+        """The job key depends on the kind, the parameters and the content
+        of the input files"""
+        key = JobService.jobKey(JobService.PREPARE, self.parameters)
+        self.assertEqual(JobService.jobKey(JobService.PREPARE, dict(self.parameters)), key)
+        self.assertNotEqual(JobService.jobKey(JobService.CALC, self.parameters), key)
+        self.assertNotEqual(JobService.jobKey(JobService.PREPARE,
+                                              dict(self.parameters, prefix = "Other")),
+                            key)
+        with open(self.inputPath, "w") as f:
+            f.write("buildings v2")
+        self.assertNotEqual(JobService.jobKey(JobService.PREPARE, self.parameters), key)
+
+    def test_input_file_changed(self):
+        """The job is run again when an input file has changed"""
+        self.calculation.release.set()
+        first = self.queue.submit(JobService.PREPARE, self.parameters)
+        self.wait(first)
+        with open(self.inputPath, "w") as f:
+            f.write("buildings v2")
+        second = self.queue.submit(JobService.PREPARE, self.parameters)
+        self.assertIsNot(second, first)
+        self.wait(second)
+        self.assertEqual(len(self.calculation.calls), 2)
+
+    def test_outputs_removed(self):
+        """The job is run again when the outputs of the done job do not exist anymore"""
+        self.calculation.release.set()
+        first = self.queue.submit(JobService.PREPARE, self.parameters)
+        self.wait(first)
+        os.rmdir(os.path.join(self.directory.name, "Scenario"))
+        second = self.queue.submit(JobService.PREPARE, self.parameters)
+        self.assertIsNot(second, first)
+        self.wait(second)
+
+    def test_failed_job(self):
+        """A failed job keeps its error and is run again when resubmitted"""
+        self.calculation.release.set()
+        parameters = dict(self.parameters, fail = True)
+        first = self.queue.submit(JobService.PREPARE, parameters)
+        self.wait(first)
+        self.assertEqual(first.status, JobService.FAILED)
+        self.assertEqual(first.error, "RuntimeError: calculation error")
+        self.assertIsNot(self.queue.submit(JobService.PREPARE, parameters), first)
+
+    def test_cancel_queued(self):
+        self.queue.submit(JobService.PREPARE, self.parameters)
+        second = self.queue.submit(JobService.PREPARE, dict(self.parameters, prefix = "Other"))
+        self.assertEqual(self.queue.cancel(second.id).status, JobService.CANCELLED)
+        self.calculation.release.set()
+        self.assertEqual(len(self.calculation.calls), 1)
+
+    def test_unknown_kind(self):
+        with self.assertRaises(ValueError):
+            self.queue.submit("unknown", self.parameters)
+
+
+@unittest.skipUnless(HAS_GDAL, "GDAL is not installed")
+class RunJobTest(unittest.TestCase):
+    """Test the calculations run by the service"""
+
+    def test_prepare_database_removed(self):
+        """The H2GIS database of a preparation is removed once done"""
+        with mock.patch.object(JobService.mainCalculations, "prepareScenario",
+                               return_value = ("cursor", "directory")) as prepare:
+            result = JobService.runJob(JobService.PREPARE, {"prefix": "Scenario"})
+        self.assertEqual(result, [None, "directory"])
+        self.assertTrue(prepare.call_args.kwargs["closeInstance"])
+        self.assertEqual(prepare.call_args.kwargs["prefix"], "Scenario")
+
+@unittest.skipUnless(HAS_GDAL, "GDAL is not installed")
+class JobRequestHandlerTest(unittest.TestCase):
+    """Test the answers of the HTTP interface"""
+
+    def setUp(self):
+        self.calculation = FakeCalculation()
+        self.calculation.release.set()
+        patcher = mock.patch.object(JobService, "runJob", self.calculation)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.queue = JobService.JobQueue(nWorkers = 1)
+        handler = type("Handler", (JobService.JobRequestHandler, ), {"queue": self.queue})
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target = self.server.serve_forever, daemon = True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.queue.executor.shutdown(wait = True)
+
+    def post(self, body):
+        request = urllib.request.Request(self.url + "/jobs", data = body.encode("utf-8"),
+                                         method = "POST")
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    def test_submit(self):
+        code, state = self.post(json.dumps({"kind": JobService.COMPARE,
+                                            "parameters": {"output_directory": "out"}}))
+        self.assertEqual(code, 200)
+        self.assertIn(state["id"], self.queue.jobs)
+
+    def test_bad_requests(self):
+        """Malformed requests are answered with 400 (the service keeps running)"""
+        for body in ["not json", "[1, 2]", '"text"', "null", '{"parameters": {}}',
+                     '{"kind": "unknown"}', '{"kind": "calc", "parameters": [1]}']:
+            code, answer = self.post(body)
+            self.assertEqual(code, 400, msg = body)
+            self.assertIn("error", answer)
+        self.assertEqual(self.queue.jobs, {})
+
+    def test_unknown_job(self):
+        with self.assertRaises(urllib.error.HTTPError) as context:
+            urllib.request.urlopen(self.url + "/jobs/unknown")
+        self.assertEqual(context.exception.code, 404)
+        context.exception.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+# coding=utf-8
+"""Tests of the temporary files of the park influence calculation.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+__author__ = 'Jérémy Bernard'
+__date__ = '2026-10-19'
+__copyright__ = '(C) 2026 by Jérémy Bernard'
+
+import importlib.util
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+# The calculation modules need GDAL (but not QGIS)
+HAS_GDAL = importlib.util.find_spec("osgeo") is not None
+if HAS_GDAL:
+    from ..functions import mainCalculations
+
+
+@unittest.skipUnless(HAS_GDAL, "GDAL is not installed")
+class CalcParkInfluenceTest(unittest.TestCase):
+    """Test that the temporary folder is always removed"""
+
+    def setUp(self):
+        self.tempoDir = tempfile.mkdtemp()
+
+    def calcParkInfluence(self):
+        with mock.patch.object(mainCalculations.tempfile, "mkdtemp",
+                               return_value = self.tempoDir):
+            return mainCalculations.calcParkInfluence(weatherFilePath = "weather.csv",
+                                                      preprocessOutputPath = self.tempoDir)
+
+    def test_removed_on_weather_error(self):
+        """The folder is removed when the weather file can not be read"""
+        with mock.patch.object(mainCalculations.WeatherReaders, "readWeather",
+                               side_effect = ValueError("Unknown weather file format")):
+            with self.assertRaises(ValueError):
+                self.calcParkInfluence()
+        self.assertFalse(os.path.exists(self.tempoDir))
+
+    def test_removed_on_cancelled_preparation(self):
+        """The folder is removed when the preparation of the missing wind
+        directions is cancelled"""
+        weights = mainCalculations.pd.DataFrame({0: [1., 0.]}, index = [0., 90.])
+        with mock.patch.object(mainCalculations.WeatherReaders, "readWeather",
+                               return_value = (None, 0)),\
+             mock.patch.object(mainCalculations.PreparedScenario, "readSettings",
+                               return_value = {"directions": [90.]}),\
+             mock.patch.object(mainCalculations.calc_fct, "direction_weights",
+                               return_value = weights),\
+             mock.patch.object(mainCalculations, "prepareMissingDirections",
+                               return_value = None) as prepare:
+            self.assertEqual(self.calcParkInfluence(), {})
+        self.assertEqual(prepare.call_args.kwargs["directions"], [0.])
+        self.assertFalse(os.path.exists(self.tempoDir))
+
+
+if __name__ == "__main__":
+    unittest.main()
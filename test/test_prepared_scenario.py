@@ -0,0 +1,156 @@
+# coding=utf-8
+"""Tests of the grid lattice and of the layers of the prepared scenarios.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+__author__ = 'Jérémy Bernard'
+__date__ = '2026-10-19'
+__copyright__ = '(C) 2026 by Jérémy Bernard'
+
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from shapely import affinity
+from shapely.geometry import Point
+
+from ..functions import PreparedScenario
+from ..functions.globalVariables import WIND_DIR_FIELD
+
+
+class FakeCursor(object):
+    """ Cursor returning given rows and recording the queries executed"""
+
+    def __init__(self, rows = None):
+        self.rows = rows or []
+        self.queries = []
+
+    def execute(self, query):
+        self.queries.append(query)
+
+    def fetchall(self):
+        return self.rows
+
+
+def rotatedGrid(colMin, nCols, rowMin, nRows, xmin, ymax, dx, dy):
+    """ Grid points of a regular lattice in the rotated frame (row IDs
+    increasing from North to South)"""
+    cols, rows = np.meshgrid(np.arange(colMin, colMin + nCols),
+                             np.arange(rowMin, rowMin + nRows))
+    return pd.DataFrame({"ID": np.arange(cols.size),
+                         "ID_COL": cols.ravel(),
+                         "ID_ROW": rows.ravel(),
+                         "X": xmin + (cols.ravel() - colMin) * dx,
+                         "Y": ymax - (rows.ravel() - rowMin) * dy})
+
+def lattice(df_grid, windDirection, center, srid = 2154):
+    """ Lattice of a grid, the extrema being those returned by the database"""
+    cursor = FakeCursor([(df_grid.ID_COL.min(), df_grid.ID_COL.max(),
+                          df_grid.ID_ROW.min(), df_grid.ID_ROW.max(),
+                          df_grid.X.min(), df_grid.X.max(),
+                          df_grid.Y.min(), df_grid.Y.max())])
+    return PreparedScenario.gridLattice(cursor = cursor,
+                                        gridTable = "GRID",
+                                        srid = srid,
+                                        windDirection = windDirection,
+                                        rotationCenterCoordinates = center)
+
+
+class GridLatticeTest(unittest.TestCase):
+    """Test the description of the grid points by a lattice"""
+
+    def setUp(self):
+        self.center = (355000., 6690000.)
+        self.df_grid = rotatedGrid(colMin = 3, nCols = 7, rowMin = 2, nRows = 5,
+                                   xmin = 354000., ymax = 6689800., dx = 10., dy = 20.)
+
+    def test_size_and_origin(self):
+        """Without rotation, the lattice origin is the North-West point"""
+        result = lattice(self.df_grid, 0, self.center)
+        self.assertEqual(result[WIND_DIR_FIELD], 0.)
+        self.assertEqual(result["SRID"], 2154)
+        self.assertEqual((result["COL_MIN"], result["ROW_MIN"]), (3, 2))
+        self.assertEqual((result["N_COLS"], result["N_ROWS"]), (7, 5))
+        self.assertEqual((result["DX"], result["DY"]), (10., 20.))
+        for key, value in {"GT0": 354000., "GT1": 10., "GT2": 0.,
+                           "GT3": 6689800., "GT4": 0., "GT5": -20.}.items():
+            self.assertAlmostEqual(result[key], value, msg = key)
+
+    def test_single_column(self):
+        """A lattice having a single column or row has a valid size"""
+        df_grid = self.df_grid[self.df_grid.ID_COL == 3]
+        result = lattice(df_grid, 0, self.center)
+        self.assertEqual((result["N_COLS"], result["N_ROWS"]), (1, 5))
+        self.assertEqual(result["DY"], 20.)
+
+    def test_rotated_points(self):
+        """The points of the lattice are the grid points rotated back to the
+        initial frame"""
+        for windDirection in [0, 30, 90, 225, 337.5]:
+            result = lattice(self.df_grid, windDirection, self.center)
+            self.assertEqual((result["N_COLS"], result["N_ROWS"]), (7, 5))
+            points = PreparedScenario.latticePoints(result, self.df_grid)
+            self.assertEqual(points.crs.to_epsg(), 2154)
+            self.assertListEqual(list(points["ID"]), list(self.df_grid["ID"]))
+            for (_, row), geom in zip(self.df_grid.iterrows(), points.geometry):
+                expected = affinity.rotate(Point(row.X, row.Y), -windDirection,
+                                           origin = self.center)
+                self.assertAlmostEqual(geom.x, expected.x, places = 6)
+                self.assertAlmostEqual(geom.y, expected.y, places = 6)
+
+    def test_lattice_from_series(self):
+        """The lattice read from the container (pd.Series) gives the same points"""
+        result = lattice(self.df_grid, 45, self.center)
+        points = PreparedScenario.latticePoints(result, self.df_grid)
+        fromSeries = PreparedScenario.latticePoints(pd.DataFrame([result]).iloc[0],
+                                                    self.df_grid)
+        self.assertTrue(points.geom_equals(fromSeries).all())
+
+
+class FetchLayerTest(unittest.TestCase):
+    """Test that the temporary rotated tables are removed"""
+
+    def test_rotated_table_dropped(self):
+        cursor = FakeCursor()
+        with mock.patch.object(PreparedScenario, "windRotation",
+                               return_value = ({"PARK": "PARK_ROTATED"}, (0, 0))),\
+                mock.patch.object(PreparedScenario, "fetchDataFrame",
+                                  return_value = mock.MagicMock()) as fetch:
+            PreparedScenario.fetchLayer(cursor = cursor, tableName = "PARK",
+                                        srid = 2154, windDirection = 30,
+                                        rotationCenterCoordinates = (0, 0),
+                                        rotateAngle = -30)
+        self.assertEqual(fetch.call_args.kwargs["query"], "PARK_ROTATED")
+        self.assertEqual(cursor.queries, ["DROP TABLE IF EXISTS PARK_ROTATED"])
+
+    def test_rotated_table_dropped_on_error(self):
+        cursor = FakeCursor()
+        with mock.patch.object(PreparedScenario, "windRotation",
+                               return_value = ({"PARK": "PARK_ROTATED"}, (0, 0))),\
+                mock.patch.object(PreparedScenario, "fetchDataFrame",
+                                  side_effect = RuntimeError("fetch error")):
+            with self.assertRaises(RuntimeError):
+                PreparedScenario.fetchLayer(cursor = cursor, tableName = "PARK",
+                                            srid = 2154,
+                                            rotationCenterCoordinates = (0, 0),
+                                            rotateAngle = -30)
+        self.assertEqual(cursor.queries, ["DROP TABLE IF EXISTS PARK_ROTATED"])
+
+    def test_table_not_rotated(self):
+        """The input table is never dropped"""
+        cursor = FakeCursor()
+        with mock.patch.object(PreparedScenario, "fetchDataFrame",
+                               return_value = mock.MagicMock()) as fetch:
+            PreparedScenario.fetchLayer(cursor = cursor, tableName = "PARK",
+                                        srid = 2154)
+        self.assertEqual(fetch.call_args.kwargs["query"], "PARK")
+        self.assertEqual(cursor.queries, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
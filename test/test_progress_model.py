@@ -0,0 +1,165 @@
+# coding=utf-8
+"""Tests of the estimation of the calculation progress.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+__author__ = 'Jérémy Bernard'
+__date__ = '2026-10-19'
+__copyright__ = '(C) 2026 by Jérémy Bernard'
+
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from ..functions import ProgressModel
+
+
+def timings(records):
+    return pd.DataFrame(records, columns = ["STEP", "SIZE", "DURATION"])
+
+
+class CostModelsTest(unittest.TestCase):
+    """Test the linear cost models fitted on the recorded durations"""
+
+    def test_linear(self):
+        models = ProgressModel.costModels(timings([("days", 10, 7),
+                                                   ("days", 20, 12),
+                                                   ("days", 40, 22)]))
+        a, b = models["days"]
+        self.assertAlmostEqual(a, 2)
+        self.assertAlmostEqual(b, 0.5)
+
+    def test_same_size(self):
+        """Durations proportional to the size if all sizes are the same"""
+        models = ProgressModel.costModels(timings([("rasters", 8, 10),
+                                                   ("rasters", 8, 14)]))
+        self.assertEqual(models["rasters"], (0, 1.5))
+
+    def test_zero_size(self):
+        models = ProgressModel.costModels(timings([("save", 0, 3),
+                                                   ("save", 0, 5)]))
+        self.assertEqual(models["save"], (4, 0))
+
+    def test_decreasing(self):
+        """A step can not be faster for a larger size"""
+        models = ProgressModel.costModels(timings([("grid", 10, 20),
+                                                   ("grid", 20, 10)]))
+        self.assertEqual(models["grid"], (15, 0))
+
+    def test_negative_intercept(self):
+        a, b = ProgressModel.costModels(timings([("grid", 10, 1),
+                                                 ("grid", 20, 11)]))["grid"]
+        self.assertEqual(a, 0)
+        self.assertAlmostEqual(b, 1)
+
+    def test_empty(self):
+        self.assertEqual(ProgressModel.costModels(timings([])), {})
+
+
+class EstimateDurationsTest(unittest.TestCase):
+    """Test the estimation of the duration of each step"""
+
+    def test_models(self):
+        estimates = ProgressModel.estimateDurations({"days": (2, 0.5), "save": (4, 0)},
+                                                    [("days", 10), ("save", 3)])
+        self.assertEqual(estimates, [7, 4])
+
+    def test_step_without_model(self):
+        """Mean rate of the steps having a model"""
+        estimates = ProgressModel.estimateDurations({"days": (0, 1), "grid": (1, 3)},
+                                                    [("days", 2), ("grid", 1), ("contours", 4)])
+        self.assertEqual(estimates, [2, 4, 8])
+
+    def test_no_model(self):
+        """Without model, the durations are proportional to the sizes"""
+        self.assertEqual(ProgressModel.estimateDurations({}, [("a", 3), ("b", 0)]),
+                         [3, 0])
+
+
+class FormatDurationTest(unittest.TestCase):
+
+    def test_format(self):
+        self.assertEqual(ProgressModel.formatDuration(12.4), "12 s")
+        self.assertEqual(ProgressModel.formatDuration(59.6), "1 min 00 s")
+        self.assertEqual(ProgressModel.formatDuration(200), "3 min 20 s")
+        self.assertEqual(ProgressModel.formatDuration(3900), "1 h 05 min")
+        self.assertEqual(ProgressModel.formatDuration(0), "0 s")
+
+
+class TimingsTest(unittest.TestCase):
+    """Test the record of the durations"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.timingsPath = os.path.join(self.directory.name, "timings", "timings.sqlite")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def run_steps(self, steps):
+        progress = ProgressModel.ProgressModel(feedback = None,
+                                               kind = ProgressModel.PROCESSING,
+                                               steps = steps,
+                                               timingsPath = self.timingsPath,
+                                               record = True)
+        for name, _ in steps:
+            with progress.step(name):
+                pass
+        progress.save()
+
+        return progress
+
+    def test_save_and_read(self):
+        self.run_steps([("days", 10), ("rasters", 4)])
+        self.run_steps([("days", 20)])
+        df = ProgressModel.readTimings(self.timingsPath, ProgressModel.PROCESSING)
+        self.assertEqual(sorted(df["STEP"]), ["days", "days", "rasters"])
+        self.assertEqual(sorted(df.loc[df.STEP == "days", "SIZE"]), [10, 20])
+        self.assertTrue(ProgressModel.readTimings(self.timingsPath,
+                                                  ProgressModel.PREPARATION).empty)
+
+    def test_history(self):
+        for size in range(5):
+            self.run_steps([("days", size)])
+        df = ProgressModel.readTimings(self.timingsPath, ProgressModel.PROCESSING,
+                                       history = 3)
+        self.assertEqual(len(df), 3)
+
+    def test_missing_file(self):
+        df = ProgressModel.readTimings(os.path.join(self.directory.name, "none.sqlite"),
+                                       ProgressModel.PROCESSING)
+        self.assertTrue(df.empty)
+
+    def test_connections_closed(self):
+        """The connections to the timing database are closed after use"""
+        connections = []
+        connect = sqlite3.connect
+
+        class RecordedConnection(sqlite3.Connection):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self.closed = False
+                connections.append(self)
+
+            def close(self):
+                self.closed = True
+                super().close()
+
+        with mock.patch.object(ProgressModel.sqlite3, "connect",
+                               lambda *args, **kwargs: connect(*args, factory = RecordedConnection, **kwargs)):
+            self.run_steps([("days", 10)])
+            ProgressModel.readTimings(self.timingsPath, ProgressModel.PROCESSING)
+        self.assertGreaterEqual(len(connections), 2)
+        self.assertTrue(all([conn.closed for conn in connections]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,250 @@
+# coding=utf-8
+"""Tests of the raster functions processing rasters tile by tile.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+__author__ = 'Jérémy Bernard'
+__date__ = '2026-10-19'
+__copyright__ = '(C) 2026 by Jérémy Bernard'
+
+import importlib.util
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+HAS_GDAL = importlib.util.find_spec("osgeo") is not None
+if HAS_GDAL:
+    from osgeo import gdal
+    from ..functions import RasterUtil
+    from ..functions.globalVariables import RASTER_NODATA
+
+
+class FakeBand(object):
+    """ Raster band read from an array"""
+
+    def __init__(self, values):
+        self.values = values
+
+    def ReadAsArray(self, c0, r0, ncols, nrows):
+        return self.values[r0:r0 + nrows, c0:c0 + ncols]
+
+
+def writeRaster(path, values, xmin, ymax, resolution, nodata):
+    """ Save an array as a GeoTIFF"""
+    raster = gdal.GetDriverByName("GTiff").Create(path, values.shape[1],
+                                                  values.shape[0], 1,
+                                                  gdal.GDT_Float32)
+    raster.SetGeoTransform((xmin, resolution, 0, ymax, 0, -resolution))
+    band = raster.GetRasterBand(1)
+    band.SetNoDataValue(nodata)
+    band.WriteArray(values.astype(np.float32))
+    band.FlushCache()
+    band = None
+    raster = None
+
+    return path
+
+
+@unittest.skipUnless(HAS_GDAL, "GDAL is not installed")
+class ReadBlockTest(unittest.TestCase):
+    """Test the reading of raster blocks"""
+
+    def test_negative_nodata(self):
+        values = np.array([[1., RASTER_NODATA], [np.float32(RASTER_NODATA), 4.]])
+        block = RasterUtil.readBlock(FakeBand(values), RASTER_NODATA, 0, 0, 2, 2)
+        np.testing.assert_array_equal(block, [[1., np.nan], [np.nan, 4.]])
+
+    def test_positive_nodata(self):
+        """A positive nodata value is masked and large values are kept"""
+        values = np.array([[1., 65535.], [20000., np.float32(3.4e38)]])
+        block = RasterUtil.readBlock(FakeBand(values), 3.4e38, 0, 0, 2, 2)
+        np.testing.assert_array_equal(block, [[1., 65535.], [20000., np.nan]])
+
+    def test_zero_nodata(self):
+        values = np.array([[0., 1e-3], [-1., RASTER_NODATA]])
+        block = RasterUtil.readBlock(FakeBand(values), 0, 0, 0, 2, 2)
+        np.testing.assert_array_equal(block, [[np.nan, 1e-3], [-1., np.nan]])
+
+    def test_no_nodata(self):
+        """Without nodata value only RASTER_NODATA is masked"""
+        values = np.array([[-1e6, 1e6], [np.nan, RASTER_NODATA]])
+        block = RasterUtil.readBlock(FakeBand(values), None, 0, 0, 2, 2)
+        np.testing.assert_array_equal(block, [[-1e6, 1e6], [np.nan, np.nan]])
+
+    def test_window(self):
+        """Only the block asked is read"""
+        values = np.arange(20, dtype = float).reshape(4, 5)
+        block = RasterUtil.readBlock(FakeBand(values), None, 3, 1, 2, 3)
+        np.testing.assert_array_equal(block, values[1:4, 3:5])
+
+
+@unittest.skipUnless(HAS_GDAL, "GDAL is not installed")
+class AlignedGridTest(unittest.TestCase):
+    """Test the grid covering several rasters"""
+
+    def test_aligned_on_resolution(self):
+        infos = [{"geotransform": (1.5, 2, 0, 21, 0, -2),
+                  "xmin": 1.5, "xmax": 11.5, "ymin": 11, "ymax": 21},
+                 {"geotransform": (7, 3, 0, 13, 0, -3),
+                  "xmin": 7, "xmax": 16, "ymin": 4, "ymax": 13}]
+        gt, ncols, nrows = RasterUtil.alignedGrid(infos)
+        self.assertEqual(gt, (0., 2, 0, 22., 0, -2))
+        self.assertEqual((ncols, nrows), (8, 9))
+
+    def test_resolution(self):
+        infos = [{"geotransform": (0, 1, 0, 10, 0, -1),
+                  "xmin": 0, "xmax": 10, "ymin": 0, "ymax": 10}]
+        gt, ncols, nrows = RasterUtil.alignedGrid(infos, resolution = 4)
+        self.assertEqual(gt, (0., 4, 0, 12., 0, -4))
+        self.assertEqual((ncols, nrows), (3, 3))
+
+
+@unittest.skipUnless(HAS_GDAL, "GDAL is not installed")
+class TiledRasterTest(unittest.TestCase):
+    """Test that the results calculated tile by tile do not depend on the
+    tile size (tiles smaller than the rasters and not dividing their size)"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(1)
+        self.ref = rng.uniform(20, 30, (10, 10))
+        self.alt = rng.uniform(20, 30, (10, 10))
+        self.ref[0, 0] = RASTER_NODATA
+        self.alt[5, 5] = 99999
+        self.refPath = writeRaster(os.path.join(self.directory.name, "ref.tif"),
+                                   self.ref, 0, 10, 1, RASTER_NODATA)
+        self.altPath = writeRaster(os.path.join(self.directory.name, "alt.tif"),
+                                   self.alt, 0, 10, 1, 99999)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_raster_stats(self):
+        ref = np.where(self.ref == RASTER_NODATA, np.nan, self.ref.astype(np.float32))
+        for blockSize in [3, 4, 512]:
+            stats = RasterUtil.rasterStats(self.refPath, blockSize = blockSize)
+            self.assertEqual(stats.count, 99)
+            self.assertAlmostEqual(stats.mean, np.nanmean(ref), places = 4)
+            self.assertAlmostEqual(stats.min, np.nanmin(ref), places = 4)
+            self.assertAlmostEqual(stats.max, np.nanmax(ref), places = 4)
+
+    def test_difference(self):
+        diffPath = os.path.join(self.directory.name, "diff.tif")
+        _, _, diffStats = RasterUtil.differenceRasters(self.altPath, self.refPath,
+                                                       outputPath = diffPath,
+                                                       blockSize = 4)
+        self.assertEqual(diffStats.count, 98)
+        diff = gdal.Open(diffPath).ReadAsArray()
+        self.assertEqual(diff[0, 0], RASTER_NODATA)
+        self.assertEqual(diff[5, 5], RASTER_NODATA)
+        self.assertAlmostEqual(float(diff[2, 3]),
+                               float(np.float32(self.alt[2, 3]) - np.float32(self.ref[2, 3])),
+                               places = 4)
+
+    def test_mosaic(self):
+        """Overlapping rasters are combined the same way for any tile size"""
+        shiftedPath = writeRaster(os.path.join(self.directory.name, "shifted.tif"),
+                                  self.alt, 5, 15, 1, 99999)
+        mosaics = []
+        for blockSize in [3, 7, 512]:
+            outputPath = os.path.join(self.directory.name, f"mosaic_{blockSize}.tif")
+            RasterUtil.mosaicRasters([self.refPath, shiftedPath], outputPath,
+                                     rule = "min", blockSize = blockSize)
+            mosaic = gdal.Open(outputPath)
+            self.assertEqual(mosaic.GetGeoTransform(), (0, 1, 0, 15, 0, -1))
+            mosaics.append(mosaic.ReadAsArray())
+            mosaic = None
+        for mosaic in mosaics[:-1]:
+            np.testing.assert_array_equal(mosaic, mosaics[-1])
+        # Cells covered by a single raster or by none
+        self.assertEqual(mosaics[-1][14, 0], np.float32(self.ref[9, 0]))
+        self.assertEqual(mosaics[-1][0, 0], RASTER_NODATA)
+        self.assertEqual(mosaics[-1][5, 0], RASTER_NODATA)
+        self.assertEqual(mosaics[-1][10, 10], RASTER_NODATA)
+        self.assertEqual(mosaics[-1][7, 7],
+                         min(np.float32(self.ref[2, 7]), np.float32(self.alt[7, 2])))
+
+
+@unittest.skipUnless(HAS_GDAL, "GDAL is not installed")
+class LatticeInterpolationTest(unittest.TestCase):
+    """Test the interpolation of values known on a rotated grid lattice"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        # Lattice of 6 columns and 4 rows (spacing 10 m x 20 m) rotated by 30°
+        angle = np.radians(30)
+        self.lattice = {"N_COLS": 6, "N_ROWS": 4, "COL_MIN": 2, "ROW_MIN": 1,
+                        "GT0": 100., "GT1": 10 * np.cos(angle), "GT2": 20 * np.sin(angle),
+                        "GT3": 200., "GT4": 10 * np.sin(angle), "GT5": -20 * np.cos(angle)}
+        cols, rows = np.meshgrid(np.arange(2, 8), np.arange(1, 5))
+        self.df_indic = pd.DataFrame({"ID_COL": cols.ravel(), "ID_ROW": rows.ravel()})
+        i = self.df_indic["ID_COL"].values - 2
+        j = self.df_indic["ID_ROW"].values - 1
+        self.x = 100. + i * self.lattice["GT1"] + j * self.lattice["GT2"]
+        self.y = 200. + i * self.lattice["GT4"] + j * self.lattice["GT5"]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def interpolate(self, values):
+        outputPath = os.path.join(self.directory.name, "lattice.tif")
+        RasterUtil.latticeInterpolation(lattice = self.lattice,
+                                        df_indic = self.df_indic,
+                                        values = values,
+                                        bounds = (50, 250, 100, 250),
+                                        pixelSize = 5,
+                                        outputPath = outputPath,
+                                        epsg = 2154,
+                                        blockSize = 16)
+        raster = gdal.Open(outputPath)
+        gt = raster.GetGeoTransform()
+        result = raster.ReadAsArray()
+        raster = None
+        xs = gt[0] + (np.arange(result.shape[1]) + 0.5) * gt[1]
+        ys = gt[3] + (np.arange(result.shape[0]) + 0.5) * gt[5]
+
+        return result, np.meshgrid(xs, ys)
+
+    def test_linear_field(self):
+        """A linear field is reproduced within the lattice, nodata outside"""
+        result, (X, Y) = self.interpolate(2 + 0.1 * self.x - 0.05 * self.y)
+        self.assertEqual(result.shape, (30, 40))
+        valid = result != RASTER_NODATA
+        self.assertTrue(valid.any())
+        np.testing.assert_allclose(result[valid], (2 + 0.1 * X - 0.05 * Y)[valid],
+                                   atol = 1e-4)
+        # Pixels far from the lattice
+        self.assertEqual(result[0, 0], RASTER_NODATA)
+        self.assertEqual(result[-1, -1], RASTER_NODATA)
+
+    def test_missing_point(self):
+        """The pixels around a point having no value are nodata"""
+        values = np.ones(len(self.df_indic))
+        values[8] = np.nan
+        result, (X, Y) = self.interpolate(values)
+        valid = result != RASTER_NODATA
+        np.testing.assert_array_equal(result[valid], 1)
+        distance = np.hypot(X - self.x[8], Y - self.y[8])
+        self.assertFalse(valid[distance < 2].any())
+        self.assertTrue(valid[(distance > 30) & (distance < 40)].any())
+
+    def test_single_row(self):
+        with self.assertRaises(ValueError):
+            RasterUtil.latticeInterpolation(lattice = dict(self.lattice, N_ROWS = 1),
+                                            df_indic = self.df_indic[self.df_indic.ID_ROW == 1],
+                                            values = np.ones(6),
+                                            bounds = (50, 250, 100, 250),
+                                            pixelSize = 5,
+                                            outputPath = os.path.join(self.directory.name, "row.tif"),
+                                            epsg = 2154)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+# coding=utf-8
+"""Tests of the catalog of the runs.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+__author__ = 'Jérémy Bernard'
+__date__ = '2026-10-19'
+__copyright__ = '(C) 2026 by Jérémy Bernard'
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+from ..functions import ScenarioCatalog
+
+
+class ScenarioCatalogTest(unittest.TestCase):
+    """Test the recording and the queries of the runs"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.catalog = ScenarioCatalog.ScenarioCatalog(os.path.join(self.directory, "catalog", "runs.sqlite"))
+        self.inputPath = os.path.join(self.directory, "buildings.geojson")
+        with open(self.inputPath, "w") as f:
+            f.write("{}")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors = True)
+
+    def outputDirectory(self, name):
+        path = os.path.join(self.directory, name)
+        os.makedirs(path, exist_ok = True)
+        return path
+
+    def record(self, kind, name, **kwargs):
+        return self.catalog.record(kind = kind,
+                                   outputDirectory = self.outputDirectory(name),
+                                   **kwargs)
+
+    def test_record(self):
+        runId = self.record(ScenarioCatalog.PREPARATION, "scenario1",
+                            scenario = "scenario1",
+                            inputs = {"buildings": self.inputPath},
+                            statistics = {"directions": [0., 90.]},
+                            started = 0,
+                            duration = 12.5)
+        run = self.catalog.get(runId)
+        self.assertEqual(run["KIND"], ScenarioCatalog.PREPARATION)
+        self.assertEqual(run["SCENARIO"], "scenario1")
+        self.assertEqual(run["OUTPUT_DIRECTORY"], os.path.join(self.directory, "scenario1"))
+        self.assertEqual(run["INPUTS"], {"buildings": self.inputPath})
+        self.assertEqual(set(run["INPUT_HASHES"].keys()), {"buildings"})
+        self.assertEqual(run["STATISTICS"], {"directions": [0., 90.]})
+        self.assertEqual(run["DURATION"], 12.5)
+        self.assertIsNone(self.catalog.get(runId + 1))
+
+    def test_unknown_kind(self):
+        with self.assertRaises(ValueError):
+            self.record("unknown", "scenario1")
+
+    def test_replace_same_directory(self):
+        """A new run in the same output directory replaces the previous one"""
+        first = self.record(ScenarioCatalog.PROCESSING, "output", weather = "2003")
+        second = self.record(ScenarioCatalog.PROCESSING, "output", weather = "2019")
+        self.assertNotEqual(first, second)
+        df_runs = self.catalog.runs()
+        self.assertListEqual(list(df_runs.index), [second])
+        self.assertEqual(df_runs.loc[second, "WEATHER"], "2019")
+        # A run of another kind in the same directory is kept
+        self.record(ScenarioCatalog.COMPARISON, "output")
+        self.assertEqual(len(self.catalog.runs()), 2)
+
+    def test_runs_filters(self):
+        self.record(ScenarioCatalog.PREPARATION, "s1", scenario = "s1")
+        self.record(ScenarioCatalog.PROCESSING, "s1_2003", scenario = "s1", weather = "2003")
+        self.record(ScenarioCatalog.PROCESSING, "s1_2019", scenario = "s1", weather = "2019")
+        self.record(ScenarioCatalog.PROCESSING, "s2_2003", scenario = "s2", weather = "2003")
+        self.assertEqual(len(self.catalog.runs()), 4)
+        self.assertEqual(len(self.catalog.runs(kind = ScenarioCatalog.PROCESSING)), 3)
+        self.assertEqual(len(self.catalog.runs(scenario = "s1")), 3)
+        self.assertEqual(len(self.catalog.runs(weather = "2003")), 2)
+        self.assertListEqual(list(self.catalog.runs(kind = ScenarioCatalog.PROCESSING,
+                                                    scenario = "s1",
+                                                    weather = "2019")["SCENARIO"]),
+                             ["s1"])
+
+    def test_runs_existing(self):
+        """The runs whose output directory has been removed are only
+        returned when asked"""
+        self.record(ScenarioCatalog.PREPARATION, "kept")
+        self.record(ScenarioCatalog.PREPARATION, "removed")
+        shutil.rmtree(os.path.join(self.directory, "removed"))
+        self.assertEqual(len(self.catalog.runs()), 1)
+        self.assertEqual(len(self.catalog.runs(existing = False)), 2)
+
+    def test_directories(self):
+        first = self.record(ScenarioCatalog.PROCESSING, "w1", scenario = "s", weather = "w1")
+        second = self.record(ScenarioCatalog.PROCESSING, "w2", scenario = "s", weather = "w2")
+        self.assertListEqual(self.catalog.directories([second, first]),
+                             [os.path.join(self.directory, "w2"),
+                              os.path.join(self.directory, "w1")])
+        self.assertEqual(self.catalog.names([first]),
+                         {os.path.join(self.directory, "w1"): "s-w1"})
+        with self.assertRaises(ValueError):
+            self.catalog.directories([first, second + 1])
+
+    def test_prune(self):
+        kept = self.record(ScenarioCatalog.PREPARATION, "kept")
+        self.record(ScenarioCatalog.PREPARATION, "removed1")
+        self.record(ScenarioCatalog.PREPARATION, "removed2")
+        shutil.rmtree(os.path.join(self.directory, "removed1"))
+        shutil.rmtree(os.path.join(self.directory, "removed2"))
+        self.assertEqual(self.catalog.prune(), 2)
+        self.assertListEqual(list(self.catalog.runs(existing = False).index), [kept])
+        self.assertEqual(self.catalog.prune(), 0)
+
+    def test_connections_closed(self):
+        """Each connection opened by the catalog is closed"""
+        connections = []
+        connect = self.catalog.connect
+        def recordConnection():
+            connections.append(connect())
+            return connections[-1]
+        with mock.patch.object(self.catalog, "connect", side_effect = recordConnection):
+            runId = self.record(ScenarioCatalog.PREPARATION, "scenario1")
+            self.catalog.runs()
+            self.catalog.directories([runId])
+            self.catalog.prune()
+        self.assertEqual(len(connections), 5)
+        for conn in connections:
+            with self.assertRaises(sqlite3.ProgrammingError):
+                conn.execute("SELECT 1")
+
+
+class RecordRunTest(unittest.TestCase):
+
+    def test_not_updated(self):
+        with mock.patch.object(ScenarioCatalog, "ScenarioCatalog") as catalog:
+            self.assertIsNone(ScenarioCatalog.recordRun(kind = ScenarioCatalog.PREPARATION,
+                                                        outputDirectory = "output",
+                                                        update = False))
+        catalog.assert_not_called()
+
+    def test_catalog_error(self):
+        """A catalog which can not be updated does not stop the calculation"""
+        with mock.patch.object(ScenarioCatalog, "ScenarioCatalog",
+                               side_effect = sqlite3.OperationalError("database is locked")),\
+             mock.patch("builtins.print"):
+            self.assertIsNone(ScenarioCatalog.recordRun(kind = ScenarioCatalog.PREPARATION,
+                                                        outputDirectory = "output"))
+
+
+if __name__ == "__main__":
+    unittest.main()
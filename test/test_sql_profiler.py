@@ -0,0 +1,107 @@
+# coding=utf-8
+"""Tests of the profiling of the SQL queries.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+__author__ = 'Jérémy Bernard'
+__date__ = '2026-10-19'
+__copyright__ = '(C) 2026 by Jérémy Bernard'
+
+import unittest
+
+from ..functions.SqlProfiler import ProfilingCursor
+
+
+class FakeConnection(object):
+    """ Connection whose cursors record the queries in a common log"""
+
+    def __init__(self):
+        self.log = []
+
+    def cursor(self):
+        return FakeCursor(self.log)
+
+
+class FakeCursor(object):
+
+    def __init__(self, log):
+        self.log = log
+        self.rowcount = 0
+
+    def execute(self, operation, parameters = None):
+        self.log.append(operation)
+
+    def executemany(self, operation, seq_of_parameters):
+        self.log.append(operation)
+
+    def fetchall(self):
+        return [("plan of " + self.log[-1],)]
+
+
+class ProfilingCursorTest(unittest.TestCase):
+    """Test the records of the profiling cursor"""
+
+    def test_explain_before_each_statement(self):
+        """Each statement is explained before being executed, thus before
+        the next statements modify its tables"""
+        conn = FakeConnection()
+        cursor = ProfilingCursor(cursor = conn.cursor(), connection = conn,
+                                 explain = True)
+        cursor.execute("""DROP TABLE IF EXISTS B;
+                          CREATE TABLE B AS SELECT * FROM A;
+                          DROP TABLE A""")
+        self.assertEqual(conn.log, ["DROP TABLE IF EXISTS B",
+                                    "EXPLAIN ANALYZE SELECT * FROM A",
+                                    "CREATE TABLE B AS SELECT * FROM A",
+                                    "DROP TABLE A"])
+        # One record per statement, with the plan of the explainable ones
+        self.assertEqual([r["statement"] for r in cursor.records],
+                         ["DROP TABLE IF EXISTS B",
+                          "CREATE TABLE B AS SELECT * FROM A",
+                          "DROP TABLE A"])
+        self.assertEqual([r.get("plan") for r in cursor.records],
+                         [None, "plan of EXPLAIN ANALYZE SELECT * FROM A", None])
+        self.assertEqual(set(r["caller"] for r in cursor.records),
+                         {"test_sql_profiler.test_explain_before_each_statement"})
+
+    def test_explain_column_list(self):
+        """A table created with the list of its columns is explained"""
+        conn = FakeConnection()
+        cursor = ProfilingCursor(cursor = conn.cursor(), connection = conn,
+                                 explain = True)
+        cursor.execute("""CREATE TABLE B(THE_GEOM GEOMETRY,
+                                         H DECIMAL(10, 2),
+                                         ID SERIAL)
+                              AS SELECT THE_GEOM, H, NULL AS ID FROM A""")
+        self.assertEqual(conn.log[0], "EXPLAIN ANALYZE SELECT THE_GEOM, H, NULL AS ID FROM A")
+        self.assertEqual(cursor.records[0]["plan"],
+                         "plan of EXPLAIN ANALYZE SELECT THE_GEOM, H, NULL AS ID FROM A")
+
+    def test_without_explain(self):
+        """Each statement is executed and recorded separately"""
+        conn = FakeConnection()
+        cursor = ProfilingCursor(cursor = conn.cursor())
+        cursor.execute("DROP TABLE IF EXISTS B; CREATE TABLE B AS SELECT * FROM A")
+        cursor.executemany("INSERT INTO B VALUES (?)", [(1,), (2,)])
+        cursor.execute("SELECT * FROM B WHERE ID = ?; ", (1,))
+        self.assertEqual(conn.log, ["DROP TABLE IF EXISTS B",
+                                    "CREATE TABLE B AS SELECT * FROM A",
+                                    "INSERT INTO B VALUES (?)",
+                                    "SELECT * FROM B WHERE ID = ?; "])
+        self.assertEqual([r["statement"] for r in cursor.records],
+                         ["DROP TABLE IF EXISTS B",
+                          "CREATE TABLE B AS SELECT * FROM A",
+                          "INSERT INTO B VALUES (?)",
+                          "SELECT * FROM B WHERE ID = ?;"])
+        self.assertEqual([r["executions"] for r in cursor.records], [1, 1, 2, 1])
+        self.assertEqual(set(r["caller"] for r in cursor.records),
+                         {"test_sql_profiler.test_without_explain"})
+        self.assertNotIn("plan", cursor.records[0])
+        self.assertEqual(cursor.rowcount, 0)
+
+if __name__ == "__main__":
+    unittest.main()
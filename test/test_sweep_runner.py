@@ -0,0 +1,130 @@
+# coding=utf-8
+"""Tests of the stages reused by the parameter sweep runner.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+__author__ = 'Jérémy Bernard'
+__date__ = '2026-10-19'
+__copyright__ = '(C) 2026 by Jérémy Bernard'
+
+import importlib.util
+import os
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+# The calculation modules need GDAL (but not QGIS)
+HAS_GDAL = importlib.util.find_spec("osgeo") is not None
+if HAS_GDAL:
+    from ..functions import SweepRunner
+
+
+class FakePreparations(object):
+    """ Replace the preparations: record the shared building stage checkpoint
+    used by each one (the first preparation of a building stage fails if
+    its name is in 'failing')"""
+
+    def __init__(self, failing = ()):
+        self.calls = {}
+        self.failing = failing
+        self.lock = threading.Lock()
+
+    def __call__(self, parameters, outputDirectory, prefix, buildingsCheckpoint = None):
+        with self.lock:
+            self.calls[prefix] = (parameters, buildingsCheckpoint)
+        if prefix in self.failing:
+            raise ValueError("Invalid park covers")
+        return outputDirectory + os.sep + prefix
+
+
+def fakeProcessing(scenarioDirectory, weatherFilePath, prefix):
+    return scenarioDirectory + os.sep + prefix, {"MEAN_DT": 1.}
+
+
+@unittest.skipUnless(HAS_GDAL, "GDAL is not installed")
+class RunSweepTest(unittest.TestCase):
+    """Test the stages shared by the points of a sweep"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.base = {"plugin_directory": self.directory,
+                     "buildingFilePath": "buildings.geojson",
+                     "weatherFilePath": "weather.csv"}
+
+    def runSweep(self, grid, preparations):
+        with mock.patch.object(SweepRunner, "ProcessPoolExecutor", ThreadPoolExecutor),\
+             mock.patch.object(SweepRunner, "configureJava"),\
+             mock.patch.object(SweepRunner, "prepareTask", preparations),\
+             mock.patch.object(SweepRunner, "processTask", fakeProcessing):
+            return SweepRunner.runSweep(outputDirectory = self.directory,
+                                        grid = grid,
+                                        baseParameters = self.base,
+                                        nWorkers = 2)
+
+    def test_parameter_groups(self):
+        """Building defaults are building stage parameters, park covers are not"""
+        self.assertIn("default_build_age", SweepRunner.BUILDING_PARAMETERS)
+        self.assertIn("parkCanopyFilePath", SweepRunner.PARK_PARAMETERS)
+        self.assertIn("ground_cover_type", SweepRunner.PARK_PARAMETERS)
+        self.assertNotIn("buildingsCheckpoint", SweepRunner.PREPARATION_PARAMETERS)
+
+    def test_park_points_share_building_stage(self):
+        """Points differing by their park covers restore the same building stage"""
+        preparations = FakePreparations()
+        df = self.runSweep(grid = {"parkCanopyFilePath": ["canopy1.geojson",
+                                                          "canopy2.geojson",
+                                                          "canopy3.geojson"]},
+                           preparations = preparations)
+        self.assertEqual(len(preparations.calls), 3)
+        checkpoints = set(c for _, c in preparations.calls.values())
+        self.assertEqual(len(checkpoints), 1)
+        self.assertIsNotNone(checkpoints.pop())
+        self.assertEqual(list(df["BUILDINGS_REUSED"]), [False, True, True])
+        self.assertEqual(list(df["PREPARATION_REUSED"]), [False, False, False])
+        self.assertTrue(df["ERROR"].isna().all())
+
+    def test_building_points_do_not_share(self):
+        """Points differing by a building default have their own building stage"""
+        preparations = FakePreparations()
+        df = self.runSweep(grid = {"default_build_age": [1950, 2000],
+                                   "parkGroundFilePath": ["ground1.geojson",
+                                                          "ground2.geojson"]},
+                           preparations = preparations)
+        checkpoints = {}
+        for parameters, checkpoint in preparations.calls.values():
+            checkpoints.setdefault(parameters["default_build_age"], set()).add(checkpoint)
+        self.assertEqual([len(c) for c in checkpoints.values()], [1, 1])
+        self.assertNotEqual(checkpoints[1950], checkpoints[2000])
+        self.assertEqual(list(df["BUILDINGS_REUSED"]), [False, True, False, True])
+
+    def test_failed_building_stage_not_shared(self):
+        """The other preparations calculate their own building stage when
+        the first one fails"""
+        preparations = FakePreparations(failing = ["Sweep_0"])
+        df = self.runSweep(grid = {"parkCanopyFilePath": ["canopy1.geojson",
+                                                          "canopy2.geojson"]},
+                           preparations = preparations)
+        self.assertIsNone(preparations.calls["Sweep_1"][1])
+        self.assertEqual(list(df["BUILDINGS_REUSED"]), [False, False])
+        self.assertIn("Invalid park covers", df.loc[0, "ERROR"])
+        self.assertEqual(df.loc[1, "MEAN_DT"], 1.)
+
+    def test_checkpoints_removed(self):
+        """The shared building stage checkpoints are removed after the sweep"""
+        def preparation(parameters, outputDirectory, prefix, buildingsCheckpoint = None):
+            os.makedirs(buildingsCheckpoint, exist_ok = True)
+            return outputDirectory + os.sep + prefix
+        self.runSweep(grid = {"parkCanopyFilePath": ["canopy1.geojson"]},
+                      preparations = preparation)
+        self.assertFalse([f for f in os.listdir(self.directory)
+                          if SweepRunner.CHECKPOINT_BUILDINGS_FOLDER in f])
+
+
+if __name__ == "__main__":
+    unittest.main()
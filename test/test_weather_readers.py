@@ -0,0 +1,285 @@
+# coding=utf-8
+"""Tests of the readers of the weather files and of their cache.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+__author__ = 'Jérémy Bernard'
+__date__ = '2026-10-19'
+__copyright__ = '(C) 2026 by Jérémy Bernard'
+
+import glob
+import importlib.util
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+# The derived variables are calculated with the calculation module (needs GDAL, not QGIS)
+HAS_GDAL = importlib.util.find_spec("osgeo") is not None
+if HAS_GDAL:
+    from ..functions import WeatherReaders
+    from ..functions.globalVariables import WDIR, WSPEED, T_AIR, RH, P_ATMO,\
+        DPV, WIND_SECTOR, WEATHER_HOURS
+
+DATA_DIRECTORY = os.path.join(os.path.dirname(__file__), "data")
+SHINY_FILE = os.path.join(DATA_DIRECTORY, "meteoERA5_Nantes2003.csv")
+EPW_FILE = os.path.join(DATA_DIRECTORY, "weather_typical_year.epw")
+CSV_FILE = os.path.join(DATA_DIRECTORY, "weather_generic.csv")
+
+
+@unittest.skipUnless(HAS_GDAL, "GDAL is not installed")
+class GetReaderTest(unittest.TestCase):
+    """Test the identification of the weather file formats"""
+
+    def test_formats(self):
+        self.assertIsInstance(WeatherReaders.getReader(SHINY_FILE),
+                              WeatherReaders.ShinyWeatherReader)
+        self.assertIsInstance(WeatherReaders.getReader(EPW_FILE),
+                              WeatherReaders.EpwReader)
+        self.assertIsInstance(WeatherReaders.getReader(CSV_FILE),
+                              WeatherReaders.CsvWeatherReader)
+
+    def test_format_given(self):
+        reader = WeatherReaders.getReader(SHINY_FILE, weatherFormat = "csv", utc = 2)
+        self.assertIsInstance(reader, WeatherReaders.CsvWeatherReader)
+        self.assertEqual(reader.utc, 2)
+        with self.assertRaises(ValueError):
+            WeatherReaders.getReader(SHINY_FILE, weatherFormat = "unknown")
+
+    def test_unknown_format(self):
+        with tempfile.NamedTemporaryFile(suffix = ".nc") as f:
+            with self.assertRaises(ValueError):
+                WeatherReaders.getReader(f.name)
+
+
+@unittest.skipUnless(HAS_GDAL, "GDAL is not installed")
+class RegisterReaderTest(unittest.TestCase):
+    """Test that only complete readers can be registered"""
+
+    def tearDown(self):
+        WeatherReaders.READERS.pop("test", None)
+
+    def test_incomplete_reader(self):
+        class IncompleteReader(WeatherReaders.WeatherReader):
+            name = "test"
+            def canRead(self, filePath):
+                return False
+        with self.assertRaises(TypeError) as context:
+            WeatherReaders.registerReader(IncompleteReader)
+        self.assertIn("chunks", str(context.exception))
+        self.assertIn("utcOffset", str(context.exception))
+        self.assertNotIn("test", WeatherReaders.READERS)
+
+    def test_not_a_reader(self):
+        with self.assertRaises(TypeError):
+            WeatherReaders.registerReader(dict)
+
+    def test_complete_reader(self):
+        class TestReader(WeatherReaders.CsvWeatherReader):
+            name = "test"
+        self.assertIs(WeatherReaders.registerReader(TestReader), TestReader)
+        self.assertIsInstance(WeatherReaders.getReader(CSV_FILE, weatherFormat = "test"),
+                              TestReader)
+
+
+@unittest.skipUnless(HAS_GDAL, "GDAL is not installed")
+class ShinyWeatherReaderTest(unittest.TestCase):
+
+    def test_read(self):
+        """Hours selected in local time, index in UTC"""
+        df_met, utc = WeatherReaders.ShinyWeatherReader().read(SHINY_FILE)
+        self.assertEqual(utc, 1)
+        self.assertEqual(len(df_met), 365 * len(WEATHER_HOURS))
+        self.assertListEqual(sorted(df_met.columns), sorted([WDIR, WSPEED, T_AIR, RH, P_ATMO]))
+        self.assertEqual(df_met.index[0], pd.Timestamp("2003-01-01 11:00", tz = "UTC"))
+        self.assertEqual(df_met.index[1], pd.Timestamp("2003-01-01 22:00", tz = "UTC"))
+        self.assertListEqual(list(df_met.iloc[0][[WDIR, WSPEED, T_AIR, P_ATMO]]),
+                             [225, 8.8, 13.8, 100054])
+        # Relative humidity given as a fraction in the file
+        self.assertAlmostEqual(df_met.iloc[0][RH], 94)
+
+    def test_chunks(self):
+        """The result does not depend on the size of the chunks"""
+        reader = WeatherReaders.ShinyWeatherReader()
+        pd.testing.assert_frame_equal(reader.read(SHINY_FILE, chunkSize = 1000)[0],
+                                      reader.read(SHINY_FILE)[0])
+
+
+@unittest.skipUnless(HAS_GDAL, "GDAL is not installed")
+class EpwReaderTest(unittest.TestCase):
+
+    def test_typical_year(self):
+        """The months coming from different years are set in the same year
+        (hours 1 to 24 being the hours ending at 1:00 to 24:00)"""
+        for chunkSize in [10, 24, 1000]:
+            df_met, utc = WeatherReaders.EpwReader().read(EPW_FILE, hours = None,
+                                                          chunkSize = chunkSize)
+            self.assertEqual(utc, 1)
+            self.assertEqual(len(df_met), 48)
+            self.assertTrue((df_met.index.tz_convert("Etc/GMT-1").year == 2005).all())
+            self.assertEqual(df_met.index[0], pd.Timestamp("2004-12-31 23:00", tz = "UTC"))
+            self.assertEqual(df_met.index[24], pd.Timestamp("2005-01-31 23:00", tz = "UTC"))
+            self.assertTrue(df_met.index.is_monotonic_increasing)
+
+    def test_columns(self):
+        df_met = WeatherReaders.EpwReader().read(EPW_FILE)[0]
+        self.assertEqual(len(df_met), 2 * len(WEATHER_HOURS))
+        # 12:00 local time is the hour 13 of the file
+        first = df_met.iloc[0]
+        self.assertAlmostEqual(first[T_AIR], 7.3)
+        self.assertEqual(first[RH], 67)
+        self.assertEqual(first[P_ATMO], 101313)
+        self.assertEqual(first[WDIR], 195)
+        self.assertAlmostEqual(first[WSPEED], 4.25)
+
+    def test_actual_years(self):
+        """A year changing on the 1st of January is kept"""
+        with open(EPW_FILE) as f:
+            lines = f.read().splitlines()
+        header, data = lines[:8], lines[8:32]
+        lastDay = [",".join(["2004", "12", "31"] + l.split(",")[3:]) for l in data]
+        with tempfile.TemporaryDirectory() as directory:
+            filePath = os.path.join(directory, "actual.epw")
+            with open(filePath, "w") as f:
+                f.write("\n".join(header + lastDay + data) + "\n")
+            df_met = WeatherReaders.EpwReader().read(filePath, hours = None)[0]
+        local = df_met.index.tz_convert("Etc/GMT-1")
+        self.assertListEqual(sorted(set(local.year)), [2004, 2005])
+        self.assertEqual(local[0], pd.Timestamp("2004-12-31 00:00", tz = "Etc/GMT-1"))
+
+    def test_utc_given(self):
+        df_met, utc = WeatherReaders.EpwReader(utc = 3).read(EPW_FILE, hours = None)
+        self.assertEqual(utc, 3)
+        self.assertEqual(df_met.index[0], pd.Timestamp("2004-12-31 21:00", tz = "UTC"))
+
+
+@unittest.skipUnless(HAS_GDAL, "GDAL is not installed")
+class CsvWeatherReaderTest(unittest.TestCase):
+
+    def test_read(self):
+        """Only the full hours of WEATHER_HOURS are kept"""
+        df_met, utc = WeatherReaders.CsvWeatherReader(utc = 2).read(CSV_FILE)
+        self.assertEqual(utc, 2)
+        self.assertEqual(len(df_met), 2 * len(WEATHER_HOURS))
+        self.assertEqual(df_met.index[0], pd.Timestamp("2020-07-14 10:00", tz = "UTC"))
+        self.assertEqual(df_met.iloc[0][T_AIR], 26)
+
+    def test_columns(self):
+        """Columns of the file named differently"""
+        with tempfile.TemporaryDirectory() as directory:
+            filePath = os.path.join(directory, "weather.csv")
+            pd.read_csv(CSV_FILE).rename(columns = {T_AIR: "temperature"})\
+                .to_csv(filePath, index = False)
+            df_met = WeatherReaders.CsvWeatherReader(columns = {T_AIR: "temperature"})\
+                .read(filePath)[0]
+        self.assertEqual(df_met.iloc[0][T_AIR], 26)
+        self.assertEqual(df_met.index[0], pd.Timestamp("2020-07-14 12:00", tz = "UTC"))
+
+
+@unittest.skipUnless(HAS_GDAL, "GDAL is not installed")
+class RelativeHumidityTest(unittest.TestCase):
+    """Test that the relative humidity of each format has the same unit"""
+
+    def test_same_dpv(self):
+        """Equivalent rows (13.8 °C, 94 %) give the same vapour pressure deficit"""
+        shiny = WeatherReaders.readWeather(SHINY_FILE, cacheDirectory = None)[0].iloc[0]
+        with tempfile.TemporaryDirectory() as directory:
+            csvPath = os.path.join(directory, "weather.csv")
+            df_csv = pd.read_csv(CSV_FILE)
+            df_csv[T_AIR] = 13.8
+            df_csv[RH] = 94
+            df_csv.to_csv(csvPath, index = False)
+            csv = WeatherReaders.readWeather(csvPath, utc = 1, cacheDirectory = None)[0].iloc[0]
+            
+            epwPath = os.path.join(directory, "weather.epw")
+            with open(EPW_FILE) as f:
+                lines = f.read().splitlines()
+            rows = [l.split(",") for l in lines[8:]]
+            for row in rows:
+                row[6], row[8] = "13.8", "94"
+            with open(epwPath, "w") as f:
+                f.write("\n".join(lines[:8] + [",".join(row) for row in rows]) + "\n")
+            epw = WeatherReaders.readWeather(epwPath, cacheDirectory = None)[0].iloc[0]
+        
+        for row in [shiny, csv, epw]:
+            self.assertAlmostEqual(row[T_AIR], 13.8)
+            self.assertAlmostEqual(row[RH], 94)
+        self.assertAlmostEqual(csv[DPV], shiny[DPV])
+        self.assertAlmostEqual(epw[DPV], shiny[DPV])
+        # About 1 hPa at 13.8 °C and 94 %
+        self.assertAlmostEqual(shiny[DPV], 0.95, places = 1)
+
+
+@unittest.skipUnless(HAS_GDAL, "GDAL is not installed")
+class ReadWeatherCacheTest(unittest.TestCase):
+    """Test the cache of the weather tables (identified by the file content)"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cacheDirectory = os.path.join(self.directory.name, "cache")
+        self.filePath = os.path.join(self.directory.name, "weather.csv")
+        shutil.copy(CSV_FILE, self.filePath)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def read(self, **kwargs):
+        return WeatherReaders.readWeather(self.filePath, utc = 2,
+                                          cacheDirectory = self.cacheDirectory,
+                                          **kwargs)
+
+    def cacheFiles(self):
+        return glob.glob(os.path.join(self.cacheDirectory, "weather_*.pkl"))
+
+    def test_derived_variables(self):
+        df_met, utc = self.read()
+        self.assertEqual(utc, 2)
+        self.assertIn(DPV, df_met.columns)
+        self.assertTrue(df_met[WIND_SECTOR].isin(range(0, 360, 45)).all())
+
+    def test_cache_used(self):
+        """The file is not read again while its content does not change"""
+        df_met, utc = self.read()
+        self.assertEqual(len(self.cacheFiles()), 1)
+        with mock.patch.object(WeatherReaders.CsvWeatherReader, "read",
+                               side_effect = AssertionError("file read again")):
+            cached, cachedUtc = self.read()
+        pd.testing.assert_frame_equal(cached, df_met)
+        self.assertEqual(cachedUtc, utc)
+
+    def test_file_modified(self):
+        """The cache is identified by the file content, not by its path"""
+        self.read()
+        df_met = pd.read_csv(self.filePath)
+        df_met[T_AIR] += 1
+        df_met.to_csv(self.filePath, index = False)
+        self.assertEqual(self.read()[0].iloc[0][T_AIR], 27)
+        self.assertEqual(len(self.cacheFiles()), 2)
+
+    def test_settings_modified(self):
+        """The cache depends on the reader settings"""
+        self.read()
+        WeatherReaders.readWeather(self.filePath, utc = 1,
+                                   cacheDirectory = self.cacheDirectory)
+        self.assertEqual(len(self.cacheFiles()), 2)
+
+    def test_corrupted_cache(self):
+        df_met = self.read()[0]
+        with open(self.cacheFiles()[0], "wb") as f:
+            f.write(b"not a pickle")
+        pd.testing.assert_frame_equal(self.read()[0], df_met)
+
+    def test_no_cache(self):
+        WeatherReaders.readWeather(self.filePath, utc = 2, cacheDirectory = None)
+        self.assertFalse(os.path.exists(self.cacheDirectory))
+
+
+if __name__ == "__main__":
+    unittest.main()